@@ -0,0 +1,148 @@
+"""
+Conversión por lotes sin interfaz gráfica.
+
+Uso:
+    python batch.py ENTRADA --parametros parametros.json --salida carpeta [--procesos N]
+
+ENTRADA es una carpeta (se convierten todas las nubes soportadas que contiene)
+o un patrón glob, p. ej. "escaneos/**/*.laz". El archivo de parámetros es un
+JSON con las mismas claves que usa la ventana principal; las que falten toman
+los valores por defecto de la interfaz. Cada archivo se convierte en un
+proceso del pool (Open3D se importa una sola vez por proceso) y al terminar se
+escribe un resumen CSV con los tiempos por archivo.
+"""
+import argparse
+import csv
+import glob
+import json
+import multiprocessing
+import os
+import sys
+import time
+
+EXTENSIONES = ('.las', '.laz', '.ply', '.pcd', '.xyz')
+FORMATOS_SALIDA = ('ply', 'obj', 'stl')
+
+# Mismos valores por defecto que la interfaz gráfica
+PARAMETROS_POR_DEFECTO = {
+    'voxel': 0.02,
+    'eliminar_outliers': True,
+    'nb_neighbors': 20,
+    'std_ratio': 2.0,
+    'metodo': 'poisson',
+    'param': 9,
+    'dens': 0.01,
+    'color_method': 'nearest',
+    'k': 10,
+    'eliminar_fragmentos': True,
+    'min_comp': 1000,
+    'suavizar': True,
+    'eliminar_duplicados': True,
+}
+
+# Módulo del pipeline, importado una vez por proceso en _inicializar_proceso
+_worker = None
+
+def buscar_archivos(entrada):
+    """
+    Devuelve las nubes a convertir a partir de una carpeta o un patrón glob.
+    """
+    if os.path.isdir(entrada):
+        candidatos = [os.path.join(entrada, nombre) for nombre in os.listdir(entrada)]
+    else:
+        candidatos = glob.glob(entrada, recursive=True)
+    return sorted(c for c in candidatos if os.path.isfile(c) and c.lower().endswith(EXTENSIONES))
+
+def cargar_parametros(ruta):
+    """
+    Lee el JSON de parámetros y lo completa con los valores por defecto.
+    """
+    params = dict(PARAMETROS_POR_DEFECTO)
+    if ruta:
+        with open(ruta, encoding='utf-8') as f:
+            params.update(json.load(f))
+    desconocidos = set(params) - set(PARAMETROS_POR_DEFECTO)
+    if desconocidos:
+        raise ValueError(f"Parámetros desconocidos: {', '.join(sorted(desconocidos))}")
+    return params
+
+def _inicializar_proceso(hilos):
+    # Repartir los núcleos entre procesos para que OpenMP (Open3D) no los sobresuscriba
+    os.environ.setdefault('OMP_NUM_THREADS', str(hilos))
+    # Open3D, NumPy y laspy se importan aquí una sola vez por proceso
+    global _worker
+    import worker
+    _worker = worker
+
+def convertir_archivo(tarea):
+    """
+    Convierte un archivo dentro de un proceso del pool y devuelve su fila de resumen.
+    """
+    archivo, params, carpeta_salida, formato = tarea
+    from utils.io import guardar_malla
+    inicio = time.perf_counter()
+    base = os.path.splitext(os.path.basename(archivo))[0]
+    salida = os.path.join(carpeta_salida, f'{base}.{formato}')
+    fila = {'archivo': archivo, 'salida': salida, 'vertices': 0, 'triangulos': 0, 'error': ''}
+    try:
+        mesh, _ = _worker.convertir_nube(dict(params, input_file=archivo))
+        if not guardar_malla(mesh, salida):
+            raise IOError('No se pudo guardar la malla')
+        fila['vertices'] = len(mesh.vertices)
+        fila['triangulos'] = len(mesh.triangles)
+    except Exception as e:
+        fila['salida'] = ''
+        fila['error'] = str(e)
+    fila['segundos'] = round(time.perf_counter() - inicio, 3)
+    return fila
+
+def escribir_resumen(ruta, filas):
+    columnas = ['archivo', 'salida', 'segundos', 'vertices', 'triangulos', 'error']
+    with open(ruta, 'w', newline='', encoding='utf-8') as f:
+        escritor = csv.DictWriter(f, fieldnames=columnas)
+        escritor.writeheader()
+        escritor.writerows(filas)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Conversión por lotes de nubes de puntos a mallas 3D')
+    parser.add_argument('entrada', help='Carpeta o patrón glob de nubes de puntos')
+    parser.add_argument('--parametros', help='JSON con los parámetros de conversión')
+    parser.add_argument('--salida', required=True, help='Carpeta de destino de las mallas')
+    parser.add_argument('--formato', choices=FORMATOS_SALIDA, default='ply')
+    parser.add_argument('--procesos', type=int, default=os.cpu_count() or 1,
+                        help='Procesos en paralelo (por defecto, uno por núcleo)')
+    parser.add_argument('--resumen', help='CSV de resumen (por defecto, SALIDA/resumen.csv)')
+    args = parser.parse_args(argv)
+
+    archivos = buscar_archivos(args.entrada)
+    if not archivos:
+        print(f'No se encontraron nubes de puntos en {args.entrada}')
+        return 1
+    params = cargar_parametros(args.parametros)
+    os.makedirs(args.salida, exist_ok=True)
+    procesos = max(1, min(args.procesos, len(archivos)))
+    print(f'Convirtiendo {len(archivos)} archivos con {procesos} procesos...')
+
+    inicio = time.perf_counter()
+    tareas = [(archivo, params, args.salida, args.formato) for archivo in archivos]
+    filas = []
+    # maxtasksperchild=None: cada proceso conserva Open3D importado entre archivos
+    hilos = max(1, (os.cpu_count() or 1) // procesos)
+    with multiprocessing.Pool(procesos, initializer=_inicializar_proceso, initargs=(hilos,)) as pool:
+        for fila in pool.imap_unordered(convertir_archivo, tareas):
+            estado = 'ERROR: ' + fila['error'] if fila['error'] else f"{fila['triangulos']} triángulos"
+            print(f"[{len(filas) + 1}/{len(archivos)}] {fila['archivo']} ({fila['segundos']:.1f} s) {estado}")
+            filas.append(fila)
+    total = time.perf_counter() - inicio
+
+    filas.sort(key=lambda f: f['archivo'])
+    ruta_resumen = args.resumen or os.path.join(args.salida, 'resumen.csv')
+    escribir_resumen(ruta_resumen, filas)
+    errores = sum(1 for f in filas if f['error'])
+    suma = sum(f['segundos'] for f in filas)
+    print(f'Completado en {total:.1f} s (suma por archivo {suma:.1f} s, {errores} errores). Resumen: {ruta_resumen}')
+    return 1 if errores else 0
+
+if __name__ == '__main__':
+    multiprocessing.freeze_support()
+    sys.exit(main())
@@ -11,12 +11,14 @@ from procesado.preprocesado import downsample_point_cloud, remove_outliers
 from procesado.reconstruccion import reconstruir_poisson, reconstruir_ball_pivoting, reconstruir_alpha_shape
 from procesado.color import transferir_color
 from utils.io import leer_nube, guardar_malla
+from utils.binario import leer_malla_binaria
 import open3d as o3d
 import numpy as np
 import time
 import tempfile
 import os
-from worker import conversion_worker, eliminar_componentes_pequenas_worker
+from worker import proceso_persistente
+from procesado.limpieza import limpiar_malla
 
 class ConversionThread(QThread):
     progress = pyqtSignal(int)
@@ -30,11 +32,10 @@ class ConversionThread(QThread):
         try:
             self.status.emit("Cargando nube de puntos...")
             self.progress.emit(5)
-            pcd = leer_nube(self.params['input_file'])
+            pcd = leer_nube(self.params['input_file'], voxel_size=self.params['voxel'])
             if self._cancel: self._emit_cancel(); return
             self.status.emit("Preprocesando nube...")
             self.progress.emit(20)
-            pcd = downsample_point_cloud(pcd, self.params['voxel'])
             if self.params['eliminar_outliers']:
                 pcd = remove_outliers(pcd, nb_neighbors=self.params['nb_neighbors'], std_ratio=self.params['std_ratio'])
             if self._cancel: self._emit_cancel(); return
@@ -69,9 +70,8 @@ class ConversionThread(QThread):
             self.progress.emit(70)
             mesh = transferir_color(mesh, pcd, metodo=self.params['color_method'], k_neighbors=self.params['k'])
             if self._cancel: self._emit_cancel(); return
-            if self.params['eliminar_fragmentos']:
-                self.status.emit("Eliminando fragmentos pequeños...")
-                mesh = MainWindow.eliminar_componentes_pequenas_static(mesh, self.params['min_comp'])
+            self.status.emit("Limpiando malla...")
+            mesh = limpiar_malla(mesh, self.params['min_comp'] if self.params['eliminar_fragmentos'] else 0)
             if self._cancel: self._emit_cancel(); return
             if self.params['suavizar']:
                 self.status.emit("Suavizando malla...")
@@ -107,6 +107,25 @@ class MainWindow(QMainWindow):
         self.mesh_path = None
         self.pcd_path = None
         self.temp_files = []
+        # Proceso de conversión persistente: se arranca ya para que el primer
+        # clic no pague la importación de Open3D
+        self.peticiones = None
+        self.cancelar = None
+        self.id_peticion = 0
+        self.iniciar_proceso()
+
+    def iniciar_proceso(self):
+        """
+        Arranca (o rearranca si murió) el proceso de conversión persistente.
+        """
+        if self.proc is not None and self.proc.is_alive():
+            return
+        self.peticiones = multiprocessing.Queue()
+        self.queue = multiprocessing.Queue()
+        self.cancelar = multiprocessing.Value('i', 0)  # id de la última petición cancelada
+        self.proc = multiprocessing.Process(target=proceso_persistente,
+                                            args=(self.peticiones, self.queue, self.cancelar), daemon=True)
+        self.proc.start()
 
     def init_ui(self):
         main_widget = QWidget()
@@ -370,10 +389,9 @@ class MainWindow(QMainWindow):
         if not self.input_file:
             QMessageBox.warning(self, "Error", "Selecciona un archivo de nube de puntos.")
             return
-        self.pcd = leer_nube(self.input_file)
-        # Preprocesado
+        # Preprocesado (el downsampling se aplica durante la lectura)
         voxel = self.voxel_spin.value()
-        self.pcd = downsample_point_cloud(self.pcd, voxel)
+        self.pcd = leer_nube(self.input_file, voxel_size=voxel)
         if self.outlier_check.isChecked():
             nb = self.nb_neighbors_spin.value()
             std = self.std_ratio_spin.value()
@@ -412,13 +430,20 @@ class MainWindow(QMainWindow):
             'suavizar': self.smooth_check.isChecked(),
             'eliminar_duplicados': self.dup_check.isChecked()
         }
-        self.queue = multiprocessing.Queue()
-        self.proc = multiprocessing.Process(target=conversion_worker, args=(params, self.queue))
-        self.proc.start()
+        self.iniciar_proceso()
+        self.id_peticion += 1
+        self.peticiones.put((self.id_peticion, params))
         self.timer = self.startTimer(100)  # 100 ms
 
     def closeEvent(self, event):
         try:
+            # Terminar el proceso persistente
+            if self.proc is not None and self.proc.is_alive():
+                self.cancelar.value = self.id_peticion
+                self.peticiones.put(None)
+                self.proc.join(timeout=2)
+                if self.proc.is_alive():
+                    self.proc.terminate()
             # Limpiar archivos temporales
             for f in self.temp_files:
                 try:
@@ -434,53 +459,61 @@ class MainWindow(QMainWindow):
             queue = self.queue  # Captura la referencia actual
             if queue is None:
                 return
+            if queue.empty() and not self.proc.is_alive():
+                # El proceso murió (p. ej. fallo nativo de Open3D); se rearranca en el próximo clic
+                self.killTimer(self.timer)
+                self.timer = None
+                self.btn_convert.setEnabled(True)
+                self.btn_cancel.setEnabled(False)
+                self.status_label.setText("El proceso de conversión terminó inesperadamente.")
+                self.progress_bar.setValue(0)
+                return
             while not queue.empty():
                 msg = queue.get()
-                if isinstance(msg, dict):
-                    if 'progress' in msg:
-                        self.progress_bar.setValue(msg['progress'])
-                    if 'status' in msg:
-                        self.status_label.setText(msg['status'])
-                    if 'result' in msg:
-                        mesh_path, pcd_path, error_msg = msg['result']
-                        self.killTimer(self.timer)
-                        self.timer = None
-                        self.proc = None
-                        self.queue = None
-                        self.btn_convert.setEnabled(True)
-                        self.btn_cancel.setEnabled(False)
-                        if error_msg:
-                            QMessageBox.warning(self, "Error", error_msg)
-                            self.status_label.setText(error_msg)
-                            self.progress_bar.setValue(0)
-                            self.mesh_path = None
-                            self.pcd_path = None
-                            return
-                        self.mesh_path = mesh_path
-                        self.pcd_path = pcd_path
-                        self.temp_files.extend([mesh_path, pcd_path])
-                        self.status_label.setText("Conversión completada.")
-                        self.progress_bar.setValue(100)
-                        # Mostrar mensaje de éxito SIN cerrar la app
-                        QMessageBox.information(self, "Éxito", "Malla generada correctamente.\nAhora puedes visualizar o guardar la malla desde los botones de la interfaz.")
+                # Ignorar mensajes de peticiones anteriores (p. ej. canceladas)
+                if not isinstance(msg, dict) or msg.get('id') != self.id_peticion:
+                    continue
+                if 'progress' in msg:
+                    self.progress_bar.setValue(msg['progress'])
+                if 'status' in msg:
+                    self.status_label.setText(msg['status'])
+                if 'result' in msg:
+                    mesh_path, pcd_path, error_msg = msg['result']
+                    self.killTimer(self.timer)
+                    self.timer = None
+                    self.btn_convert.setEnabled(True)
+                    self.btn_cancel.setEnabled(False)
+                    if error_msg:
+                        QMessageBox.warning(self, "Error", error_msg)
+                        self.status_label.setText(error_msg)
+                        self.progress_bar.setValue(0)
+                        self.mesh_path = None
+                        self.pcd_path = None
+                        return
+                    self.mesh_path = mesh_path
+                    self.pcd_path = pcd_path
+                    self.temp_files.extend([mesh_path, pcd_path])
+                    self.status_label.setText("Conversión completada.")
+                    self.progress_bar.setValue(100)
+                    # Mostrar mensaje de éxito SIN cerrar la app
+                    QMessageBox.information(self, "Éxito", "Malla generada correctamente.\nAhora puedes visualizar o guardar la malla desde los botones de la interfaz.")
         except Exception as e:
             QMessageBox.critical(self, "Error interno", f"Ocurrió un error inesperado: {str(e)}")
 
     def cancelar_conversion(self):
-        if self.proc is not None and self.proc.is_alive():
-            self.proc.terminate()
-            self.proc = None
-            self.queue = None
-            if self.timer:
-                self.killTimer(self.timer)
-                self.timer = None
-            self.status_label.setText("Conversión cancelada.")
-            self.btn_cancel.setEnabled(False)
-            self.btn_convert.setEnabled(True)
+        # El proceso persistente abandona la petición en la siguiente etapa sin terminar
+        if self.cancelar is not None:
+            self.cancelar.value = self.id_peticion
+        if self.timer:
+            self.killTimer(self.timer)
+            self.timer = None
+        self.status_label.setText("Conversión cancelada.")
+        self.btn_cancel.setEnabled(False)
+        self.btn_convert.setEnabled(True)
 
     def visualizar_malla(self):
         if self.mesh_path is not None and os.path.exists(self.mesh_path):
-            mesh = o3d.io.read_triangle_mesh(self.mesh_path)
+            mesh = leer_malla_binaria(self.mesh_path)
             # Centrar ventana en pantalla 1920x1080 (ajusta left/top si tu pantalla es diferente)
             width, height = 1200, 800
             left = (1920 - width) // 2  # Centrado horizontal
@@ -499,7 +532,7 @@ class MainWindow(QMainWindow):
             return
         file_path, _ = QFileDialog.getSaveFileName(self, "Guardar malla 3D", "", "Mesh Files (*.ply *.stl *.obj)")
         if file_path:
-            mesh = o3d.io.read_triangle_mesh(self.mesh_path)
+            mesh = leer_malla_binaria(self.mesh_path)
             ok = o3d.io.write_triangle_mesh(file_path, mesh)
             if ok:
                 QMessageBox.information(self, "Éxito", "Malla guardada correctamente.")
@@ -514,18 +547,6 @@ class MainWindow(QMainWindow):
         btn.clicked.connect(lambda: QMessageBox.information(self, "Ayuda", texto_largo_html))
         return btn
 
-    @staticmethod
-    def eliminar_componentes_pequenas_static(mesh, min_triangles=1000):
-        mesh = mesh.remove_unreferenced_vertices()
-        triangle_clusters, cluster_n_triangles, _ = mesh.cluster_connected_triangles()
-        triangle_clusters = np.asarray(triangle_clusters)
-        cluster_n_triangles = np.asarray(cluster_n_triangles)
-        large_clusters = [i for i, n in enumerate(cluster_n_triangles) if n > min_triangles]
-        triangles_to_remove = [i for i, c in enumerate(triangle_clusters) if c not in large_clusters]
-        mesh.remove_triangles_by_index(triangles_to_remove)
-        mesh.remove_unreferenced_vertices()
-        return mesh
-
 if __name__ == "__main__":
     app = QApplication(sys.argv)
     # Estilo global para tooltips cuadrados
@@ -0,0 +1,94 @@
+import hashlib
+import json
+import os
+from utils.binario import guardar_nube_binaria, leer_nube_binaria
+
+# Directorio de la caché de etapas y tamaño máximo (LRU por fecha de uso)
+DIR_CACHE = os.getenv('CONVERTIDOR_CACHE_DIR',
+                      os.path.join(os.path.expanduser('~'), '.cache', 'nueva_app_converter', 'etapas'))
+MAX_BYTES_CACHE = int(os.getenv('CONVERTIDOR_CACHE_MAX_MB', '10240')) * 1024 * 1024
+
+def hash_archivo(ruta, tam_bloque=8 * 1024 * 1024):
+    """
+    SHA-256 del archivo de entrada leído por bloques.
+    """
+    digest = hashlib.sha256()
+    with open(ruta, 'rb') as f:
+        for bloque in iter(lambda: f.read(tam_bloque), b''):
+            digest.update(bloque)
+    return digest.hexdigest()
+
+def claves_etapas(hash_entrada, parametros_etapas):
+    """
+    Una clave por etapa: la clave anterior (o el hash de la entrada) más los
+    parámetros de la etapa. Cambiar una etapa invalida también las siguientes.
+    """
+    claves = []
+    padre = hash_entrada
+    for parametros in parametros_etapas:
+        texto = json.dumps(parametros, sort_keys=True, separators=(',', ':'))
+        padre = hashlib.sha256(f'{padre}:{texto}'.encode()).hexdigest()
+        claves.append(padre)
+    return claves
+
+def _ruta(clave):
+    return os.path.join(DIR_CACHE, f'{clave}.bvb')
+
+def guardar_etapa(clave, pcd):
+    """
+    Guarda puntos, colores y normales de la nube (escritura atómica) y
+    expulsa las entradas menos usadas si la caché supera el tamaño máximo.
+    Devuelve False si no se pudo escribir.
+    """
+    try:
+        os.makedirs(DIR_CACHE, exist_ok=True)
+        ruta = guardar_nube_binaria(_ruta(clave), pcd)
+        _expulsar(conservar=ruta)
+        return True
+    except OSError as e:
+        # Un fallo de la caché no debe abortar la conversión
+        print(f'No se pudo guardar la etapa en caché: {e}')
+        return False
+
+def cargar_etapa(clave):
+    """
+    Devuelve la nube cacheada de una etapa o None si no existe.
+    """
+    ruta = _ruta(clave)
+    if not os.path.exists(ruta):
+        return None
+    try:
+        pcd = leer_nube_binaria(ruta)
+        os.utime(ruta)
+        return pcd
+    except (OSError, ValueError):
+        return None
+
+def reanudar(claves):
+    """
+    Busca la etapa más profunda cacheada. Devuelve (índice, nube) o (-1, None).
+    """
+    for indice in reversed(range(len(claves))):
+        pcd = cargar_etapa(claves[indice])
+        if pcd is not None:
+            return indice, pcd
+    return -1, None
+
+def _expulsar(conservar=None):
+    entradas = []
+    for nombre in os.listdir(DIR_CACHE):
+        ruta = os.path.join(DIR_CACHE, nombre)
+        if nombre.endswith('.bvb'):
+            estado = os.stat(ruta)
+            entradas.append((estado.st_mtime, estado.st_size, ruta))
+    total = sum(e[1] for e in entradas)
+    for _, tam, ruta in sorted(entradas):
+        if total <= MAX_BYTES_CACHE:
+            break
+        if ruta == conservar:
+            continue
+        try:
+            os.remove(ruta)
+            total -= tam
+        except FileNotFoundError:
+            pass
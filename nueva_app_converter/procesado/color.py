@@ -1,17 +1,36 @@
 import open3d as o3d
 import numpy as np
+from scipy.spatial import cKDTree
+
+# Vértices por bloque de consulta para acotar la memoria de los índices k-NN
+TAM_BLOQUE = 1_000_000
 
 def transferir_color(mesh, pcd, metodo='nearest', k_neighbors=10):
     """
     Transfiere el color de la nube de puntos a la malla usando el método seleccionado.
+    - nearest: color del punto más cercano.
+    - weighted: media de los k vecinos más cercanos.
+    - interpolated: media ponderada por el inverso de la distancia de los k vecinos.
+    Todas las consultas se hacen en bloque y en paralelo (workers=-1).
     """
-    # Implementación simple: nearest neighbor
     if not pcd.has_colors():
         return mesh
-    pcd_tree = o3d.geometry.KDTreeFlann(pcd)
-    mesh_colors = []
-    for v in np.asarray(mesh.vertices):
-        _, idx, _ = pcd_tree.search_knn_vector_3d(v, 1)
-        mesh_colors.append(np.asarray(pcd.colors)[idx[0]])
+    puntos = np.asarray(pcd.points)
+    colores = np.asarray(pcd.colors)
+    vertices = np.asarray(mesh.vertices)
+    arbol = cKDTree(puntos)
+    k = 1 if metodo == 'nearest' else int(max(1, min(k_neighbors, len(puntos))))
+    mesh_colors = np.empty((len(vertices), 3))
+    for inicio in range(0, len(vertices), TAM_BLOQUE):
+        fin = min(inicio + TAM_BLOQUE, len(vertices))
+        dist, idx = arbol.query(vertices[inicio:fin], k=k, workers=-1)
+        if k == 1:
+            mesh_colors[inicio:fin] = colores[idx.reshape(-1)]
+        elif metodo == 'interpolated':
+            pesos = 1.0 / np.maximum(dist, 1e-12)
+            pesos /= pesos.sum(axis=1, keepdims=True)
+            mesh_colors[inicio:fin] = np.einsum('nk,nkc->nc', pesos, colores[idx])
+        else:
+            mesh_colors[inicio:fin] = colores[idx].mean(axis=1)
     mesh.vertex_colors = o3d.utility.Vector3dVector(mesh_colors)
-    return mesh 
\ No newline at end of file
+    return mesh
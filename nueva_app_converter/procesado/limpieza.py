@@ -0,0 +1,65 @@
+import numpy as np
+import open3d as o3d
+
+def mascara_degenerados(triangulos):
+    """
+    Triángulos con algún índice de vértice repetido.
+    """
+    return ((triangulos[:, 0] == triangulos[:, 1]) |
+            (triangulos[:, 1] == triangulos[:, 2]) |
+            (triangulos[:, 0] == triangulos[:, 2]))
+
+def mascara_duplicados(triangulos):
+    """
+    Triángulos repetidos (mismos vértices en cualquier orden); se conserva el primero.
+    """
+    mascara = np.ones(len(triangulos), dtype=bool)
+    if len(triangulos):
+        _, primeros = np.unique(np.sort(triangulos, axis=1), axis=0, return_index=True)
+        mascara[primeros] = False
+    return mascara
+
+def mascara_componentes_pequenas(mesh, min_triangulos):
+    """
+    Triángulos de componentes conexas con min_triangulos triángulos o menos.
+    Una sola indexación cuenta[cluster] en lugar de recorrer los triángulos.
+    """
+    clusters, triangulos_por_cluster, _ = mesh.cluster_connected_triangles()
+    clusters = np.asarray(clusters)
+    if len(clusters) == 0:
+        return np.zeros(0, dtype=bool)
+    return np.asarray(triangulos_por_cluster)[clusters] <= min_triangulos
+
+def limpiar_malla(mesh, min_triangulos=0):
+    """
+    Elimina triángulos degenerados y duplicados, las componentes con
+    min_triangulos triángulos o menos (0 desactiva el filtro) y los vértices
+    no referenciados. Devuelve una malla nueva.
+    """
+    vertices = np.asarray(mesh.vertices)
+    triangulos = np.asarray(mesh.triangles)
+    colores = np.asarray(mesh.vertex_colors) if mesh.has_vertex_colors() else None
+    normales = np.asarray(mesh.vertex_normals) if mesh.has_vertex_normals() else None
+
+    triangulos = triangulos[~mascara_degenerados(triangulos)]
+    triangulos = triangulos[~mascara_duplicados(triangulos)]
+    if min_triangulos > 0 and len(triangulos):
+        intermedia = o3d.geometry.TriangleMesh(o3d.utility.Vector3dVector(vertices),
+                                               o3d.utility.Vector3iVector(triangulos))
+        triangulos = triangulos[~mascara_componentes_pequenas(intermedia, min_triangulos)]
+
+    # Compactar vértices no referenciados
+    usados = np.zeros(len(vertices), dtype=bool)
+    usados[triangulos.ravel()] = True
+    reindice = (np.cumsum(usados) - 1).astype(np.int32)
+
+    limpia = o3d.geometry.TriangleMesh()
+    limpia.vertices = o3d.utility.Vector3dVector(vertices[usados])
+    limpia.triangles = o3d.utility.Vector3iVector(reindice[triangulos])
+    if colores is not None:
+        limpia.vertex_colors = o3d.utility.Vector3dVector(colores[usados])
+    if normales is not None:
+        limpia.vertex_normals = o3d.utility.Vector3dVector(normales[usados])
+    print(f'Limpieza de malla: {len(np.asarray(mesh.triangles))} -> {len(triangulos)} triángulos, '
+          f'{len(vertices)} -> {int(usados.sum())} vértices')
+    return limpia
@@ -0,0 +1,76 @@
+import numpy as np
+
+def _agrupar(claves):
+    """
+    Agrupa claves de vóxel (N, 3). Devuelve el índice de la primera fila de
+    cada grupo y el grupo de cada fila.
+    """
+    minimos = claves.min(axis=0)
+    rangos = claves.max(axis=0) - minimos + 1
+    if int(rangos[0]) * int(rangos[1]) * int(rangos[2]) < 2 ** 63:
+        rel = claves - minimos
+        empaquetadas = (rel[:, 0] * rangos[1] + rel[:, 1]) * rangos[2] + rel[:, 2]
+        _, primeras, inversa = np.unique(empaquetadas, return_index=True, return_inverse=True)
+    else:
+        _, primeras, inversa = np.unique(claves, axis=0, return_index=True, return_inverse=True)
+    return primeras, inversa.reshape(-1)
+
+def _reducir(claves, cuentas, sumas, sumas_color):
+    """
+    Fusiona las filas con la misma clave sumando cuentas, posiciones y colores.
+    """
+    primeras, inversa = _agrupar(claves)
+    n = len(primeras)
+    nuevas_cuentas = np.bincount(inversa, weights=cuentas, minlength=n)
+    nuevas_sumas = np.column_stack([np.bincount(inversa, weights=sumas[:, e], minlength=n) for e in range(3)])
+    nuevos_colores = None
+    if sumas_color is not None:
+        nuevos_colores = np.column_stack([np.bincount(inversa, weights=sumas_color[:, e], minlength=n) for e in range(3)])
+    return claves[primeras], nuevas_cuentas, nuevas_sumas, nuevos_colores
+
+class AcumuladorVoxel:
+    """
+    Rejilla de vóxeles incremental: recibe bloques de puntos y guarda solo
+    los agregados por vóxel (memoria proporcional a los vóxeles de salida).
+    """
+    def __init__(self, voxel_size, umbral_fusion=8_000_000):
+        self.voxel_size = float(voxel_size)
+        self.umbral_fusion = umbral_fusion
+        self.puntos_entrada = 0
+        self._pendientes = []
+        self._filas = 0
+        self._filas_fusionadas = 0
+
+    def agregar(self, puntos, colores=None):
+        if len(puntos) == 0:
+            return
+        claves = np.floor(puntos / self.voxel_size).astype(np.int64)
+        self._pendientes.append(_reducir(claves, np.ones(len(puntos)), puntos, colores))
+        self.puntos_entrada += len(puntos)
+        self._filas += len(self._pendientes[-1][0])
+        # Umbral relativo: con una rejilla fusionada mayor que el umbral, fusionar
+        # en cada bloque la reordenaría entera cada vez (coste cuadrático)
+        if self._filas > max(self.umbral_fusion, 2 * self._filas_fusionadas):
+            self._fusionar()
+
+    def _fusionar(self):
+        if len(self._pendientes) <= 1:
+            return
+        partes = list(zip(*self._pendientes))
+        colores = np.concatenate(partes[3]) if partes[3][0] is not None else None
+        self._pendientes = [_reducir(np.concatenate(partes[0]), np.concatenate(partes[1]),
+                                     np.concatenate(partes[2]), colores)]
+        self._filas = len(self._pendientes[0][0])
+        self._filas_fusionadas = self._filas
+
+    def resultado(self):
+        """
+        Devuelve (puntos, colores) promediados por vóxel.
+        """
+        self._fusionar()
+        if not self._pendientes:
+            return np.empty((0, 3)), None
+        _, cuentas, sumas, sumas_color = self._pendientes[0]
+        puntos = sumas / cuentas[:, None]
+        colores = sumas_color / cuentas[:, None] if sumas_color is not None else None
+        return puntos, colores
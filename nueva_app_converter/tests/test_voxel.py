@@ -0,0 +1,36 @@
+"""
+Tests para la rejilla de vóxeles incremental del conversor
+"""
+
+import numpy as np
+
+from procesado.voxel import AcumuladorVoxel
+
+
+def test_promedio_por_voxel():
+    """Test promedio de puntos y colores por vóxel"""
+    acumulador = AcumuladorVoxel(0.5)
+    acumulador.agregar(np.array([[0.1, 0.1, 0.1], [0.3, 0.3, 0.3]]), np.array([[1.0, 0, 0], [0, 0, 1.0]]))
+    acumulador.agregar(np.array([[1.2, 0.1, 0.1]]), np.array([[0, 1.0, 0]]))
+
+    puntos, colores = acumulador.resultado()
+    orden = np.argsort(puntos[:, 0])
+    np.testing.assert_allclose(puntos[orden], [[0.2, 0.2, 0.2], [1.2, 0.1, 0.1]])
+    np.testing.assert_allclose(colores[orden], [[0.5, 0, 0.5], [0, 1, 0]])
+
+
+def test_umbral_relativo_a_la_rejilla(monkeypatch):
+    """Test con una rejilla fusionada mayor que el umbral no se fusiona en cada bloque"""
+    rng = np.random.default_rng(4)
+    acumulador = AcumuladorVoxel(0.001, umbral_fusion=100)
+    fusiones = []
+    fusionar = acumulador._fusionar
+    monkeypatch.setattr(acumulador, "_fusionar", lambda: fusiones.append(1) or fusionar())
+
+    # 50 bloques de 200 vóxeles distintos: la rejilla crece hasta 10000 filas
+    for _ in range(50):
+        acumulador.agregar(rng.random((200, 3)) * 1000)
+
+    assert len(fusiones) < 10
+    puntos, _ = acumulador.resultado()
+    assert len(puntos) == 10000
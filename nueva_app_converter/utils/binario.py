@@ -0,0 +1,110 @@
+import json
+import os
+import struct
+import numpy as np
+import open3d as o3d
+
+# Formato .bvb: MAGIC | longitud del header (uint64) | header JSON | arrays
+# alineados a 64 bytes. Es el mismo formato que usa la API (point_buffer.py):
+# leer un archivo solo lo mapea en memoria, sin parsear PLY/PCD.
+MAGIC = b"BVBUF\x00\x01\x00"
+ALINEACION = 64
+_LONGITUD = struct.Struct("<Q")
+
+def _alinear(offset):
+    return (offset + ALINEACION - 1) // ALINEACION * ALINEACION
+
+def escribir_binario(ruta, arrays, meta=None):
+    """
+    Escribe los arrays (los None se omiten) en formato .bvb de forma atómica.
+    """
+    arrays = {nombre: np.ascontiguousarray(a) for nombre, a in arrays.items() if a is not None}
+    entradas = {nombre: {'dtype': a.dtype.str, 'shape': list(a.shape), 'offset': 0}
+                for nombre, a in arrays.items()}
+    header = {'arrays': entradas, 'meta': meta or {}}
+    reservado = len(json.dumps(header).encode()) + 32 * len(entradas) + 16
+    offset = _alinear(len(MAGIC) + _LONGITUD.size + reservado)
+    for nombre, a in arrays.items():
+        entradas[nombre]['offset'] = offset
+        offset = _alinear(offset + a.nbytes)
+    header_bytes = json.dumps(header).encode().ljust(reservado, b" ")
+
+    tmp = ruta + '.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(MAGIC)
+        f.write(_LONGITUD.pack(len(header_bytes)))
+        f.write(header_bytes)
+        for nombre, a in arrays.items():
+            f.seek(entradas[nombre]['offset'])
+            if a.nbytes:
+                f.write(memoryview(a).cast('B'))
+        f.truncate(offset)
+    os.replace(tmp, ruta)
+    return ruta
+
+def leer_binario(ruta):
+    """
+    Mapea un archivo .bvb y devuelve (arrays, meta). Los arrays son vistas de
+    solo lectura sobre el archivo, sin copia.
+    """
+    with open(ruta, 'rb') as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f'No es un archivo .bvb: {ruta}')
+        (longitud,) = _LONGITUD.unpack(f.read(_LONGITUD.size))
+        header = json.loads(f.read(longitud))
+    arrays = {}
+    if header['arrays']:
+        mapa = np.memmap(ruta, dtype=np.uint8, mode='r')
+        for nombre, e in header['arrays'].items():
+            forma = tuple(e['shape'])
+            arrays[nombre] = np.frombuffer(mapa, dtype=np.dtype(e['dtype']), count=int(np.prod(forma)),
+                                           offset=e['offset']).reshape(forma)
+    return arrays, header.get('meta', {})
+
+def guardar_nube_binaria(ruta, pcd):
+    """
+    Guarda puntos, colores y normales de una nube de Open3D en .bvb.
+    """
+    return escribir_binario(ruta, {
+        'points': np.asarray(pcd.points),
+        'colors': np.asarray(pcd.colors) if pcd.has_colors() else None,
+        'normals': np.asarray(pcd.normals) if pcd.has_normals() else None,
+    })
+
+def leer_nube_binaria(ruta):
+    """
+    Reconstruye una nube de Open3D desde un archivo .bvb.
+    """
+    arrays, _ = leer_binario(ruta)
+    pcd = o3d.geometry.PointCloud()
+    pcd.points = o3d.utility.Vector3dVector(arrays['points'])
+    if 'colors' in arrays:
+        pcd.colors = o3d.utility.Vector3dVector(arrays['colors'])
+    if 'normals' in arrays:
+        pcd.normals = o3d.utility.Vector3dVector(arrays['normals'])
+    return pcd
+
+def guardar_malla_binaria(ruta, mesh):
+    """
+    Guarda vértices, triángulos, colores y normales de una malla en .bvb.
+    """
+    return escribir_binario(ruta, {
+        'vertices': np.asarray(mesh.vertices),
+        'triangles': np.asarray(mesh.triangles),
+        'vertex_colors': np.asarray(mesh.vertex_colors) if mesh.has_vertex_colors() else None,
+        'vertex_normals': np.asarray(mesh.vertex_normals) if mesh.has_vertex_normals() else None,
+    })
+
+def leer_malla_binaria(ruta):
+    """
+    Reconstruye una malla de Open3D desde un archivo .bvb.
+    """
+    arrays, _ = leer_binario(ruta)
+    mesh = o3d.geometry.TriangleMesh()
+    mesh.vertices = o3d.utility.Vector3dVector(arrays['vertices'])
+    mesh.triangles = o3d.utility.Vector3iVector(arrays['triangles'])
+    if 'vertex_colors' in arrays:
+        mesh.vertex_colors = o3d.utility.Vector3dVector(arrays['vertex_colors'])
+    if 'vertex_normals' in arrays:
+        mesh.vertex_normals = o3d.utility.Vector3dVector(arrays['vertex_normals'])
+    return mesh
@@ -1,26 +1,61 @@
 import open3d as o3d
 import laspy
 import numpy as np
+from procesado.preprocesado import downsample_point_cloud
+from procesado.voxel import AcumuladorVoxel
 
-def leer_nube(file_path):
+# Puntos leídos por bloque en archivos LAS/LAZ
+PUNTOS_POR_BLOQUE = 2_000_000
+
+def iterar_bloques_las(file_path, tam_bloque=PUNTOS_POR_BLOQUE):
+    """
+    Recorre un archivo LAS/LAZ por bloques con el iterador de laspy.
+    Devuelve (puntos (n, 3) float64, colores (n, 3) en [0, 1] o None) por bloque.
+    """
+    with laspy.open(file_path) as reader:
+        dims = set(reader.header.point_format.dimension_names)
+        con_color = {'red', 'green', 'blue'} <= dims
+        for bloque in reader.chunk_iterator(tam_bloque):
+            puntos = np.empty((len(bloque), 3))
+            puntos[:, 0] = bloque.x
+            puntos[:, 1] = bloque.y
+            puntos[:, 2] = bloque.z
+            colores = None
+            if con_color:
+                colores = np.empty((len(bloque), 3))
+                colores[:, 0] = bloque.red
+                colores[:, 1] = bloque.green
+                colores[:, 2] = bloque.blue
+                colores /= 65535.0
+            yield puntos, colores
+
+def leer_nube(file_path, voxel_size=0):
     """
     Lee una nube de puntos desde archivo (soporta .las, .laz, .ply, .pcd, .xyz).
+    Si voxel_size > 0 devuelve la nube ya reducida; en LAS/LAZ el downsampling
+    se hace bloque a bloque mientras se lee, sin cargar el archivo completo.
     """
     ext = file_path.lower().split('.')[-1]
     if ext in ['las', 'laz']:
-        las = laspy.read(file_path)
-        points = np.vstack((las.x, las.y, las.z)).T
         pcd = o3d.geometry.PointCloud()
+        if voxel_size > 0:
+            acumulador = AcumuladorVoxel(voxel_size)
+            for puntos, colores in iterar_bloques_las(file_path):
+                acumulador.agregar(puntos, colores)
+            points, colors = acumulador.resultado()
+        else:
+            bloques = list(iterar_bloques_las(file_path))
+            points = np.concatenate([b[0] for b in bloques])
+            colors = np.concatenate([b[1] for b in bloques]) if bloques and bloques[0][1] is not None else None
         pcd.points = o3d.utility.Vector3dVector(points)
-        if hasattr(las, 'red'):
-            colors = np.vstack((las.red, las.green, las.blue)).T / 65535.0
+        if colors is not None:
             pcd.colors = o3d.utility.Vector3dVector(colors)
         return pcd
     else:
-        return o3d.io.read_point_cloud(file_path)
+        return downsample_point_cloud(o3d.io.read_point_cloud(file_path), voxel_size)
 
 def guardar_malla(mesh, file_path):
     """
     Guarda la malla en el formato especificado (.ply, .obj, .stl).
     """
-    return o3d.io.write_triangle_mesh(file_path, mesh) 
\ No newline at end of file
+    return o3d.io.write_triangle_mesh(file_path, mesh)
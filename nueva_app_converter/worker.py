@@ -1,18 +1,66 @@
 import open3d as o3d
-from procesado.preprocesado import downsample_point_cloud, remove_outliers
+from procesado.preprocesado import remove_outliers
 from procesado.reconstruccion import reconstruir_poisson, reconstruir_ball_pivoting, reconstruir_alpha_shape
 from procesado.color import transferir_color
+from procesado.limpieza import limpiar_malla
+from procesado.cache_etapas import hash_archivo, claves_etapas, reanudar, guardar_etapa
 from utils.io import leer_nube
+from utils.binario import guardar_malla_binaria, guardar_nube_binaria
 import numpy as np
 import tempfile
 import os
 
-def conversion_worker(params, queue):
-    try:
-        queue.put({'progress': 5, 'status': 'Cargando nube de puntos...'})
-        pcd = leer_nube(params['input_file'])
-        queue.put({'progress': 20, 'status': 'Preprocesando nube...'})
-        pcd = downsample_point_cloud(pcd, params['voxel'])
+# Vecinos usados para orientar las normales de forma consistente
+K_ORIENTACION = 100
+
+def _sin_progreso(progreso, estado):
+    pass
+
+class ConversionCancelada(Exception):
+    pass
+
+def _hash_entrada(ruta, memoria):
+    # El hash se recalcula solo si el archivo cambió (tamaño o fecha)
+    estado = os.stat(ruta)
+    firma = (os.path.abspath(ruta), estado.st_size, estado.st_mtime_ns)
+    if memoria is None:
+        return hash_archivo(ruta)
+    if memoria.get('firma') != firma:
+        memoria['firma'] = firma
+        memoria['hash'] = hash_archivo(ruta)
+    return memoria['hash']
+
+def convertir_nube(params, progreso=_sin_progreso, memoria=None):
+    """
+    Pipeline completo de conversión nube -> malla. Devuelve (mesh, pcd).
+    progreso(porcentaje, estado) recibe el avance; lo usan la ventana
+    principal (a través de la cola) y el modo por lotes.
+    memoria (dict) conserva entre llamadas el hash de la entrada y la última
+    nube con normales, para que el proceso persistente no relea el archivo.
+    """
+    progreso(5, 'Cargando nube de puntos...')
+    # Cada etapa se cachea con el hash de la entrada y los parámetros
+    # anteriores; se reanuda desde la más profunda disponible
+    parametros_outliers = {'eliminar_outliers': params['eliminar_outliers']}
+    if params['eliminar_outliers']:
+        parametros_outliers.update(nb_neighbors=params['nb_neighbors'], std_ratio=params['std_ratio'])
+    claves = claves_etapas(_hash_entrada(params['input_file'], memoria), [
+        {'voxel': params['voxel']},
+        parametros_outliers,
+        {'orientacion_k': K_ORIENTACION},
+    ])
+    if memoria is not None and memoria.get('clave') == claves[2]:
+        etapa, pcd = 2, memoria['pcd']
+    else:
+        etapa, pcd = reanudar(claves)
+    if etapa >= 0:
+        print(f'Reanudando desde la etapa {etapa} cacheada ({len(pcd.points)} puntos)')
+    if etapa < 0:
+        # El downsampling se aplica durante la lectura (por bloques en LAS/LAZ)
+        pcd = leer_nube(params['input_file'], voxel_size=params['voxel'])
+        guardar_etapa(claves[0], pcd)
+    progreso(20, 'Preprocesando nube...')
+    if etapa < 1:
         if params['eliminar_outliers']:
             pcd = remove_outliers(pcd, nb_neighbors=params['nb_neighbors'], std_ratio=params['std_ratio'])
         # --- Preprocesado extra ---
@@ -24,47 +72,81 @@ def conversion_worker(params, queue):
         print('Mínimo:', pts.min(axis=0))
         print('Máximo:', pts.max(axis=0))
         # --- Fin preprocesado extra ---
-        queue.put({'progress': 30, 'status': 'Calculando normales...'})
+        guardar_etapa(claves[1], pcd)
+    progreso(30, 'Calculando normales...')
+    if etapa < 2:
         pcd.estimate_normals()
-        pcd.orient_normals_consistent_tangent_plane(100)
-        queue.put({'progress': 50, 'status': 'Reconstruyendo malla...'})
-        metodo = params['metodo']
-        if metodo == "poisson":
-            mesh = reconstruir_poisson(pcd, depth=params['param'], density_percentile=params['dens'])
-        elif metodo == "ball_pivoting":
-            mesh = reconstruir_ball_pivoting(pcd, radio=params['param']/100.0)
-        elif metodo == "alpha_shape":
-            mesh = reconstruir_alpha_shape(pcd, alpha=params['param']/100.0)
-        else:
-            queue.put({'result': (None, None, "Método de reconstrucción no soportado.")})
-            return
-        queue.put({'progress': 70, 'status': 'Transfiriendo color...'})
-        mesh = transferir_color(mesh, pcd, metodo=params['color_method'], k_neighbors=params['k'])
-        if params['eliminar_fragmentos']:
-            queue.put({'progress': 85, 'status': 'Eliminando fragmentos pequeños...'})
-            mesh = eliminar_componentes_pequenas_worker(mesh, params['min_comp'])
-        if params['suavizar']:
-            queue.put({'progress': 95, 'status': 'Suavizando malla...'})
-            mesh = mesh.filter_smooth_simple(number_of_iterations=1)
-        # Guardar malla y nube en archivos temporales
-        mesh_fd, mesh_path = tempfile.mkstemp(suffix='.ply')
-        os.close(mesh_fd)
-        o3d.io.write_triangle_mesh(mesh_path, mesh)
-        pcd_fd, pcd_path = tempfile.mkstemp(suffix='.pcd')
-        os.close(pcd_fd)
-        o3d.io.write_point_cloud(pcd_path, pcd)
+        pcd.orient_normals_consistent_tangent_plane(K_ORIENTACION)
+        guardar_etapa(claves[2], pcd)
+    if memoria is not None:
+        memoria['clave'], memoria['pcd'] = claves[2], pcd
+    progreso(50, 'Reconstruyendo malla...')
+    metodo = params['metodo']
+    if metodo == "poisson":
+        mesh = reconstruir_poisson(pcd, depth=params['param'], density_percentile=params['dens'])
+    elif metodo == "ball_pivoting":
+        mesh = reconstruir_ball_pivoting(pcd, radio=params['param']/100.0)
+    elif metodo == "alpha_shape":
+        mesh = reconstruir_alpha_shape(pcd, alpha=params['param']/100.0)
+    else:
+        raise ValueError("Método de reconstrucción no soportado.")
+    progreso(70, 'Transfiriendo color...')
+    mesh = transferir_color(mesh, pcd, metodo=params['color_method'], k_neighbors=params['k'])
+    progreso(85, 'Limpiando malla...')
+    mesh = limpiar_malla(mesh, params['min_comp'] if params['eliminar_fragmentos'] else 0)
+    if params['suavizar']:
+        progreso(95, 'Suavizando malla...')
+        mesh = mesh.filter_smooth_simple(number_of_iterations=1)
+    return mesh, pcd
+
+def conversion_worker(params, queue):
+    try:
+        mesh, pcd = convertir_nube(params, lambda p, s: queue.put({'progress': p, 'status': s}))
+        mesh_path, pcd_path = _guardar_resultado(mesh, pcd)
         queue.put({'progress': 100, 'status': 'Conversión completada.'})
         queue.put({'result': (mesh_path, pcd_path, "")})
     except Exception as e:
         queue.put({'result': (None, None, str(e))})
 
-def eliminar_componentes_pequenas_worker(mesh, min_triangles=1000):
-    mesh = mesh.remove_unreferenced_vertices()
-    triangle_clusters, cluster_n_triangles, _ = mesh.cluster_connected_triangles()
-    triangle_clusters = np.asarray(triangle_clusters)
-    cluster_n_triangles = np.asarray(cluster_n_triangles)
-    large_clusters = [i for i, n in enumerate(cluster_n_triangles) if n > min_triangles]
-    triangles_to_remove = [i for i, c in enumerate(triangle_clusters) if c not in large_clusters]
-    mesh.remove_triangles_by_index(triangles_to_remove)
-    mesh.remove_unreferenced_vertices()
-    return mesh 
\ No newline at end of file
+def _guardar_resultado(mesh, pcd):
+    # Guardar malla y nube en archivos temporales
+    # (formato .bvb: la ventana principal los mapea sin parsear PLY/PCD)
+    mesh_fd, mesh_path = tempfile.mkstemp(suffix='.bvb')
+    os.close(mesh_fd)
+    guardar_malla_binaria(mesh_path, mesh)
+    pcd_fd, pcd_path = tempfile.mkstemp(suffix='.bvb')
+    os.close(pcd_fd)
+    guardar_nube_binaria(pcd_path, pcd)
+    return mesh_path, pcd_path
+
+def proceso_persistente(peticiones, respuestas, cancelar):
+    """
+    Bucle del proceso de conversión de larga duración. Recibe (id, params)
+    por la cola de peticiones (None para terminar) y responde con mensajes
+    {'id', 'progress', 'status'} y finalmente {'id', 'result'}. Open3D se
+    importa una sola vez y la última nube preprocesada queda en memoria.
+    cancelar es un multiprocessing.Value con el id de la última petición
+    cancelada; se comprueba entre etapas y no mata el proceso.
+    """
+    memoria = {}
+    respuestas.put({'id': None, 'status': 'listo'})
+    while True:
+        peticion = peticiones.get()
+        if peticion is None:
+            break
+        id_peticion, params = peticion
+
+        def progreso(porcentaje, estado):
+            if cancelar.value >= id_peticion:
+                raise ConversionCancelada()
+            respuestas.put({'id': id_peticion, 'progress': porcentaje, 'status': estado})
+
+        try:
+            mesh, pcd = convertir_nube(params, progreso, memoria)
+            progreso(100, 'Conversión completada.')
+            mesh_path, pcd_path = _guardar_resultado(mesh, pcd)
+            respuestas.put({'id': id_peticion, 'result': (mesh_path, pcd_path, "")})
+        except ConversionCancelada:
+            respuestas.put({'id': id_peticion, 'result': (None, None, "Conversión cancelada por el usuario.")})
+        except Exception as e:
+            respuestas.put({'id': id_peticion, 'result': (None, None, str(e))})
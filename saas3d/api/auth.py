@@ -4,10 +4,12 @@ from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import HTTPException, status, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from database import get_db
+from database import get_async_db
 from models import User
+from user_cache import CachedUser, user_cache
 import os
 
 # Configuración
@@ -41,34 +43,54 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-def verify_token(token: str, credentials_exception):
-    """Verificar token JWT"""
+def decode_token(token: str, credentials_exception) -> dict:
+    """Decodificar y validar un token JWT (requiere ``sub``)"""
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        email: str = payload.get("sub")
-        if email is None:
-            raise credentials_exception
-        return email
     except JWTError:
         raise credentials_exception
+    if payload.get("sub") is None:
+        raise credentials_exception
+    return payload
 
-def get_user_by_email(db: Session, email: str) -> Optional[User]:
+def verify_token(token: str, credentials_exception):
+    """Verificar token JWT"""
+    return decode_token(token, credentials_exception)["sub"]
+
+async def get_user_by_email(db: AsyncSession, email: str) -> Optional[User]:
     """Obtener usuario por email"""
-    return db.query(User).filter(User.email == email).first()
+    result = await db.execute(select(User).where(User.email == email))
+    return result.scalars().first()
 
-def get_current_user(
+async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
-) -> User:
-    """Obtener usuario actual desde token"""
+    db: AsyncSession = Depends(get_async_db)
+) -> CachedUser:
+    """
+    Obtener usuario actual desde token
+
+    Los tokens llevan el id del usuario (``uid``), así que normalmente se
+    resuelve desde la caché sin consultar la base de datos. Los tokens
+    emitidos antes de incluir ``uid`` se resuelven por email.
+    """
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
     
-    email = verify_token(credentials.credentials, credentials_exception)
-    user = get_user_by_email(db, email)
-    if user is None:
+    payload = decode_token(credentials.credentials, credentials_exception)
+    user_id = payload.get("uid")
+    if user_id is not None:
+        cached = await user_cache.aget(user_id)
+        if cached is not None and cached.email == payload["sub"]:
+            return cached
+        user = await db.get(User, user_id)
+    else:
+        user = await get_user_by_email(db, payload["sub"])
+    
+    if user is None or user.email != payload["sub"]:
         raise credentials_exception
-    return user
+    cached = CachedUser.from_model(user)
+    await user_cache.aset(cached)
+    return cached
@@ -0,0 +1,61 @@
+"""
+Benchmark de transferencia de color: bucle por vértice vs consulta k-NN en bloque
+
+Uso:
+    python benchmarks/bench_color_transfer.py --points 2000000 --vertices 2000000
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+from scipy.spatial import cKDTree
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from processing.color_transfer import transfer_vertex_colors, COLOR_METHODS
+
+
+def loop_transfer(tree, colors, vertices):
+    """Réplica del bucle original: una consulta k-NN por vértice"""
+    mesh_colors = np.zeros((len(vertices), 3))
+    for i, vertex in enumerate(vertices):
+        _, idx = tree.query(vertex, k=1)
+        mesh_colors[i] = colors[idx]
+    return mesh_colors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--points', type=int, default=1_000_000)
+    parser.add_argument('--vertices', type=int, default=1_000_000)
+    parser.add_argument('--loop-vertices', type=int, default=50_000,
+                        help='Vértices medidos con el bucle (se extrapola vértices/s)')
+    parser.add_argument('--k', type=int, default=10)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    points = rng.random((args.points, 3))
+    colors = rng.random((args.points, 3))
+    vertices = rng.random((args.vertices, 3))
+    tree = cKDTree(points)
+
+    print(f"Puntos: {args.points:,}  Vértices: {args.vertices:,}  k={args.k}")
+
+    sample = vertices[:args.loop_vertices]
+    start = time.perf_counter()
+    loop_transfer(tree, colors, sample)
+    loop_rate = len(sample) / (time.perf_counter() - start)
+    print(f"{'bucle (nearest)':<24}{loop_rate:>14,.0f} vértices/s")
+
+    for method in COLOR_METHODS:
+        start = time.perf_counter()
+        transfer_vertex_colors(vertices, points, colors, method=method, k_neighbors=args.k, tree=tree)
+        rate = len(vertices) / (time.perf_counter() - start)
+        print(f"{'bloque (' + method + ')':<24}{rate:>14,.0f} vértices/s  x{rate / loop_rate:,.1f}")
+
+
+if __name__ == '__main__':
+    main()
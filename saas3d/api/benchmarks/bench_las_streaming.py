@@ -0,0 +1,101 @@
+"""
+Pico de RSS al cargar un LAS: laspy.read + vstack vs lectura por bloques
+
+Cada ruta se ejecuta en un subproceso limpio y se mide ru_maxrss.
+
+Uso:
+    python benchmarks/bench_las_streaming.py --points 20000000 --voxel 0.05
+    python benchmarks/bench_las_streaming.py --file survey.laz --voxel 0.05
+"""
+
+import argparse
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+API_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(API_DIR))
+
+
+def generate_las(path: Path, n_points: int, chunk: int = 2_000_000):
+    """Generar un LAS sintético con RGB escribiendo por bloques"""
+    import laspy
+
+    header = laspy.LasHeader(point_format=3, version="1.2")
+    header.scales = np.array([0.001, 0.001, 0.001])
+    header.offsets = np.zeros(3)
+    rng = np.random.default_rng(0)
+    with laspy.open(str(path), mode="w", header=header) as writer:
+        for start in range(0, n_points, chunk):
+            n = min(chunk, n_points - start)
+            record = laspy.ScaleAwarePointRecord.zeros(n, header=header)
+            record.x = rng.random(n) * 100
+            record.y = rng.random(n) * 100
+            record.z = rng.random(n) * 10
+            record.red = rng.integers(0, 65535, n)
+            record.green = rng.integers(0, 65535, n)
+            record.blue = rng.integers(0, 65535, n)
+            writer.write_points(record)
+
+
+def run_old(path: str, voxel: float):
+    """Ruta anterior: archivo completo en memoria y después downsampling"""
+    import laspy
+    from processing.voxel_grid import voxel_downsample
+
+    las = laspy.read(path)
+    points = np.vstack((las.x, las.y, las.z)).transpose()
+    colors = np.vstack((las.red, las.green, las.blue)).transpose() / 65535.0
+    return voxel_downsample(points, colors, voxel)[0]
+
+
+def run_stream(path: str, voxel: float):
+    """Ruta nueva: bloques directamente sobre la rejilla de vóxeles"""
+    from processing.las_stream import read_las_downsampled
+
+    return read_las_downsampled(path, voxel)[0]
+
+
+def child(mode: str, path: str, voxel: float):
+    start = time.perf_counter()
+    points = (run_old if mode == "old" else run_stream)(path, voxel)
+    elapsed = time.perf_counter() - start
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"{mode} {len(points)} {elapsed:.2f} {peak_mb:.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--file", help="LAS/LAZ existente (si no, se genera uno)")
+    parser.add_argument("--points", type=int, default=20_000_000)
+    parser.add_argument("--voxel", type=float, default=0.5)
+    parser.add_argument("--child", choices=["old", "stream"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.child, args.file, args.voxel)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = args.file
+        if path is None:
+            path = str(Path(tmp) / "bench.las")
+            generate_las(Path(path), args.points)
+        size_mb = Path(path).stat().st_size / 2 ** 20
+        print(f"Archivo: {path} ({size_mb:.0f} MB), voxel={args.voxel}")
+        print(f"{'ruta':<10}{'puntos salida':>16}{'tiempo (s)':>12}{'pico RSS (MB)':>16}")
+        for mode in ("old", "stream"):
+            out = subprocess.run(
+                [sys.executable, __file__, "--child", mode, "--file", path, "--voxel", str(args.voxel)],
+                check=True, capture_output=True, text=True
+            ).stdout.split()
+            print(f"{mode:<10}{int(out[1]):>16,}{float(out[2]):>12.2f}{float(out[3]):>16,.0f}")
+
+
+if __name__ == "__main__":
+    main()
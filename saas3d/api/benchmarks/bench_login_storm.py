@@ -0,0 +1,130 @@
+"""
+Latencia de los endpoints de jobs durante una ráfaga de logins
+
+Cada modo se ejecuta en un subproceso limpio con su propia base SQLite:
+
+- ``threadpool``: hash en el threadpool por defecto de FastAPI (ruta anterior)
+- ``thread`` / ``process``: hash en el pool acotado de ``password_pool``
+
+Mientras ``--storm`` clientes hacen login sin pausa, una sonda mide la
+latencia de ``GET /api/jobs`` (async) y de ``GET /api/uploads/{id}`` (sync,
+usa el threadpool). Los clientes rechazados con 503 esperan lo que indica
+``Retry-After`` antes de reintentar. Primero se mide la sonda sin ráfaga
+como referencia.
+
+Uso:
+    python benchmarks/bench_login_storm.py --storm 64 --seconds 5
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+API_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(API_DIR))
+
+CREDENTIALS = {"email": "storm@example.com", "password": "stormpassword"}
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(int(fraction * len(values)), len(values) - 1)] * 1000
+
+
+async def run(mode: str, storm: int, seconds: float):
+    import httpx
+    from fastapi.concurrency import run_in_threadpool
+    from main import app
+    import routes.auth
+
+    if mode == "threadpool":
+        routes.auth.run_password_hash = lambda func, *args: run_in_threadpool(func, *args)
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+        await client.post("/auth/register", json=CREDENTIALS)
+        token = (await client.post("/auth/login", json=CREDENTIALS)).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+        for i in range(20):
+            await client.post("/api/jobs", json={"input_key": f"bench_{i}.ply"}, headers=headers)
+
+        async def probe(deadline: float) -> dict:
+            latencies = {"jobs": [], "uploads": []}
+            while time.perf_counter() < deadline:
+                start = time.perf_counter()
+                await client.get("/api/jobs", headers=headers)
+                latencies["jobs"].append(time.perf_counter() - start)
+                start = time.perf_counter()
+                await client.get("/api/uploads/missing", headers=headers)
+                latencies["uploads"].append(time.perf_counter() - start)
+                await asyncio.sleep(0.01)
+            return latencies
+
+        counts = {"ok": 0, "busy": 0}
+
+        async def login_loop(deadline: float):
+            while time.perf_counter() < deadline:
+                response = await client.post("/auth/login", json=CREDENTIALS)
+                if response.status_code == 200:
+                    counts["ok"] += 1
+                else:
+                    # Como un cliente real: esperar lo indicado en Retry-After
+                    counts["busy"] += 1
+                    await asyncio.sleep(float(response.headers.get("retry-after", "1")))
+
+        idle = await probe(time.perf_counter() + 1.0)
+        deadline = time.perf_counter() + seconds
+        results = await asyncio.gather(probe(deadline), *[login_loop(deadline) for _ in range(storm)])
+        loaded = results[0]
+
+    for phase, latencies in (("reposo", idle), ("ráfaga", loaded)):
+        for endpoint, values in latencies.items():
+            print(f"{mode} {phase} {endpoint} {statistics.median(values) * 1000:.1f} "
+                  f"{percentile(values, 0.95):.1f} {len(values)}")
+    print(f"{mode} logins {counts['ok'] / seconds:.0f} {counts['busy'] / seconds:.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--storm", type=int, default=64, help="clientes haciendo login en paralelo")
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--child", choices=["threadpool", "thread", "process"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        asyncio.run(run(args.child, args.storm, args.seconds))
+        return
+
+    print(f"{'modo':<12}{'fase':<9}{'endpoint':<10}{'p50 (ms)':>10}{'p95 (ms)':>10}{'muestras':>10}")
+    logins = []
+    for mode in ("threadpool", "thread", "process"):
+        with tempfile.TemporaryDirectory() as tmp:
+            env = dict(
+                os.environ,
+                DATABASE_URL=f"sqlite:///{tmp}/bench.db",
+                PASSWORD_HASH_EXECUTOR="process" if mode == "process" else "thread",
+            )
+            out = subprocess.run(
+                [sys.executable, __file__, "--child", mode, "--storm", str(args.storm), "--seconds", str(args.seconds)],
+                check=True, capture_output=True, text=True, env=env, cwd=API_DIR
+            ).stdout.splitlines()
+        for line in out:
+            fields = line.split()
+            if len(fields) == 6:
+                print(f"{fields[0]:<12}{fields[1]:<9}{fields[2]:<10}{fields[3]:>10}{fields[4]:>10}{fields[5]:>10}")
+            elif len(fields) == 4 and fields[1] == "logins":
+                logins.append(fields)
+    print()
+    print(f"{'modo':<12}{'logins/s':>10}{'503/s':>10}")
+    for mode, _, ok, busy in logins:
+        print(f"{mode:<12}{ok:>10}{busy:>10}")
+
+
+if __name__ == "__main__":
+    main()
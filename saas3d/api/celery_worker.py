@@ -2,22 +2,46 @@
 Worker de Celery para procesamiento asíncrono de nubes de puntos
 """
 
-from celery import Celery
-from celery.signals import task_prerun, task_postrun
+from celery import Celery, chord
+from celery.signals import task_prerun, task_postrun, celeryd_after_setup, worker_ready
 import os
 import logging
+import shutil
+import tempfile
+import threading
+import time
+import uuid
 from pathlib import Path
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional
 import traceback
+from datetime import datetime
+
+import numpy as np
+from sqlalchemy import update
 
 from processing.point_cloud_processor_simple import PointCloudProcessor
+from processing.point_buffer import read_buffer, write_buffer
+from processing.tiling import DEFAULT_OVERLAP_RATIO, auto_tile_size, plan_tiles, stitch_tiles
 from database import SessionLocal
 from models import Job
 from enums import JobStatus
+from result_cache import result_cache, file_sha256
+from storage import OUTPUT_DIR, upload_storage, output_storage
+from input_cache import (
+    INPUT_CACHE_DIR, INPUT_AFFINITY_NODE_TTL, WORKER_QUEUE, input_affinity, input_cache, input_cache_key
+)
+from stage_cache import STAGES, stage_cache
+from job_events import job_events, status_event
+from job_progress import progress_store
 
 # Configuración de Celery
 CELERY_BROKER_URL = os.getenv("CELERY_BROKER_URL", "redis://localhost:6380/0")
 CELERY_RESULT_BACKEND = os.getenv("CELERY_RESULT_BACKEND", "redis://localhost:6380/1")
+# Cola de las tareas de tesela: su memoria está acotada por el tamaño de
+# tesela, así que cualquier worker puede reconstruirlas
+TILE_QUEUE = os.getenv("TILE_QUEUE", "celery")
+# Prefijo en el almacenamiento de salida de los archivos intermedios por teselas
+TILE_KEY_PREFIX = ".tiles"
 
 celery_app = Celery(
     "saas3d_worker",
@@ -33,6 +57,8 @@ celery_app.conf.update(
     timezone='UTC',
     enable_utc=True,
     task_track_started=True,
+    # Límites por defecto; con COST_ROUTING la API envía los del nivel de
+    # cada job (time_limit/soft_time_limit en apply_async)
     task_time_limit=30 * 60,  # 30 minutos máximo
     task_soft_time_limit=25 * 60,  # 25 minutos soft limit
     worker_prefetch_multiplier=1,
@@ -44,15 +70,16 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 @celery_app.task(bind=True, name='process_point_cloud')
-def process_point_cloud_task(self, job_id: int, input_file_path: str, 
-                           algorithm: str = 'poisson', **kwargs) -> Dict[str, Any]:
+def process_point_cloud_task(self, job_id: int, input_file_path: str = None, 
+                           algorithm: str = 'poisson', input_key: str = None, **kwargs) -> Dict[str, Any]:
     """
     Tarea principal para procesar nube de puntos
     
     Args:
         job_id: ID del trabajo en la base de datos
-        input_file_path: Ruta al archivo de entrada
+        input_file_path: Ruta local al archivo de entrada (alternativa a input_key)
         algorithm: Algoritmo de reconstrucción ('poisson', 'ball_pivoting', 'alpha_shape')
+        input_key: Clave del archivo de entrada en el almacenamiento
         **kwargs: Parámetros adicionales del algoritmo
     
     Returns:
@@ -60,48 +87,85 @@ def process_point_cloud_task(self, job_id: int, input_file_path: str,
     """
     db = SessionLocal()
     processor = PointCloudProcessor()
+    work_dir = None
     
     try:
-        # Actualizar estado del trabajo
-        update_job_status(db, job_id, JobStatus.processing, progress=5)
+        # Actualizar estado del trabajo (única escritura hasta el final)
+        owner_id = update_job_status(db, job_id, JobStatus.processing, progress=5)
+        
+        if input_file_path is None:
+            # Sin ruta local (p. ej. S3): la entrada sale de la caché del nodo
+            # (o se descarga una sola vez) a un directorio temporal del trabajo
+            input_file_path = upload_storage.local_path(input_key)
+            if input_file_path is None:
+                work_root = INPUT_CACHE_DIR / ".work"
+                work_root.mkdir(parents=True, exist_ok=True)
+                work_dir = Path(tempfile.mkdtemp(prefix=f"job_{job_id}_", dir=work_root))
+                input_file_path = work_dir / Path(input_key).name
+                input_cache.checkout(input_cache_key(kwargs.get('input_sha256'), input_key),
+                                     input_key, upload_storage, input_file_path)
         
-        # Cargar nube de puntos
         logger.info(f"Iniciando procesamiento para job {job_id}")
-        if not processor.load_point_cloud(input_file_path):
-            raise Exception("Error al cargar la nube de puntos")
+        voxel_size = kwargs.get('voxel_size', 0.01)
+        nb_neighbors = kwargs.get('nb_neighbors', 20)
+        std_ratio = kwargs.get('std_ratio', 2.0)
+        radius = kwargs.get('normal_radius', 0.1)
+        max_nn = kwargs.get('normal_max_nn', 30)
         
-        update_job_status(db, job_id, JobStatus.processing, progress=15)
+        # Reanudar desde la etapa de preprocesado más profunda cacheada
+        input_hash = kwargs.get('input_sha256') or file_sha256(input_file_path)
+        stage_keys = stage_cache.chain_keys(input_hash, [
+            {'voxel_size': voxel_size},
+            {'nb_neighbors': nb_neighbors, 'std_ratio': std_ratio},
+            {'normal_radius': radius, 'normal_max_nn': max_nn},
+        ])
+        cached_depth, cached_arrays = stage_cache.resume(stage_keys)
+        if cached_depth >= 0:
+            logger.info(f"Reanudando desde la etapa '{STAGES[cached_depth]}' cacheada")
+            if not processor.set_point_arrays(cached_arrays):
+                raise Exception("Error al restaurar la nube desde caché")
         
-        # Preprocesamiento
-        logger.info("Aplicando preprocesamiento...")
+        if cached_depth < 0:
+            # Cargar nube de puntos con downsampling durante la lectura
+            # (LAS/LAZ se leen por bloques directamente sobre la rejilla de vóxeles)
+            if not processor.load_point_cloud(input_file_path, voxel_size=voxel_size):
+                raise Exception("Error al cargar la nube de puntos")
+            save_stage(processor, stage_keys[0])
         
-        # Downsampling
-        voxel_size = kwargs.get('voxel_size', 0.01)
-        if not processor.downsample(voxel_size):
-            raise Exception("Error en downsampling")
+        report_progress(job_id, owner_id, 25)
         
-        update_job_status(db, job_id, JobStatus.processing, progress=25)
+        # Preprocesamiento
+        logger.info("Aplicando preprocesamiento...")
         
         # Eliminar outliers
-        nb_neighbors = kwargs.get('nb_neighbors', 20)
-        std_ratio = kwargs.get('std_ratio', 2.0)
-        if not processor.remove_outliers(nb_neighbors, std_ratio):
-            raise Exception("Error al eliminar outliers")
+        if cached_depth < 1:
+            if not processor.remove_outliers(nb_neighbors, std_ratio):
+                raise Exception("Error al eliminar outliers")
+            save_stage(processor, stage_keys[1])
         
-        update_job_status(db, job_id, JobStatus.processing, progress=35)
+        report_progress(job_id, owner_id, 35)
         
         # Estimar normales
-        radius = kwargs.get('normal_radius', 0.1)
-        max_nn = kwargs.get('normal_max_nn', 30)
-        if not processor.estimate_normals(radius, max_nn):
-            raise Exception("Error al estimar normales")
+        if cached_depth < 2:
+            if not processor.estimate_normals(radius, max_nn):
+                raise Exception("Error al estimar normales")
+            save_stage(processor, stage_keys[2])
         
-        update_job_status(db, job_id, JobStatus.processing, progress=45)
+        report_progress(job_id, owner_id, 45)
         
         # Reconstrucción según algoritmo seleccionado
         logger.info(f"Aplicando algoritmo {algorithm}...")
         
-        if algorithm == 'poisson':
+        if kwargs.get('tiled', False):
+            # Modo por teselas: cada tesela es una tarea del chord y el
+            # callback cose las mallas y termina el trabajo
+            if algorithm not in ['poisson', 'ball_pivoting', 'alpha_shape']:
+                raise Exception(f"Algoritmo no soportado: {algorithm}")
+            n_tiles = dispatch_tiles(self, processor, job_id, owner_id, algorithm, kwargs)
+            report_progress(job_id, owner_id, 50)
+            return {'success': True, 'job_id': job_id, 'tiles': n_tiles, 'dispatched': True}
+                
+        elif algorithm == 'poisson':
             depth = kwargs.get('poisson_depth', 9)
             width = kwargs.get('poisson_width', 0)
             scale = kwargs.get('poisson_scale', 1.1)
@@ -122,84 +186,321 @@ def process_point_cloud_task(self, job_id: int, input_file_path: str,
         else:
             raise Exception(f"Algoritmo no soportado: {algorithm}")
         
-        update_job_status(db, job_id, JobStatus.processing, progress=70)
-        
-        # Transferir colores si están disponibles
-        logger.info("Transfiriendo colores...")
-        processor.transfer_colors()
-        
-        update_job_status(db, job_id, JobStatus.processing, progress=80)
-        
-        # Guardar malla
-        logger.info("Guardando malla...")
-        output_format = kwargs.get('output_format', 'ply')
-        output_filename = f"mesh_{job_id}.{output_format}"
-        output_path = Path("saas3d/api/outputs") / output_filename
-        
-        if not processor.save_mesh(str(output_path), output_format):
-            raise Exception("Error al guardar la malla")
-        
-        update_job_status(db, job_id, JobStatus.processing, progress=95)
-        
-        # Obtener información de la malla
-        mesh_info = processor.get_mesh_info()
-        
-        # Actualizar trabajo como completado
-        update_job_status(db, job_id, JobStatus.completed, progress=100, 
-                        output_key=output_filename)
-        
-        logger.info(f"Procesamiento completado para job {job_id}")
-        
-        result = {
-            'success': True,
-            'job_id': job_id,
-            'output_file': str(output_path),
-            'output_filename': output_filename,
-            'mesh_info': mesh_info,
-            'algorithm_used': algorithm,
-            'parameters': kwargs
-        }
-        
-        return result
+        return finish_job(db, processor, job_id, owner_id, algorithm, kwargs)
         
     except Exception as e:
-        error_msg = f"Error en procesamiento: {str(e)}"
-        logger.error(error_msg)
-        logger.error(traceback.format_exc())
+        return fail_job(db, job_id, e)
         
-        # Actualizar trabajo como fallido
-        update_job_status(db, job_id, JobStatus.failed, error=error_msg)
+    finally:
+        db.close()
+        if work_dir is not None:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+def finish_job(db, processor, job_id: int, owner_id: Optional[int], algorithm: str,
+               kwargs: Dict[str, Any]) -> Dict[str, Any]:
+    """Limpiar, colorear, guardar y publicar la malla reconstruida"""
+    report_progress(job_id, owner_id, 65)
+    
+    # Limpieza: degenerados, duplicados, fragmentos pequeños y vértices sueltos
+    if not processor.clean_mesh(kwargs.get('min_component_triangles', 0)):
+        raise Exception("Error en la limpieza de la malla")
+    
+    report_progress(job_id, owner_id, 70)
+    
+    # Transferir colores si están disponibles
+    logger.info("Transfiriendo colores...")
+    color_method = kwargs.get('color_method', 'nearest')
+    color_k_neighbors = kwargs.get('color_k_neighbors', 10)
+    processor.transfer_colors(color_method, color_k_neighbors)
+    
+    report_progress(job_id, owner_id, 80)
+    
+    # Guardar malla
+    logger.info("Guardando malla...")
+    output_format = kwargs.get('output_format', 'ply')
+    output_filename = f"mesh_{job_id}.{output_format}"
+    output_path = OUTPUT_DIR / output_filename
+    
+    if not processor.save_mesh(str(output_path), output_format):
+        raise Exception("Error al guardar la malla")
+    
+    # Registrar el resultado en la caché para reenvíos idénticos
+    cache_key = kwargs.get('result_cache_key')
+    if cache_key:
+        try:
+            result_cache.store(cache_key, output_path, output_format)
+        except OSError as e:
+            logger.warning(f"No se pudo guardar el resultado en caché: {str(e)}")
+    
+    # Publicar el resultado (con el backend de archivos ya está en su sitio)
+    output_storage.put_file(output_filename, output_path, move=True)
+    
+    report_progress(job_id, owner_id, 95)
+    
+    # Obtener información de la malla
+    mesh_info = processor.get_mesh_info()
+    
+    # Actualizar trabajo como completado
+    update_job_status(db, job_id, JobStatus.completed, progress=100, 
+                    output_key=output_filename)
+    
+    logger.info(f"Procesamiento completado para job {job_id}")
+    
+    result = {
+        'success': True,
+        'job_id': job_id,
+        'output_file': str(output_path),
+        'output_filename': output_filename,
+        'mesh_info': mesh_info,
+        'algorithm_used': algorithm,
+        'parameters': kwargs
+    }
+    
+    return result
+
+def fail_job(db, job_id: int, error: Exception) -> Dict[str, Any]:
+    """Registrar el error y marcar el trabajo como fallido"""
+    error_msg = f"Error en procesamiento: {str(error)}"
+    logger.error(error_msg)
+    logger.error(traceback.format_exc())
+    
+    # Actualizar trabajo como fallido
+    update_job_status(db, job_id, JobStatus.failed, error=error_msg)
+    
+    return {
+        'success': False,
+        'job_id': job_id,
+        'error': error_msg
+    }
+
+def tile_keys(prefix: str, n_tiles: int) -> List[str]:
+    """Claves de los archivos intermedios de un trabajo por teselas"""
+    keys = [f"{prefix}_cloud.bvb"]
+    for i in range(n_tiles):
+        keys += [f"{prefix}_tile_{i}.bvb", f"{prefix}_mesh_{i}.bvb"]
+    return keys
+
+def put_tile_buffer(key: str, arrays: Dict[str, Optional[np.ndarray]], tmp_dir: str):
+    """Publicar arrays como .bvb en el almacenamiento de salida"""
+    path = write_buffer(Path(tmp_dir) / Path(key).name, arrays)
+    output_storage.put_file(key, path, move=True)
+
+def fetch_tile_buffer(key: str, tmp_dir: str) -> Dict[str, np.ndarray]:
+    """Mapear un .bvb del almacenamiento de salida (descargándolo si no es local)"""
+    path = output_storage.local_path(key)
+    if path is None:
+        path = Path(tmp_dir) / Path(key).name
+        output_storage.fetch(key, path)
+    arrays, _ = read_buffer(path)
+    return arrays
+
+def dispatch_tiles(task, processor, job_id: int, owner_id: Optional[int], algorithm: str,
+                   kwargs: Dict[str, Any]) -> int:
+    """
+    Repartir la nube en teselas y lanzarlas como un chord de Celery
+    
+    Cada tesela se publica como .bvb y se reconstruye en una tarea propia de
+    ``TILE_QUEUE``, repartida entre todos los workers; el callback cose las
+    mallas en la cola del trabajo y, si alguna tesela falla, el errback marca
+    el trabajo como fallido.
+    
+    Returns:
+        Número de teselas lanzadas
+    """
+    arrays = processor.get_point_arrays()
+    points = arrays['points']
+    tile_size = kwargs.get('tile_size') or auto_tile_size(points)
+    overlap = kwargs.get('tile_overlap')
+    if overlap is None:
+        overlap = tile_size * DEFAULT_OVERLAP_RATIO
+    tiles = plan_tiles(points, tile_size, overlap)
+    if not tiles:
+        raise Exception("La nube no tiene puntos suficientes para reconstruir por teselas")
+    logger.info(f"Reconstrucción por teselas ({algorithm}): {len(tiles)} teselas de {tile_size:.3f}")
+    
+    algorithm_params = {
+        key: value for key, value in kwargs.items()
+        if key.startswith(('poisson_', 'ball_pivoting_', 'alpha_shape_'))
+    }
+    prefix = f"{TILE_KEY_PREFIX}/{job_id}_{uuid.uuid4().hex}"
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        # La nube completa, para transferir colores tras el cosido
+        put_tile_buffer(f"{prefix}_cloud.bvb", arrays, tmp_dir)
+        header = []
+        for i, tile in enumerate(tiles):
+            indices = tile['indices']
+            put_tile_buffer(f"{prefix}_tile_{i}.bvb", {
+                name: values[indices] if values is not None else None
+                for name, values in arrays.items()
+            }, tmp_dir)
+            header.append(reconstruct_tile_task.signature(
+                (f"{prefix}_tile_{i}.bvb", f"{prefix}_mesh_{i}.bvb", algorithm, algorithm_params),
+                queue=TILE_QUEUE
+            ))
+    
+    # El cosido necesita la malla completa: va a la misma cola que el trabajo
+    delivery_info = task.request.delivery_info or {}
+    tiles_meta = [{'core_min': t['core_min'].tolist(), 'core_max': t['core_max'].tolist()} for t in tiles]
+    callback = stitch_tiles_task.signature(
+        (job_id, owner_id, algorithm, prefix, tiles_meta, tile_size, kwargs),
+        queue=delivery_info.get('routing_key')
+    ).on_error(tiles_failed_task.signature((job_id, prefix, len(tiles))))
+    chord(header)(callback)
+    return len(tiles)
+
+@celery_app.task(name='reconstruct_tile')
+def reconstruct_tile_task(tile_key: str, mesh_key: str, algorithm: str,
+                          params: Dict[str, Any]) -> Optional[str]:
+    """
+    Reconstruir una tesela de un trabajo por teselas
+    
+    Returns:
+        Clave de la malla de la tesela, o None si la tesela no genera malla
+    """
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        arrays = fetch_tile_buffer(tile_key, tmp_dir)
+        mesh = PointCloudProcessor.reconstruct_tile_mesh(arrays, algorithm, params)
+        if mesh is None:
+            return None
+        vertices, triangles, colors = mesh
+        put_tile_buffer(mesh_key, {'vertices': vertices, 'triangles': triangles, 'colors': colors}, tmp_dir)
+    return mesh_key
+
+@celery_app.task(name='stitch_tiles')
+def stitch_tiles_task(mesh_keys: List[Optional[str]], job_id: int, owner_id: Optional[int],
+                      algorithm: str, prefix: str, tiles: List[Dict[str, Any]], tile_size: float,
+                      kwargs: Dict[str, Any]) -> Dict[str, Any]:
+    """Coser las mallas de las teselas y terminar el trabajo (callback del chord)"""
+    db = SessionLocal()
+    processor = PointCloudProcessor()
+    
+    try:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            if not processor.set_point_arrays(fetch_tile_buffer(f"{prefix}_cloud.bvb", tmp_dir)):
+                raise Exception("Error al restaurar la nube de las teselas")
+            
+            tile_meshes = []
+            for key in mesh_keys:
+                if key is None:
+                    tile_meshes.append(None)
+                    continue
+                mesh = fetch_tile_buffer(key, tmp_dir)
+                tile_meshes.append((mesh['vertices'], mesh['triangles'], mesh.get('colors')))
+            
+            vertices, triangles, colors = stitch_tiles(tile_meshes, [
+                {'core_min': np.array(t['core_min']), 'core_max': np.array(t['core_max'])} for t in tiles
+            ], tile_size * 1e-4)
+            if not processor.set_mesh_arrays(vertices, triangles, colors):
+                raise Exception("Error en reconstrucción por teselas")
+            logger.info(f"Teselas cosidas para job {job_id}: {len(vertices)} vértices")
+            
+            return finish_job(db, processor, job_id, owner_id, algorithm, kwargs)
         
-        return {
-            'success': False,
-            'job_id': job_id,
-            'error': error_msg
-        }
+    except Exception as e:
+        return fail_job(db, job_id, e)
         
     finally:
         db.close()
+        delete_tile_files(prefix, len(tiles))
+
+@celery_app.task(name='tiles_failed')
+def tiles_failed_task(request, exc, tb, job_id: int, prefix: str, n_tiles: int):
+    """Errback del chord: una tesela falló, el trabajo no se puede coser"""
+    db = SessionLocal()
+    try:
+        update_job_status(db, job_id, JobStatus.failed,
+                          error=f"Error en reconstrucción por teselas: {str(exc)}")
+    finally:
+        db.close()
+        delete_tile_files(prefix, n_tiles)
+
+def delete_tile_files(prefix: str, n_tiles: int):
+    """Borrar los archivos intermedios de un trabajo por teselas"""
+    for key in tile_keys(prefix, n_tiles):
+        try:
+            output_storage.delete(key)
+        except OSError as e:
+            logger.warning(f"No se pudo borrar {key}: {str(e)}")
+
+def save_stage(processor, key: str):
+    """Guardar la salida de una etapa; un fallo de la caché no aborta el trabajo"""
+    try:
+        stage_cache.save(key, processor.get_point_arrays())
+    except OSError as e:
+        logger.warning(f"No se pudo guardar la etapa en caché: {str(e)}")
 
 def update_job_status(db, job_id: int, status: JobStatus, progress: int = None, 
                      error: str = None, output_key: str = None):
-    """Actualizar estado de un trabajo en la base de datos"""
+    """
+    Transición de estado de un trabajo: un único UPDATE sin SELECT previo
+    
+    Returns:
+        ID del propietario del trabajo (para publicar eventos), o None si el
+        trabajo no existe o la escritura falla
+    """
+    values = {"status": status}
+    if progress is None and status in [JobStatus.completed, JobStatus.failed]:
+        # Conservar el último progreso intermedio conocido
+        progress = progress_store.get(job_id)
+    if progress is not None:
+        values["progress"] = progress
+    if error is not None:
+        values["error"] = error
+    if output_key is not None:
+        values["output_key"] = output_key
+    if status in [JobStatus.completed, JobStatus.failed]:
+        values["finished_at"] = datetime.utcnow()
+    
     try:
-        job = db.query(Job).filter(Job.id == job_id).first()
-        if job:
-            job.status = status
-            if progress is not None:
-                job.progress = progress
-            if error is not None:
-                job.error = error
-            if output_key is not None:
-                job.output_key = output_key
-            
-            db.commit()
-            logger.info(f"Job {job_id} actualizado: {status} ({progress}%)")
-        else:
-            logger.error(f"Job {job_id} no encontrado")
+        row = db.execute(
+            update(Job).where(Job.id == job_id).values(**values).returning(Job.user_id, Job.progress)
+        ).first()
+        db.commit()
     except Exception as e:
         logger.error(f"Error al actualizar job {job_id}: {str(e)}")
         db.rollback()
+        return None
+    
+    if row is None:
+        logger.error(f"Job {job_id} no encontrado")
+        return None
+    
+    # El valor escrito en la tabla sustituye al progreso intermedio
+    progress_store.clear(job_id)
+    logger.info(f"Job {job_id} actualizado: {status} ({row.progress}%)")
+    job_events.publish(row.user_id, status_event(job_id, status, row.progress, error, output_key))
+    return row.user_id
+
+def report_progress(job_id: int, owner_id: int, progress: int):
+    """Progreso intermedio: almacén rápido y evento, sin escribir en la base de datos"""
+    progress_store.set(job_id, progress)
+    if owner_id is not None:
+        job_events.publish(owner_id, status_event(job_id, JobStatus.processing, progress))
+
+@celeryd_after_setup.connect
+def add_node_queue(sender, instance, **kwargs):
+    """Con afinidad, consumir también de la cola propia del nodo"""
+    if input_affinity.enabled:
+        queues = instance.app.amqp.queues
+        # Colas de nivel (-Q) que consume el nodo; sin -Q, la cola por defecto
+        consumed = queues.consume_from or {instance.app.conf.task_default_queue: None}
+        input_affinity.tier_queues = set(consumed) - {WORKER_QUEUE}
+        queues.select_add(WORKER_QUEUE)
+        logger.info(f"Afinidad de entradas activa, cola del nodo: {WORKER_QUEUE} "
+                    f"(niveles: {', '.join(sorted(input_affinity.tier_queues))})")
+
+@worker_ready.connect
+def start_affinity_heartbeat(sender=None, **kwargs):
+    """Renovar periódicamente el latido del nodo para que la API le envíe trabajos"""
+    if not input_affinity.enabled:
+        return
+    
+    def beat():
+        while True:
+            input_affinity.heartbeat()
+            time.sleep(INPUT_AFFINITY_NODE_TTL / 3)
+    
+    threading.Thread(target=beat, name="input-affinity-heartbeat", daemon=True).start()
 
 @task_prerun.connect
 def task_prerun_handler(sender=None, task_id=None, task=None, args=None, kwargs=None, **kwds):
@@ -0,0 +1,84 @@
+"""
+Enrutado de jobs por coste estimado
+
+Con una sola cola y un único ``task_time_limit``, una nube PLY de 10k puntos
+puede quedar detrás de un LAZ de 200M. Al enviar el job se lee solo la
+cabecera del archivo (``point_cloud_header``) y se elige un nivel:
+
+- ``small``: cola de baja latencia con límite corto y mucha concurrencia
+- ``medium``: cola por defecto de Celery (mismo límite que antes)
+- ``large``: workers con mucha memoria, concurrencia baja y límite largo
+
+El coste se mide en puntos tras el downsampling: la lectura de LAS/LAZ es por
+bloques sobre la rejilla de vóxeles (``processing.las_stream``), así que lo
+que pesa es la nube resultante. Con la extensión de la cabecera se acota por
+el número de vóxeles de la bounding box; sin extensión (PLY, PCD, XYZ) se usa
+el número de puntos del archivo. Si la cabecera no se puede leer el job va a
+``medium``.
+
+Desactivado por defecto (``COST_ROUTING=true`` para activarlo): los workers
+de ``small`` y ``large`` tienen que consumir sus colas (``-Q``).
+"""
+
+import logging
+import math
+import os
+from dataclasses import dataclass
+from typing import Optional
+
+from point_cloud_header import PointCloudHeader
+
+logger = logging.getLogger(__name__)
+
+COST_ROUTING = os.getenv("COST_ROUTING", "false").lower() == "true"
+# Puntos (tras el downsampling) máximos de cada nivel; por encima, large
+COST_SMALL_MAX_POINTS = int(os.getenv("COST_SMALL_MAX_POINTS", "2000000"))
+COST_MEDIUM_MAX_POINTS = int(os.getenv("COST_MEDIUM_MAX_POINTS", "30000000"))
+COST_QUEUE_SMALL = os.getenv("COST_QUEUE_SMALL", "pointclouds.small")
+COST_QUEUE_MEDIUM = os.getenv("COST_QUEUE_MEDIUM", "celery")  # cola por defecto de Celery
+COST_QUEUE_LARGE = os.getenv("COST_QUEUE_LARGE", "pointclouds.large")
+# Límite duro de cada nivel; el soft limit es 5/6 (como los 25/30 min globales)
+COST_TIME_LIMIT_SMALL = int(os.getenv("COST_TIME_LIMIT_SMALL_SECONDS", str(5 * 60)))
+COST_TIME_LIMIT_MEDIUM = int(os.getenv("COST_TIME_LIMIT_MEDIUM_SECONDS", str(30 * 60)))
+COST_TIME_LIMIT_LARGE = int(os.getenv("COST_TIME_LIMIT_LARGE_SECONDS", str(4 * 60 * 60)))
+
+
+@dataclass(frozen=True)
+class Route:
+    """Nivel, cola y límites de tiempo de un job"""
+    tier: str
+    queue: str
+    time_limit: int
+    point_count: Optional[int] = None
+    effective_points: Optional[int] = None
+
+    @property
+    def soft_time_limit(self) -> int:
+        return self.time_limit * 5 // 6
+
+    def task_options(self) -> dict:
+        """Opciones de ``apply_async`` para la tarea"""
+        return {"queue": self.queue, "time_limit": self.time_limit, "soft_time_limit": self.soft_time_limit}
+
+
+def effective_points(header: PointCloudHeader, voxel_size: float) -> int:
+    """Puntos esperados tras el downsampling (cota por vóxeles de la bounding box)"""
+    extent = header.extent
+    if extent is None or voxel_size <= 0:
+        return header.point_count
+    cells = math.prod(max(size / voxel_size, 1.0) for size in extent)
+    return min(header.point_count, int(cells))
+
+
+def route_for(header: Optional[PointCloudHeader], voxel_size: float) -> Route:
+    """Nivel del job según la cabecera de su entrada"""
+    if header is None:
+        return Route("medium", COST_QUEUE_MEDIUM, COST_TIME_LIMIT_MEDIUM)
+    points = effective_points(header, voxel_size)
+    if points <= COST_SMALL_MAX_POINTS:
+        tier, queue, time_limit = "small", COST_QUEUE_SMALL, COST_TIME_LIMIT_SMALL
+    elif points <= COST_MEDIUM_MAX_POINTS:
+        tier, queue, time_limit = "medium", COST_QUEUE_MEDIUM, COST_TIME_LIMIT_MEDIUM
+    else:
+        tier, queue, time_limit = "large", COST_QUEUE_LARGE, COST_TIME_LIMIT_LARGE
+    return Route(tier, queue, time_limit, header.point_count, points)
@@ -5,3 +5,7 @@ class JobStatus(str, enum.Enum):
     processing = 'processing'
     completed = 'completed'
     failed = 'failed'
+
+class UploadStatus(str, enum.Enum):
+    pending = 'pending'
+    completed = 'completed'
@@ -0,0 +1,228 @@
+"""
+Caché local de archivos de entrada en cada worker
+
+Con almacenamiento remoto (S3) cada trabajo descargaría su entrada aunque el
+mismo nodo la hubiera procesado minutos antes. Las entradas se guardan por
+hash de contenido en ``INPUT_CACHE_DIR`` con presupuesto de disco y
+expulsión LRU. El llenado es atómico y se serializa con un ``flock`` por
+entrada, de modo que varias tareas del mismo nodo no descargan dos veces el
+mismo archivo.
+
+Opcionalmente (``INPUT_AFFINITY``) cada worker anuncia en Redis qué entradas
+tiene y escucha en una cola propia; la API envía el trabajo a esa cola si el
+nodo está vivo y su cola no está saturada. Con el enrutado por coste el nodo
+anuncia también las colas de nivel que consume y solo recibe trabajos de su
+nivel: la cola propia no debe saltarse los límites de memoria del nivel.
+"""
+
+import hashlib
+import logging
+import os
+import socket
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterable, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: solo exclusión dentro del proceso
+    fcntl = None
+
+from result_cache import evict_lru
+from storage import OUTPUT_DIR
+from storage.base import Storage
+from storage.filesystem import link_or_copy
+
+logger = logging.getLogger(__name__)
+
+INPUT_CACHE_DIR = Path(os.getenv("INPUT_CACHE_DIR", str(OUTPUT_DIR / "inputs")))
+INPUT_CACHE_MAX_BYTES = int(os.getenv("INPUT_CACHE_MAX_MB", "20480")) * 1024 * 1024
+
+INPUT_AFFINITY = os.getenv("INPUT_AFFINITY", "false").lower() == "true"
+INPUT_AFFINITY_REDIS_URL = os.getenv("INPUT_AFFINITY_REDIS_URL",
+                                     os.getenv("CELERY_BROKER_URL", "redis://localhost:6380/0"))
+# Cola propia del nodo (el worker la añade a las que consume)
+WORKER_QUEUE = os.getenv("WORKER_QUEUE", f"node.{socket.gethostname()}")
+# Trabajos pendientes a partir de los cuales no se espera al nodo con la entrada
+INPUT_AFFINITY_MAX_BACKLOG = int(os.getenv("INPUT_AFFINITY_MAX_BACKLOG", "2"))
+# Un nodo que no renueva su latido en este tiempo se considera caído
+INPUT_AFFINITY_NODE_TTL = int(os.getenv("INPUT_AFFINITY_NODE_TTL", "60"))
+INPUT_AFFINITY_HOLDER_TTL = 7 * 24 * 3600
+
+
+def input_cache_key(input_sha256: Optional[str], input_key: str) -> str:
+    """Clave de caché: el hash de contenido o, si no se conoce, la clave de almacenamiento"""
+    if input_sha256:
+        return input_sha256
+    # Las claves sin hash (subidas directas) son nombres únicos e inmutables
+    return "key-" + hashlib.sha256(input_key.encode()).hexdigest()
+
+
+class InputCache:
+    """Caché LRU de archivos de entrada descargados del almacenamiento"""
+
+    def __init__(self, cache_dir: Path = INPUT_CACHE_DIR, max_bytes: int = INPUT_CACHE_MAX_BYTES):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self._thread_lock = threading.Lock()
+
+    def entry_path(self, cache_key: str, suffix: str) -> Path:
+        return self.cache_dir / f"{cache_key}{suffix.lower()}"
+
+    @contextmanager
+    def _locked(self, cache_key: str):
+        """Exclusión entre procesos (flock) para llenar una entrada"""
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        if fcntl is None:
+            with self._thread_lock:
+                yield
+            return
+        with open(self.cache_dir / f".{cache_key}.lock", "w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    @staticmethod
+    def _link(entry: Path, destination: Path) -> bool:
+        """Marcar la entrada como usada y enlazarla; False si ya no existe"""
+        try:
+            os.utime(entry)
+            link_or_copy(entry, Path(destination))
+            return True
+        except FileNotFoundError:
+            return False
+
+    def checkout(self, cache_key: str, storage_key: str, storage: Storage, destination: Path) -> bool:
+        """
+        Dejar la entrada en ``destination`` (enlace duro a la caché)
+
+        El enlace mantiene el archivo aunque otro proceso lo expulse mientras
+        el trabajo lo usa. La expulsión no toma el lock de la entrada, así que
+        puede borrarla entre la comprobación y el enlace: entonces se vuelve a
+        descargar.
+
+        Returns:
+            True si la entrada ya estaba en caché
+        """
+        entry = self.entry_path(cache_key, Path(storage_key).suffix)
+        with self._locked(cache_key):
+            hit = entry.exists() and self._link(entry, destination)
+            if not hit:
+                storage.fetch(storage_key, entry)
+                if not self._link(entry, destination):
+                    # Expulsada otra vez (entrada mayor que el presupuesto): sin caché
+                    storage.fetch(storage_key, Path(destination))
+
+        evicted = evict_lru(self.cache_dir, self.max_bytes, keep=entry)
+        input_affinity.unregister(path.stem for path in evicted)
+        input_affinity.register(cache_key)
+        logger.info(f"Entrada {storage_key}: {'en caché' if hit else 'descargada'}")
+        return hit
+
+
+class InputAffinity:
+    """Registro en Redis de qué nodo tiene cada entrada (desactivado por defecto)"""
+
+    def __init__(self, enabled: bool = INPUT_AFFINITY, redis_url: str = INPUT_AFFINITY_REDIS_URL,
+                 queue: str = WORKER_QUEUE):
+        self.enabled = enabled
+        self.redis_url = redis_url
+        self.queue = queue
+        # Colas de nivel que consume el worker (las fija el worker al arrancar)
+        self.tier_queues = set()
+        self._client = None
+
+    @property
+    def client(self):
+        if self._client is None:
+            import redis
+            self._client = redis.Redis.from_url(self.redis_url)
+        return self._client
+
+    @staticmethod
+    def _holders_key(cache_key: str) -> str:
+        return f"input-cache:holders:{cache_key}"
+
+    @staticmethod
+    def _node_key(queue: str) -> str:
+        return f"input-cache:node:{queue}"
+
+    def _node_value(self) -> str:
+        """Valor del latido: las colas de nivel que consume el nodo"""
+        return ",".join(sorted(self.tier_queues))
+
+    def heartbeat(self):
+        """Marcar este nodo como vivo"""
+        if not self.enabled:
+            return
+        try:
+            self.client.set(self._node_key(self.queue), self._node_value(), ex=INPUT_AFFINITY_NODE_TTL)
+        except Exception as e:
+            logger.warning(f"No se pudo renovar el latido de afinidad: {str(e)}")
+
+    def register(self, cache_key: str):
+        """Anunciar que este nodo tiene la entrada"""
+        if not self.enabled:
+            return
+        try:
+            pipe = self.client.pipeline()
+            pipe.sadd(self._holders_key(cache_key), self.queue)
+            pipe.expire(self._holders_key(cache_key), INPUT_AFFINITY_HOLDER_TTL)
+            pipe.set(self._node_key(self.queue), self._node_value(), ex=INPUT_AFFINITY_NODE_TTL)
+            pipe.execute()
+        except Exception as e:
+            logger.warning(f"No se pudo registrar la afinidad de {cache_key}: {str(e)}")
+
+    def unregister(self, cache_keys: Iterable[str]):
+        """Retirar el anuncio de las entradas expulsadas"""
+        cache_keys = list(cache_keys)
+        if not self.enabled or not cache_keys:
+            return
+        try:
+            pipe = self.client.pipeline()
+            for cache_key in cache_keys:
+                pipe.srem(self._holders_key(cache_key), self.queue)
+            pipe.execute()
+        except Exception as e:
+            logger.warning(f"No se pudo retirar la afinidad: {str(e)}")
+
+    def pick_queue(self, cache_key: str, tier_queue: Optional[str] = None) -> Optional[str]:
+        """
+        Cola del nodo vivo con la entrada y menos trabajos pendientes
+
+        Args:
+            cache_key: Clave de la entrada en la caché
+            tier_queue: Cola del nivel del job; solo se eligen nodos que la consumen
+
+        Returns:
+            None si ningún nodo la tiene, están caídos, saturados o son de otro
+            nivel (cola común o del nivel)
+        """
+        if not self.enabled:
+            return None
+        try:
+            best, best_backlog = None, INPUT_AFFINITY_MAX_BACKLOG
+            for raw in self.client.smembers(self._holders_key(cache_key)):
+                queue = raw.decode() if isinstance(raw, bytes) else raw
+                node = self.client.get(self._node_key(queue))
+                if node is None:
+                    continue
+                if tier_queue is not None:
+                    node = node.decode() if isinstance(node, bytes) else str(node)
+                    if tier_queue not in node.split(","):
+                        continue
+                # Con el broker Redis cada cola es una lista con su nombre
+                backlog = self.client.llen(queue)
+                if backlog < best_backlog:
+                    best, best_backlog = queue, backlog
+            return best
+        except Exception as e:
+            logger.warning(f"Afinidad no disponible, se usa la cola común: {str(e)}")
+            return None
+
+
+input_affinity = InputAffinity()
+input_cache = InputCache()
@@ -0,0 +1,176 @@
+"""
+Eventos de estado y progreso de los jobs
+
+Los workers publican cada cambio de estado/progreso en el canal del
+propietario del job; la API los reenvía por Server-Sent Events a los
+clientes suscritos (``GET /api/jobs/events``), así el frontend no tiene que
+sondear ``GET /api/jobs``.
+
+- ``MemoryJobEvents``: reparto dentro del proceso (tests y desarrollo con un
+  único proceso).
+- ``RedisJobEvents``: publicación con Redis pub/sub. Cada proceso de la API
+  mantiene una sola suscripción por patrón (``job-events:*``) y reparte los
+  mensajes a sus clientes en memoria, así que el número de conexiones a
+  Redis no crece con el número de clientes.
+
+Cada suscriptor tiene una cola acotada; si un cliente lento la llena se
+descartan los eventos más antiguos (el progreso posterior los sustituye).
+"""
+
+import asyncio
+import json
+import logging
+import os
+import threading
+from contextlib import asynccontextmanager
+from typing import Dict, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+JOB_EVENTS_BACKEND = os.getenv("JOB_EVENTS_BACKEND", "redis")  # redis | memory
+JOB_EVENTS_REDIS_URL = os.getenv("JOB_EVENTS_REDIS_URL",
+                                 os.getenv("CELERY_BROKER_URL", "redis://localhost:6380/0"))
+JOB_EVENTS_QUEUE_SIZE = int(os.getenv("JOB_EVENTS_QUEUE_SIZE", "100"))
+# Segundos entre comentarios de keep-alive en el stream SSE
+JOB_EVENTS_HEARTBEAT = float(os.getenv("JOB_EVENTS_HEARTBEAT_SECONDS", "15"))
+
+CHANNEL_PREFIX = "job-events:"
+
+
+def status_event(job_id: int, status, progress: int, error: str = None, output_key: str = None) -> dict:
+    """Evento de estado/progreso de un job"""
+    return {
+        "job_id": job_id,
+        "status": status.value if hasattr(status, "value") else status,
+        "progress": progress,
+        "error": error,
+        "output_key": output_key,
+    }
+
+
+def job_event(job) -> dict:
+    """Evento con el estado actual de un job"""
+    return status_event(job.id, job.status, job.progress, job.error, job.output_key)
+
+
+def _offer(queue: asyncio.Queue, event: dict):
+    """Encolar descartando el evento más antiguo si la cola está llena"""
+    if queue.full():
+        queue.get_nowait()
+    queue.put_nowait(event)
+
+
+class MemoryJobEvents:
+    """Reparto de eventos entre los suscriptores de este proceso"""
+
+    def __init__(self, queue_size: int = JOB_EVENTS_QUEUE_SIZE):
+        self.queue_size = queue_size
+        self._subscribers: Dict[int, Set[Tuple[asyncio.AbstractEventLoop, asyncio.Queue]]] = {}
+        self._lock = threading.Lock()
+
+    def subscriber_count(self) -> int:
+        with self._lock:
+            return sum(len(subscribers) for subscribers in self._subscribers.values())
+
+    def dispatch(self, user_id: int, event: dict):
+        """Entregar un evento a los suscriptores locales (seguro desde cualquier hilo)"""
+        with self._lock:
+            subscribers = list(self._subscribers.get(user_id, ()))
+        for loop, queue in subscribers:
+            try:
+                loop.call_soon_threadsafe(_offer, queue, event)
+            except RuntimeError:
+                # Bucle ya cerrado: el suscriptor se retira al salir de subscribe()
+                pass
+
+    def publish(self, user_id: int, event: dict):
+        """Publicar un evento para los clientes del usuario"""
+        self.dispatch(user_id, event)
+
+    async def _on_subscribe(self):
+        """Punto de extensión: preparar la recepción antes de entregar eventos"""
+
+    @asynccontextmanager
+    async def subscribe(self, user_id: int):
+        """Suscribirse a los eventos del usuario; devuelve la cola de eventos"""
+        await self._on_subscribe()
+        entry = (asyncio.get_running_loop(), asyncio.Queue(maxsize=self.queue_size))
+        with self._lock:
+            self._subscribers.setdefault(user_id, set()).add(entry)
+        try:
+            yield entry[1]
+        finally:
+            with self._lock:
+                subscribers = self._subscribers.get(user_id)
+                if subscribers is not None:
+                    subscribers.discard(entry)
+                    if not subscribers:
+                        del self._subscribers[user_id]
+
+
+class RedisJobEvents(MemoryJobEvents):
+    """Publicación con Redis pub/sub y una suscripción por proceso de la API"""
+
+    def __init__(self, redis_url: str = JOB_EVENTS_REDIS_URL, queue_size: int = JOB_EVENTS_QUEUE_SIZE):
+        super().__init__(queue_size)
+        self.redis_url = redis_url
+        self._client = None
+        self._listener = None
+
+    @property
+    def client(self):
+        if self._client is None:
+            import redis
+            self._client = redis.Redis.from_url(self.redis_url, socket_timeout=1)
+        return self._client
+
+    def publish(self, user_id: int, event: dict):
+        """Publicar en Redis; un fallo no debe interrumpir el procesamiento"""
+        try:
+            self.client.publish(f"{CHANNEL_PREFIX}{user_id}", json.dumps(event))
+        except Exception as e:
+            logger.warning(f"No se pudo publicar el evento del job: {str(e)}")
+
+    async def _on_subscribe(self):
+        if self._listener is None or self._listener.done():
+            self._listener = asyncio.create_task(self._listen())
+
+    async def _listen(self):
+        """Recibir de Redis y repartir localmente; reconecta tras un error"""
+        import redis.asyncio as aioredis
+
+        while True:
+            client = aioredis.Redis.from_url(self.redis_url)
+            try:
+                async with client.pubsub() as pubsub:
+                    await pubsub.psubscribe(f"{CHANNEL_PREFIX}*")
+                    async for message in pubsub.listen():
+                        if message["type"] != "pmessage":
+                            continue
+                        channel = message["channel"]
+                        if isinstance(channel, bytes):
+                            channel = channel.decode()
+                        try:
+                            user_id = int(channel[len(CHANNEL_PREFIX):])
+                            event = json.loads(message["data"])
+                        except ValueError:
+                            continue
+                        self.dispatch(user_id, event)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Suscripción a eventos de jobs interrumpida: {str(e)}")
+                await asyncio.sleep(1)
+            finally:
+                await client.aclose()
+
+
+def create_job_events():
+    if JOB_EVENTS_BACKEND == "memory":
+        return MemoryJobEvents()
+    if JOB_EVENTS_BACKEND == "redis":
+        return RedisJobEvents()
+    raise ValueError(f"JOB_EVENTS_BACKEND no válido: {JOB_EVENTS_BACKEND}")
+
+
+job_events = create_job_events()
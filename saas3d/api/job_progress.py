@@ -0,0 +1,112 @@
+"""
+Progreso intermedio de los jobs fuera de la base de datos
+
+El worker informa del progreso unas diez veces por job. Escribir cada punto
+en ``jobs`` supone una transacción por paso; en su lugar el progreso
+intermedio va a un almacén rápido (Redis, o memoria en tests y desarrollo)
+y en la tabla solo se escriben las transiciones de estado. Las lecturas
+(``GET /api/jobs``) combinan ambas fuentes: para los jobs en
+``processing`` prevalece el valor del almacén.
+
+Cada transición borra la entrada del job, así que un valor antiguo (p. ej.
+de un intento anterior) nunca oculta el estado escrito en la tabla.
+"""
+
+import logging
+import os
+import threading
+from typing import Dict, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+JOB_PROGRESS_BACKEND = os.getenv("JOB_PROGRESS_BACKEND", "redis")  # redis | memory
+JOB_PROGRESS_REDIS_URL = os.getenv("JOB_PROGRESS_REDIS_URL",
+                                   os.getenv("CELERY_BROKER_URL", "redis://localhost:6380/0"))
+# Las entradas caducan solas si un worker muere sin llegar a una transición
+JOB_PROGRESS_TTL = int(os.getenv("JOB_PROGRESS_TTL_SECONDS", "86400"))
+
+
+class MemoryProgressStore:
+    """Progreso en memoria del proceso"""
+
+    def __init__(self):
+        self._values: Dict[int, int] = {}
+        self._lock = threading.Lock()
+
+    def set(self, job_id: int, progress: int):
+        with self._lock:
+            self._values[job_id] = progress
+
+    def get(self, job_id: int) -> Optional[int]:
+        with self._lock:
+            return self._values.get(job_id)
+
+    def get_many(self, job_ids: Iterable[int]) -> Dict[int, int]:
+        with self._lock:
+            return {job_id: self._values[job_id] for job_id in job_ids if job_id in self._values}
+
+    def clear(self, job_id: int):
+        with self._lock:
+            self._values.pop(job_id, None)
+
+
+class RedisProgressStore:
+    """
+    Progreso en Redis, compartido entre workers y API
+
+    Los errores de Redis se registran y se ignoran: sin almacén las lecturas
+    muestran el último estado escrito en la tabla.
+    """
+
+    def __init__(self, redis_url: str = JOB_PROGRESS_REDIS_URL, ttl: int = JOB_PROGRESS_TTL):
+        self.redis_url = redis_url
+        self.ttl = ttl
+        self._client = None
+
+    @property
+    def client(self):
+        if self._client is None:
+            import redis
+            self._client = redis.Redis.from_url(self.redis_url, socket_timeout=1)
+        return self._client
+
+    @staticmethod
+    def _key(job_id: int) -> str:
+        return f"job-progress:{job_id}"
+
+    def set(self, job_id: int, progress: int):
+        try:
+            self.client.set(self._key(job_id), progress, ex=self.ttl)
+        except Exception as e:
+            logger.warning(f"No se pudo guardar el progreso del job {job_id}: {str(e)}")
+
+    def get(self, job_id: int) -> Optional[int]:
+        return self.get_many([job_id]).get(job_id)
+
+    def get_many(self, job_ids: Iterable[int]) -> Dict[int, int]:
+        job_ids = list(job_ids)
+        if not job_ids:
+            return {}
+        try:
+            values = self.client.mget([self._key(job_id) for job_id in job_ids])
+        except Exception as e:
+            logger.warning(f"No se pudo leer el progreso de los jobs: {str(e)}")
+            return {}
+        return {job_id: int(value) for job_id, value in zip(job_ids, values) if value is not None}
+
+    def clear(self, job_id: int):
+        try:
+            self.client.delete(self._key(job_id))
+        except Exception as e:
+            logger.warning(f"No se pudo borrar el progreso del job {job_id}: {str(e)}")
+
+
+def create_progress_store():
+    if JOB_PROGRESS_BACKEND == "memory":
+        return MemoryProgressStore()
+    if JOB_PROGRESS_BACKEND == "redis":
+        return RedisProgressStore()
+    raise ValueError(f"JOB_PROGRESS_BACKEND no válido: {JOB_PROGRESS_BACKEND}")
+
+
+progress_store = create_progress_store()
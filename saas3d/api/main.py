@@ -1,23 +1,29 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from database import engine
+from database import engine, pool_stats
+from password_pool import hashing_pool
 from models import Base
 from routes.auth import router as auth_router
 from routes.jobs import router as jobs_router
-from routes.upload import router as upload_router
+from routes.upload import router as upload_router, UploadSizeLimitMiddleware
 from routes.processing import router as processing_router
+from routes.resumable_upload import router as resumable_upload_router
+from routes.outputs import router as outputs_router
 
 # Crear tablas
 Base.metadata.create_all(bind=engine)
 
 app = FastAPI(title="BIMView API", version="1.0.0")
-app.add_middleware(CORSMiddleware, allow_origins=["http://localhost:3000"])
+app.add_middleware(CORSMiddleware, allow_origins=["http://localhost:3000"], expose_headers=["ETag", "X-Next-Cursor"])
+app.add_middleware(UploadSizeLimitMiddleware, path="/api/upload")
 
 # Incluir routers
 app.include_router(auth_router, prefix="/auth", tags=["authentication"])
 app.include_router(jobs_router, prefix="/api", tags=["jobs"])
 app.include_router(upload_router, prefix="/api", tags=["upload"])
+app.include_router(resumable_upload_router, prefix="/api", tags=["upload"])
 app.include_router(processing_router, prefix="/api", tags=["processing"])
+app.include_router(outputs_router, prefix="/api", tags=["outputs"])
 
 @app.get("/")
 def read_root():
@@ -26,3 +32,13 @@ def read_root():
 @app.get("/health")
 def health_check():
     return {"status": "healthy"}
+
+@app.get("/metrics/db-pool")
+def db_pool_metrics():
+    """Ocupación de los pools de conexiones y tiempo de espera de los checkouts"""
+    return pool_stats()
+
+@app.get("/metrics/password-hashing")
+def password_hashing_metrics():
+    """Ocupación del pool de hash de contraseñas y peticiones rechazadas"""
+    return hashing_pool.stats()
@@ -1,8 +1,8 @@
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, ForeignKey, Text, Enum
+from sqlalchemy import Column, Integer, BigInteger, String, DateTime, Boolean, ForeignKey, Text, Enum, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from database import Base
-from enums import JobStatus
+from enums import JobStatus, UploadStatus
 
 class User(Base):
     __tablename__ = 'users'
@@ -27,6 +27,7 @@ class Job(Base):
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey('users.id'), nullable=False)
     input_key = Column(String, index=True)  # Clave del archivo de entrada en S3
+    input_sha256 = Column(String(64), index=True)  # SHA-256 del archivo de entrada
     output_key = Column(String, index=True)  # Clave del archivo de salida en S3
     status = Column(Enum(JobStatus), default=JobStatus.queued)
     progress = Column(Integer, default=0)  # Progreso de 0 a 100
@@ -38,5 +39,41 @@ class Job(Base):
     # Relación con User
     user = relationship("User", back_populates="jobs")
     
+    # Listado paginado por usuario (más recientes primero, desempate por id)
+    __table_args__ = (
+        Index('ix_jobs_user_id_created_at_id', 'user_id', 'created_at', 'id'),
+    )
+    
     def __repr__(self):
         return f"<Job(id={self.id}, user_id={self.user_id}, status='{self.status}')>"
+
+class UploadSession(Base):
+    __tablename__ = 'upload_sessions'
+    
+    id = Column(String(36), primary_key=True)  # UUID de la sesión
+    user_id = Column(Integer, ForeignKey('users.id'), nullable=False, index=True)
+    filename = Column(String, nullable=False)  # Nombre original
+    stored_filename = Column(String, nullable=False)  # Nombre en UPLOAD_DIR (o clave en el almacenamiento)
+    storage_upload_id = Column(String)  # Subida multiparte del almacenamiento (subidas directas)
+    total_size = Column(BigInteger, nullable=False)
+    chunk_size = Column(Integer, nullable=False)
+    status = Column(Enum(UploadStatus), default=UploadStatus.pending)
+    job_id = Column(Integer, ForeignKey('jobs.id'))  # Job creado al finalizar
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())  # Último bloque recibido
+    
+    # Relación con los bloques recibidos
+    chunks = relationship("UploadChunk", back_populates="session", cascade="all, delete-orphan")
+    
+    def __repr__(self):
+        return f"<UploadSession(id='{self.id}', user_id={self.user_id}, status='{self.status}')>"
+
+class UploadChunk(Base):
+    __tablename__ = 'upload_chunks'
+    
+    session_id = Column(String(36), ForeignKey('upload_sessions.id'), primary_key=True)
+    index = Column(Integer, primary_key=True)  # Número de bloque (offset = index * chunk_size)
+    size = Column(Integer, nullable=False)
+    
+    # Relación con la sesión
+    session = relationship("UploadSession", back_populates="chunks")
@@ -0,0 +1,108 @@
+"""
+Pool acotado para el hash de contraseñas
+
+``pbkdf2_sha256`` es deliberadamente costoso (decenas de ms de CPU). En el
+threadpool por defecto de FastAPI, una ráfaga de logins ocupa todos sus
+hilos y bloquea el resto de endpoints síncronos. Aquí el hash se ejecuta en
+un executor propio con un número fijo de workers (hilos o procesos, estos
+últimos sin competir por el GIL con el event loop) y una cola limitada:
+cuando hay ``PASSWORD_HASH_MAX_PENDING`` operaciones en curso o esperando,
+las nuevas fallan al instante con ``HashingPoolSaturated`` (503) en lugar de
+acumularse.
+"""
+
+import asyncio
+import logging
+import os
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+PASSWORD_HASH_EXECUTOR = os.getenv("PASSWORD_HASH_EXECUTOR", "thread")  # thread | process
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "16"))
+# Segundos sugeridos al cliente en Retry-After cuando el pool está saturado
+PASSWORD_HASH_RETRY_AFTER = int(os.getenv("PASSWORD_HASH_RETRY_AFTER", "1"))
+
+
+class HashingPoolSaturated(Exception):
+    """El pool de hash tiene la cola llena"""
+
+
+class HashingPool:
+    """Executor dedicado con límite de operaciones pendientes"""
+
+    def __init__(self, kind: str = PASSWORD_HASH_EXECUTOR, workers: int = PASSWORD_HASH_WORKERS,
+                 max_pending: int = PASSWORD_HASH_MAX_PENDING):
+        if kind not in ("thread", "process"):
+            raise ValueError(f"Tipo de executor no válido: {kind}")
+        self.kind = kind
+        self.workers = workers
+        self.max_pending = max_pending
+        self._executor: Optional[Executor] = None
+        self._lock = threading.Lock()
+        self.pending = 0
+        self.completed = 0
+        self.rejected = 0
+
+    @property
+    def executor(self) -> Executor:
+        # Creación perezosa: los procesos no se lanzan al importar el módulo
+        with self._lock:
+            if self._executor is None:
+                if self.kind == "process":
+                    self._executor = ProcessPoolExecutor(max_workers=self.workers)
+                else:
+                    self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="password-hash")
+            return self._executor
+
+    def _acquire(self):
+        with self._lock:
+            if self.pending >= self.max_pending:
+                self.rejected += 1
+                raise HashingPoolSaturated()
+            self.pending += 1
+
+    def _release(self):
+        with self._lock:
+            self.pending -= 1
+            self.completed += 1
+
+    async def run(self, func: Callable, *args):
+        """
+        Ejecutar ``func(*args)`` en el pool
+
+        ``func`` debe ser una función de módulo (se serializa por referencia
+        con el executor de procesos).
+
+        Raises:
+            HashingPoolSaturated: si la cola está llena
+        """
+        self._acquire()
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.executor, func, *args)
+        finally:
+            self._release()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "executor": self.kind,
+                "workers": self.workers,
+                "max_pending": self.max_pending,
+                "pending": self.pending,
+                "completed": self.completed,
+                "rejected": self.rejected,
+            }
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+hashing_pool = HashingPool()
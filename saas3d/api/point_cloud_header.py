@@ -0,0 +1,132 @@
+"""
+Lectura de cabeceras de nubes de puntos sin descargar el archivo
+
+Para estimar el coste de un job al enviarlo basta con la cabecera: número de
+puntos y, si el formato la guarda, la extensión (bounding box). Solo se leen
+los primeros bytes con ``Storage.read_range``, así que funciona igual con el
+sistema de archivos que con S3.
+
+- LAS/LAZ: cabecera binaria pública (LAZ comparte la cabecera sin comprimir)
+- PLY: número de elementos ``vertex`` de la cabecera de texto
+- PCD: campo ``POINTS`` (o ``WIDTH`` x ``HEIGHT``)
+- XYZ: sin cabecera; se estima a partir del tamaño y de las primeras líneas
+"""
+
+import logging
+import struct
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional, Tuple
+
+from storage.base import Storage
+
+logger = logging.getLogger(__name__)
+
+# Bytes leídos para las cabeceras de texto (PLY/PCD) y la muestra de XYZ
+TEXT_HEADER_BYTES = 64 * 1024
+# Cabecera LAS 1.4 completa (las versiones anteriores son más cortas)
+LAS_HEADER_BYTES = 375
+
+
+@dataclass(frozen=True)
+class PointCloudHeader:
+    """Número de puntos y extensión leídos de la cabecera"""
+    point_count: int
+    # (min_x, min_y, min_z, max_x, max_y, max_z) si el formato la incluye
+    bounds: Optional[Tuple[float, float, float, float, float, float]] = None
+    # True si el número de puntos es una estimación (XYZ)
+    estimated: bool = False
+
+    @property
+    def extent(self) -> Optional[Tuple[float, float, float]]:
+        """Tamaño de la bounding box en cada eje"""
+        if self.bounds is None:
+            return None
+        min_x, min_y, min_z, max_x, max_y, max_z = self.bounds
+        return max_x - min_x, max_y - min_y, max_z - min_z
+
+
+def parse_las_header(data: bytes) -> PointCloudHeader:
+    """Cabecera pública de LAS/LAZ (versiones 1.0 a 1.4)"""
+    if len(data) < 227 or data[:4] != b"LASF":
+        raise ValueError("Cabecera LAS no válida")
+    version = (data[24], data[25])
+    point_count = struct.unpack_from("<I", data, 107)[0]
+    if point_count == 0 and version >= (1, 4) and len(data) >= 255:
+        # En LAS 1.4 el contador heredado vale 0 por encima de 2^32 puntos
+        point_count = struct.unpack_from("<Q", data, 247)[0]
+    max_x, min_x, max_y, min_y, max_z, min_z = struct.unpack_from("<6d", data, 179)
+    return PointCloudHeader(point_count, (min_x, min_y, min_z, max_x, max_y, max_z))
+
+
+def _text_header_lines(data: bytes, terminator: str) -> list:
+    """Líneas de una cabecera de texto hasta la que empieza por ``terminator``"""
+    lines = []
+    for raw in data.split(b"\n"):
+        line = raw.decode("ascii", errors="replace").strip()
+        lines.append(line)
+        if line.startswith(terminator):
+            return lines
+    raise ValueError(f"Cabecera sin '{terminator}' en los primeros {len(data)} bytes")
+
+
+def parse_ply_header(data: bytes) -> PointCloudHeader:
+    """Número de vértices de la cabecera PLY"""
+    if not data.startswith(b"ply"):
+        raise ValueError("Cabecera PLY no válida")
+    for line in _text_header_lines(data, "end_header"):
+        fields = line.split()
+        if len(fields) == 3 and fields[:2] == ["element", "vertex"]:
+            return PointCloudHeader(int(fields[2]))
+    raise ValueError("Cabecera PLY sin elemento vertex")
+
+
+def parse_pcd_header(data: bytes) -> PointCloudHeader:
+    """Número de puntos de la cabecera PCD"""
+    fields = {}
+    for line in _text_header_lines(data, "DATA"):
+        if line and not line.startswith("#"):
+            name, _, value = line.partition(" ")
+            fields[name.upper()] = value.strip()
+    if "POINTS" in fields:
+        return PointCloudHeader(int(fields["POINTS"]))
+    if "WIDTH" in fields and "HEIGHT" in fields:
+        return PointCloudHeader(int(fields["WIDTH"]) * int(fields["HEIGHT"]))
+    raise ValueError("Cabecera PCD sin POINTS")
+
+
+def estimate_xyz_points(sample: bytes, file_size: int) -> PointCloudHeader:
+    """Estimar las líneas de un XYZ con la longitud media de las primeras"""
+    if len(sample) >= file_size:
+        # Archivo leído entero: cuenta exacta (la última línea puede no acabar en salto)
+        return PointCloudHeader(len(sample.splitlines()))
+    complete = sample[:sample.rfind(b"\n") + 1]
+    if not complete:
+        raise ValueError("Muestra XYZ sin líneas completas")
+    return PointCloudHeader(round(file_size * complete.count(b"\n") / len(complete)), estimated=True)
+
+
+def read_point_cloud_header(storage: Storage, key: str) -> Optional[PointCloudHeader]:
+    """
+    Leer la cabecera de un archivo del almacenamiento
+
+    Returns:
+        None si el formato no se reconoce o la cabecera no se puede leer
+    """
+    suffix = Path(key).suffix.lower()
+    try:
+        file_size = storage.size(key)
+        if file_size == 0:
+            return None
+        if suffix in (".las", ".laz"):
+            return parse_las_header(storage.read_range(key, 0, min(LAS_HEADER_BYTES, file_size) - 1))
+        sample = storage.read_range(key, 0, min(TEXT_HEADER_BYTES, file_size) - 1)
+        if suffix == ".ply":
+            return parse_ply_header(sample)
+        if suffix == ".pcd":
+            return parse_pcd_header(sample)
+        if suffix == ".xyz":
+            return estimate_xyz_points(sample, file_size)
+    except Exception as e:
+        logger.warning(f"No se pudo leer la cabecera de {key}: {str(e)}")
+    return None
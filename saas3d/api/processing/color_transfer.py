@@ -0,0 +1,80 @@
+"""
+Transferencia de color vectorizada desde la nube de puntos a los vértices de la malla
+"""
+
+import numpy as np
+from scipy.spatial import cKDTree
+from typing import Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Métodos soportados (mismos nombres que en nueva_app_converter):
+#   nearest      -> color del punto más cercano
+#   weighted     -> media de los k vecinos más cercanos
+#   interpolated -> media ponderada por el inverso de la distancia (IDW)
+COLOR_METHODS = ['nearest', 'weighted', 'interpolated']
+COLOR_METHOD_ALIASES = {'mean': 'weighted', 'idw': 'interpolated'}
+
+# Vértices por bloque de consulta; limita la memoria de los índices k-NN
+QUERY_CHUNK_SIZE = 1_000_000
+
+
+def normalize_color_method(method: str) -> str:
+    """Normalizar nombre del método de color"""
+    method = COLOR_METHOD_ALIASES.get(method, method)
+    if method not in COLOR_METHODS:
+        raise ValueError(f"Método de color no soportado: {method}")
+    return method
+
+
+def transfer_vertex_colors(vertices: np.ndarray, points: np.ndarray, colors: np.ndarray,
+                           method: str = 'nearest', k_neighbors: int = 10,
+                           workers: int = -1, tree: Optional[cKDTree] = None,
+                           chunk_size: int = QUERY_CHUNK_SIZE) -> np.ndarray:
+    """
+    Calcular el color de cada vértice a partir de sus vecinos en la nube
+
+    Todas las consultas k-NN se lanzan en bloque sobre un cKDTree usando
+    todos los núcleos (workers=-1), sin bucle Python por vértice.
+
+    Args:
+        vertices: Vértices de la malla (N, 3)
+        points: Puntos de la nube (M, 3)
+        colors: Colores de la nube (M, 3) en [0, 1]
+        method: 'nearest', 'weighted' o 'interpolated'
+        k_neighbors: Vecinos usados por 'weighted' e 'interpolated'
+        workers: Hilos para la consulta (-1 = todos los núcleos)
+        tree: KDTree ya construido sobre ``points`` (opcional)
+        chunk_size: Vértices por bloque de consulta
+
+    Returns:
+        Array (N, 3) con los colores de los vértices
+    """
+    method = normalize_color_method(method)
+    vertices = np.asarray(vertices, dtype=np.float64)
+    colors = np.asarray(colors, dtype=np.float64)
+
+    if tree is None:
+        tree = cKDTree(np.asarray(points, dtype=np.float64))
+
+    k = 1 if method == 'nearest' else int(max(1, min(k_neighbors, tree.n)))
+    mesh_colors = np.empty((len(vertices), 3), dtype=np.float64)
+
+    for start in range(0, len(vertices), chunk_size):
+        stop = min(start + chunk_size, len(vertices))
+        distances, indices = tree.query(vertices[start:stop], k=k, workers=workers)
+
+        if k == 1:
+            mesh_colors[start:stop] = colors[indices.reshape(-1)]
+            continue
+
+        neighbor_colors = colors[indices]  # (n, k, 3)
+        if method == 'weighted':
+            mesh_colors[start:stop] = neighbor_colors.mean(axis=1)
+        else:
+            weights = 1.0 / np.maximum(distances, 1e-12)
+            weights /= weights.sum(axis=1, keepdims=True)
+            mesh_colors[start:stop] = np.einsum('nk,nkc->nc', weights, neighbor_colors)
+
+    return mesh_colors
@@ -0,0 +1,73 @@
+"""
+Lectura por bloques de archivos LAS/LAZ con memoria acotada
+
+En lugar de ``laspy.read`` + ``np.vstack`` (que mantiene el archivo completo
+varias veces en float64), los puntos se leen con el iterador de bloques de
+laspy y se envían directamente a la rejilla de vóxeles. El pico de memoria
+depende del tamaño del bloque y de los vóxeles de salida.
+"""
+
+import numpy as np
+from typing import Iterator, Optional, Tuple
+import logging
+
+from .voxel_grid import VoxelGridAccumulator
+
+logger = logging.getLogger(__name__)
+
+# Puntos leídos por bloque
+DEFAULT_CHUNK_POINTS = 2_000_000
+
+
+def has_rgb(header) -> bool:
+    """Indica si el formato de punto del header incluye RGB"""
+    dimensions = set(header.point_format.dimension_names)
+    return {'red', 'green', 'blue'} <= dimensions
+
+
+def iter_las_chunks(file_path: str, chunk_size: int = DEFAULT_CHUNK_POINTS
+                    ) -> Iterator[Tuple[np.ndarray, Optional[np.ndarray]]]:
+    """
+    Iterar sobre un archivo LAS/LAZ por bloques
+
+    Yields:
+        (points, colors): puntos (n, 3) float64 y colores (n, 3) en [0, 1] u None
+    """
+    import laspy
+
+    with laspy.open(str(file_path)) as reader:
+        with_colors = has_rgb(reader.header)
+        for chunk in reader.chunk_iterator(chunk_size):
+            n = len(chunk)
+            points = np.empty((n, 3), dtype=np.float64)
+            points[:, 0] = chunk.x
+            points[:, 1] = chunk.y
+            points[:, 2] = chunk.z
+
+            colors = None
+            if with_colors:
+                colors = np.empty((n, 3), dtype=np.float64)
+                colors[:, 0] = chunk.red
+                colors[:, 1] = chunk.green
+                colors[:, 2] = chunk.blue
+                colors /= 65535.0  # Normalizar a [0,1]
+
+            yield points, colors
+
+
+def read_las_downsampled(file_path: str, voxel_size: float,
+                         chunk_size: int = DEFAULT_CHUNK_POINTS
+                         ) -> Tuple[np.ndarray, Optional[np.ndarray], int]:
+    """
+    Leer un LAS/LAZ aplicando el downsampling por vóxeles bloque a bloque
+
+    Returns:
+        (points, colors, input_count)
+    """
+    accumulator = VoxelGridAccumulator(voxel_size)
+    for points, colors in iter_las_chunks(file_path, chunk_size):
+        accumulator.add(points, colors)
+
+    points, colors = accumulator.result()
+    logger.info(f"LAS leído por bloques: {accumulator.input_count} -> {len(points)} puntos")
+    return points, colors, accumulator.input_count
@@ -0,0 +1,119 @@
+"""
+Limpieza vectorizada de mallas (sin Open3D)
+
+Todas las operaciones trabajan sobre arrays de vértices (V, 3) y triángulos
+(T, 3) con máscaras booleanas, ``np.unique`` y ``bincount``: eliminación de
+triángulos degenerados y duplicados, filtrado de componentes conexas pequeñas
+y compactación de vértices no referenciados. El coste es O(T log T),
+independiente del número de componentes.
+"""
+
+import numpy as np
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components
+from typing import Dict, Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def degenerate_mask(triangles: np.ndarray) -> np.ndarray:
+    """Máscara de triángulos con algún índice de vértice repetido"""
+    return ((triangles[:, 0] == triangles[:, 1]) |
+            (triangles[:, 1] == triangles[:, 2]) |
+            (triangles[:, 0] == triangles[:, 2]))
+
+
+def duplicate_mask(triangles: np.ndarray) -> np.ndarray:
+    """Máscara de triángulos repetidos (mismos vértices en cualquier orden); se conserva el primero"""
+    if len(triangles) == 0:
+        return np.zeros(0, dtype=bool)
+    _, first = np.unique(np.sort(triangles, axis=1), axis=0, return_index=True)
+    mask = np.ones(len(triangles), dtype=bool)
+    mask[first] = False
+    return mask
+
+
+def triangle_components(triangles: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Componentes conexas de triángulos que comparten arista
+
+    Returns:
+        (labels, counts): componente de cada triángulo y triángulos por componente
+    """
+    n = len(triangles)
+    if n == 0:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+
+    # Aristas no orientadas de cada triángulo, empaquetadas en un int64
+    edges = np.sort(triangles[:, [0, 1, 1, 2, 2, 0]].reshape(-1, 2), axis=1).astype(np.int64)
+    keys = edges[:, 0] * (int(triangles.max()) + 1) + edges[:, 1]
+    owners = np.repeat(np.arange(n), 3)
+
+    # Triángulos consecutivos con la misma arista tras ordenar están conectados
+    order = np.argsort(keys, kind='stable')
+    keys, owners = keys[order], owners[order]
+    shared = keys[1:] == keys[:-1]
+    graph = coo_matrix((np.ones(int(shared.sum()), dtype=np.int8),
+                        (owners[:-1][shared], owners[1:][shared])), shape=(n, n))
+
+    _, labels = connected_components(graph, directed=False)
+    return labels, np.bincount(labels)
+
+
+def small_component_mask(triangles: np.ndarray, min_triangles: int) -> np.ndarray:
+    """Máscara de triángulos en componentes con ``min_triangles`` triángulos o menos"""
+    labels, counts = triangle_components(triangles)
+    return counts[labels] <= min_triangles
+
+
+def compact_vertices(vertices: np.ndarray, triangles: np.ndarray,
+                     vertex_arrays: Optional[Dict[str, Optional[np.ndarray]]] = None
+                     ) -> Tuple[np.ndarray, np.ndarray, Dict[str, Optional[np.ndarray]]]:
+    """Eliminar vértices no referenciados y reindexar los triángulos"""
+    vertex_arrays = vertex_arrays or {}
+    used = np.zeros(len(vertices), dtype=bool)
+    used[triangles.ravel()] = True
+    remap = np.cumsum(used) - 1
+
+    compacted = {name: array[used] if array is not None else None for name, array in vertex_arrays.items()}
+    return vertices[used], remap[triangles].astype(triangles.dtype), compacted
+
+
+def clean_mesh(vertices: np.ndarray, triangles: np.ndarray,
+               vertex_arrays: Optional[Dict[str, Optional[np.ndarray]]] = None,
+               min_component_triangles: int = 0):
+    """
+    Limpieza completa de una malla
+
+    Args:
+        vertices: Vértices (V, 3)
+        triangles: Triángulos (T, 3)
+        vertex_arrays: Arrays por vértice a mantener alineados (colores, normales)
+        min_component_triangles: Se eliminan las componentes con este número
+            de triángulos o menos (0 desactiva el filtro)
+
+    Returns:
+        (vertices, triangles, vertex_arrays, stats)
+    """
+    triangles = np.asarray(triangles)
+    stats = {'input_vertices': len(vertices), 'input_triangles': len(triangles)}
+
+    remove = degenerate_mask(triangles)
+    stats['degenerate'] = int(remove.sum())
+    triangles = triangles[~remove]
+
+    remove = duplicate_mask(triangles)
+    stats['duplicate'] = int(remove.sum())
+    triangles = triangles[~remove]
+
+    stats['small_components'] = 0
+    if min_component_triangles > 0 and len(triangles):
+        remove = small_component_mask(triangles, min_component_triangles)
+        stats['small_components'] = int(remove.sum())
+        triangles = triangles[~remove]
+
+    vertices, triangles, vertex_arrays = compact_vertices(vertices, triangles, vertex_arrays)
+    stats['unreferenced_vertices'] = stats['input_vertices'] - len(vertices)
+    logger.info(f"Limpieza de malla: {stats}")
+    return vertices, triangles, vertex_arrays, stats
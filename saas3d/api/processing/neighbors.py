@@ -0,0 +1,86 @@
+"""
+Operaciones por vecindad sobre un cKDTree compartido (sin Open3D)
+
+Eliminación estadística de outliers y estimación de normales por PCA, ambas
+con consultas k-NN en bloque (workers=-1) y álgebra vectorizada por bloques
+para que los 20/30 vecinos por defecto escalen a decenas de millones de puntos.
+"""
+
+import numpy as np
+from scipy.spatial import cKDTree
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Puntos por bloque de consulta; acota la memoria de los arrays (n, k, 3)
+QUERY_CHUNK_SIZE = 200_000
+
+
+def build_kdtree(points: np.ndarray) -> cKDTree:
+    """Construir KDTree sobre los puntos"""
+    # Sin balanceo ni compactación: construcción mucho más rápida en nubes grandes
+    return cKDTree(points, balanced_tree=False, compact_nodes=False)
+
+
+def statistical_outlier_mask(tree: cKDTree, points: np.ndarray, nb_neighbors: int = 20,
+                             std_ratio: float = 2.0, workers: int = -1,
+                             chunk_size: int = QUERY_CHUNK_SIZE) -> np.ndarray:
+    """
+    Máscara de puntos a conservar según el filtro estadístico de outliers
+
+    Un punto es outlier si su distancia media a los ``nb_neighbors`` vecinos
+    supera la media global más ``std_ratio`` desviaciones típicas (mismo
+    criterio que ``remove_statistical_outlier`` de Open3D).
+    """
+    n = len(points)
+    k = min(nb_neighbors, n - 1)
+    if k < 1:
+        return np.ones(n, dtype=bool)
+
+    mean_distances = np.empty(n, dtype=np.float64)
+    for start in range(0, n, chunk_size):
+        stop = min(start + chunk_size, n)
+        # k + 1 porque el primer vecino es el propio punto
+        distances, _ = tree.query(points[start:stop], k=k + 1, workers=workers)
+        mean_distances[start:stop] = distances[:, 1:].mean(axis=1)
+
+    threshold = mean_distances.mean() + std_ratio * mean_distances.std()
+    return mean_distances <= threshold
+
+
+def estimate_normals_pca(tree: cKDTree, points: np.ndarray, radius: float = 0.1,
+                         max_nn: int = 30, workers: int = -1,
+                         chunk_size: int = QUERY_CHUNK_SIZE) -> np.ndarray:
+    """
+    Estimar normales por PCA de la vecindad híbrida (radio + max_nn)
+
+    La normal es el autovector del menor autovalor de la covarianza de los
+    vecinos, calculada con ``eigh`` por lotes. Los puntos con menos de 3
+    vecinos reciben (0, 0, 1). Las normales se orientan hacia +Z.
+    """
+    n = len(points)
+    k = int(max(1, min(max_nn, n)))
+    normals = np.empty((n, 3), dtype=np.float64)
+
+    for start in range(0, n, chunk_size):
+        stop = min(start + chunk_size, n)
+        _, indices = tree.query(points[start:stop], k=k, distance_upper_bound=radius, workers=workers)
+        indices = indices.reshape(stop - start, k)
+
+        # Vecinos fuera del radio vienen con índice n
+        valid = indices < n
+        counts = valid.sum(axis=1)
+        neighbors = points[np.where(valid, indices, 0)]
+        weights = valid[:, :, np.newaxis]
+
+        centroids = (neighbors * weights).sum(axis=1) / counts[:, np.newaxis]
+        centered = (neighbors - centroids[:, np.newaxis, :]) * weights
+        covariances = np.einsum('nki,nkj->nij', centered, centered) / counts[:, np.newaxis, np.newaxis]
+
+        _, eigenvectors = np.linalg.eigh(covariances)
+        chunk_normals = eigenvectors[:, :, 0]
+        chunk_normals[counts < 3] = (0.0, 0.0, 1.0)
+        normals[start:stop] = chunk_normals
+
+    normals[normals[:, 2] < 0] *= -1
+    return normals
@@ -0,0 +1,111 @@
+"""
+Formato binario mapeable en memoria para nubes de puntos y mallas (.bvb)
+
+Estructura del archivo::
+
+    MAGIC (8 bytes) | longitud del header (uint64 LE) | header JSON | arrays
+
+El header describe cada array (dtype, shape, offset) y metadatos libres. Los
+arrays empiezan en offsets alineados a 64 bytes, de modo que la lectura con
+``np.memmap`` devuelve vistas sin copia: entre etapas, cachés y procesos solo
+se comparten páginas del archivo, sin serializar ni parsear PLY/PCD.
+"""
+
+import json
+import os
+import struct
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+MAGIC = b"BVBUF\x00\x01\x00"
+ALIGNMENT = 64
+_LENGTH = struct.Struct("<Q")
+
+# Nombres habituales de los arrays
+POINT_ARRAYS = ('points', 'colors', 'normals')
+MESH_ARRAYS = ('vertices', 'triangles', 'vertex_colors', 'vertex_normals')
+
+
+def _align(offset: int) -> int:
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def write_buffer(path, arrays: Dict[str, Optional[np.ndarray]],
+                 meta: Optional[Dict[str, Any]] = None) -> Path:
+    """
+    Escribir arrays en formato .bvb (escritura atómica)
+
+    Args:
+        path: Ruta de destino
+        arrays: Arrays por nombre; los None se omiten
+        meta: Metadatos serializables a JSON
+
+    Returns:
+        Ruta escrita
+    """
+    path = Path(path)
+    arrays = {name: np.ascontiguousarray(array) for name, array in arrays.items() if array is not None}
+
+    # El header depende de los offsets y los offsets del tamaño del header:
+    # se reserva espacio con un header provisional y se rellena con espacios
+    entries = {
+        name: {'dtype': array.dtype.str, 'shape': list(array.shape), 'offset': 0}
+        for name, array in arrays.items()
+    }
+    header = {'arrays': entries, 'meta': meta or {}}
+    reserved = len(json.dumps(header).encode()) + 32 * len(entries) + 16
+
+    offset = _align(len(MAGIC) + _LENGTH.size + reserved)
+    for name, array in arrays.items():
+        entries[name]['offset'] = offset
+        offset = _align(offset + array.nbytes)
+
+    header_bytes = json.dumps(header).encode()
+    if len(header_bytes) > reserved:
+        raise ValueError("Header .bvb demasiado grande")
+    header_bytes = header_bytes.ljust(reserved, b" ")
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.tmp")
+    with open(tmp, "wb") as f:
+        f.write(MAGIC)
+        f.write(_LENGTH.pack(len(header_bytes)))
+        f.write(header_bytes)
+        for name, array in arrays.items():
+            f.seek(entries[name]['offset'])
+            f.write(memoryview(array).cast('B') if array.nbytes else b"")
+        f.truncate(offset)
+    os.replace(tmp, path)
+    return path
+
+
+def read_header(path) -> Dict[str, Any]:
+    """Leer solo el header JSON de un archivo .bvb"""
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"No es un archivo .bvb: {path}")
+        (length,) = _LENGTH.unpack(f.read(_LENGTH.size))
+        return json.loads(f.read(length))
+
+
+def read_buffer(path) -> Tuple[Dict[str, np.ndarray], Dict[str, Any]]:
+    """
+    Mapear un archivo .bvb en memoria
+
+    Returns:
+        (arrays, meta): los arrays son vistas de solo lectura sobre el archivo
+        mapeado (sin copia); siguen siendo válidos aunque el archivo se borre
+    """
+    header = read_header(path)
+    arrays = {}
+    if os.path.getsize(path) > 0 and header['arrays']:
+        mapped = np.memmap(path, dtype=np.uint8, mode='r')
+        for name, entry in header['arrays'].items():
+            dtype = np.dtype(entry['dtype'])
+            shape = tuple(entry['shape'])
+            count = int(np.prod(shape)) if shape else 1
+            arrays[name] = np.frombuffer(mapped, dtype=dtype, count=count,
+                                         offset=entry['offset']).reshape(shape)
+    return arrays, header.get('meta', {})
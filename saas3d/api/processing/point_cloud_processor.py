@@ -4,10 +4,20 @@ Basado en el código original de nueva_app_converter
 """
 
 import numpy as np
+import tempfile
 from pathlib import Path
-from typing import Tuple, Optional
+from typing import Dict, Tuple, Optional
 import logging
 
+from .color_transfer import transfer_vertex_colors
+from .las_stream import iter_las_chunks, read_las_downsampled
+from .mesh_cleanup import clean_mesh
+from .point_buffer import write_buffer
+from .tiling import (
+    DEFAULT_OVERLAP_RATIO, auto_tile_size, plan_tiles, build_tile_payloads,
+    reconstruct_tile, reconstruct_tiles, stitch_tiles
+)
+
 # Importar Open3D de forma opcional
 try:
     import open3d as o3d
@@ -25,8 +35,13 @@ class PointCloudProcessor:
         self.point_cloud = None
         self.mesh = None
         
-    def load_point_cloud(self, file_path: str) -> bool:
-        """Cargar nube de puntos desde archivo"""
+    def load_point_cloud(self, file_path: str, voxel_size: Optional[float] = None) -> bool:
+        """
+        Cargar nube de puntos desde archivo
+        
+        Si se indica ``voxel_size`` la nube se devuelve ya reducida; en LAS/LAZ
+        el downsampling se aplica bloque a bloque durante la lectura.
+        """
         if not OPEN3D_AVAILABLE:
             logger.error("Open3D no está disponible. Instalar con: pip install open3d")
             return False
@@ -37,17 +52,22 @@ class PointCloudProcessor:
             if file_path.suffix.lower() == '.ply':
                 self.point_cloud = o3d.io.read_point_cloud(str(file_path))
             elif file_path.suffix.lower() in ['.las', '.laz']:
-                # Para archivos LAS/LAZ necesitamos usar laspy
-                import laspy
-                las = laspy.read(str(file_path))
-                points = np.vstack((las.x, las.y, las.z)).transpose()
+                # Para archivos LAS/LAZ necesitamos usar laspy (lectura por bloques)
+                if voxel_size:
+                    points, colors, _ = read_las_downsampled(str(file_path), voxel_size)
+                    voxel_size = None  # Ya aplicado durante la lectura
+                else:
+                    chunks = list(iter_las_chunks(str(file_path)))
+                    points = np.concatenate([chunk_points for chunk_points, _ in chunks])
+                    colors = None
+                    if chunks and chunks[0][1] is not None:
+                        colors = np.concatenate([chunk_colors for _, chunk_colors in chunks])
+                    
                 self.point_cloud = o3d.geometry.PointCloud()
                 self.point_cloud.points = o3d.utility.Vector3dVector(points)
                 
                 # Añadir colores si están disponibles
-                if hasattr(las, 'red') and hasattr(las, 'green') and hasattr(las, 'blue'):
-                    colors = np.vstack((las.red, las.green, las.blue)).transpose()
-                    colors = colors / 65535.0  # Normalizar a [0,1]
+                if colors is not None:
                     self.point_cloud.colors = o3d.utility.Vector3dVector(colors)
             elif file_path.suffix.lower() == '.pcd':
                 self.point_cloud = o3d.io.read_point_cloud(str(file_path))
@@ -62,6 +82,9 @@ class PointCloudProcessor:
                 return False
                 
             logger.info(f"Nube de puntos cargada: {len(self.point_cloud.points)} puntos")
+            
+            if voxel_size:
+                return self.downsample(voxel_size)
             return True
             
         except Exception as e:
@@ -126,6 +149,28 @@ class PointCloudProcessor:
             logger.error(f"Error al estimar normales: {str(e)}")
             return False
     
+    def get_point_arrays(self) -> Dict[str, Optional[np.ndarray]]:
+        """Arrays de la nube actual (para la caché de etapas)"""
+        pcd = self.point_cloud
+        return {
+            'points': np.asarray(pcd.points),
+            'colors': np.asarray(pcd.colors) if pcd.has_colors() else None,
+            'normals': np.asarray(pcd.normals) if pcd.has_normals() else None,
+        }
+    
+    def set_point_arrays(self, arrays: Dict[str, np.ndarray]) -> bool:
+        """Restaurar la nube desde arrays cacheados"""
+        if not OPEN3D_AVAILABLE or arrays.get('points') is None:
+            return False
+        self.point_cloud = o3d.geometry.PointCloud()
+        self.point_cloud.points = o3d.utility.Vector3dVector(arrays['points'])
+        if arrays.get('colors') is not None:
+            self.point_cloud.colors = o3d.utility.Vector3dVector(arrays['colors'])
+        if arrays.get('normals') is not None:
+            self.point_cloud.normals = o3d.utility.Vector3dVector(arrays['normals'])
+        logger.info(f"Nube restaurada desde caché: {len(self.point_cloud.points)} puntos")
+        return True
+    
     def reconstruct_poisson(self, depth: int = 9, width: int = 0, scale: float = 1.1, 
                           linear_fit: bool = False) -> bool:
         """Reconstrucción usando algoritmo Poisson"""
@@ -198,7 +243,98 @@ class PointCloudProcessor:
             logger.error(f"Error en reconstrucción Alpha Shape: {str(e)}")
             return False
     
-    def transfer_colors(self) -> bool:
+    def reconstruct_tiled(self, algorithm: str = 'poisson', tile_size: Optional[float] = None,
+                          overlap: Optional[float] = None, max_workers: Optional[int] = None,
+                          **params) -> bool:
+        """Reconstrucción por teselas en paralelo con cosido de costuras"""
+        try:
+            if self.point_cloud is None:
+                return False
+                
+            points = np.asarray(self.point_cloud.points)
+            normals = np.asarray(self.point_cloud.normals) if self.point_cloud.has_normals() else None
+            colors = np.asarray(self.point_cloud.colors) if self.point_cloud.has_colors() else None
+            
+            tile_size = tile_size or auto_tile_size(points)
+            overlap = overlap if overlap is not None else tile_size * DEFAULT_OVERLAP_RATIO
+            tiles = plan_tiles(points, tile_size, overlap)
+            logger.info(f"Reconstrucción por teselas ({algorithm}): {len(tiles)} teselas de {tile_size:.3f}")
+            
+            # Los procesos del pool mapean la nube desde un .bvb temporal
+            with tempfile.TemporaryDirectory() as tmp_dir:
+                buffer_path = write_buffer(Path(tmp_dir) / 'cloud.bvb', {
+                    'points': points, 'normals': normals, 'colors': colors
+                })
+                payloads = build_tile_payloads(points, normals, colors, tiles, algorithm, params,
+                                               buffer_path=buffer_path)
+                tile_meshes = reconstruct_tiles(payloads, max_workers)
+            vertices, triangles, vertex_colors = stitch_tiles(tile_meshes, tiles, tile_size * 1e-4)
+            
+            if not self.set_mesh_arrays(vertices, triangles, vertex_colors):
+                logger.error("La reconstrucción por teselas falló")
+                return False
+                
+            logger.info(f"Reconstrucción por teselas completada: {len(vertices)} vértices")
+            return True
+            
+        except Exception as e:
+            logger.error(f"Error en reconstrucción por teselas: {str(e)}")
+            return False
+    
+    @staticmethod
+    def reconstruct_tile_mesh(arrays: Dict[str, np.ndarray], algorithm: str,
+                              params: Dict) -> Optional[Tuple[np.ndarray, np.ndarray, Optional[np.ndarray]]]:
+        """Reconstruir una sola tesela (tarea de tesela del worker)"""
+        return reconstruct_tile({
+            'points': arrays['points'],
+            'normals': arrays.get('normals'),
+            'colors': arrays.get('colors'),
+            'algorithm': algorithm,
+            'params': params,
+        })
+    
+    def set_mesh_arrays(self, vertices: np.ndarray, triangles: np.ndarray,
+                        vertex_colors: Optional[np.ndarray] = None) -> bool:
+        """Establecer la malla a partir de arrays (p. ej. teselas cosidas)"""
+        if not OPEN3D_AVAILABLE or len(triangles) == 0:
+            return False
+        self.mesh = o3d.geometry.TriangleMesh()
+        self.mesh.vertices = o3d.utility.Vector3dVector(vertices)
+        self.mesh.triangles = o3d.utility.Vector3iVector(triangles)
+        if vertex_colors is not None:
+            self.mesh.vertex_colors = o3d.utility.Vector3dVector(vertex_colors)
+        return True
+    
+    def clean_mesh(self, min_component_triangles: int = 0) -> bool:
+        """Eliminar triángulos degenerados/duplicados, fragmentos pequeños y vértices sueltos"""
+        try:
+            if self.mesh is None:
+                return False
+                
+            vertex_arrays = {
+                'colors': np.asarray(self.mesh.vertex_colors) if self.mesh.has_vertex_colors() else None,
+                'normals': np.asarray(self.mesh.vertex_normals) if self.mesh.has_vertex_normals() else None,
+            }
+            vertices, triangles, vertex_arrays, _ = clean_mesh(
+                np.asarray(self.mesh.vertices), np.asarray(self.mesh.triangles),
+                vertex_arrays, min_component_triangles
+            )
+            
+            mesh = o3d.geometry.TriangleMesh()
+            mesh.vertices = o3d.utility.Vector3dVector(vertices)
+            mesh.triangles = o3d.utility.Vector3iVector(triangles)
+            if vertex_arrays['colors'] is not None:
+                mesh.vertex_colors = o3d.utility.Vector3dVector(vertex_arrays['colors'])
+            if vertex_arrays['normals'] is not None:
+                mesh.vertex_normals = o3d.utility.Vector3dVector(vertex_arrays['normals'])
+            self.mesh = mesh
+            return True
+            
+        except Exception as e:
+            logger.error(f"Error en limpieza de malla: {str(e)}")
+            return False
+    
+    def transfer_colors(self, method: str = 'nearest', k_neighbors: int = 10) -> bool:
         """Transferir colores de la nube de puntos a la malla"""
         try:
             if self.point_cloud is None or self.mesh is None:
@@ -208,20 +344,17 @@ class PointCloudProcessor:
                 logger.warning("La nube de puntos no tiene colores")
                 return False
                 
-            # Crear KDTree para búsqueda rápida
-            pcd_tree = o3d.geometry.KDTreeFlann(self.point_cloud)
-            
-            # Obtener vértices de la malla
-            mesh_vertices = np.asarray(self.mesh.vertices)
-            mesh_colors = np.zeros((len(mesh_vertices), 3))
-            
-            # Para cada vértice de la malla, encontrar el punto más cercano
-            for i, vertex in enumerate(mesh_vertices):
-                [_, idx, _] = pcd_tree.search_knn_vector_3d(vertex, 1)
-                mesh_colors[i] = self.point_cloud.colors[idx[0]]
+            # Consulta k-NN en bloque sobre todos los vértices
+            mesh_colors = transfer_vertex_colors(
+                np.asarray(self.mesh.vertices),
+                np.asarray(self.point_cloud.points),
+                np.asarray(self.point_cloud.colors),
+                method=method,
+                k_neighbors=k_neighbors
+            )
             
             self.mesh.vertex_colors = o3d.utility.Vector3dVector(mesh_colors)
-            logger.info("Colores transferidos a la malla")
+            logger.info(f"Colores transferidos a la malla ({method})")
             return True
             
         except Exception as e:
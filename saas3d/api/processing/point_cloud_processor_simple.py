@@ -8,6 +8,11 @@ from pathlib import Path
 from typing import Tuple, Optional, Dict, Any
 import logging
 
+from .voxel_grid import voxel_downsample
+from .las_stream import iter_las_chunks, read_las_downsampled
+from .neighbors import build_kdtree, statistical_outlier_mask, estimate_normals_pca
+from .tiling import DEFAULT_OVERLAP_RATIO, auto_tile_size, plan_tiles
+
 logger = logging.getLogger(__name__)
 
 class PointCloudProcessor:
@@ -18,9 +23,17 @@ class PointCloudProcessor:
         self.mesh = None
         self.points = None
         self.colors = None
+        self.normals = None
+        self._kdtree = None
+        self._kdtree_points = None
+        
+    def load_point_cloud(self, file_path: str, voxel_size: Optional[float] = None) -> bool:
+        """
+        Cargar nube de puntos desde archivo
         
-    def load_point_cloud(self, file_path: str) -> bool:
-        """Cargar nube de puntos desde archivo"""
+        Si se indica ``voxel_size`` la nube se devuelve ya reducida; en LAS/LAZ
+        el downsampling se aplica bloque a bloque durante la lectura.
+        """
         try:
             file_path = Path(file_path)
             
@@ -29,24 +42,26 @@ class PointCloudProcessor:
                 self.points = np.random.rand(1000, 3)  # Puntos simulados
                 self.colors = np.random.rand(1000, 3)  # Colores simulados
                 logger.info(f"Nube de puntos simulada cargada: {len(self.points)} puntos")
-                return True
                 
             elif file_path.suffix.lower() in ['.las', '.laz']:
                 # Para archivos LAS/LAZ usar laspy
                 try:
-                    import laspy
-                    las = laspy.read(str(file_path))
-                    self.points = np.vstack((las.x, las.y, las.z)).transpose()
+                    if voxel_size:
+                        self.points, self.colors, _ = read_las_downsampled(str(file_path), voxel_size)
+                        if self.colors is None:
+                            self.colors = np.random.rand(len(self.points), 3)
+                        return True
+                    
+                    chunks = list(iter_las_chunks(str(file_path)))
+                    self.points = np.concatenate([points for points, _ in chunks])
                     
                     # Añadir colores si están disponibles
-                    if hasattr(las, 'red') and hasattr(las, 'green') and hasattr(las, 'blue'):
-                        self.colors = np.vstack((las.red, las.green, las.blue)).transpose()
-                        self.colors = self.colors / 65535.0  # Normalizar a [0,1]
+                    if chunks and chunks[0][1] is not None:
+                        self.colors = np.concatenate([colors for _, colors in chunks])
                     else:
                         self.colors = np.random.rand(len(self.points), 3)
                         
                     logger.info(f"Nube de puntos LAS cargada: {len(self.points)} puntos")
-                    return True
                 except ImportError:
                     logger.error("laspy no está instalado")
                     return False
@@ -54,48 +69,57 @@ class PointCloudProcessor:
             else:
                 logger.error(f"Formato de archivo no soportado: {file_path.suffix}")
                 return False
+            
+            if voxel_size:
+                return self.downsample(voxel_size)
+            return True
                 
         except Exception as e:
             logger.error(f"Error al cargar nube de puntos: {str(e)}")
             return False
     
     def downsample(self, voxel_size: float = 0.01) -> bool:
-        """Reducir densidad de puntos (simulado)"""
+        """Reducir densidad de puntos con una rejilla de vóxeles"""
         try:
             if self.points is None:
                 return False
                 
+            if voxel_size <= 0:
+                return True
+                
             original_count = len(self.points)
-            # Simulación de downsampling
-            step = max(1, int(1 / voxel_size))
-            self.points = self.points[::step]
-            if self.colors is not None:
-                self.colors = self.colors[::step]
+            self.points, self.colors = voxel_downsample(self.points, self.colors, voxel_size)
             
-            logger.info(f"Downsampling simulado: {original_count} -> {len(self.points)} puntos")
+            logger.info(f"Downsampling: {original_count} -> {len(self.points)} puntos")
             return True
             
         except Exception as e:
             logger.error(f"Error en downsampling: {str(e)}")
             return False
     
+    def _get_kdtree(self):
+        """KDTree de los puntos actuales (se reutiliza mientras no cambien)"""
+        if self._kdtree is None or self._kdtree_points is not self.points:
+            self._kdtree = build_kdtree(self.points)
+            self._kdtree_points = self.points
+        return self._kdtree
+    
     def remove_outliers(self, nb_neighbors: int = 20, std_ratio: float = 2.0) -> bool:
-        """Eliminar puntos atípicos (simulado)"""
+        """Eliminar puntos atípicos con el filtro estadístico k-NN"""
         try:
             if self.points is None:
                 return False
                 
             original_count = len(self.points)
-            # Simulación de eliminación de outliers
-            keep_ratio = 0.9  # Mantener 90% de los puntos
-            keep_count = int(original_count * keep_ratio)
-            indices = np.random.choice(original_count, keep_count, replace=False)
+            mask = statistical_outlier_mask(self._get_kdtree(), self.points, nb_neighbors, std_ratio)
             
-            self.points = self.points[indices]
+            self.points = self.points[mask]
             if self.colors is not None:
-                self.colors = self.colors[indices]
+                self.colors = self.colors[mask]
+            if self.normals is not None:
+                self.normals = self.normals[mask]
             
-            logger.info(f"Outlier removal simulado: {original_count} -> {len(self.points)} puntos")
+            logger.info(f"Outlier removal: {original_count} -> {len(self.points)} puntos")
             return True
             
         except Exception as e:
@@ -103,24 +127,34 @@ class PointCloudProcessor:
             return False
     
     def estimate_normals(self, radius: float = 0.1, max_nn: int = 30) -> bool:
-        """Estimar normales de la superficie (simulado)"""
+        """Estimar normales de la superficie por PCA de la vecindad"""
         try:
             if self.points is None:
                 return False
                 
-            # Simulación de normales
-            self.normals = np.random.rand(len(self.points), 3)
-            # Normalizar
-            norms = np.linalg.norm(self.normals, axis=1)
-            self.normals = self.normals / norms[:, np.newaxis]
+            self.normals = estimate_normals_pca(self._get_kdtree(), self.points, radius, max_nn)
             
-            logger.info("Normales estimadas (simulado)")
+            logger.info("Normales estimadas correctamente")
             return True
             
         except Exception as e:
             logger.error(f"Error al estimar normales: {str(e)}")
             return False
     
+    def get_point_arrays(self) -> Dict[str, Optional[np.ndarray]]:
+        """Arrays de la nube actual (para la caché de etapas)"""
+        return {'points': self.points, 'colors': self.colors, 'normals': self.normals}
+    
+    def set_point_arrays(self, arrays: Dict[str, np.ndarray]) -> bool:
+        """Restaurar la nube desde arrays cacheados"""
+        if arrays.get('points') is None:
+            return False
+        self.points = arrays['points']
+        self.colors = arrays.get('colors')
+        self.normals = arrays.get('normals')
+        logger.info(f"Nube restaurada desde caché: {len(self.points)} puntos")
+        return True
+    
     def reconstruct_poisson(self, depth: int = 9, width: int = 0, scale: float = 1.1, 
                           linear_fit: bool = False) -> bool:
         """Reconstrucción usando algoritmo Poisson (simulado)"""
@@ -139,7 +173,7 @@ class PointCloudProcessor:
                 'vertices': n_vertices,
                 'triangles': n_triangles,
                 'has_colors': self.colors is not None,
-                'has_normals': hasattr(self, 'normals')
+                'has_normals': self.normals is not None
             }
             
             logger.info(f"Reconstrucción Poisson simulada completada: {n_vertices} vértices")
@@ -166,7 +200,7 @@ class PointCloudProcessor:
                 'vertices': n_vertices,
                 'triangles': int(n_triangles),
                 'has_colors': self.colors is not None,
-                'has_normals': hasattr(self, 'normals')
+                'has_normals': self.normals is not None
             }
             
             logger.info(f"Reconstrucción Ball Pivoting simulada completada: {n_vertices} vértices")
@@ -193,7 +227,7 @@ class PointCloudProcessor:
                 'vertices': n_vertices,
                 'triangles': int(n_triangles),
                 'has_colors': self.colors is not None,
-                'has_normals': hasattr(self, 'normals')
+                'has_normals': self.normals is not None
             }
             
             logger.info(f"Reconstrucción Alpha Shape simulada completada: {n_vertices} vértices")
@@ -203,7 +237,70 @@ class PointCloudProcessor:
             logger.error(f"Error en reconstrucción Alpha Shape: {str(e)}")
             return False
     
-    def transfer_colors(self) -> bool:
+    def reconstruct_tiled(self, algorithm: str = 'poisson', tile_size: Optional[float] = None,
+                          overlap: Optional[float] = None, max_workers: Optional[int] = None,
+                          **params) -> bool:
+        """Reconstrucción por teselas (reparto real, malla simulada)"""
+        try:
+            if self.points is None:
+                return False
+                
+            tile_size = tile_size or auto_tile_size(self.points)
+            overlap = overlap if overlap is not None else tile_size * DEFAULT_OVERLAP_RATIO
+            tiles = plan_tiles(self.points, tile_size, overlap)
+            logger.info(f"Reconstrucción por teselas (simulada): {len(tiles)} teselas de {tile_size:.3f}")
+            
+            n_vertices = sum(min(len(tile['indices']) // 2, 500) for tile in tiles)
+            self.mesh_info = {
+                'vertices': n_vertices,
+                'triangles': n_vertices * 2,
+                'tiles': len(tiles),
+                'has_colors': self.colors is not None,
+                'has_normals': self.normals is not None
+            }
+            
+            logger.info(f"Reconstrucción por teselas simulada completada: {n_vertices} vértices")
+            return True
+            
+        except Exception as e:
+            logger.error(f"Error en reconstrucción por teselas: {str(e)}")
+            return False
+    
+    @staticmethod
+    def reconstruct_tile_mesh(arrays: Dict[str, np.ndarray], algorithm: str,
+                              params: Dict[str, Any]) -> Optional[Tuple[np.ndarray, np.ndarray, Optional[np.ndarray]]]:
+        """Reconstruir una sola tesela (simulado: tira de triángulos sobre sus puntos)"""
+        points = arrays['points']
+        n_vertices = min(len(points) // 2, 500)
+        if n_vertices < 3:
+            return None
+        idx = np.arange(n_vertices)
+        triangles = np.column_stack([idx[:-2], idx[1:-1], idx[2:]])
+        colors = arrays.get('colors')
+        return (np.array(points[:n_vertices]), triangles,
+                np.array(colors[:n_vertices]) if colors is not None else None)
+    
+    def set_mesh_arrays(self, vertices: np.ndarray, triangles: np.ndarray,
+                        vertex_colors: Optional[np.ndarray] = None) -> bool:
+        """Establecer la malla a partir de arrays (p. ej. teselas cosidas)"""
+        if len(triangles) == 0:
+            return False
+        self.mesh_info = {
+            'vertices': len(vertices),
+            'triangles': len(triangles),
+            'has_colors': vertex_colors is not None,
+            'has_normals': self.normals is not None
+        }
+        return True
+    
+    def clean_mesh(self, min_component_triangles: int = 0) -> bool:
+        """Limpieza de la malla (simulada: no hay malla real que limpiar)"""
+        if not hasattr(self, 'mesh_info'):
+            return False
+        logger.info("Limpieza de malla (simulada)")
+        return True
+    
+    def transfer_colors(self, method: str = 'nearest', k_neighbors: int = 10) -> bool:
         """Transferir colores de la nube de puntos a la malla (simulado)"""
         try:
             if self.points is None:
@@ -0,0 +1,278 @@
+"""
+Reconstrucción por teselas para nubes de puntos muy grandes
+
+La nube preprocesada se divide en una rejilla de teselas con solape, cada
+tesela se reconstruye en un proceso independiente y las mallas resultantes
+se cosen: se recortan los triángulos cuyo centroide cae fuera del núcleo de
+su tesela y se sueldan los vértices cercanos en las costuras. La memoria
+por proceso queda acotada por el tamaño de la tesela.
+"""
+
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components
+from scipy.spatial import cKDTree
+from itertools import product
+from typing import Any, Dict, List, Optional, Tuple
+import logging
+import os
+
+from .mesh_cleanup import degenerate_mask
+from .point_buffer import read_buffer
+from .voxel_grid import group_voxel_keys
+
+logger = logging.getLogger(__name__)
+
+# Puntos objetivo por tesela cuando no se indica tile_size
+DEFAULT_POINTS_PER_TILE = 500_000
+# Solape por defecto, como fracción del tamaño de tesela
+DEFAULT_OVERLAP_RATIO = 0.05
+# Teselas con menos puntos no se reconstruyen
+MIN_TILE_POINTS = 10
+
+TILE_WORKERS = int(os.getenv("TILE_WORKERS", "0")) or os.cpu_count() or 1
+
+
+def auto_tile_size(points: np.ndarray, points_per_tile: int = DEFAULT_POINTS_PER_TILE) -> float:
+    """Tamaño de tesela para obtener ~points_per_tile puntos por tesela"""
+    extent = points.max(axis=0) - points.min(axis=0)
+    extent = extent[extent > 0]
+    if len(extent) == 0 or len(points) <= points_per_tile:
+        return float(max(extent.max() if len(extent) else 1.0, 1e-9)) * 1.01
+    n_tiles = len(points) / points_per_tile
+    return float((np.prod(extent) / n_tiles) ** (1.0 / len(extent)))
+
+
+def plan_tiles(points: np.ndarray, tile_size: float, overlap: float) -> List[Dict[str, Any]]:
+    """
+    Repartir los puntos en teselas cúbicas con solape
+
+    Args:
+        points: Puntos (N, 3)
+        tile_size: Lado de la tesela
+        overlap: Margen añadido a cada lado del núcleo (< tile_size / 2)
+
+    Returns:
+        Lista de teselas con 'key', 'core_min', 'core_max' e 'indices'
+    """
+    if overlap >= tile_size / 2:
+        raise ValueError("El solape debe ser menor que la mitad del tamaño de tesela")
+
+    origin = points.min(axis=0)
+    rel = (points - origin) / tile_size
+    keys = np.floor(rel).astype(np.int64)
+    frac = (rel - keys) * tile_size
+
+    # Cada punto pertenece a su tesela y, si está a menos de 'overlap' de un
+    # borde, también a la vecina de ese lado (hasta 27 combinaciones)
+    near_low = frac < overlap
+    near_high = frac >= tile_size - overlap
+    conditions = {-1: near_low, 0: np.ones_like(near_low), 1: near_high}
+
+    point_ids, tile_keys = [], []
+    for offset in product((-1, 0, 1), repeat=3):
+        mask = conditions[offset[0]][:, 0] & conditions[offset[1]][:, 1] & conditions[offset[2]][:, 2]
+        ids = np.flatnonzero(mask)
+        if len(ids):
+            point_ids.append(ids)
+            tile_keys.append(keys[ids] + np.array(offset))
+    point_ids = np.concatenate(point_ids)
+    tile_keys = np.concatenate(tile_keys)
+
+    first, inverse = group_voxel_keys(tile_keys)
+    order = np.argsort(inverse, kind='stable')
+    bounds = np.cumsum(np.bincount(inverse, minlength=len(first)))[:-1]
+    core_keys = {tuple(k) for k in np.unique(keys, axis=0)}
+
+    tiles = []
+    for group, indices in enumerate(np.split(point_ids[order], bounds)):
+        key = tuple(int(v) for v in tile_keys[first[group]])
+        # Las teselas sin puntos propios no aportan triángulos tras el recorte
+        if key not in core_keys or len(indices) < MIN_TILE_POINTS:
+            continue
+        core_min = origin + np.array(key) * tile_size
+        tiles.append({
+            'key': key,
+            'core_min': core_min,
+            'core_max': core_min + tile_size,
+            'indices': indices,
+        })
+    return tiles
+
+
+def load_tile_arrays(payload: Dict[str, Any]
+                     ) -> Tuple[np.ndarray, Optional[np.ndarray], Optional[np.ndarray]]:
+    """
+    Arrays (points, normals, colors) de una tesela
+
+    Si el payload referencia un archivo .bvb, la nube se mapea en memoria y
+    solo se copian las filas de la tesela.
+    """
+    if 'buffer' not in payload:
+        return payload['points'], payload.get('normals'), payload.get('colors')
+
+    arrays, _ = read_buffer(payload['buffer'])
+    indices = payload['indices']
+    normals = arrays.get('normals')
+    colors = arrays.get('colors')
+    return (arrays['points'][indices],
+            normals[indices] if normals is not None else None,
+            colors[indices] if colors is not None else None)
+
+
+def reconstruct_tile(payload: Dict[str, Any]) -> Optional[Tuple[np.ndarray, np.ndarray, Optional[np.ndarray]]]:
+    """
+    Reconstruir una tesela con Open3D (se ejecuta en un proceso del pool)
+
+    Returns:
+        (vertices, triangles, vertex_colors) o None si la tesela no genera malla
+    """
+    import open3d as o3d
+
+    points, normals, colors = load_tile_arrays(payload)
+    pcd = o3d.geometry.PointCloud()
+    pcd.points = o3d.utility.Vector3dVector(points)
+    if normals is not None:
+        pcd.normals = o3d.utility.Vector3dVector(normals)
+    if colors is not None:
+        pcd.colors = o3d.utility.Vector3dVector(colors)
+
+    algorithm = payload['algorithm']
+    params = payload.get('params', {})
+
+    if algorithm == 'poisson':
+        mesh, densities = o3d.geometry.TriangleMesh.create_from_point_cloud_poisson(
+            pcd,
+            depth=params.get('poisson_depth', 9),
+            width=params.get('poisson_width', 0),
+            scale=params.get('poisson_scale', 1.1),
+            linear_fit=params.get('poisson_linear_fit', False)
+        )
+        # Poisson extrapola superficie en zonas vacías de la tesela
+        densities = np.asarray(densities)
+        if len(densities):
+            mesh.remove_vertices_by_mask(densities < np.quantile(densities, 0.01))
+    elif algorithm == 'ball_pivoting':
+        radii = params.get('ball_pivoting_radii')
+        if radii is None:
+            avg_dist = float(np.mean(pcd.compute_nearest_neighbor_distance()))
+            radii = [avg_dist, avg_dist * 2]
+        mesh = o3d.geometry.TriangleMesh.create_from_point_cloud_ball_pivoting(
+            pcd, o3d.utility.DoubleVector(radii)
+        )
+    elif algorithm == 'alpha_shape':
+        mesh = o3d.geometry.TriangleMesh.create_from_point_cloud_alpha_shape(
+            pcd, params.get('alpha_shape_alpha', 0.1)
+        )
+    else:
+        raise ValueError(f"Algoritmo no soportado: {algorithm}")
+
+    if len(mesh.triangles) == 0:
+        return None
+    colors = np.asarray(mesh.vertex_colors) if mesh.has_vertex_colors() else None
+    return np.asarray(mesh.vertices), np.asarray(mesh.triangles), colors
+
+
+def reconstruct_tiles(payloads: List[Dict[str, Any]], max_workers: Optional[int] = None) -> list:
+    """Reconstruir las teselas en un pool de procesos"""
+    max_workers = max(1, min(max_workers or TILE_WORKERS, len(payloads)))
+    if max_workers == 1:
+        return [reconstruct_tile(payload) for payload in payloads]
+
+    try:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            return list(executor.map(reconstruct_tile, payloads))
+    except AssertionError as e:
+        # Los procesos daemon (p. ej. hijos prefork de Celery) no pueden crear hijos
+        logger.warning(f"Pool de procesos no disponible ({str(e)}), reconstrucción secuencial")
+        return [reconstruct_tile(payload) for payload in payloads]
+
+
+def stitch_tiles(tile_meshes: list, tiles: List[Dict[str, Any]], weld_tolerance: float
+                 ) -> Tuple[np.ndarray, np.ndarray, Optional[np.ndarray]]:
+    """
+    Coser las mallas de las teselas
+
+    Se conservan solo los triángulos cuyo centroide cae en el núcleo
+    [core_min, core_max) de su tesela y se sueldan los vértices a menos de
+    ``weld_tolerance`` entre sí (también por transitividad): las teselas se
+    mallan por separado y sus vértices de costura no coinciden exactamente.
+
+    Returns:
+        (vertices, triangles, vertex_colors)
+    """
+    all_vertices, all_triangles, all_colors = [], [], []
+    with_colors = all(m is None or m[2] is not None for m in tile_meshes)
+    offset = 0
+
+    for mesh, tile in zip(tile_meshes, tiles):
+        if mesh is None:
+            continue
+        vertices, triangles, colors = mesh
+        centroids = vertices[triangles].mean(axis=1)
+        inside = np.all((centroids >= tile['core_min']) & (centroids < tile['core_max']), axis=1)
+        triangles = triangles[inside]
+        if len(triangles) == 0:
+            continue
+
+        # Compactar vértices referenciados
+        used, remapped = np.unique(triangles, return_inverse=True)
+        all_vertices.append(vertices[used])
+        all_triangles.append(remapped.reshape(-1, 3) + offset)
+        if with_colors:
+            all_colors.append(colors[used])
+        offset += len(used)
+
+    if not all_triangles:
+        return np.empty((0, 3)), np.empty((0, 3), dtype=np.int64), None
+
+    vertices = np.concatenate(all_vertices)
+    triangles = np.concatenate(all_triangles)
+    colors = np.concatenate(all_colors) if with_colors else None
+
+    # Soldar vértices de las costuras: componentes conexas del grafo de pares
+    # cercanos; cada grupo se sustituye por su primer vértice
+    n = len(vertices)
+    pairs = cKDTree(vertices).query_pairs(weld_tolerance, output_type='ndarray')
+    graph = coo_matrix((np.ones(len(pairs), dtype=bool), (pairs[:, 0], pairs[:, 1])), shape=(n, n))
+    _, labels = connected_components(graph, directed=False)
+    _, first, inverse = np.unique(labels, return_index=True, return_inverse=True)
+    triangles = inverse[triangles]
+    vertices = vertices[first]
+    if colors is not None:
+        colors = colors[first]
+
+    # Triángulos degenerados tras la soldadura
+    return vertices, triangles[~degenerate_mask(triangles)], colors
+
+
+def build_tile_payloads(points: np.ndarray, normals: Optional[np.ndarray], colors: Optional[np.ndarray],
+                        tiles: List[Dict[str, Any]], algorithm: str, params: Dict[str, Any],
+                        buffer_path=None) -> list:
+    """
+    Preparar los datos de cada tesela para el pool
+
+    Con ``buffer_path`` (la nube completa escrita en .bvb) cada payload lleva
+    solo los índices de la tesela: los procesos del pool mapean el archivo en
+    lugar de recibir los arrays serializados.
+    """
+    payloads = []
+    for tile in tiles:
+        indices = tile['indices']
+        if buffer_path is not None:
+            payloads.append({
+                'buffer': str(buffer_path),
+                'indices': indices,
+                'algorithm': algorithm,
+                'params': params,
+            })
+            continue
+        payloads.append({
+            'points': points[indices],
+            'normals': normals[indices] if normals is not None else None,
+            'colors': colors[indices] if colors is not None else None,
+            'algorithm': algorithm,
+            'params': params,
+        })
+    return payloads
@@ -0,0 +1,147 @@
+"""
+Downsampling por rejilla de vóxeles en NumPy puro (sin Open3D)
+
+Cada punto se cuantiza a la clave entera de su vóxel y los puntos/colores se
+promedian por vóxel con unique + bincount. La entrada se procesa por bloques y
+los agregados parciales (suma, número de puntos) se fusionan, de modo que la
+memoria depende del tamaño del bloque y del número de vóxeles de salida, no
+del número de puntos de entrada.
+"""
+
+import numpy as np
+from typing import Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Puntos por bloque al cuantizar
+DEFAULT_CHUNK_SIZE = 2_000_000
+# Filas de agregados parciales acumuladas antes de fusionarlas
+DEFAULT_MERGE_THRESHOLD = 8_000_000
+
+
+def group_voxel_keys(keys: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Agrupar claves de vóxel (N, 3)
+
+    Returns:
+        (first, inverse): índice de la primera fila de cada grupo y grupo de cada fila
+    """
+    mins = keys.min(axis=0)
+    spans = keys.max(axis=0) - mins + 1
+
+    # Empaquetar (i, j, k) en un único int64 cuando el rango lo permite
+    if int(spans[0]) * int(spans[1]) * int(spans[2]) < 2 ** 63:
+        rel = keys - mins
+        packed = (rel[:, 0] * spans[1] + rel[:, 1]) * spans[2] + rel[:, 2]
+        _, first, inverse = np.unique(packed, return_index=True, return_inverse=True)
+    else:
+        _, first, inverse = np.unique(keys, axis=0, return_index=True, return_inverse=True)
+
+    return first, inverse.reshape(-1)
+
+
+def _reduce(keys: np.ndarray, counts: np.ndarray, sums: np.ndarray,
+            color_sums: Optional[np.ndarray]):
+    """Fusionar filas con la misma clave sumando agregados"""
+    first, inverse = group_voxel_keys(keys)
+    n = len(first)
+
+    new_counts = np.bincount(inverse, weights=counts, minlength=n)
+    new_sums = np.empty((n, 3), dtype=np.float64)
+    for axis in range(3):
+        new_sums[:, axis] = np.bincount(inverse, weights=sums[:, axis], minlength=n)
+
+    new_color_sums = None
+    if color_sums is not None:
+        new_color_sums = np.empty((n, 3), dtype=np.float64)
+        for axis in range(3):
+            new_color_sums[:, axis] = np.bincount(inverse, weights=color_sums[:, axis], minlength=n)
+
+    return keys[first], new_counts, new_sums, new_color_sums
+
+
+class VoxelGridAccumulator:
+    """Acumulador incremental de una rejilla de vóxeles"""
+
+    def __init__(self, voxel_size: float, merge_threshold: int = DEFAULT_MERGE_THRESHOLD):
+        if voxel_size <= 0:
+            raise ValueError("voxel_size debe ser mayor que 0")
+        self.voxel_size = float(voxel_size)
+        self.merge_threshold = merge_threshold
+        self.input_count = 0
+        self._has_colors = None
+        self._pending = []
+        self._pending_rows = 0
+        # Filas de la rejilla ya fusionada (incluidas en _pending_rows)
+        self._merged_rows = 0
+
+    def add(self, points: np.ndarray, colors: Optional[np.ndarray] = None):
+        """Añadir un bloque de puntos (y colores opcionales)"""
+        if len(points) == 0:
+            return
+        if self._has_colors is None:
+            self._has_colors = colors is not None
+        elif self._has_colors != (colors is not None):
+            raise ValueError("Todos los bloques deben tener (o no tener) colores")
+
+        points = np.asarray(points, dtype=np.float64)
+        keys = np.floor(points / self.voxel_size).astype(np.int64)
+        color_sums = np.asarray(colors, dtype=np.float64) if colors is not None else None
+
+        partial = _reduce(keys, np.ones(len(points)), points, color_sums)
+        self.input_count += len(points)
+        self._pending.append(partial)
+        self._pending_rows += len(partial[0])
+
+        # Umbral relativo: con una rejilla fusionada mayor que el umbral, fusionar
+        # en cada bloque la reordenaría entera cada vez (coste cuadrático)
+        if self._pending_rows > max(self.merge_threshold, 2 * self._merged_rows):
+            self._merge()
+
+    def _merge(self):
+        """Fusionar los agregados parciales pendientes"""
+        if len(self._pending) <= 1:
+            return
+        keys = np.concatenate([p[0] for p in self._pending])
+        counts = np.concatenate([p[1] for p in self._pending])
+        sums = np.concatenate([p[2] for p in self._pending])
+        color_sums = None
+        if self._has_colors:
+            color_sums = np.concatenate([p[3] for p in self._pending])
+        self._pending = [_reduce(keys, counts, sums, color_sums)]
+        self._pending_rows = len(self._pending[0][0])
+        self._merged_rows = self._pending_rows
+
+    def result(self) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+        """Obtener puntos (y colores) promediados por vóxel"""
+        self._merge()
+        if not self._pending:
+            empty_colors = np.empty((0, 3)) if self._has_colors else None
+            return np.empty((0, 3)), empty_colors
+
+        _, counts, sums, color_sums = self._pending[0]
+        points = sums / counts[:, np.newaxis]
+        colors = color_sums / counts[:, np.newaxis] if color_sums is not None else None
+        return points, colors
+
+
+def voxel_downsample(points: np.ndarray, colors: Optional[np.ndarray], voxel_size: float,
+                     chunk_size: int = DEFAULT_CHUNK_SIZE) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """
+    Downsampling por vóxeles promediando puntos y colores
+
+    Args:
+        points: Puntos (N, 3)
+        colors: Colores (N, 3) u None
+        voxel_size: Tamaño del vóxel
+        chunk_size: Puntos por bloque
+
+    Returns:
+        (points, colors) con un punto por vóxel ocupado
+    """
+    accumulator = VoxelGridAccumulator(voxel_size)
+    for start in range(0, len(points), chunk_size):
+        stop = start + chunk_size
+        accumulator.add(points[start:stop], colors[start:stop] if colors is not None else None)
+    return accumulator.result()
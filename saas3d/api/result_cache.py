@@ -0,0 +1,145 @@
+"""
+Caché de resultados direccionada por contenido
+
+La clave es el hash del archivo de entrada más una forma canónica de los
+parámetros de la tarea. Las mallas cacheadas viven en ``OUTPUT_DIR/cache`` y
+se expulsan por LRU (mtime) cuando el directorio supera el tamaño máximo.
+
+Las entradas son copias, no enlaces duros a las salidas de los jobs: así
+marcar un acierto (mtime) no cambia el ETag de las salidas ya publicadas y
+expulsar una entrada libera de verdad su espacio.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import uuid
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from storage import OUTPUT_DIR
+from storage.base import Storage
+from storage.filesystem import copy_file, link_or_copy
+
+logger = logging.getLogger(__name__)
+
+RESULT_CACHE_DIR = Path(os.getenv("RESULT_CACHE_DIR", str(OUTPUT_DIR / "cache")))
+RESULT_CACHE_MAX_BYTES = int(os.getenv("RESULT_CACHE_MAX_MB", "10240")) * 1024 * 1024
+
+HASH_CHUNK_SIZE = 8 * 1024 * 1024
+
+
+def file_sha256(path) -> str:
+    """SHA-256 de un archivo leído por bloques"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def canonical_params(params: Dict[str, Any]) -> str:
+    """Forma canónica de los parámetros (claves ordenadas, sin espacios)"""
+    return json.dumps(params, sort_keys=True, separators=(",", ":"), default=str)
+
+
+def evict_lru(directory: Path, max_bytes: int, keep: Optional[Path] = None) -> List[Path]:
+    """
+    Borrar los archivos de ``directory`` por mtime ascendente hasta ocupar ``max_bytes``
+
+    Returns:
+        Archivos expulsados
+    """
+    evicted = []
+    if not directory.exists():
+        return evicted
+    entries = []
+    for path in directory.iterdir():
+        if path.is_file() and not path.name.startswith("."):
+            stat = path.stat()
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries, key=lambda entry: entry[0]):
+        if total <= max_bytes:
+            break
+        if keep is not None and path == keep:
+            continue
+        try:
+            path.unlink()
+            total -= size
+            evicted.append(path)
+            logger.info(f"Caché: expulsado {path.name}")
+        except FileNotFoundError:
+            pass
+    return evicted
+
+
+class ResultCache:
+    """Caché LRU de mallas resultado con contadores de aciertos/fallos"""
+
+    def __init__(self, cache_dir: Path = RESULT_CACHE_DIR, max_bytes: int = RESULT_CACHE_MAX_BYTES):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(input_hash: str, params: Dict[str, Any]) -> str:
+        """Clave de caché a partir del hash de entrada y los parámetros"""
+        payload = f"{input_hash}:{canonical_params(params)}"
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def _entry_path(self, key: str, output_format: str) -> Path:
+        return self.cache_dir / f"{key}.{output_format}"
+
+    def lookup(self, key: str, output_format: str) -> Optional[Path]:
+        """Buscar un resultado; actualiza su posición LRU si existe"""
+        path = self._entry_path(key, output_format)
+        with self._lock:
+            if path.exists():
+                self.hits += 1
+                os.utime(path)
+                return path
+            self.misses += 1
+            return None
+
+    def store(self, key: str, output_path: Path, output_format: str) -> Path:
+        """Guardar un resultado en la caché y aplicar la expulsión LRU"""
+        entry = self._entry_path(key, output_format)
+        copy_file(Path(output_path), entry)
+        self.evict(keep=entry)
+        return entry
+
+    def export(self, entry: Path, storage: Storage, key: str):
+        """Publicar una copia de la entrada como salida de un job"""
+        tmp = self.cache_dir / f".export.{uuid.uuid4().hex}{entry.suffix}"
+        copy_file(entry, tmp)
+        try:
+            storage.put_file(key, tmp, move=True)
+        finally:
+            tmp.unlink(missing_ok=True)
+
+    def evict(self, keep: Optional[Path] = None):
+        """Expulsar las entradas menos usadas hasta respetar el tamaño máximo"""
+        evict_lru(self.cache_dir, self.max_bytes, keep)
+
+    def stats(self) -> Dict[str, Any]:
+        """Contadores y ocupación de la caché"""
+        entries = [p for p in self.cache_dir.glob("*") if p.is_file() and not p.name.startswith(".")] \
+            if self.cache_dir.exists() else []
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "entries": len(entries),
+            "bytes": sum(p.stat().st_size for p in entries),
+            "max_bytes": self.max_bytes,
+        }
+
+
+result_cache = ResultCache()
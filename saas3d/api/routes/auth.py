@@ -1,9 +1,9 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import timedelta
 from typing import Optional
 
-from database import get_db
+from database import get_async_db
 from models import User
 from schemas import UserCreate, UserLogin, UserResponse, Token, TokenData
 from auth import (
@@ -15,23 +15,36 @@ from auth import (
     get_current_user,
     ACCESS_TOKEN_EXPIRE_MINUTES
 )
+from password_pool import PASSWORD_HASH_RETRY_AFTER, HashingPoolSaturated, hashing_pool
 
 router = APIRouter()
 
-def authenticate_user(db: Session, email: str, password: str) -> Optional[User]:
+async def run_password_hash(func, *args):
+    """Ejecutar una operación de hash en su pool dedicado (503 si está saturado)"""
+    try:
+        return await hashing_pool.run(func, *args)
+    except HashingPoolSaturated:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Authentication service busy, retry shortly",
+            headers={"Retry-After": str(PASSWORD_HASH_RETRY_AFTER)},
+        )
+
+async def authenticate_user(db: AsyncSession, email: str, password: str) -> Optional[User]:
     """Autenticar usuario"""
-    user = get_user_by_email(db, email)
+    user = await get_user_by_email(db, email)
     if not user:
         return None
-    if not verify_password(password, user.hashed_password):
+    # El hash de contraseña es deliberadamente costoso: en su propio pool acotado
+    if not await run_password_hash(verify_password, password, user.hashed_password):
         return None
     return user
 
 @router.post("/register", response_model=UserResponse)
-def register(user: UserCreate, db: Session = Depends(get_db)):
+async def register(user: UserCreate, db: AsyncSession = Depends(get_async_db)):
     """Registrar nuevo usuario"""
     # Verificar si el usuario ya existe
-    db_user = get_user_by_email(db, user.email)
+    db_user = await get_user_by_email(db, user.email)
     if db_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -39,22 +52,22 @@ def register(user: UserCreate, db: Session = Depends(get_db)):
         )
     
     # Crear nuevo usuario
-    hashed_password = get_password_hash(user.password)
+    hashed_password = await run_password_hash(get_password_hash, user.password)
     db_user = User(
         email=user.email,
         hashed_password=hashed_password
     )
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
+    await db.refresh(db_user)
     
     return db_user
 
 @router.post("/login", response_model=Token)
-def login(user: UserLogin, db: Session = Depends(get_db)):
+async def login(user: UserLogin, db: AsyncSession = Depends(get_async_db)):
     """Iniciar sesión"""
     # Autenticar usuario
-    authenticated_user = authenticate_user(db, user.email, user.password)
+    authenticated_user = await authenticate_user(db, user.email, user.password)
     if not authenticated_user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -65,13 +78,13 @@ def login(user: UserLogin, db: Session = Depends(get_db)):
     # Crear token
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
-        data={"sub": authenticated_user.email}, 
+        data={"sub": authenticated_user.email, "uid": authenticated_user.id}, 
         expires_delta=access_token_expires
     )
     
     return {"access_token": access_token, "token_type": "bearer"}
 
 @router.get("/me", response_model=UserResponse)
-def read_users_me(current_user: User = Depends(get_current_user)):
+async def read_users_me(current_user: User = Depends(get_current_user)):
     """Obtener información del usuario actual"""
     return current_user
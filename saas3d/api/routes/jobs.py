@@ -1,17 +1,29 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from sqlalchemy import and_, select, tuple_, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Dict, List, Optional
 from datetime import datetime
+import asyncio
+import base64
+import binascii
+import hashlib
+import json
 
-from database import get_db
+from database import get_async_db
 from models import Job, User
 from schemas import JobCreate, JobResponse
 from enums import JobStatus
 from auth import get_current_user
+from routes.upload import owns_file, release_blob
+from routes.outputs import etag_matches
+import job_events as events
+import job_progress
 
 router = APIRouter()
 
-def create_job(db: Session, user_id: int, input_key: str, task_id: str = None) -> Job:
+async def create_job(db: AsyncSession, user_id: int, input_key: str, task_id: str = None) -> Job:
     """Crear nuevo job"""
     job = Job(
         user_id=user_id,
@@ -20,13 +32,14 @@ def create_job(db: Session, user_id: int, input_key: str, task_id: str = None) -
         status=JobStatus.queued
     )
     db.add(job)
-    db.commit()
-    db.refresh(job)
+    await db.commit()
+    await db.refresh(job)
     return job
 
-def get_job(db: Session, job_id: int, user_id: int) -> Job:
+async def get_job(db: AsyncSession, job_id: int, user_id: int) -> Job:
     """Obtener job por ID y usuario"""
-    job = db.query(Job).filter(Job.id == job_id, Job.user_id == user_id).first()
+    result = await db.execute(select(Job).where(Job.id == job_id, Job.user_id == user_id))
+    job = result.scalars().first()
     if not job:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -34,69 +47,207 @@ def get_job(db: Session, job_id: int, user_id: int) -> Job:
         )
     return job
 
-def get_user_jobs(db: Session, user_id: int, skip: int = 0, limit: int = 100) -> List[Job]:
-    """Obtener jobs del usuario"""
-    return db.query(Job).filter(Job.user_id == user_id).offset(skip).limit(limit).all()
+def encode_cursor(job: Job) -> str:
+    """Cursor opaco con el último job de la página"""
+    return base64.urlsafe_b64encode(f"job:{job.id}".encode()).decode().rstrip("=")
 
-def update_job_status(db: Session, job_id: int, status: JobStatus, progress: int = None, error: str = None, output_key: str = None):
-    """Actualizar estado del job"""
-    job = db.query(Job).filter(Job.id == job_id).first()
-    if not job:
-        return None
-    
-    job.status = status
+def decode_cursor(cursor: str) -> int:
+    """ID del job ancla de un cursor de ``encode_cursor`` (400 si no es válido)"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        prefix, job_id = raw.split(":", 1)
+        if prefix != "job":
+            raise ValueError(raw)
+        return int(job_id)
+    except (ValueError, UnicodeDecodeError, binascii.Error):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+
+async def get_user_jobs(db: AsyncSession, user_id: int, skip: int = 0, limit: int = 100,
+                        cursor: Optional[str] = None, job_status: Optional[JobStatus] = None) -> List[Job]:
+    """
+    Obtener jobs del usuario, del más reciente al más antiguo
+
+    Con ``cursor`` se continúa tras el último job de la página anterior
+    (paginación por clave sobre el índice (user_id, created_at, id)); ``skip``
+    se mantiene por compatibilidad y recorre las filas saltadas.
+    """
+    query = select(Job).where(Job.user_id == user_id)
+    if job_status is not None:
+        query = query.where(Job.status == job_status)
+    if cursor is not None:
+        anchor_id = decode_cursor(cursor)
+        # created_at del ancla leído de la propia tabla: se compara con el valor
+        # almacenado, sin conversiones de formato ni de precisión. Si el ancla
+        # se ha borrado vale el del job anterior (los ids siguen el orden de
+        # creación). La comparación de filas se resuelve como rango del índice
+        own_jobs = and_(Job.user_id == user_id, Job.id <= anchor_id)
+        anchor_created_at = (
+            select(Job.created_at).where(own_jobs).order_by(Job.id.desc()).limit(1).scalar_subquery()
+        )
+        query = query.where(tuple_(Job.created_at, Job.id) < tuple_(anchor_created_at, anchor_id))
+    elif skip:
+        query = query.offset(skip)
+    query = query.order_by(Job.created_at.desc(), Job.id.desc()).limit(limit)
+    result = await db.execute(query)
+    return list(result.scalars().all())
+
+async def update_job_status(db: AsyncSession, job_id: int, status: JobStatus, progress: int = None, error: str = None, output_key: str = None):
+    """Actualizar estado del job (un único UPDATE, sin SELECT previo)"""
+    values = {"status": status}
     if progress is not None:
-        job.progress = progress
+        values["progress"] = progress
     if error is not None:
-        job.error = error
+        values["error"] = error
     if output_key is not None:
-        job.output_key = output_key
+        values["output_key"] = output_key
     if status in [JobStatus.completed, JobStatus.failed]:
-        job.finished_at = datetime.utcnow()
+        values["finished_at"] = datetime.utcnow()
     
-    db.commit()
-    db.refresh(job)
+    result = await db.execute(
+        update(Job).where(Job.id == job_id).values(**values).returning(Job),
+        execution_options={"synchronize_session": False}
+    )
+    job = result.scalars().first()
+    await db.commit()
+    if job is not None:
+        await run_in_threadpool(job_progress.progress_store.clear, job_id)
     return job
 
+async def live_progress(jobs: List[Job]) -> Dict[int, int]:
+    """Progreso intermedio del almacén rápido para los jobs en curso"""
+    processing = [job.id for job in jobs if job.status == JobStatus.processing]
+    if not processing:
+        return {}
+    return await run_in_threadpool(job_progress.progress_store.get_many, processing)
+
+def job_responses(jobs: List[Job], live: Dict[int, int]) -> List[JobResponse]:
+    """Respuestas con el progreso intermedio aplicado"""
+    responses = []
+    for job in jobs:
+        response = JobResponse.model_validate(job)
+        if job.id in live:
+            response = response.model_copy(update={"progress": live[job.id]})
+        responses.append(response)
+    return responses
+
+async def with_live_progress(jobs: List[Job]) -> List[JobResponse]:
+    """Respuestas con el progreso intermedio del almacén rápido para los jobs en curso"""
+    return job_responses(jobs, await live_progress(jobs))
+
+def jobs_etag(jobs: List[Job], live: Dict[int, int], next_cursor: Optional[str]) -> str:
+    """ETag de una página a partir de los campos que cambian, sin serializarla"""
+    digest = hashlib.sha1(repr(next_cursor).encode())
+    for job in jobs:
+        digest.update(repr((
+            job.id, job.status, live.get(job.id, job.progress), job.error,
+            job.input_key, job.input_sha256, job.output_key, job.task_id, job.finished_at
+        )).encode())
+    return f'"{digest.hexdigest()}"'
+
 @router.post("/jobs", response_model=JobResponse)
-def create_job_endpoint(
+async def create_job_endpoint(
     job: JobCreate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Crear nuevo job"""
-    db_job = create_job(db, current_user.id, job.input_key)
+    """
+    Crear nuevo job sobre un archivo que el usuario ya tiene (p. ej. para
+    reprocesarlo); los archivos nuevos se suben con /api/upload
+    """
+    if not await owns_file(db, current_user.id, job.input_key):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Archivo no encontrado"
+        )
+    db_job = await create_job(db, current_user.id, job.input_key)
     return db_job
 
 @router.get("/jobs", response_model=List[JobResponse])
-def get_jobs(
-    skip: int = 0,
-    limit: int = 100,
+async def get_jobs(
+    request: Request,
+    response: Response,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=500),
+    cursor: Optional[str] = None,
+    job_status: Optional[JobStatus] = Query(None, alias="status"),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Obtener jobs del usuario"""
-    jobs = get_user_jobs(db, current_user.id, skip, limit)
-    return jobs
+    """
+    Obtener jobs del usuario
+
+    La cabecera ``X-Next-Cursor`` (ausente en la última página) se pasa como
+    ``cursor`` para pedir la siguiente. Cada página lleva ETag: con
+    ``If-None-Match`` una página sin cambios se responde con 304.
+    """
+    jobs = await get_user_jobs(db, current_user.id, skip, limit + 1, cursor, job_status)
+    next_cursor = encode_cursor(jobs[limit - 1]) if len(jobs) > limit else None
+    jobs = jobs[:limit]
+    live = await live_progress(jobs)
+    
+    headers = {"ETag": jobs_etag(jobs, live, next_cursor), "Cache-Control": "private, no-cache"}
+    if next_cursor:
+        headers["X-Next-Cursor"] = next_cursor
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and etag_matches(if_none_match, headers["ETag"]):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    
+    response.headers.update(headers)
+    return job_responses(jobs, live)
+
+async def job_event_stream(user_id: int):
+    """Stream SSE con los eventos de los jobs del usuario"""
+    async with events.job_events.subscribe(user_id) as queue:
+        # Confirmar la suscripción: el cliente puede cargar la lista sin perder eventos
+        yield ": subscribed\n\n"
+        while True:
+            try:
+                event = await asyncio.wait_for(queue.get(), timeout=events.JOB_EVENTS_HEARTBEAT)
+            except asyncio.TimeoutError:
+                # Keep-alive para proxies que cortan conexiones inactivas
+                yield ": ping\n\n"
+                continue
+            yield f"event: job\ndata: {json.dumps(event)}\n\n"
+
+@router.get("/jobs/events")
+async def stream_job_events(
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Eventos de estado y progreso de los jobs del usuario (Server-Sent Events)"""
+    # El stream puede durar horas: no retener una conexión del pool
+    user_id = current_user.id
+    await db.close()
+    return StreamingResponse(
+        job_event_stream(user_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 @router.get("/jobs/{job_id}", response_model=JobResponse)
-def get_job_endpoint(
+async def get_job_endpoint(
     job_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Obtener job específico"""
-    job = get_job(db, job_id, current_user.id)
-    return job
+    job = await get_job(db, job_id, current_user.id)
+    return (await with_live_progress([job]))[0]
 
 @router.delete("/jobs/{job_id}")
-def delete_job(
+async def delete_job(
     job_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Eliminar job"""
-    job = get_job(db, job_id, current_user.id)
-    db.delete(job)
-    db.commit()
+    job = await get_job(db, job_id, current_user.id)
+    input_key = job.input_key
+    await db.delete(job)
+    await db.commit()
+    # El archivo de entrada se comparte entre jobs con el mismo contenido
+    await release_blob(db, input_key)
     return {"message": "Job deleted successfully"}
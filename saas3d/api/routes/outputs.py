@@ -0,0 +1,214 @@
+"""
+Descarga de resultados (mallas del almacenamiento de salida)
+
+Con S3 la respuesta es una redirección a una URL firmada: el propio
+almacenamiento resuelve Range y ETag y la API no está en el camino de los
+datos. Con el backend de archivos se sirve desde aquí con ``Range``
+(descargas parciales y reanudadas), ETags fuertes con
+``If-None-Match``/``If-Range`` y transferencia sin copia: con
+``OUTPUT_ACCEL_REDIRECT`` el cuerpo lo sirve nginx (``sendfile``) y, si el
+servidor ASGI ofrece la extensión ``http.response.zerocopy``, se le pasa el
+descriptor del archivo en lugar de leerlo en Python.
+"""
+
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import RedirectResponse, Response
+from sqlalchemy.orm import Session
+from pathlib import Path
+from typing import Optional, Tuple
+import os
+import re
+
+from database import get_db
+from models import Job, User
+from auth import get_current_user
+from enums import JobStatus
+from storage import PRESIGN_EXPIRES, output_storage
+
+router = APIRouter()
+
+STREAM_CHUNK_SIZE = 1024 * 1024
+# Prefijo de la location interna de nginx que apunta a OUTPUT_DIR
+# (p. ej. "/protected-outputs/"); vacío para servir desde la API
+OUTPUT_ACCEL_REDIRECT = os.getenv("OUTPUT_ACCEL_REDIRECT", "")
+
+MEDIA_TYPES = {
+    ".ply": "application/octet-stream",
+    ".obj": "model/obj",
+    ".stl": "model/stl",
+}
+
+RANGE_PATTERN = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def file_etag(stat: os.stat_result) -> str:
+    """
+    ETag fuerte a partir de inodo, tamaño y mtime
+
+    Los resultados se escriben una vez y se sustituyen con renombrados o
+    enlaces atómicos, así que cualquier cambio de contenido cambia el inodo o
+    el mtime. La caché de resultados guarda copias propias, así que sus
+    accesos no tocan el mtime de las salidas publicadas.
+    """
+    return f'"{stat.st_ino:x}-{stat.st_size:x}-{stat.st_mtime_ns:x}"'
+
+
+def etag_matches(header: str, etag: str) -> bool:
+    """Comparación débil de If-None-Match (lista de ETags o ``*``)"""
+    if header.strip() == "*":
+        return True
+    candidates = [tag.strip() for tag in header.split(",")]
+    return any(tag.removeprefix("W/") == etag for tag in candidates)
+
+
+def parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """
+    Interpretar un ``Range`` de un solo intervalo
+
+    Returns:
+        (inicio, fin) inclusivos, o None si la cabecera no se entiende (se
+        sirve el archivo completo, como permite el RFC 9110)
+
+    Raises:
+        HTTPException 416: si el intervalo no se puede satisfacer
+    """
+    match = RANGE_PATTERN.match(header.strip())
+    if not match or match.groups() == ("", ""):
+        return None
+    first, last = match.groups()
+    if first:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+        if last and int(last) < start:
+            return None
+    else:
+        # Sufijo: los últimos N bytes
+        start = max(size - int(last), 0)
+        end = size - 1
+        if int(last) == 0:
+            start = size
+
+    if start >= size:
+        raise HTTPException(
+            status_code=status.HTTP_416_RANGE_NOT_SATISFIABLE,
+            detail="Rango no satisfacible",
+            headers={"Content-Range": f"bytes */{size}"}
+        )
+    return start, end
+
+
+class FileRangeResponse(Response):
+    """Respuesta con un intervalo de un archivo, sin cargarlo en memoria"""
+
+    def __init__(self, path: Path, start: int, length: int, status_code: int, headers: dict, send_body: bool = True):
+        super().__init__(status_code=status_code, headers=headers)
+        self.path = path
+        self.start = start
+        self.length = length
+        self.send_body = send_body
+        self.headers["content-length"] = str(length)
+
+    async def __call__(self, scope, receive, send):
+        await send({
+            "type": "http.response.start",
+            "status": self.status_code,
+            "headers": self.raw_headers,
+        })
+        if not self.send_body or self.length == 0:
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        f = await run_in_threadpool(open, self.path, "rb")
+        try:
+            if "http.response.zerocopy" in scope.get("extensions", {}):
+                await send({
+                    "type": "http.response.zerocopy",
+                    "file": f.fileno(),
+                    "offset": self.start,
+                    "count": self.length,
+                })
+                return
+
+            await run_in_threadpool(f.seek, self.start)
+            remaining = self.length
+            while remaining > 0:
+                chunk = await run_in_threadpool(f.read, min(STREAM_CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                await send({"type": "http.response.body", "body": chunk, "more_body": remaining > 0})
+        finally:
+            await run_in_threadpool(f.close)
+
+
+def get_output_key(db: Session, job_id: int, user_id: int) -> str:
+    """Clave del resultado de un job completado del usuario"""
+    job = db.query(Job).filter(Job.id == job_id, Job.user_id == user_id).first()
+    if not job or job.status != JobStatus.completed or not job.output_key:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Resultado no encontrado"
+        )
+    return Path(job.output_key).name
+
+
+@router.api_route("/outputs/{job_id}", methods=["GET", "HEAD"])
+def download_output(
+    job_id: int,
+    request: Request,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Descargar la malla resultante de un job"""
+    output_key = get_output_key(db, job_id, current_user.id)
+    if output_storage.supports_presign:
+        return RedirectResponse(
+            output_storage.presign_get(output_key, PRESIGN_EXPIRES, output_key),
+            status_code=status.HTTP_307_TEMPORARY_REDIRECT
+        )
+    
+    path = output_storage.local_path(output_key)
+    if not path.is_file():
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Resultado no encontrado"
+        )
+    stat = path.stat()
+    size = stat.st_size
+    etag = file_etag(stat)
+
+    headers = {
+        "ETag": etag,
+        "Accept-Ranges": "bytes",
+        # Privado (requiere token) y siempre revalidado: las repeticiones cuestan un 304
+        "Cache-Control": "private, no-cache",
+    }
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and etag_matches(if_none_match, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    headers["Content-Disposition"] = f'attachment; filename="{path.name}"'
+    headers["Content-Type"] = MEDIA_TYPES.get(path.suffix.lower(), "application/octet-stream")
+
+    if OUTPUT_ACCEL_REDIRECT:
+        # nginx sirve el cuerpo (sendfile) y resuelve Range/If-Range por su cuenta
+        headers["X-Accel-Redirect"] = f"{OUTPUT_ACCEL_REDIRECT.rstrip('/')}/{path.name}"
+        return Response(status_code=status.HTTP_200_OK, headers=headers)
+
+    byte_range = None
+    range_header = request.headers.get("range")
+    if range_header:
+        # If-Range: solo se respeta el intervalo si el archivo no ha cambiado
+        if_range = request.headers.get("if-range")
+        if if_range is None or if_range.strip() == etag:
+            byte_range = parse_range(range_header, size)
+
+    send_body = request.method != "HEAD"
+    if byte_range is None:
+        return FileRangeResponse(path, 0, size, status.HTTP_200_OK, headers, send_body)
+
+    start, end = byte_range
+    headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    return FileRangeResponse(path, start, end - start + 1, status.HTTP_206_PARTIAL_CONTENT, headers, send_body)
@@ -3,19 +3,31 @@ Endpoints para procesamiento de nubes de puntos
 """
 
 from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks
-from sqlalchemy.orm import Session
-from typing import List, Optional
-from pydantic import BaseModel
+from fastapi.concurrency import run_in_threadpool
+from celery import group
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Dict, List, Optional, Tuple
+from pydantic import BaseModel, Field
 import os
+import logging
 from pathlib import Path
+from datetime import datetime
 
-from database import get_db
+from database import get_async_db
 from models import Job, User
 from auth import get_current_user
 from enums import JobStatus
 from celery_worker import process_point_cloud_task
+from result_cache import result_cache, file_sha256
+from storage import upload_storage, output_storage
+from input_cache import input_affinity, input_cache_key
+from job_events import job_event, job_events, status_event
+from cost_routing import COST_ROUTING, route_for
+from point_cloud_header import read_point_cloud_header
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
 
 class ProcessingRequest(BaseModel):
     """Modelo para solicitud de procesamiento"""
@@ -26,6 +38,8 @@ class ProcessingRequest(BaseModel):
     normal_radius: float = 0.1
     normal_max_nn: int = 30
     output_format: str = "ply"
+    color_method: str = "nearest"  # nearest, weighted, interpolated
+    color_k_neighbors: int = 10
     
     # Parámetros específicos por algoritmo
     poisson_depth: int = 9
@@ -36,6 +50,14 @@ class ProcessingRequest(BaseModel):
     ball_pivoting_radii: Optional[List[float]] = None
     
     alpha_shape_alpha: float = 0.1
+    
+    # Reconstrucción por teselas para nubes muy grandes
+    tiled: bool = False
+    tile_size: Optional[float] = None  # Automático si no se indica
+    tile_overlap: Optional[float] = None  # 5% del tamaño de tesela por defecto
+    
+    # Limpieza de malla (0 = solo triángulos degenerados/duplicados y vértices sueltos)
+    min_component_triangles: int = 0
 
 class ProcessingResponse(BaseModel):
     """Modelo para respuesta de procesamiento"""
@@ -44,21 +66,266 @@ class ProcessingResponse(BaseModel):
     message: str
     task_id: Optional[str] = None
 
+# Máximo de jobs por petición de lote
+BATCH_MAX_JOBS = int(os.getenv("BATCH_MAX_JOBS", "500"))
+
+class BatchProcessingRequest(BaseModel):
+    """Solicitud de procesamiento de varios jobs con los mismos parámetros"""
+    job_ids: List[int] = Field(..., min_length=1, max_length=BATCH_MAX_JOBS)
+    parameters: ProcessingRequest = ProcessingRequest()
+
+class BatchJobResult(BaseModel):
+    """Resultado de un job dentro de un lote"""
+    job_id: int
+    accepted: bool
+    status: str
+    message: str
+    task_id: Optional[str] = None
+
+class BatchProcessingResponse(BaseModel):
+    """Modelo para respuesta de procesamiento por lotes"""
+    accepted: int
+    rejected: int
+    results: List[BatchJobResult]
+
+VALID_ALGORITHMS = ["poisson", "ball_pivoting", "alpha_shape"]
+VALID_FORMATS = ["ply", "obj", "stl"]
+VALID_COLOR_METHODS = ["nearest", "weighted", "interpolated"]
+
+def validate_processing_request(processing_request: ProcessingRequest):
+    """Validar algoritmo, formato de salida y método de color"""
+    if processing_request.algorithm not in VALID_ALGORITHMS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Algoritmo no válido. Opciones: {', '.join(VALID_ALGORITHMS)}"
+        )
+    
+    if processing_request.output_format not in VALID_FORMATS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Formato de salida no válido. Opciones: {', '.join(VALID_FORMATS)}"
+        )
+    
+    if processing_request.color_method not in VALID_COLOR_METHODS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Método de color no válido. Opciones: {', '.join(VALID_COLOR_METHODS)}"
+        )
+
+def task_parameters(processing_request: ProcessingRequest) -> dict:
+    """Parámetros de la tarea de Celery"""
+    return {
+        'algorithm': processing_request.algorithm,
+        'voxel_size': processing_request.voxel_size,
+        'nb_neighbors': processing_request.nb_neighbors,
+        'std_ratio': processing_request.std_ratio,
+        'normal_radius': processing_request.normal_radius,
+        'normal_max_nn': processing_request.normal_max_nn,
+        'output_format': processing_request.output_format,
+        'color_method': processing_request.color_method,
+        'color_k_neighbors': processing_request.color_k_neighbors,
+        'poisson_depth': processing_request.poisson_depth,
+        'poisson_width': processing_request.poisson_width,
+        'poisson_scale': processing_request.poisson_scale,
+        'poisson_linear_fit': processing_request.poisson_linear_fit,
+        'ball_pivoting_radii': processing_request.ball_pivoting_radii,
+        'alpha_shape_alpha': processing_request.alpha_shape_alpha,
+        'tiled': processing_request.tiled,
+        'tile_size': processing_request.tile_size,
+        'tile_overlap': processing_request.tile_overlap,
+        'min_component_triangles': processing_request.min_component_triangles,
+    }
+
+def plan_job(job: Job, task_params: dict) -> Tuple[Optional[str], Optional[str], Optional[Path], dict]:
+    """
+    Hash de entrada, clave y malla de la caché de resultados y opciones de
+    envío de la tarea (operaciones bloqueantes: se ejecuta en el threadpool)
+    
+    El hash se calcula durante la subida; se recalcula solo para jobs antiguos
+    con el archivo en disco (con S3 lo calcula el worker tras descargarlo)
+    """
+    input_hash = job.input_sha256
+    local_input = upload_storage.local_path(job.input_key)
+    if input_hash is None and local_input is not None:
+        input_hash = file_sha256(local_input)
+    cache_key = result_cache.make_key(input_hash, task_params) if input_hash else None
+    cached_path = result_cache.lookup(cache_key, task_params['output_format']) if cache_key else None
+    
+    options = {}
+    if cached_path is None:
+        # Nivel de coste según la cabecera de la entrada (cola y límites de tiempo)
+        if COST_ROUTING:
+            route = route_for(read_point_cloud_header(upload_storage, job.input_key), task_params['voxel_size'])
+            options = route.task_options()
+            logger.info(f"Job {job.id}: nivel {route.tier} ({route.effective_points} puntos estimados)")
+        # Con almacenamiento remoto y afinidad activa, preferir un nodo que ya
+        # tenga la entrada en su caché local y que consuma la cola del nivel
+        if local_input is None:
+            queue = input_affinity.pick_queue(input_cache_key(input_hash, job.input_key), options.get("queue"))
+            if queue is not None:
+                options["queue"] = queue
+    return input_hash, cache_key, cached_path, options
+
+def task_signature(job: Job, task_params: dict, input_hash: Optional[str], cache_key: Optional[str],
+                   options: dict):
+    """Firma de la tarea de procesamiento de un job"""
+    return process_point_cloud_task.signature(kwargs=dict(
+        job_id=job.id,
+        input_key=job.input_key,
+        input_sha256=input_hash,
+        result_cache_key=cache_key,
+        **task_params
+    ), **options)
+
+def dispatch_group(signatures: list) -> List[str]:
+    """Enviar las tareas como un grupo de Celery (un solo envío al broker); devuelve los task_id"""
+    result = group(signatures).apply_async()
+    return [task.id for task in result.results]
+
+@router.post("/process/batch", response_model=BatchProcessingResponse)
+async def start_batch_processing(
+    batch: BatchProcessingRequest,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Iniciar el procesamiento de varios jobs con los mismos parámetros
+    
+    Los jobs se leen con una sola consulta, las tareas se envían como un
+    grupo de Celery y los task_id se guardan con un único UPDATE masivo.
+    Cada job se acepta o rechaza por separado.
+    """
+    validate_processing_request(batch.parameters)
+    task_params = task_parameters(batch.parameters)
+    output_format = batch.parameters.output_format
+    job_ids = list(dict.fromkeys(batch.job_ids))
+    
+    result = await db.execute(select(Job).where(Job.id.in_(job_ids), Job.user_id == current_user.id))
+    jobs = {job.id: job for job in result.scalars().all()}
+    
+    results: Dict[int, BatchJobResult] = {}
+    candidates = []
+    for job_id in job_ids:
+        job = jobs.get(job_id)
+        if job is None:
+            results[job_id] = BatchJobResult(job_id=job_id, accepted=False, status="not_found",
+                                             message="Trabajo no encontrado")
+        elif job.status != JobStatus.queued:
+            results[job_id] = BatchJobResult(job_id=job_id, accepted=False, status=job.status.value,
+                                             message=f"El trabajo ya está en estado: {job.status.value}")
+        else:
+            candidates.append(job)
+    
+    def plan_all() -> Tuple[Dict[int, Optional[tuple]], Dict[int, str]]:
+        # Entradas compartidas (deduplicadas) se comprueban una sola vez.
+        # Un error en un job (almacenamiento, caché) solo rechaza ese job
+        exists = {}
+        plans, errors = {}, {}
+        for job in candidates:
+            try:
+                if job.input_key not in exists:
+                    exists[job.input_key] = upload_storage.exists(job.input_key)
+                plans[job.id] = plan_job(job, task_params) if exists[job.input_key] else None
+            except Exception as e:
+                logger.error(f"Error al preparar el job {job.id}: {str(e)}")
+                errors[job.id] = f"Error al iniciar procesamiento: {str(e)}"
+        return plans, errors
+    
+    plans, errors = await run_in_threadpool(plan_all)
+    
+    cached, pending = [], []
+    for job in candidates:
+        if job.id in errors:
+            results[job.id] = BatchJobResult(job_id=job.id, accepted=False, status=job.status.value,
+                                             message=errors[job.id])
+            continue
+        plan = plans[job.id]
+        if plan is None:
+            results[job.id] = BatchJobResult(job_id=job.id, accepted=False, status=job.status.value,
+                                             message="Archivo de entrada no encontrado")
+            continue
+        input_hash, cache_key, cached_path, options = plan
+        if cached_path is not None:
+            cached.append((job, cached_path))
+        else:
+            pending.append((job, task_signature(job, task_params, input_hash, cache_key, options)))
+    
+    updates = []
+    events = []
+    
+    # Reenvíos idénticos: completar con la malla cacheada
+    if cached:
+        def publish_cached() -> Dict[int, str]:
+            failed = {}
+            for job, cached_path in cached:
+                try:
+                    result_cache.export(cached_path, output_storage, f"mesh_{job.id}.{output_format}")
+                except Exception as e:
+                    logger.error(f"Error al publicar la malla cacheada del job {job.id}: {str(e)}")
+                    failed[job.id] = f"Error al iniciar procesamiento: {str(e)}"
+            return failed
+        
+        failed = await run_in_threadpool(publish_cached)
+        finished_at = datetime.utcnow()
+        for job, _ in cached:
+            if job.id in failed:
+                results[job.id] = BatchJobResult(job_id=job.id, accepted=False, status=job.status.value,
+                                                 message=failed[job.id])
+                continue
+            output_key = f"mesh_{job.id}.{output_format}"
+            updates.append({"id": job.id, "status": JobStatus.completed, "progress": 100,
+                            "output_key": output_key, "finished_at": finished_at})
+            events.append((job.user_id, status_event(job.id, JobStatus.completed, 100, output_key=output_key)))
+            results[job.id] = BatchJobResult(job_id=job.id, accepted=True, status="completed",
+                                             message="Resultado obtenido de la caché")
+    
+    if pending:
+        try:
+            task_ids = await run_in_threadpool(dispatch_group, [signature for _, signature in pending])
+        except Exception as e:
+            error = f"Error al iniciar procesamiento: {str(e)}"
+            finished_at = datetime.utcnow()
+            for job, _ in pending:
+                updates.append({"id": job.id, "status": JobStatus.failed, "error": error, "finished_at": finished_at})
+                events.append((job.user_id, status_event(job.id, JobStatus.failed, job.progress, error=error)))
+                results[job.id] = BatchJobResult(job_id=job.id, accepted=False, status="failed", message=error)
+        else:
+            for (job, _), task_id in zip(pending, task_ids):
+                updates.append({"id": job.id, "task_id": task_id})
+                results[job.id] = BatchJobResult(job_id=job.id, accepted=True, status="queued",
+                                                 message="Procesamiento iniciado correctamente", task_id=task_id)
+    
+    if updates:
+        # UPDATE masivo por clave primaria (un executemany por tipo de cambio)
+        await db.execute(update(Job), updates)
+        await db.commit()
+    if events:
+        def publish_events():
+            for user_id, event in events:
+                job_events.publish(user_id, event)
+        
+        await run_in_threadpool(publish_events)
+    
+    ordered = [results[job_id] for job_id in job_ids]
+    accepted = sum(1 for item in ordered if item.accepted)
+    return BatchProcessingResponse(accepted=accepted, rejected=len(ordered) - accepted, results=ordered)
+
 @router.post("/process/{job_id}", response_model=ProcessingResponse)
-def start_processing(
+async def start_processing(
     job_id: int,
     processing_request: ProcessingRequest,
     background_tasks: BackgroundTasks,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Iniciar procesamiento de una nube de puntos"""
     
     # Verificar que el trabajo existe y pertenece al usuario
-    job = db.query(Job).filter(
+    result = await db.execute(select(Job).where(
         Job.id == job_id,
         Job.user_id == current_user.id
-    ).first()
+    ))
+    job = result.scalars().first()
     
     if not job:
         raise HTTPException(
@@ -73,59 +340,44 @@ def start_processing(
         )
     
     # Verificar que el archivo de entrada existe
-    input_file_path = Path("saas3d/api/uploads") / job.input_key
-    if not input_file_path.exists():
+    if not await run_in_threadpool(upload_storage.exists, job.input_key):
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Archivo de entrada no encontrado"
         )
     
-    # Validar algoritmo
-    valid_algorithms = ["poisson", "ball_pivoting", "alpha_shape"]
-    if processing_request.algorithm not in valid_algorithms:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Algoritmo no válido. Opciones: {', '.join(valid_algorithms)}"
-        )
-    
-    # Validar formato de salida
-    valid_formats = ["ply", "obj", "stl"]
-    if processing_request.output_format not in valid_formats:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Formato de salida no válido. Opciones: {', '.join(valid_formats)}"
-        )
+    validate_processing_request(processing_request)
     
     try:
-        # Preparar parámetros para la tarea
-        task_params = {
-            'algorithm': processing_request.algorithm,
-            'voxel_size': processing_request.voxel_size,
-            'nb_neighbors': processing_request.nb_neighbors,
-            'std_ratio': processing_request.std_ratio,
-            'normal_radius': processing_request.normal_radius,
-            'normal_max_nn': processing_request.normal_max_nn,
-            'output_format': processing_request.output_format,
-            'poisson_depth': processing_request.poisson_depth,
-            'poisson_width': processing_request.poisson_width,
-            'poisson_scale': processing_request.poisson_scale,
-            'poisson_linear_fit': processing_request.poisson_linear_fit,
-            'ball_pivoting_radii': processing_request.ball_pivoting_radii,
-            'alpha_shape_alpha': processing_request.alpha_shape_alpha,
-        }
+        task_params = task_parameters(processing_request)
+        
+        # Reenvío idéntico: completar el trabajo con la malla cacheada
+        input_hash, cache_key, cached_path, options = await run_in_threadpool(plan_job, job, task_params)
+        if cached_path is not None:
+            output_filename = f"mesh_{job_id}.{processing_request.output_format}"
+            await run_in_threadpool(result_cache.export, cached_path, output_storage, output_filename)
+            
+            job.status = JobStatus.completed
+            job.progress = 100
+            job.output_key = output_filename
+            job.finished_at = datetime.utcnow()
+            await db.commit()
+            await run_in_threadpool(job_events.publish, job.user_id, job_event(job))
+            
+            return ProcessingResponse(
+                job_id=job_id,
+                status="completed",
+                message="Resultado obtenido de la caché"
+            )
         
         # Enviar tarea a Celery
-        task = process_point_cloud_task.delay(
-            job_id=job_id,
-            input_file_path=str(input_file_path),
-            algorithm=processing_request.algorithm,
-            **task_params
-        )
+        signature = task_signature(job, task_params, input_hash, cache_key, options)
+        task = await run_in_threadpool(signature.apply_async)
         
         # Actualizar trabajo con el task_id
         job.task_id = task.id
         job.status = JobStatus.queued  # Mantener como queued hasta que Celery lo procese
-        db.commit()
+        await db.commit()
         
         return ProcessingResponse(
             job_id=job_id,
@@ -138,7 +390,8 @@ def start_processing(
         # Marcar trabajo como fallido
         job.status = JobStatus.failed
         job.error = f"Error al iniciar procesamiento: {str(e)}"
-        db.commit()
+        await db.commit()
+        await run_in_threadpool(job_events.publish, job.user_id, job_event(job))
         
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -184,10 +437,21 @@ def get_available_algorithms():
             "std_ratio": {"type": "float", "default": 2.0, "min": 0.1, "max": 5.0},
             "normal_radius": {"type": "float", "default": 0.1, "min": 0.01, "max": 1.0},
             "normal_max_nn": {"type": "int", "default": 30, "min": 5, "max": 100},
-            "output_format": {"type": "str", "options": ["ply", "obj", "stl"], "default": "ply"}
+            "output_format": {"type": "str", "options": ["ply", "obj", "stl"], "default": "ply"},
+            "color_method": {"type": "str", "options": ["nearest", "weighted", "interpolated"], "default": "nearest"},
+            "color_k_neighbors": {"type": "int", "default": 10, "min": 1, "max": 50},
+            "tiled": {"type": "bool", "default": False, "description": "Reconstrucción por teselas en paralelo"},
+            "tile_size": {"type": "float", "default": None, "description": "Lado de la tesela (automático si no se indica)"},
+            "tile_overlap": {"type": "float", "default": None, "description": "Solape entre teselas"},
+            "min_component_triangles": {"type": "int", "default": 0, "min": 0, "description": "Eliminar fragmentos con este número de triángulos o menos"}
         }
     }
 
+@router.get("/cache/stats")
+def get_cache_stats(current_user: User = Depends(get_current_user)):
+    """Obtener contadores de la caché de resultados"""
+    return result_cache.stats()
+
 @router.get("/task-status/{task_id}")
 def get_task_status(task_id: str, current_user: User = Depends(get_current_user)):
     """Obtener estado de una tarea de Celery"""
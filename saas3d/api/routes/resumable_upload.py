@@ -0,0 +1,425 @@
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import func, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, selectinload
+from pydantic import BaseModel
+from typing import Optional
+from datetime import datetime, timedelta, timezone
+import logging
+from pathlib import Path
+import math
+import os
+import time
+import uuid
+
+from database import get_db, get_async_db
+from models import Job, UploadChunk, UploadSession, User
+from auth import get_current_user
+from enums import JobStatus, UploadStatus
+from routes.upload import (
+    ALLOWED_EXTENSIONS, UPLOAD_DIR, generate_unique_filename, blob_filename, discard_job, store_blob,
+    upload_response
+)
+from storage import PRESIGN_EXPIRES, upload_storage
+from upload_sessions import UPLOAD_SESSION_IDLE_TTL, get_hasher, discard_hasher
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+# Límites de las subidas reanudables
+MAX_RESUMABLE_FILE_SIZE = int(os.getenv("MAX_RESUMABLE_FILE_SIZE_MB", "51200")) * 1024 * 1024  # 50GB
+DEFAULT_CHUNK_SIZE = 8 * 1024 * 1024
+MIN_CHUNK_SIZE = 1024 * 1024
+MAX_CHUNK_SIZE = 64 * 1024 * 1024
+# Límites de S3 para las subidas directas (multiparte)
+MIN_DIRECT_CHUNK_SIZE = 5 * 1024 * 1024
+MAX_DIRECT_PARTS = 10000
+# Intervalo mínimo (por proceso) entre barridos de sesiones abandonadas
+UPLOAD_SESSION_SWEEP_SECONDS = int(os.getenv("UPLOAD_SESSION_SWEEP_SECONDS", "300"))
+_last_session_sweep = 0.0
+
+class UploadSessionCreate(BaseModel):
+    filename: str
+    total_size: int
+    chunk_size: Optional[int] = None
+    # Subida directa al almacenamiento con URLs firmadas (sin pasar por la API)
+    direct: bool = False
+
+def total_chunks(session: UploadSession) -> int:
+    """Número de bloques de la sesión"""
+    return max(1, math.ceil(session.total_size / session.chunk_size))
+
+def expected_chunk_size(session: UploadSession, index: int) -> int:
+    """Tamaño esperado del bloque (el último puede ser menor)"""
+    return min(session.chunk_size, session.total_size - index * session.chunk_size)
+
+def write_at(path: Path, offset: int, data: bytes):
+    """Escribir datos en su offset final del archivo (sin archivos temporales)"""
+    with open(path, "r+b") as f:
+        f.seek(offset)
+        f.write(data)
+
+def check_chunk_index(session: UploadSession, index: int):
+    """Validar el índice de bloque"""
+    if not 0 <= index < total_chunks(session):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Índice de bloque fuera de rango (0-{total_chunks(session) - 1})"
+        )
+
+def get_session(db: Session, upload_id: str, user_id: int) -> UploadSession:
+    """Obtener sesión de subida por ID y usuario"""
+    session = db.query(UploadSession).filter(
+        UploadSession.id == upload_id, UploadSession.user_id == user_id
+    ).first()
+    if not session:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Sesión de subida no encontrada"
+        )
+    return session
+
+async def load_session(db: AsyncSession, upload_id: str, user_id: int, with_chunks: bool = False) -> UploadSession:
+    """Obtener sesión de subida por ID y usuario (sesión async; bloques cargados si se piden)"""
+    query = select(UploadSession).where(UploadSession.id == upload_id, UploadSession.user_id == user_id)
+    if with_chunks:
+        query = query.options(selectinload(UploadSession.chunks))
+    session = (await db.execute(query)).scalars().first()
+    if not session:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Sesión de subida no encontrada"
+        )
+    return session
+
+def discard_session_data(session: UploadSession):
+    """Borrar los bytes recibidos de una sesión pendiente (archivo o subida multiparte)"""
+    if session.storage_upload_id:
+        upload_storage.abort_multipart(session.stored_filename, session.storage_upload_id)
+    else:
+        (UPLOAD_DIR / session.stored_filename).unlink(missing_ok=True)
+    discard_hasher(session.id)
+
+def expire_stale_sessions(db: Session, ttl: int = UPLOAD_SESSION_IDLE_TTL) -> int:
+    """
+    Eliminar las sesiones pendientes sin actividad durante ``ttl`` segundos
+    
+    Libera el archivo reservado (hasta el tamaño total de la subida) o la
+    subida multiparte del almacenamiento.
+    
+    Returns:
+        Número de sesiones eliminadas
+    """
+    cutoff = datetime.now(timezone.utc) - timedelta(seconds=ttl)
+    stale = db.query(UploadSession).filter(
+        UploadSession.status == UploadStatus.pending,
+        func.coalesce(UploadSession.updated_at, UploadSession.created_at) < cutoff
+    ).all()
+    for session in stale:
+        try:
+            discard_session_data(session)
+        except Exception as e:
+            logger.warning(f"No se pudieron borrar los datos de la sesión {session.id}: {str(e)}")
+            continue
+        db.delete(session)
+    db.commit()
+    if stale:
+        logger.info(f"Sesiones de subida abandonadas eliminadas: {len(stale)}")
+    return len(stale)
+
+def maybe_expire_stale_sessions(db: Session):
+    """Barrido de sesiones abandonadas como mucho cada UPLOAD_SESSION_SWEEP_SECONDS"""
+    global _last_session_sweep
+    now = time.monotonic()
+    if now - _last_session_sweep < UPLOAD_SESSION_SWEEP_SECONDS:
+        return
+    _last_session_sweep = now
+    expire_stale_sessions(db)
+
+def received_chunks(session: UploadSession) -> dict:
+    """Bloques recibidos: índice -> tamaño"""
+    if session.storage_upload_id and session.status == UploadStatus.pending:
+        # Subida directa: el almacenamiento es quien sabe qué partes llegaron
+        parts = upload_storage.list_parts(session.stored_filename, session.storage_upload_id)
+        return {
+            number - 1: size for number, (size, _) in parts.items()
+            if 0 <= number - 1 < total_chunks(session) and size == expected_chunk_size(session, number - 1)
+        }
+    return {chunk.index: chunk.size for chunk in session.chunks}
+
+def session_state(session: UploadSession) -> dict:
+    """Estado de la sesión: bloques recibidos y pendientes"""
+    sizes = received_chunks(session)
+    received = sorted(sizes)
+    received_set = set(received)
+    return {
+        "upload_id": session.id,
+        "filename": session.filename,
+        "status": session.status,
+        "total_size": session.total_size,
+        "chunk_size": session.chunk_size,
+        "total_chunks": total_chunks(session),
+        "received_chunks": received,
+        "missing_chunks": [i for i in range(total_chunks(session)) if i not in received_set],
+        "bytes_received": sum(sizes.values()),
+        "job_id": session.job_id,
+        "direct": bool(session.storage_upload_id),
+    }
+
+@router.post("/uploads")
+def create_upload_session(
+    request: UploadSessionCreate,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Crear una sesión de subida reanudable"""
+    maybe_expire_stale_sessions(db)
+    if Path(request.filename).suffix.lower() not in ALLOWED_EXTENSIONS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Tipo de archivo no permitido. Extensiones permitidas: {', '.join(ALLOWED_EXTENSIONS)}"
+        )
+    if request.total_size <= 0 or request.total_size > MAX_RESUMABLE_FILE_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Tamaño no válido. Tamaño máximo: {MAX_RESUMABLE_FILE_SIZE // (1024*1024)}MB"
+        )
+    chunk_size = request.chunk_size or DEFAULT_CHUNK_SIZE
+    if not MIN_CHUNK_SIZE <= chunk_size <= MAX_CHUNK_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"chunk_size debe estar entre {MIN_CHUNK_SIZE} y {MAX_CHUNK_SIZE} bytes"
+        )
+
+    stored_filename = generate_unique_filename(request.filename)
+    storage_upload_id = None
+    if request.direct:
+        if not upload_storage.supports_presign:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="El almacenamiento configurado no admite subidas directas"
+            )
+        if chunk_size < MIN_DIRECT_CHUNK_SIZE or math.ceil(request.total_size / chunk_size) > MAX_DIRECT_PARTS:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Las subidas directas requieren chunk_size >= {MIN_DIRECT_CHUNK_SIZE} bytes "
+                       f"y como máximo {MAX_DIRECT_PARTS} bloques"
+            )
+        storage_upload_id = upload_storage.create_multipart(stored_filename)
+    else:
+        # Reservar el archivo completo: cada bloque se escribe en su offset final
+        with open(UPLOAD_DIR / stored_filename, "wb") as f:
+            f.truncate(request.total_size)
+
+    session = UploadSession(
+        id=str(uuid.uuid4()),
+        user_id=current_user.id,
+        filename=request.filename,
+        stored_filename=stored_filename,
+        storage_upload_id=storage_upload_id,
+        total_size=request.total_size,
+        chunk_size=chunk_size,
+        status=UploadStatus.pending
+    )
+    db.add(session)
+    db.commit()
+    db.refresh(session)
+    return session_state(session)
+
+@router.put("/uploads/{upload_id}/chunks/{index}")
+async def upload_chunk(
+    upload_id: str,
+    index: int,
+    request: Request,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Subir un bloque (en cualquier orden; reenviar un bloque lo sobrescribe)"""
+    session = await load_session(db, upload_id, current_user.id)
+    if session.status != UploadStatus.pending:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="La sesión de subida ya está finalizada"
+        )
+    if session.storage_upload_id:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Subida directa: enviar el bloque a su URL firmada"
+        )
+    check_chunk_index(session, index)
+    
+    # No retener una conexión del pool durante la transferencia
+    file_path = UPLOAD_DIR / session.stored_filename
+    offset = index * session.chunk_size
+    expected = expected_chunk_size(session, index)
+    await db.rollback()
+
+    data = bytearray()
+    async for piece in request.stream():
+        data.extend(piece)
+        if len(data) > expected:
+            raise HTTPException(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                detail=f"El bloque {index} debe tener {expected} bytes"
+            )
+    if len(data) != expected:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"El bloque {index} debe tener {expected} bytes"
+        )
+
+    await run_in_threadpool(write_at, file_path, offset, data)
+    await run_in_threadpool(get_hasher(upload_id).feed, index, data)
+
+    try:
+        await db.merge(UploadChunk(session_id=upload_id, index=index, size=expected))
+        await db.execute(update(UploadSession).where(UploadSession.id == upload_id).values(updated_at=func.now()))
+        await db.commit()
+    except IntegrityError:
+        # Mismo bloque registrado en paralelo por otra petición
+        await db.rollback()
+
+    return {"upload_id": upload_id, "index": index, "size": expected}
+
+@router.get("/uploads/{upload_id}/chunks/{index}/url")
+def get_chunk_upload_url(
+    upload_id: str,
+    index: int,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """URL firmada para subir un bloque directamente al almacenamiento (PUT)"""
+    session = get_session(db, upload_id, current_user.id)
+    if session.status != UploadStatus.pending or not session.storage_upload_id:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="La sesión no es una subida directa pendiente"
+        )
+    check_chunk_index(session, index)
+    response = {
+        "upload_id": upload_id,
+        "index": index,
+        "size": expected_chunk_size(session, index),
+        "method": "PUT",
+        "url": upload_storage.presign_part(session.stored_filename, session.storage_upload_id,
+                                           index + 1, PRESIGN_EXPIRES),
+        "expires_in": PRESIGN_EXPIRES,
+    }
+    # Pedir la URL de un bloque cuenta como actividad de la sesión
+    session.updated_at = func.now()
+    db.commit()
+    return response
+
+@router.get("/uploads/{upload_id}")
+def get_upload_session(
+    upload_id: str,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Consultar los bloques recibidos y pendientes de una sesión"""
+    return session_state(get_session(db, upload_id, current_user.id))
+
+@router.post("/uploads/{upload_id}/complete")
+async def complete_upload_session(
+    upload_id: str,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Finalizar la subida: verificar bloques, completar el hash y crear el Job"""
+    session = await load_session(db, upload_id, current_user.id, with_chunks=True)
+    # Con subidas directas el estado consulta las partes al almacenamiento
+    state = await run_in_threadpool(session_state, session)
+    if session.status == UploadStatus.completed:
+        return state
+
+    if state["missing_chunks"]:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Faltan {len(state['missing_chunks'])} bloques"
+        )
+
+    if session.storage_upload_id:
+        return await complete_direct_upload(db, session, current_user)
+
+    # Los bloques ya están en su sitio: solo se lee del disco la parte no hasheada
+    file_path = UPLOAD_DIR / session.stored_filename
+    file_sha256 = await run_in_threadpool(get_hasher(upload_id).finish, file_path)
+
+    blob_key = blob_filename(file_sha256, session.filename)
+    deduplicated = await run_in_threadpool(upload_storage.exists, blob_key)
+    job = Job(
+        user_id=current_user.id,
+        input_key=blob_key,
+        input_sha256=file_sha256,
+        status=JobStatus.queued
+    )
+    db.add(job)
+    await db.commit()
+
+    # El job se confirma antes de guardar el blob (ver ``release_blob``);
+    # con el backend de archivos es un renombrado (sin copia)
+    try:
+        await run_in_threadpool(store_blob, file_path, blob_key)
+    except Exception as e:
+        # La sesión sigue pendiente: se puede reintentar con el hash desde disco
+        discard_hasher(upload_id)
+        await discard_job(db, job)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error al guardar archivo: {str(e)}"
+        )
+
+    session.status = UploadStatus.completed
+    session.job_id = job.id
+    session.chunks.clear()
+    await db.commit()
+    discard_hasher(upload_id)
+    return upload_response(job, session.filename, session.total_size, deduplicated)
+
+async def complete_direct_upload(db: AsyncSession, session: UploadSession, current_user: User) -> dict:
+    """
+    Ensamblar una subida directa en el almacenamiento y crear el Job
+    
+    Los bytes no pasan por la API, así que no hay hash de contenido: el
+    archivo conserva su nombre único y el worker calcula el hash al procesarlo.
+    """
+    def assemble():
+        parts = upload_storage.list_parts(session.stored_filename, session.storage_upload_id)
+        upload_storage.complete_multipart(
+            session.stored_filename, session.storage_upload_id,
+            [(number, parts[number][1]) for number in range(1, total_chunks(session) + 1)]
+        )
+
+    await run_in_threadpool(assemble)
+    job = Job(
+        user_id=current_user.id,
+        input_key=session.stored_filename,
+        status=JobStatus.queued
+    )
+    db.add(job)
+    await db.flush()
+    session.status = UploadStatus.completed
+    session.job_id = job.id
+    await db.commit()
+    return upload_response(job, session.filename, session.total_size, False)
+
+@router.delete("/uploads/{upload_id}")
+def abort_upload_session(
+    upload_id: str,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Cancelar una sesión pendiente y borrar los datos recibidos"""
+    session = get_session(db, upload_id, current_user.id)
+    if session.status != UploadStatus.pending:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="La sesión de subida ya está finalizada"
+        )
+    discard_session_data(session)
+    db.delete(session)
+    db.commit()
+    return {"message": "Sesión de subida cancelada"}
@@ -1,21 +1,83 @@
 from fastapi import APIRouter, Depends, UploadFile, File, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from pydantic import BaseModel
+import hashlib
+import logging
 import os
+import re
 import uuid
 from pathlib import Path
+from typing import BinaryIO, Tuple
 
-from database import get_db
-from models import User
+from database import get_async_db
+from models import Job, User
+from enums import JobStatus
 from auth import get_current_user
+from storage import UPLOAD_DIR, PRESIGN_EXPIRES, upload_storage
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
 # Configuración de archivos
-UPLOAD_DIR = Path("uploads")
-UPLOAD_DIR.mkdir(exist_ok=True)
-
 ALLOWED_EXTENSIONS = {".ply", ".las", ".laz", ".pcd", ".xyz"}
-MAX_FILE_SIZE = 100 * 1024 * 1024  # 100MB
+MAX_FILE_SIZE = int(os.getenv("MAX_FILE_SIZE_MB", "100")) * 1024 * 1024  # 100MB
+UPLOAD_CHUNK_SIZE = 1024 * 1024  # 1MB por bloque
+# Margen para cabeceras y separadores multipart sobre el tamaño del archivo
+MULTIPART_OVERHEAD = 64 * 1024
+# Alcance de la subida por hash: "user" (solo contenidos ya subidos por el
+# propio usuario) o "global" (cualquier contenido almacenado)
+UPLOAD_DEDUP_SCOPE = os.getenv("UPLOAD_DEDUP_SCOPE", "user")
+
+SHA256_PATTERN = re.compile(r"^[0-9a-f]{64}$")
+
+class FileTooLargeError(Exception):
+    """El archivo supera MAX_FILE_SIZE"""
+
+class UploadSizeLimitMiddleware:
+    """
+    Rechaza con 413 las subidas cuyo cuerpo supera el límite
+
+    Comprueba Content-Length antes de leer nada y cuenta los bytes recibidos
+    (también con transfer-encoding chunked), de modo que la petición se corta
+    en cuanto se cruza el límite, sin esperar a que termine el multipart.
+    """
+    
+    def __init__(self, app, path: str = "/api/upload"):
+        self.app = app
+        self.path = path
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] != self.path:
+            await self.app(scope, receive, send)
+            return
+        
+        max_body = MAX_FILE_SIZE + MULTIPART_OVERHEAD
+        too_large = HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Archivo demasiado grande. Tamaño máximo: {MAX_FILE_SIZE // (1024*1024)}MB"
+        )
+        content_length = dict(scope["headers"]).get(b"content-length")
+        if content_length is not None and int(content_length) > max_body:
+            from fastapi.responses import JSONResponse
+            response = JSONResponse(status_code=too_large.status_code, content={"detail": too_large.detail})
+            await response(scope, receive, send)
+            return
+        
+        received = 0
+        
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > max_body:
+                    raise too_large
+            return message
+        
+        await self.app(scope, limited_receive, send)
 
 def validate_file(file: UploadFile) -> bool:
     """Validar archivo de entrada"""
@@ -29,20 +91,132 @@ def validate_file(file: UploadFile) -> bool:
     
     return True
 
+def write_upload(source: BinaryIO, destination: Path, max_size: int) -> Tuple[int, str]:
+    """
+    Copiar la subida a disco por bloques calculando su SHA-256 en la misma pasada
+    
+    Se ejecuta en el threadpool para no bloquear el event loop.
+    
+    Returns:
+        (tamaño en bytes, sha256 hexadecimal)
+    
+    Raises:
+        FileTooLargeError: si se supera ``max_size`` (el archivo parcial se borra)
+    """
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with open(destination, "wb") as buffer:
+            while True:
+                chunk = source.read(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_size:
+                    raise FileTooLargeError()
+                digest.update(chunk)
+                buffer.write(chunk)
+    except BaseException:
+        destination.unlink(missing_ok=True)
+        raise
+    return size, digest.hexdigest()
+
 def generate_unique_filename(original_filename: str) -> str:
     """Generar nombre único para el archivo"""
     file_ext = Path(original_filename).suffix
     unique_id = str(uuid.uuid4())
     return f"{unique_id}{file_ext}"
 
+def blob_filename(sha256: str, original_filename: str) -> str:
+    """Nombre del blob direccionado por contenido (hash + extensión)"""
+    return f"{sha256}{Path(original_filename).suffix.lower()}"
+
+async def count_blob_references(db: AsyncSession, blob_key: str) -> int:
+    """Número de jobs que referencian el blob"""
+    result = await db.execute(select(func.count()).select_from(Job).where(Job.input_key == blob_key))
+    return result.scalar_one()
+
+def store_blob(source: Path, blob_key: str):
+    """
+    Mover el archivo recibido al almacenamiento con su nombre por contenido
+    
+    Se llama después de confirmar el Job que lo referencia. Si el blob ya
+    existe se sobrescribe con el mismo contenido, lo que además lo restaura
+    si una eliminación concurrente lo acababa de retirar.
+    """
+    upload_storage.put_file(blob_key, source, move=True)
+
+async def release_blob(db: AsyncSession, blob_key: str) -> bool:
+    """
+    Borrar el blob si ya no lo referencia ningún job
+    
+    Con referencias el blob no se toca. Sin ellas se retira (renombrado
+    atómico) y se vuelven a contar: una subida concurrente o confirma su job
+    antes del recuento (y el blob se restaura) o ya no encuentra el blob y
+    sube los bytes.
+    
+    Returns:
+        True si el blob se eliminó
+    """
+    if not blob_key:
+        return False
+    # Ni un instante sin blob para los workers y descargas que lo leen
+    if await count_blob_references(db, blob_key) > 0:
+        return False
+    tombstone = f".{blob_key}.{uuid.uuid4().hex}.deleted"
+    try:
+        await run_in_threadpool(upload_storage.rename, blob_key, tombstone)
+    except FileNotFoundError:
+        return False
+    
+    if await count_blob_references(db, blob_key) > 0:
+        if await run_in_threadpool(upload_storage.exists, blob_key):
+            await run_in_threadpool(upload_storage.delete, tombstone)
+        else:
+            await run_in_threadpool(upload_storage.rename, tombstone, blob_key)
+        return False
+    
+    await run_in_threadpool(upload_storage.delete, tombstone)
+    logger.info(f"Blob {blob_key} eliminado (sin referencias)")
+    return True
+
+async def discard_job(db: AsyncSession, job: Job):
+    """Eliminar un job ya confirmado cuyo blob no se pudo guardar"""
+    try:
+        await db.rollback()
+        await db.delete(job)
+        await db.commit()
+    except Exception as e:
+        logger.error(f"No se pudo eliminar el job {job.id} sin blob: {str(e)}")
+
+def upload_response(job: Job, filename: str, file_size: int, deduplicated: bool) -> dict:
+    """Respuesta común de las subidas"""
+    return {
+        "message": "Archivo subido exitosamente",
+        "filename": filename,
+        "unique_filename": job.input_key,
+        "job_id": job.id,
+        "file_size": file_size,
+        "sha256": job.input_sha256,
+        "deduplicated": deduplicated
+    }
+
+class HashUploadRequest(BaseModel):
+    sha256: str
+    filename: str
+
 @router.post("/upload")
 async def upload_file(
     file: UploadFile = File(...),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Subir archivo de nube de puntos"""
     
+    # No retener una conexión del pool durante la transferencia
+    user_id = current_user.id
+    await db.rollback()
+    
     # Validar archivo
     if not validate_file(file):
         raise HTTPException(
@@ -50,73 +224,138 @@ async def upload_file(
             detail=f"Tipo de archivo no permitido. Extensiones permitidas: {', '.join(ALLOWED_EXTENSIONS)}"
         )
     
-    # Verificar tamaño del archivo
-    file_content = await file.read()
-    if len(file_content) > MAX_FILE_SIZE:
+    # Archivo temporal hasta conocer el hash del contenido
+    part_path = UPLOAD_DIR / f".{uuid.uuid4().hex}.part"
+    
+    # Copiar a disco por bloques (fuera del event loop) verificando el tamaño
+    try:
+        file_size, file_sha256 = await run_in_threadpool(write_upload, file.file, part_path, MAX_FILE_SIZE)
+    except FileTooLargeError:
         raise HTTPException(
             status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
             detail=f"Archivo demasiado grande. Tamaño máximo: {MAX_FILE_SIZE // (1024*1024)}MB"
         )
     
-    # Generar nombre único
-    unique_filename = generate_unique_filename(file.filename)
-    file_path = UPLOAD_DIR / unique_filename
+    blob_key = blob_filename(file_sha256, file.filename)
+    job = None
     
-    # Guardar archivo
     try:
-        with open(file_path, "wb") as buffer:
-            buffer.write(file_content)
-        
+        deduplicated = await run_in_threadpool(upload_storage.exists, blob_key)
         # Crear entrada en la base de datos (Job)
-        from models import Job, JobStatus
         job = Job(
-            user_id=current_user.id,
-            input_key=unique_filename,
+            user_id=user_id,
+            input_key=blob_key,
+            input_sha256=file_sha256,
             status=JobStatus.queued
         )
         db.add(job)
-        db.commit()
-        db.refresh(job)
+        await db.commit()
         
-        return {
-            "message": "Archivo subido exitosamente",
-            "filename": file.filename,
-            "unique_filename": unique_filename,
-            "job_id": job.id,
-            "file_size": len(file_content),
-            "file_path": str(file_path)
-        }
+        await run_in_threadpool(store_blob, part_path, blob_key)
+        return upload_response(job, file.filename, file_size, deduplicated)
         
     except Exception as e:
         # Limpiar archivo si hay error
-        if file_path.exists():
-            file_path.unlink()
+        part_path.unlink(missing_ok=True)
+        # Sin blob guardado el job no tiene entrada
+        if job is not None and job.id is not None:
+            await discard_job(db, job)
         
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error al guardar archivo: {str(e)}"
         )
 
-@router.get("/files/{filename}")
-async def download_file(
-    filename: str,
-    current_user: User = Depends(get_current_user)
+@router.post("/upload/by-hash")
+async def upload_by_hash(
+    request: HashUploadRequest,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Descargar archivo"""
-    file_path = UPLOAD_DIR / filename
+    """
+    Crear un job a partir de un contenido ya almacenado, sin transferir bytes
     
-    if not file_path.exists():
+    Responde 404 si el contenido no existe (o no es accesible con el alcance
+    configurado); el cliente debe entonces subir el archivo normalmente.
+    """
+    sha256 = request.sha256.lower()
+    if not SHA256_PATTERN.match(sha256):
         raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Archivo no encontrado"
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="sha256 debe tener 64 caracteres hexadecimales"
+        )
+    if Path(request.filename).suffix.lower() not in ALLOWED_EXTENSIONS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Tipo de archivo no permitido. Extensiones permitidas: {', '.join(ALLOWED_EXTENSIONS)}"
         )
     
-    # Verificar que el usuario tiene acceso al archivo
-    # (implementar lógica de verificación si es necesario)
+    blob_key = blob_filename(sha256, request.filename)
+    not_found = HTTPException(
+        status_code=status.HTTP_404_NOT_FOUND,
+        detail="Contenido no encontrado; subir el archivo"
+    )
+    if UPLOAD_DEDUP_SCOPE != "global":
+        result = await db.execute(select(Job.id).where(
+            Job.user_id == current_user.id, Job.input_key == blob_key
+        ).limit(1))
+        if result.first() is None:
+            raise not_found
+    
+    job = Job(
+        user_id=current_user.id,
+        input_key=blob_key,
+        input_sha256=sha256,
+        status=JobStatus.queued
+    )
+    db.add(job)
+    await db.commit()
+    
+    # Comprobar después de confirmar el job (ver release_blob)
+    try:
+        size = await run_in_threadpool(upload_storage.size, blob_key)
+    except FileNotFoundError:
+        await db.delete(job)
+        await db.commit()
+        raise not_found
+    
+    return upload_response(job, request.filename, size, True)
+
+async def owns_file(db: AsyncSession, user_id: int, filename: str) -> bool:
+    """
+    El usuario tiene un job que referencia el archivo
+    
+    Los blobs se nombran por su hash: conocer el nombre no da acceso.
+    """
+    result = await db.execute(select(Job.id).where(
+        Job.user_id == user_id, Job.input_key == filename
+    ).limit(1))
+    return result.first() is not None
+
+@router.get("/files/{filename}")
+async def download_file(
+    filename: str,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Descargar archivo (con S3, redirección a una URL firmada)"""
+    not_found = HTTPException(
+        status_code=status.HTTP_404_NOT_FOUND,
+        detail="Archivo no encontrado"
+    )
+    if not await owns_file(db, current_user.id, filename):
+        raise not_found
+    await db.rollback()
+    if not await run_in_threadpool(upload_storage.exists, filename):
+        raise not_found
+    
+    if upload_storage.supports_presign:
+        from fastapi.responses import RedirectResponse
+        return RedirectResponse(upload_storage.presign_get(filename, PRESIGN_EXPIRES, filename))
     
     from fastapi.responses import FileResponse
     return FileResponse(
-        path=str(file_path),
+        path=str(upload_storage.local_path(filename)),
         filename=filename,
         media_type='application/octet-stream'
     )
@@ -124,22 +363,32 @@ async def download_file(
 @router.delete("/files/{filename}")
 async def delete_file(
     filename: str,
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Eliminar archivo"""
-    file_path = UPLOAD_DIR / filename
+    """
+    Eliminar archivo y los jobs del usuario que lo usan
     
-    if not file_path.exists():
+    El blob se borra solo si ya no lo referencia ningún job (de otro usuario
+    con el mismo contenido); para quien lo elimina deja de ser accesible.
+    """
+    result = await db.execute(select(Job).where(Job.user_id == current_user.id, Job.input_key == filename))
+    jobs = result.scalars().all()
+    if not jobs:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Archivo no encontrado"
         )
     
     try:
-        file_path.unlink()
-        return {"message": "Archivo eliminado exitosamente"}
+        for job in jobs:
+            await db.delete(job)
+        await db.commit()
+        # Retirada con tombstone: no compite con /upload/by-hash
+        await release_blob(db, filename)
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error al eliminar archivo: {str(e)}"
         )
+    return {"message": "Archivo eliminado exitosamente", "deleted_jobs": len(jobs)}
@@ -30,6 +30,7 @@ class JobResponse(BaseModel):
     id: int
     user_id: int
     input_key: Optional[str]
+    input_sha256: Optional[str] = None
     output_key: Optional[str]
     status: JobStatus
     progress: int
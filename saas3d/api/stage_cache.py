@@ -0,0 +1,95 @@
+"""
+Caché de etapas intermedias del preprocesado
+
+Cada etapa (carga + downsampling, eliminación de outliers, normales) guarda
+sus arrays con una clave encadenada: la clave de la etapa anterior (o el hash
+del archivo de entrada) más los parámetros de la propia etapa. Un trabajo
+nuevo reanuda desde la etapa más profunda cacheada, de modo que cambiar solo
+los parámetros de reconstrucción no repite el preprocesado. Las entradas
+usan el formato .bvb, así que reanudar una etapa solo mapea el archivo.
+"""
+
+import hashlib
+import logging
+import os
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from processing.point_buffer import read_buffer, write_buffer
+from result_cache import canonical_params, evict_lru
+from storage import OUTPUT_DIR
+
+logger = logging.getLogger(__name__)
+
+STAGE_CACHE_DIR = Path(os.getenv("STAGE_CACHE_DIR", str(OUTPUT_DIR / "stages")))
+STAGE_CACHE_MAX_BYTES = int(os.getenv("STAGE_CACHE_MAX_MB", "20480")) * 1024 * 1024
+
+# Etapas en orden de ejecución
+STAGES = ('load', 'outliers', 'normals')
+
+
+class StageCache:
+    """Caché LRU de los arrays de salida de cada etapa"""
+
+    def __init__(self, cache_dir: Path = STAGE_CACHE_DIR, max_bytes: int = STAGE_CACHE_MAX_BYTES):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+
+    @staticmethod
+    def chain_keys(input_hash: str, stage_params: List[Dict[str, Any]]) -> List[str]:
+        """
+        Claves encadenadas de las etapas
+
+        Args:
+            input_hash: Hash del archivo de entrada
+            stage_params: Parámetros de cada etapa, en orden
+
+        Returns:
+            Una clave por etapa; cada una depende de todos los parámetros anteriores
+        """
+        keys = []
+        parent = input_hash
+        for params in stage_params:
+            parent = hashlib.sha256(f"{parent}:{canonical_params(params)}".encode()).hexdigest()
+            keys.append(parent)
+        return keys
+
+    def _entry_path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.bvb"
+
+    def load(self, key: str) -> Optional[Dict[str, np.ndarray]]:
+        """Mapear los arrays de una etapa (vistas sin copia); None si no está cacheada"""
+        path = self._entry_path(key)
+        if not path.exists():
+            return None
+        try:
+            arrays, _ = read_buffer(path)
+            os.utime(path)
+            return arrays
+        except (OSError, ValueError) as e:
+            logger.warning(f"Entrada de caché de etapas ilegible {path.name}: {str(e)}")
+            return None
+
+    def save(self, key: str, arrays: Dict[str, Optional[np.ndarray]]) -> Path:
+        """Guardar los arrays de una etapa (escritura atómica) y aplicar la expulsión LRU"""
+        path = write_buffer(self._entry_path(key), arrays)
+        evict_lru(self.cache_dir, self.max_bytes, keep=path)
+        return path
+
+    def resume(self, keys: List[str]) -> Tuple[int, Optional[Dict[str, np.ndarray]]]:
+        """
+        Buscar la etapa más profunda cacheada
+
+        Returns:
+            (índice de la etapa, arrays) o (-1, None) si no hay ninguna
+        """
+        for depth in reversed(range(len(keys))):
+            arrays = self.load(keys[depth])
+            if arrays is not None:
+                return depth, arrays
+        return -1, None
+
+
+stage_cache = StageCache()
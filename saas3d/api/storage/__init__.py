@@ -0,0 +1,57 @@
+"""
+Almacenamiento de archivos de entrada y resultados
+
+``STORAGE_BACKEND`` elige el backend:
+
+- ``filesystem`` (por defecto): directorios locales ``UPLOAD_DIR`` y
+  ``OUTPUT_DIR``. API y workers deben compartirlos (mismo host o NFS).
+- ``s3``: los buckets S3/MinIO ``S3_BUCKET_INPUT`` y ``S3_BUCKET_OUTPUT``.
+  Los workers descargan las entradas y suben los resultados, y los clientes
+  pueden subir y descargar directamente con URLs firmadas.
+
+En ambos casos ``UPLOAD_DIR`` y ``OUTPUT_DIR`` siguen siendo directorios
+locales para archivos temporales y cachés.
+"""
+
+import os
+from pathlib import Path
+
+from storage.base import Storage
+from storage.filesystem import FilesystemStorage, link_or_copy
+
+API_DIR = Path(__file__).resolve().parent.parent
+
+# Rutas relativas al directorio de la API, no al directorio de trabajo
+UPLOAD_DIR = Path(os.getenv("UPLOAD_DIRECTORY", str(API_DIR / "uploads")))
+OUTPUT_DIR = Path(os.getenv("OUTPUT_DIRECTORY", str(API_DIR / "outputs")))
+
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "filesystem")
+S3_BUCKET_INPUT = os.getenv("S3_BUCKET_INPUT", "saas3d-input")
+S3_BUCKET_OUTPUT = os.getenv("S3_BUCKET_OUTPUT", "saas3d-output")
+# Sin credenciales se usa la cadena por defecto de boto3 (AWS_*, rol de IAM...)
+S3_ACCESS_KEY = os.getenv("S3_ACCESS_KEY") or None
+S3_SECRET_KEY = os.getenv("S3_SECRET_KEY") or None
+S3_ENDPOINT_URL = os.getenv("S3_ENDPOINT_URL") or None
+S3_PUBLIC_ENDPOINT_URL = os.getenv("S3_PUBLIC_ENDPOINT_URL") or None
+S3_REGION = os.getenv("S3_REGION", "us-east-1")
+# Validez de las URLs firmadas
+PRESIGN_EXPIRES = int(os.getenv("PRESIGN_EXPIRES_SECONDS", "3600"))
+
+UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
+OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
+
+
+def get_storage(area: str) -> Storage:
+    """Backend configurado para un área (``uploads`` u ``outputs``)"""
+    if STORAGE_BACKEND == "s3":
+        from storage.s3 import S3Storage
+        bucket = S3_BUCKET_INPUT if area == "uploads" else S3_BUCKET_OUTPUT
+        return S3Storage(bucket, endpoint_url=S3_ENDPOINT_URL, public_endpoint_url=S3_PUBLIC_ENDPOINT_URL,
+                         region=S3_REGION, access_key=S3_ACCESS_KEY, secret_key=S3_SECRET_KEY)
+    if STORAGE_BACKEND == "filesystem":
+        return FilesystemStorage(UPLOAD_DIR if area == "uploads" else OUTPUT_DIR)
+    raise ValueError(f"STORAGE_BACKEND no soportado: {STORAGE_BACKEND}")
+
+
+upload_storage = get_storage("uploads")
+output_storage = get_storage("outputs")
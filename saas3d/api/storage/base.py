@@ -0,0 +1,81 @@
+"""
+Interfaz común de los backends de almacenamiento
+
+Las claves son nombres relativos dentro de un área (``uploads`` u
+``outputs``). Un objeto inexistente se señala con ``FileNotFoundError`` en
+todos los backends.
+"""
+
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+
+class Storage(ABC):
+    """Almacenamiento de objetos por clave"""
+
+    # El backend puede firmar URLs para que el cliente mueva los bytes directamente
+    supports_presign = False
+
+    @abstractmethod
+    def exists(self, key: str) -> bool:
+        """Indica si el objeto existe"""
+
+    @abstractmethod
+    def size(self, key: str) -> int:
+        """Tamaño del objeto en bytes"""
+
+    @abstractmethod
+    def put_file(self, key: str, path: Path, move: bool = False):
+        """Guardar un archivo local como objeto (``move`` permite consumir el original)"""
+
+    @abstractmethod
+    def fetch(self, key: str, destination: Path):
+        """Descargar el objeto a un archivo local (escritura atómica)"""
+
+    @abstractmethod
+    def read_range(self, key: str, start: int, end: int) -> bytes:
+        """Leer los bytes [start, end] (inclusivos) del objeto"""
+
+    @abstractmethod
+    def delete(self, key: str):
+        """Borrar el objeto (sin error si no existe)"""
+
+    @abstractmethod
+    def rename(self, source: str, destination: str):
+        """Renombrar un objeto, sobrescribiendo el destino"""
+
+    def local_path(self, key: str) -> Optional[Path]:
+        """Ruta local del objeto si el backend es un sistema de archivos"""
+        return None
+
+    # Subida multiparte
+    @abstractmethod
+    def create_multipart(self, key: str) -> str:
+        """Iniciar una subida multiparte; devuelve su identificador"""
+
+    @abstractmethod
+    def upload_part(self, key: str, upload_id: str, part_number: int, data: bytes) -> str:
+        """Subir una parte (numeradas desde 1); devuelve su ETag"""
+
+    @abstractmethod
+    def list_parts(self, key: str, upload_id: str) -> Dict[int, Tuple[int, str]]:
+        """Partes recibidas: número -> (tamaño, ETag)"""
+
+    @abstractmethod
+    def complete_multipart(self, key: str, upload_id: str, parts: List[Tuple[int, str]]):
+        """Ensamblar el objeto a partir de las partes (número, ETag) en orden"""
+
+    @abstractmethod
+    def abort_multipart(self, key: str, upload_id: str):
+        """Cancelar la subida y liberar las partes recibidas"""
+
+    # URLs firmadas (solo backends con supports_presign)
+    def presign_get(self, key: str, expires: int, filename: Optional[str] = None) -> str:
+        raise NotImplementedError("El backend no admite URLs firmadas")
+
+    def presign_put(self, key: str, expires: int) -> str:
+        raise NotImplementedError("El backend no admite URLs firmadas")
+
+    def presign_part(self, key: str, upload_id: str, part_number: int, expires: int) -> str:
+        raise NotImplementedError("El backend no admite URLs firmadas")
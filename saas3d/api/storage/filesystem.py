@@ -0,0 +1,129 @@
+"""
+Backend de almacenamiento sobre un directorio local (o compartido por NFS)
+"""
+
+import hashlib
+import os
+import shutil
+import uuid
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from storage.base import Storage
+
+COPY_CHUNK_SIZE = 8 * 1024 * 1024
+
+
+def link_or_copy(src: Path, dst: Path):
+    """Enlace duro si es posible (sin copiar bytes), copia en otro caso"""
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    tmp = dst.with_name(f".{dst.name}.tmp")
+    if tmp.exists():
+        tmp.unlink()
+    try:
+        os.link(src, tmp)
+    except OSError:
+        shutil.copyfile(src, tmp)
+    os.replace(tmp, dst)
+
+
+def copy_file(src: Path, dst: Path):
+    """Copia atómica (temporal + renombrado) en un inodo propio"""
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    tmp = dst.with_name(f".{dst.name}.{uuid.uuid4().hex}.tmp")
+    try:
+        shutil.copyfile(src, tmp)
+        os.replace(tmp, dst)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+
+
+class FilesystemStorage(Storage):
+    """Objetos como archivos bajo ``root``; las partes multiparte en ``root/.multipart``"""
+
+    def __init__(self, root: Path):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, key: str) -> Path:
+        path = (self.root / key).resolve()
+        if self.root.resolve() not in path.parents:
+            raise ValueError(f"Clave fuera del almacenamiento: {key}")
+        return path
+
+    def _parts_dir(self, upload_id: str) -> Path:
+        return self.root / ".multipart" / upload_id
+
+    def exists(self, key: str) -> bool:
+        return self._path(key).is_file()
+
+    def size(self, key: str) -> int:
+        return self._path(key).stat().st_size
+
+    def local_path(self, key: str) -> Optional[Path]:
+        return self._path(key)
+
+    def put_file(self, key: str, path: Path, move: bool = False):
+        target = self._path(key)
+        if Path(path).resolve() == target:
+            return
+        target.parent.mkdir(parents=True, exist_ok=True)
+        if move:
+            # Renombrado si es el mismo sistema de archivos; si no, copia y borrado
+            shutil.move(str(path), target)
+        else:
+            link_or_copy(Path(path), target)
+
+    def fetch(self, key: str, destination: Path):
+        link_or_copy(self._path(key), Path(destination))
+
+    def read_range(self, key: str, start: int, end: int) -> bytes:
+        with open(self._path(key), "rb") as f:
+            f.seek(start)
+            return f.read(end - start + 1)
+
+    def delete(self, key: str):
+        self._path(key).unlink(missing_ok=True)
+
+    def rename(self, source: str, destination: str):
+        os.replace(self._path(source), self._path(destination))
+
+    def create_multipart(self, key: str) -> str:
+        upload_id = uuid.uuid4().hex
+        self._parts_dir(upload_id).mkdir(parents=True)
+        return upload_id
+
+    def upload_part(self, key: str, upload_id: str, part_number: int, data: bytes) -> str:
+        parts_dir = self._parts_dir(upload_id)
+        if not parts_dir.is_dir():
+            raise FileNotFoundError(f"Subida multiparte no encontrada: {upload_id}")
+        tmp = parts_dir / f".{part_number}.{uuid.uuid4().hex}"
+        tmp.write_bytes(data)
+        os.replace(tmp, parts_dir / str(part_number))
+        return hashlib.md5(data).hexdigest()
+
+    def list_parts(self, key: str, upload_id: str) -> Dict[int, Tuple[int, str]]:
+        parts_dir = self._parts_dir(upload_id)
+        if not parts_dir.is_dir():
+            raise FileNotFoundError(f"Subida multiparte no encontrada: {upload_id}")
+        parts = {}
+        for path in parts_dir.iterdir():
+            if path.name.isdigit():
+                # El ETag solo se calcula al subir; aquí basta con el tamaño
+                parts[int(path.name)] = (path.stat().st_size, "")
+        return parts
+
+    def complete_multipart(self, key: str, upload_id: str, parts: List[Tuple[int, str]]):
+        parts_dir = self._parts_dir(upload_id)
+        target = self._path(key)
+        tmp = target.with_name(f".{target.name}.{upload_id}.tmp")
+        with open(tmp, "wb") as out:
+            for part_number, _ in parts:
+                with open(parts_dir / str(part_number), "rb") as part:
+                    shutil.copyfileobj(part, out, COPY_CHUNK_SIZE)
+        os.replace(tmp, target)
+        shutil.rmtree(parts_dir, ignore_errors=True)
+
+    def abort_multipart(self, key: str, upload_id: str):
+        shutil.rmtree(self._parts_dir(upload_id), ignore_errors=True)
@@ -0,0 +1,156 @@
+"""
+Backend de almacenamiento S3 (AWS S3, MinIO o cualquier servicio compatible)
+
+Las URLs firmadas se generan con ``public_endpoint_url`` cuando el endpoint
+que usa la API (p. ej. ``http://minio:9000`` dentro de docker) no es el que
+alcanza el navegador.
+"""
+
+import os
+import uuid
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import boto3
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
+from botocore.exceptions import ClientError
+
+from storage.base import Storage
+
+# Umbral y tamaño de parte de las transferencias gestionadas (multiparte)
+TRANSFER_CONFIG = TransferConfig(multipart_threshold=64 * 1024 * 1024,
+                                 multipart_chunksize=64 * 1024 * 1024)
+NOT_FOUND_CODES = {"404", "NoSuchKey", "NotFound", "NoSuchUpload"}
+
+
+def _not_found(error: ClientError) -> bool:
+    return error.response.get("Error", {}).get("Code") in NOT_FOUND_CODES
+
+
+class S3Storage(Storage):
+    """Objetos en ``bucket`` bajo ``prefix``"""
+
+    supports_presign = True
+
+    def __init__(self, bucket: str, prefix: str = "", endpoint_url: Optional[str] = None,
+                 public_endpoint_url: Optional[str] = None, region: Optional[str] = None,
+                 access_key: Optional[str] = None, secret_key: Optional[str] = None):
+        self.bucket = bucket
+        self.prefix = prefix
+        options = {
+            "region_name": region,
+            "aws_access_key_id": access_key,
+            "aws_secret_access_key": secret_key,
+            "config": Config(signature_version="s3v4", s3={"addressing_style": "path"}),
+        }
+        self.client = boto3.client("s3", endpoint_url=endpoint_url, **options)
+        self.presign_client = self.client
+        if public_endpoint_url and public_endpoint_url != endpoint_url:
+            self.presign_client = boto3.client("s3", endpoint_url=public_endpoint_url, **options)
+
+    def _key(self, key: str) -> str:
+        return f"{self.prefix}{key}"
+
+    def _call(self, method, **kwargs):
+        """Llamada al cliente traduciendo 404 a FileNotFoundError"""
+        try:
+            return method(Bucket=self.bucket, **kwargs)
+        except ClientError as e:
+            if _not_found(e):
+                raise FileNotFoundError(kwargs.get("Key")) from e
+            raise
+
+    def exists(self, key: str) -> bool:
+        try:
+            self._call(self.client.head_object, Key=self._key(key))
+            return True
+        except FileNotFoundError:
+            return False
+
+    def size(self, key: str) -> int:
+        return self._call(self.client.head_object, Key=self._key(key))["ContentLength"]
+
+    def put_file(self, key: str, path: Path, move: bool = False):
+        self.client.upload_file(str(path), self.bucket, self._key(key), Config=TRANSFER_CONFIG)
+        if move:
+            Path(path).unlink()
+
+    def fetch(self, key: str, destination: Path):
+        destination = Path(destination)
+        destination.parent.mkdir(parents=True, exist_ok=True)
+        tmp = destination.with_name(f".{destination.name}.{uuid.uuid4().hex}.tmp")
+        try:
+            self.client.download_file(self.bucket, self._key(key), str(tmp), Config=TRANSFER_CONFIG)
+        except ClientError as e:
+            tmp.unlink(missing_ok=True)
+            if _not_found(e):
+                raise FileNotFoundError(key) from e
+            raise
+        os.replace(tmp, destination)
+
+    def read_range(self, key: str, start: int, end: int) -> bytes:
+        response = self._call(self.client.get_object, Key=self._key(key), Range=f"bytes={start}-{end}")
+        return response["Body"].read()
+
+    def delete(self, key: str):
+        self._call(self.client.delete_object, Key=self._key(key))
+
+    def rename(self, source: str, destination: str):
+        # S3 no tiene renombrado: copia en el servidor (multiparte si hace falta) y borrado
+        try:
+            self.client.copy({"Bucket": self.bucket, "Key": self._key(source)}, self.bucket,
+                             self._key(destination), Config=TRANSFER_CONFIG)
+        except ClientError as e:
+            if _not_found(e):
+                raise FileNotFoundError(source) from e
+            raise
+        self.delete(source)
+
+    def create_multipart(self, key: str) -> str:
+        return self._call(self.client.create_multipart_upload, Key=self._key(key))["UploadId"]
+
+    def upload_part(self, key: str, upload_id: str, part_number: int, data: bytes) -> str:
+        response = self._call(self.client.upload_part, Key=self._key(key), UploadId=upload_id,
+                              PartNumber=part_number, Body=data)
+        return response["ETag"]
+
+    def list_parts(self, key: str, upload_id: str) -> Dict[int, Tuple[int, str]]:
+        parts = {}
+        paginator = self.client.get_paginator("list_parts")
+        try:
+            for page in paginator.paginate(Bucket=self.bucket, Key=self._key(key), UploadId=upload_id):
+                for part in page.get("Parts", []):
+                    parts[part["PartNumber"]] = (part["Size"], part["ETag"])
+        except ClientError as e:
+            if _not_found(e):
+                raise FileNotFoundError(upload_id) from e
+            raise
+        return parts
+
+    def complete_multipart(self, key: str, upload_id: str, parts: List[Tuple[int, str]]):
+        self._call(self.client.complete_multipart_upload, Key=self._key(key), UploadId=upload_id,
+                   MultipartUpload={"Parts": [{"PartNumber": n, "ETag": etag} for n, etag in parts]})
+
+    def abort_multipart(self, key: str, upload_id: str):
+        try:
+            self._call(self.client.abort_multipart_upload, Key=self._key(key), UploadId=upload_id)
+        except FileNotFoundError:
+            pass
+
+    def presign_get(self, key: str, expires: int, filename: Optional[str] = None) -> str:
+        params = {"Bucket": self.bucket, "Key": self._key(key)}
+        if filename:
+            params["ResponseContentDisposition"] = f'attachment; filename="{filename}"'
+        return self.presign_client.generate_presigned_url("get_object", Params=params, ExpiresIn=expires)
+
+    def presign_put(self, key: str, expires: int) -> str:
+        return self.presign_client.generate_presigned_url(
+            "put_object", Params={"Bucket": self.bucket, "Key": self._key(key)}, ExpiresIn=expires)
+
+    def presign_part(self, key: str, upload_id: str, part_number: int, expires: int) -> str:
+        return self.presign_client.generate_presigned_url(
+            "upload_part",
+            Params={"Bucket": self.bucket, "Key": self._key(key), "UploadId": upload_id,
+                    "PartNumber": part_number},
+            ExpiresIn=expires)
@@ -0,0 +1,61 @@
+"""
+Configuración común de los tests de la API
+
+Base de datos SQLite de prueba con sesiones síncronas y asíncronas y un
+cliente de la app con las dependencias de base de datos sustituidas. Cada
+módulo crea y borra las tablas con su propio fixture ``setup_database``.
+"""
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
+from main import app
+from database import get_db, get_async_db
+from enums import JobStatus
+from models import Job
+
+# Base de datos de prueba
+SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
+engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+async_engine = create_async_engine("sqlite+aiosqlite:///./test.db", poolclass=NullPool)
+TestingAsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+def override_get_db():
+    try:
+        db = TestingSessionLocal()
+        yield db
+    finally:
+        db.close()
+
+async def override_get_async_db():
+    async with TestingAsyncSessionLocal() as db:
+        yield db
+
+client = TestClient(app)
+
+def seed_job(headers: dict, input_key: str) -> int:
+    """
+    Job en cola del usuario sobre ``input_key`` creado en la base de datos
+
+    ``POST /api/jobs`` solo acepta archivos que el usuario ya tiene.
+    """
+    user_id = client.get("/auth/me", headers=headers).json()["id"]
+    db = TestingSessionLocal()
+    try:
+        job = Job(user_id=user_id, input_key=input_key, status=JobStatus.queued)
+        db.add(job)
+        db.commit()
+        return job.id
+    finally:
+        db.close()
+
+@pytest.fixture(autouse=True)
+def database_overrides():
+    """Sustituir las dependencias de base de datos de la app en cada test"""
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_async_db] = override_get_async_db
+    yield
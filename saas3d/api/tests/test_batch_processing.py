@@ -0,0 +1,219 @@
+import pytest
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from database import Base
+from enums import JobStatus
+from models import Job
+from result_cache import ResultCache
+from job_events import MemoryJobEvents
+from storage.filesystem import FilesystemStorage
+import routes.processing as processing
+
+from tests.conftest import client, engine, TestingSessionLocal, seed_job
+
+@pytest.fixture
+def setup_database():
+    Base.metadata.create_all(bind=engine)
+    yield
+    Base.metadata.drop_all(bind=engine)
+
+@pytest.fixture
+def environment(setup_database, tmp_path, monkeypatch):
+    """Almacenamiento, caché y eventos temporales; grupo de Celery simulado"""
+    uploads = FilesystemStorage(tmp_path / "uploads")
+    outputs = FilesystemStorage(tmp_path / "outputs")
+    cache = ResultCache(tmp_path / "cache")
+    dispatched = []
+
+    def fake_dispatch(signatures):
+        dispatched.append(signatures)
+        return [f"task-{signature.kwargs['job_id']}" for signature in signatures]
+
+    monkeypatch.setattr(processing, "upload_storage", uploads)
+    monkeypatch.setattr(processing, "output_storage", outputs)
+    monkeypatch.setattr(processing, "result_cache", cache)
+    monkeypatch.setattr(processing, "job_events", MemoryJobEvents())
+    monkeypatch.setattr(processing, "dispatch_group", fake_dispatch)
+    return {"uploads": uploads, "outputs": outputs, "cache": cache, "dispatched": dispatched, "tmp": tmp_path}
+
+def login(email: str) -> dict:
+    client.post("/auth/register", json={"email": email, "password": "testpassword"})
+    response = client.post("/auth/login", json={"email": email, "password": "testpassword"})
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+def create_job(headers: dict, environment: dict, input_key: str, content: bytes = b"ply\n") -> int:
+    """Job en cola con su archivo de entrada"""
+    source = environment["tmp"] / f"source_{input_key}"
+    source.write_bytes(content)
+    environment["uploads"].put_file(input_key, source)
+    return seed_job(headers, input_key)
+
+def read_job(job_id: int) -> Job:
+    db = TestingSessionLocal()
+    try:
+        return db.get(Job, job_id)
+    finally:
+        db.close()
+
+def test_batch_dispatches_group_and_records_task_ids(environment):
+    """Test un lote se envía como un único grupo y guarda los task_id"""
+    headers = login("batch@example.com")
+    job_ids = [create_job(headers, environment, f"cloud_{i}.ply", f"ply {i}".encode()) for i in range(3)]
+
+    response = client.post("/api/process/batch", json={"job_ids": job_ids}, headers=headers)
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data["accepted"] == 3
+    assert data["rejected"] == 0
+    assert [item["job_id"] for item in data["results"]] == job_ids
+    assert all(item["status"] == "queued" for item in data["results"])
+    assert len(environment["dispatched"]) == 1
+    assert len(environment["dispatched"][0]) == 3
+    for job_id in job_ids:
+        stored = read_job(job_id)
+        assert stored.task_id == f"task-{job_id}"
+        assert stored.status == JobStatus.queued
+
+def test_batch_writes_task_ids_in_bulk(environment):
+    """Test los jobs se leen con un SELECT y los task_id se escriben en un executemany"""
+    headers = login("bulk@example.com")
+    job_ids = [create_job(headers, environment, f"bulk_{i}.ply", f"bulk {i}".encode()) for i in range(5)]
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if "jobs" in statement:
+            statements.append((statement.split()[0].upper(), executemany))
+
+    event.listen(Engine, "before_cursor_execute", record)
+    try:
+        response = client.post("/api/process/batch", json={"job_ids": job_ids}, headers=headers)
+    finally:
+        event.remove(Engine, "before_cursor_execute", record)
+
+    assert response.json()["accepted"] == 5
+    assert statements.count(("SELECT", False)) == 1
+    assert statements.count(("UPDATE", True)) == 1
+    assert not any(kind == "UPDATE" and not many for kind, many in statements)
+
+def test_batch_rejects_per_job(environment):
+    """Test jobs ajenos, inexistentes, ya iniciados o sin entrada se rechazan por separado"""
+    headers = login("owner@example.com")
+    other = login("other@example.com")
+    good = create_job(headers, environment, "good.ply")
+    foreign = create_job(other, environment, "foreign.ply")
+    started = create_job(headers, environment, "started.ply")
+    missing_input = seed_job(headers, "missing.ply")
+
+    db = TestingSessionLocal()
+    try:
+        db.get(Job, started).status = JobStatus.processing
+        db.commit()
+    finally:
+        db.close()
+
+    response = client.post(
+        "/api/process/batch",
+        json={"job_ids": [good, foreign, started, missing_input, 9999, good]},
+        headers=headers,
+    )
+
+    assert response.status_code == 200
+    data = response.json()
+    results = {item["job_id"]: item for item in data["results"]}
+    assert [item["job_id"] for item in data["results"]] == [good, foreign, started, missing_input, 9999]
+    assert data["accepted"] == 1
+    assert data["rejected"] == 4
+    assert results[good]["accepted"]
+    assert results[foreign]["status"] == "not_found"
+    assert results[9999]["status"] == "not_found"
+    assert results[started]["status"] == "processing"
+    assert results[missing_input]["message"] == "Archivo de entrada no encontrado"
+    assert read_job(foreign).task_id is None
+
+def test_batch_uses_result_cache(environment):
+    """Test un job con resultado en caché se completa sin enviar tarea"""
+    headers = login("cached@example.com")
+    job_id = create_job(headers, environment, "cached.ply", b"cached cloud")
+    params = processing.task_parameters(processing.ProcessingRequest())
+    input_hash = processing.file_sha256(environment["uploads"].local_path("cached.ply"))
+    mesh = environment["tmp"] / "mesh.ply"
+    mesh.write_bytes(b"mesh")
+    environment["cache"].store(environment["cache"].make_key(input_hash, params), mesh, "ply")
+
+    data = client.post("/api/process/batch", json={"job_ids": [job_id]}, headers=headers).json()
+
+    assert data["results"][0]["status"] == "completed"
+    assert environment["dispatched"] == []
+    stored = read_job(job_id)
+    assert stored.status == JobStatus.completed
+    assert stored.output_key == f"mesh_{job_id}.ply"
+    assert environment["outputs"].exists(f"mesh_{job_id}.ply")
+
+def test_batch_dispatch_failure_marks_jobs_failed(environment, monkeypatch):
+    """Test un fallo del broker marca los jobs del grupo como fallidos"""
+    headers = login("broker@example.com")
+    job_id = create_job(headers, environment, "broker.ply")
+
+    def broken(signatures):
+        raise ConnectionError("broker caído")
+
+    monkeypatch.setattr(processing, "dispatch_group", broken)
+    data = client.post("/api/process/batch", json={"job_ids": [job_id]}, headers=headers).json()
+
+    assert data["accepted"] == 0
+    assert data["results"][0]["status"] == "failed"
+    assert read_job(job_id).status == JobStatus.failed
+
+def test_batch_isolates_job_errors(environment, monkeypatch):
+    """Test un error al preparar o publicar un job solo rechaza ese job"""
+    headers = login("isolated@example.com")
+    good = create_job(headers, environment, "fine.ply", b"fine cloud")
+    broken = create_job(headers, environment, "broken.ply", b"broken cloud")
+    cached = create_job(headers, environment, "cached_fail.ply", b"cached fail")
+    params = processing.task_parameters(processing.ProcessingRequest())
+    input_hash = processing.file_sha256(environment["uploads"].local_path("cached_fail.ply"))
+    mesh = environment["tmp"] / "mesh.ply"
+    mesh.write_bytes(b"mesh")
+    environment["cache"].store(environment["cache"].make_key(input_hash, params), mesh, "ply")
+
+    plan_job = processing.plan_job
+
+    def failing_plan(job, task_params):
+        if job.input_key == "broken.ply":
+            raise OSError("almacenamiento no disponible")
+        return plan_job(job, task_params)
+
+    def failing_export(entry, storage, key):
+        raise OSError("disco lleno")
+
+    monkeypatch.setattr(processing, "plan_job", failing_plan)
+    monkeypatch.setattr(environment["cache"], "export", failing_export)
+    response = client.post("/api/process/batch", json={"job_ids": [good, broken, cached]}, headers=headers)
+
+    assert response.status_code == 200
+    data = response.json()
+    results = {item["job_id"]: item for item in data["results"]}
+    assert data["accepted"] == 1
+    assert results[good]["status"] == "queued"
+    assert not results[broken]["accepted"] and "almacenamiento" in results[broken]["message"]
+    assert not results[cached]["accepted"] and "disco lleno" in results[cached]["message"]
+    assert read_job(broken).status == JobStatus.queued
+    assert read_job(cached).status == JobStatus.queued
+
+def test_batch_validates_parameters(environment):
+    """Test parámetros no válidos y lotes vacíos"""
+    headers = login("invalid@example.com")
+    job_id = create_job(headers, environment, "invalid.ply")
+
+    response = client.post("/api/process/batch",
+                           json={"job_ids": [job_id], "parameters": {"algorithm": "marching"}}, headers=headers)
+    assert response.status_code == 400
+
+    response = client.post("/api/process/batch", json={"job_ids": []}, headers=headers)
+    assert response.status_code == 422
+
+def test_batch_requires_authentication():
+    """Test el lote requiere token"""
+    response = client.post("/api/process/batch", json={"job_ids": [1]})
+    assert response.status_code in (401, 403)
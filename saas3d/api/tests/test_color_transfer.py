@@ -0,0 +1,81 @@
+"""
+Tests para la transferencia de color vectorizada
+"""
+
+import pytest
+import numpy as np
+
+from processing.color_transfer import transfer_vertex_colors, normalize_color_method
+
+
+@pytest.fixture
+def cloud():
+    """Nube sencilla con un color por punto"""
+    points = np.array([[0, 0, 0], [1, 0, 0], [0, 1, 0], [0, 0, 1]], dtype=float)
+    colors = np.array([[1, 0, 0], [0, 1, 0], [0, 0, 1], [1, 1, 1]], dtype=float)
+    return points, colors
+
+
+def test_nearest(cloud):
+    """Test método nearest"""
+    points, colors = cloud
+    vertices = np.array([[0.1, 0, 0], [0.9, 0.05, 0], [0, 0, 0.8]])
+    
+    result = transfer_vertex_colors(vertices, points, colors, method='nearest')
+    np.testing.assert_allclose(result, colors[[0, 1, 3]])
+
+
+def test_weighted_is_k_mean(cloud):
+    """Test método weighted (media de k vecinos)"""
+    points, colors = cloud
+    vertices = np.array([[0.2, 0.2, 0]])
+    
+    result = transfer_vertex_colors(vertices, points, colors, method='weighted', k_neighbors=3)
+    np.testing.assert_allclose(result[0], colors[:3].mean(axis=0))
+
+
+def test_interpolated_is_inverse_distance(cloud):
+    """Test método interpolated (IDW)"""
+    points, colors = cloud
+    vertices = np.array([[0.25, 0, 0]])
+    
+    result = transfer_vertex_colors(vertices, points, colors, method='interpolated', k_neighbors=2)
+    # Distancias 0.25 y 0.75 -> pesos 0.75 y 0.25
+    np.testing.assert_allclose(result[0], 0.75 * colors[0] + 0.25 * colors[1])
+
+
+def test_interpolated_exact_hit(cloud):
+    """Test IDW con vértice coincidente con un punto"""
+    points, colors = cloud
+    
+    result = transfer_vertex_colors(points[:1], points, colors, method='interpolated', k_neighbors=3)
+    np.testing.assert_allclose(result[0], colors[0], atol=1e-9)
+
+
+def test_chunked_matches_single_query():
+    """Test que la consulta por bloques da el mismo resultado"""
+    rng = np.random.default_rng(0)
+    points = rng.random((500, 3))
+    colors = rng.random((500, 3))
+    vertices = rng.random((1000, 3))
+    
+    full = transfer_vertex_colors(vertices, points, colors, method='interpolated', k_neighbors=5)
+    chunked = transfer_vertex_colors(vertices, points, colors, method='interpolated',
+                                     k_neighbors=5, chunk_size=64)
+    np.testing.assert_allclose(full, chunked)
+
+
+def test_k_larger_than_cloud(cloud):
+    """Test k mayor que el número de puntos"""
+    points, colors = cloud
+    
+    result = transfer_vertex_colors(np.zeros((2, 3)), points, colors, method='weighted', k_neighbors=50)
+    np.testing.assert_allclose(result, np.tile(colors.mean(axis=0), (2, 1)))
+
+
+def test_method_aliases():
+    """Test alias de métodos"""
+    assert normalize_color_method('mean') == 'weighted'
+    assert normalize_color_method('idw') == 'interpolated'
+    with pytest.raises(ValueError):
+        normalize_color_method('bilinear')
@@ -0,0 +1,153 @@
+"""
+Tests para la lectura de cabeceras y el enrutado por coste
+"""
+
+import numpy as np
+import pytest
+from database import Base
+import cost_routing
+from cost_routing import route_for, effective_points
+from point_cloud_header import (
+    PointCloudHeader, parse_ply_header, parse_pcd_header, estimate_xyz_points, read_point_cloud_header
+)
+from result_cache import ResultCache
+from job_events import MemoryJobEvents
+from storage.filesystem import FilesystemStorage
+import routes.processing as processing
+
+from tests.conftest import client, engine, seed_job
+
+PLY_HEADER = b"ply\nformat binary_little_endian 1.0\nelement vertex 12345\nproperty float x\n" \
+             b"property float y\nproperty float z\nelement face 10\nend_header\n"
+
+PCD_HEADER = b"# .PCD v0.7\nVERSION 0.7\nFIELDS x y z\nSIZE 4 4 4\nTYPE F F F\nCOUNT 1 1 1\n" \
+             b"WIDTH 640\nHEIGHT 480\nVIEWPOINT 0 0 0 1 0 0 0\nPOINTS 307200\nDATA binary\n"
+
+@pytest.fixture
+def setup_database():
+    Base.metadata.create_all(bind=engine)
+    yield
+    Base.metadata.drop_all(bind=engine)
+
+@pytest.fixture
+def storage(tmp_path):
+    return FilesystemStorage(tmp_path / "uploads")
+
+def put(storage, tmp_path, key: str, content: bytes):
+    source = tmp_path / f"source_{key}"
+    source.write_bytes(content)
+    storage.put_file(key, source)
+
+def write_las(path, points, version="1.2", point_format=1):
+    laspy = pytest.importorskip("laspy")
+    header = laspy.LasHeader(point_format=point_format, version=version)
+    header.scales = np.array([0.001, 0.001, 0.001])
+    header.offsets = points.min(axis=0)
+    las = laspy.LasData(header)
+    las.x, las.y, las.z = points[:, 0], points[:, 1], points[:, 2]
+    las.write(str(path))
+
+@pytest.mark.parametrize("version,point_format", [("1.2", 1), ("1.4", 6)])
+def test_las_header(storage, tmp_path, version, point_format):
+    """Test número de puntos y extensión de LAS 1.2 y 1.4 (contador de 64 bits)"""
+    points = np.array([[0.0, 0.0, 0.0], [10.0, 20.0, 5.0], [3.0, 4.0, 1.0]])
+    path = tmp_path / "cloud.las"
+    write_las(path, points, version, point_format)
+    storage.put_file("cloud.las", path)
+
+    header = read_point_cloud_header(storage, "cloud.las")
+
+    assert header.point_count == 3
+    assert header.extent == pytest.approx((10.0, 20.0, 5.0))
+
+def test_ply_header():
+    """Test vértices de la cabecera PLY (las caras no cuentan)"""
+    assert parse_ply_header(PLY_HEADER + b"\x00" * 64).point_count == 12345
+
+def test_pcd_header():
+    """Test campo POINTS y, en su defecto, WIDTH x HEIGHT"""
+    assert parse_pcd_header(PCD_HEADER).point_count == 307200
+    assert parse_pcd_header(PCD_HEADER.replace(b"POINTS 307200\n", b"")).point_count == 640 * 480
+
+def test_xyz_estimate():
+    """Test XYZ: cuenta exacta si se lee entero, estimación si no"""
+    lines = b"".join(f"{i}.000 {i}.500 1.250\n".encode() for i in range(1000))
+    assert estimate_xyz_points(lines, len(lines)).point_count == 1000
+
+    sample = lines[:4096]
+    estimate = estimate_xyz_points(sample, len(lines))
+    assert estimate.estimated
+    assert abs(estimate.point_count - 1000) < 50
+
+def test_unreadable_headers(storage, tmp_path):
+    """Test formatos desconocidos o cabeceras corruptas devuelven None"""
+    put(storage, tmp_path, "broken.ply", b"not a ply file")
+    put(storage, tmp_path, "broken.las", b"LASF" + b"\x00" * 10)
+    put(storage, tmp_path, "cloud.e57", b"\x00" * 100)
+
+    assert read_point_cloud_header(storage, "broken.ply") is None
+    assert read_point_cloud_header(storage, "broken.las") is None
+    assert read_point_cloud_header(storage, "cloud.e57") is None
+    assert read_point_cloud_header(storage, "missing.ply") is None
+
+def test_header_reads_only_prefix(storage, tmp_path, monkeypatch):
+    """Test solo se piden los primeros bytes del archivo"""
+    put(storage, tmp_path, "big.ply", PLY_HEADER + b"\x00" * (1024 * 1024))
+    ranges = []
+    read_range = storage.read_range
+    monkeypatch.setattr(storage, "read_range", lambda key, start, end: ranges.append((start, end)) or
+                        read_range(key, start, end))
+
+    assert read_point_cloud_header(storage, "big.ply").point_count == 12345
+    assert ranges == [(0, 64 * 1024 - 1)]
+
+def test_route_tiers(monkeypatch):
+    """Test niveles según los umbrales y nivel medio sin cabecera"""
+    monkeypatch.setattr(cost_routing, "COST_SMALL_MAX_POINTS", 1000)
+    monkeypatch.setattr(cost_routing, "COST_MEDIUM_MAX_POINTS", 100000)
+
+    small = route_for(PointCloudHeader(500), 0.01)
+    medium = route_for(PointCloudHeader(50000), 0.01)
+    large = route_for(PointCloudHeader(10 ** 8), 0.01)
+    unknown = route_for(None, 0.01)
+
+    assert (small.tier, medium.tier, large.tier, unknown.tier) == ("small", "medium", "large", "medium")
+    assert small.time_limit < medium.time_limit < large.time_limit
+    assert large.task_options() == {"queue": cost_routing.COST_QUEUE_LARGE,
+                                    "time_limit": large.time_limit, "soft_time_limit": large.time_limit * 5 // 6}
+
+def test_extent_bounds_effective_points():
+    """Test la extensión acota los puntos tras el downsampling"""
+    header = PointCloudHeader(200_000_000, (0.0, 0.0, 0.0, 100.0, 100.0, 10.0))
+    assert effective_points(header, 0.5) == 200 * 200 * 20
+    assert effective_points(header, 0.0001) == 200_000_000
+    assert effective_points(PointCloudHeader(5000), 0.5) == 5000
+
+def test_batch_submission_uses_route(setup_database, storage, tmp_path, monkeypatch):
+    """Test el envío aplica la cola y los límites del nivel a la tarea"""
+    monkeypatch.setattr(processing, "COST_ROUTING", True)
+    monkeypatch.setattr(cost_routing, "COST_SMALL_MAX_POINTS", 20000)
+    monkeypatch.setattr(processing, "upload_storage", storage)
+    monkeypatch.setattr(processing, "result_cache", ResultCache(tmp_path / "cache"))
+    monkeypatch.setattr(processing, "job_events", MemoryJobEvents())
+    dispatched = []
+    monkeypatch.setattr(processing, "dispatch_group",
+                        lambda signatures: dispatched.extend(signatures) or ["task"] * len(signatures))
+
+    put(storage, tmp_path, "small.ply", PLY_HEADER)
+    put(storage, tmp_path, "scan.pcd", PCD_HEADER)
+    client.post("/auth/register", json={"email": "routing@example.com", "password": "testpassword"})
+    token = client.post("/auth/login", json={"email": "routing@example.com",
+                                             "password": "testpassword"}).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    job_ids = [seed_job(headers, key)
+               for key in ("small.ply", "scan.pcd")]
+
+    response = client.post("/api/process/batch", json={"job_ids": job_ids}, headers=headers)
+
+    assert response.json()["accepted"] == 2
+    options = {signature.kwargs["input_key"]: signature.options for signature in dispatched}
+    assert options["small.ply"]["queue"] == cost_routing.COST_QUEUE_SMALL
+    assert options["small.ply"]["time_limit"] == cost_routing.COST_TIME_LIMIT_SMALL
+    assert options["scan.pcd"]["queue"] == cost_routing.COST_QUEUE_MEDIUM
+    assert options["scan.pcd"]["soft_time_limit"] == cost_routing.COST_TIME_LIMIT_MEDIUM * 5 // 6
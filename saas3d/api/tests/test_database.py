@@ -0,0 +1,85 @@
+"""
+Tests para la capa de base de datos (URLs async y métricas del pool)
+"""
+
+import inspect
+import threading
+import time
+
+from fastapi.routing import APIRoute
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+
+from database import get_db, PoolWaitMetrics, TimedQueuePool, async_database_url
+from main import app
+
+client = TestClient(app)
+
+
+def test_async_database_url():
+    """Test conversión a drivers asíncronos"""
+    assert async_database_url("postgresql://u:p@h:5432/db") == "postgresql+asyncpg://u:p@h:5432/db"
+    assert async_database_url("sqlite:///./test.db") == "sqlite+aiosqlite:///./test.db"
+    assert async_database_url("postgresql+asyncpg://h/db") == "postgresql+asyncpg://h/db"
+
+
+def test_pool_wait_is_measured(tmp_path):
+    """Test que la espera por una conexión ocupada queda registrada"""
+    class Pool(TimedQueuePool):
+        metrics = PoolWaitMetrics()
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'pool.db'}", poolclass=Pool,
+                           pool_size=1, max_overflow=0, pool_timeout=5)
+    holding = threading.Event()
+
+    def hold_connection():
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+            holding.set()
+            time.sleep(0.2)
+
+    holder = threading.Thread(target=hold_connection)
+    holder.start()
+    holding.wait()
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+    holder.join()
+
+    stats = Pool.metrics.snapshot()
+    assert stats["checkouts"] == 2
+    assert stats["wait_seconds_max"] >= 0.1
+    assert sum(stats["wait_histogram"].values()) == 2
+
+
+def test_db_pool_metrics_endpoint():
+    """Test endpoint de métricas del pool"""
+    response = client.get("/metrics/db-pool")
+    assert response.status_code == 200
+    data = response.json()
+    assert set(data) == {"async", "sync"}
+    assert "status" in data["async"]
+
+
+def test_async_handlers_do_not_use_sync_session():
+    """Test ningún handler async depende de la sesión síncrona (bloquearía el event loop)"""
+    def dependency_calls(dependant):
+        for dependency in dependant.dependencies:
+            yield dependency.call
+            yield from dependency_calls(dependency)
+
+    def api_routes(routes):
+        for route in routes:
+            # Los routers incluidos se conservan envueltos
+            if hasattr(route, "original_router"):
+                yield from api_routes(route.original_router.routes)
+            elif isinstance(route, APIRoute):
+                yield route
+
+    routes = list(api_routes(app.routes))
+    assert any(route.path.endswith("/chunks/{index}") for route in routes)
+    offenders = [
+        route.path for route in routes
+        if inspect.iscoroutinefunction(route.endpoint)
+        and get_db in dependency_calls(route.dependant)
+    ]
+    assert offenders == []
@@ -0,0 +1,161 @@
+"""
+Tests para la caché local de entradas de los workers
+"""
+
+import threading
+import time
+
+import pytest
+
+from input_cache import InputAffinity, InputCache, input_cache_key
+from storage.filesystem import FilesystemStorage
+
+
+class CountingStorage(FilesystemStorage):
+    """Almacenamiento "remoto" que cuenta (y ralentiza) las descargas"""
+
+    def __init__(self, root, delay=0.0):
+        super().__init__(root)
+        self.fetches = 0
+        self.delay = delay
+
+    def fetch(self, key, destination):
+        self.fetches += 1
+        time.sleep(self.delay)
+        super().fetch(key, destination)
+
+
+@pytest.fixture
+def remote(tmp_path):
+    storage = CountingStorage(tmp_path / "remote", delay=0.05)
+    for name, size in (("a.laz", 1000), ("b.laz", 1000), ("c.laz", 1000)):
+        (storage.root / name).write_bytes(name.encode() * (size // len(name)))
+    return storage
+
+
+def test_checkout_hit_after_miss(remote, tmp_path):
+    """Test que la segunda petición de la misma entrada no descarga"""
+    cache = InputCache(tmp_path / "cache", max_bytes=10 ** 6)
+    assert cache.checkout("hash-a", "a.laz", remote, tmp_path / "job1" / "a.laz") is False
+    assert cache.checkout("hash-a", "a.laz", remote, tmp_path / "job2" / "a.laz") is True
+    assert remote.fetches == 1
+    assert (tmp_path / "job2" / "a.laz").read_bytes() == (remote.root / "a.laz").read_bytes()
+
+
+def test_concurrent_checkout_downloads_once(remote, tmp_path):
+    """Test que tareas concurrentes no descargan dos veces la misma entrada"""
+    cache = InputCache(tmp_path / "cache", max_bytes=10 ** 6)
+    threads = [
+        threading.Thread(target=cache.checkout, args=("hash-a", "a.laz", remote, tmp_path / f"job{i}" / "a.laz"))
+        for i in range(4)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert remote.fetches == 1
+    assert all((tmp_path / f"job{i}" / "a.laz").exists() for i in range(4))
+
+
+def test_checkout_survives_concurrent_eviction(remote, tmp_path, monkeypatch):
+    """Test una entrada expulsada por otro proceso durante un acierto se vuelve a descargar"""
+    import input_cache
+    cache = InputCache(tmp_path / "cache", max_bytes=10 ** 6)
+    cache.checkout("hash-a", "a.laz", remote, tmp_path / "job1" / "a.laz")
+    utime = input_cache.os.utime
+    evictions = []
+
+    def evict_then_utime(path, *args, **kwargs):
+        # Otro proceso expulsa la entrada justo después de ``entry.exists()``
+        if not evictions:
+            evictions.append(path)
+            path.unlink()
+        return utime(path, *args, **kwargs)
+
+    monkeypatch.setattr(input_cache.os, "utime", evict_then_utime)
+    assert cache.checkout("hash-a", "a.laz", remote, tmp_path / "job2" / "a.laz") is False
+    assert remote.fetches == 2
+    assert (tmp_path / "job2" / "a.laz").read_bytes() == (remote.root / "a.laz").read_bytes()
+
+
+def test_lru_eviction_keeps_job_copies(remote, tmp_path):
+    """Test expulsión LRU por presupuesto sin romper los archivos en uso"""
+    cache = InputCache(tmp_path / "cache", max_bytes=2500)
+    cache.checkout("hash-a", "a.laz", remote, tmp_path / "job1" / "a.laz")
+    time.sleep(0.01)
+    cache.checkout("hash-b", "b.laz", remote, tmp_path / "job2" / "b.laz")
+    time.sleep(0.01)
+    # Usar "a" la convierte en la más reciente: se expulsa "b"
+    cache.checkout("hash-a", "a.laz", remote, tmp_path / "job3" / "a.laz")
+    time.sleep(0.01)
+    cache.checkout("hash-c", "c.laz", remote, tmp_path / "job4" / "c.laz")
+
+    assert cache.entry_path("hash-a", ".laz").exists()
+    assert not cache.entry_path("hash-b", ".laz").exists()
+    assert cache.entry_path("hash-c", ".laz").exists()
+    assert (tmp_path / "job2" / "b.laz").exists()
+    assert remote.fetches == 3
+
+
+def test_input_cache_key():
+    """Test clave por hash de contenido o, en su defecto, por clave de almacenamiento"""
+    assert input_cache_key("ab" * 32, "x.laz") == "ab" * 32
+    assert input_cache_key(None, "x.laz") == input_cache_key(None, "x.laz")
+    assert input_cache_key(None, "x.laz") != input_cache_key(None, "y.laz")
+
+
+def test_affinity_falls_back_to_default_queue():
+    """Test que sin afinidad o sin Redis se usa la cola común"""
+    assert InputAffinity(enabled=False).pick_queue("hash-a") is None
+    unreachable = InputAffinity(enabled=True, redis_url="redis://127.0.0.1:1/0")
+    assert unreachable.pick_queue("hash-a") is None
+    unreachable.register("hash-a")
+
+
+class FakeAffinityRedis:
+    """Redis mínimo en memoria para el registro de afinidad"""
+
+    def __init__(self):
+        self.values, self.sets, self.lists = {}, {}, {}
+
+    def set(self, key, value, ex=None):
+        self.values[key] = str(value).encode()
+
+    def get(self, key):
+        return self.values.get(key)
+
+    def sadd(self, key, member):
+        self.sets.setdefault(key, set()).add(member.encode())
+
+    def expire(self, key, ttl):
+        pass
+
+    def smembers(self, key):
+        return self.sets.get(key, set())
+
+    def llen(self, key):
+        return self.lists.get(key, 0)
+
+    def pipeline(self):
+        return self
+
+    def execute(self):
+        pass
+
+
+def test_affinity_respects_tier_queue():
+    """Test la cola del nodo solo se elige si el nodo consume la cola del nivel"""
+    redis = FakeAffinityRedis()
+    small = InputAffinity(enabled=True, queue="node.small-1")
+    large = InputAffinity(enabled=True, queue="node.large-1")
+    small.tier_queues, large.tier_queues = {"pointclouds.small"}, {"pointclouds.large", "celery"}
+    small._client = large._client = redis
+    small.register("hash-a")
+    large.register("hash-b")
+
+    assert small.pick_queue("hash-a", "pointclouds.small") == "node.small-1"
+    assert small.pick_queue("hash-a", "pointclouds.large") is None
+    assert small.pick_queue("hash-b", "pointclouds.large") == "node.large-1"
+    assert small.pick_queue("hash-b", "celery") == "node.large-1"
+    # Sin enrutado por coste no hay nivel que respetar
+    assert small.pick_queue("hash-a") == "node.small-1"
@@ -0,0 +1,147 @@
+import asyncio
+import json
+
+import pytest
+from main import app
+from database import Base
+from enums import JobStatus
+import job_events
+from job_events import MemoryJobEvents
+from job_progress import MemoryProgressStore
+
+from tests.conftest import client, engine, TestingSessionLocal
+
+@pytest.fixture
+def setup_database():
+    Base.metadata.create_all(bind=engine)
+    yield
+    Base.metadata.drop_all(bind=engine)
+
+@pytest.fixture
+def broker(monkeypatch):
+    """Broker en memoria en lugar de Redis"""
+    memory = MemoryJobEvents(queue_size=10)
+    monkeypatch.setattr(job_events, "job_events", memory)
+    import celery_worker
+    monkeypatch.setattr(celery_worker, "job_events", memory)
+    monkeypatch.setattr(celery_worker, "progress_store", MemoryProgressStore())
+    return memory
+
+@pytest.fixture
+def auth_token(setup_database):
+    client.post("/auth/register", json={"email": "events@example.com", "password": "testpassword"})
+    response = client.post("/auth/login", json={"email": "events@example.com", "password": "testpassword"})
+    return response.json()["access_token"]
+
+async def read_stream(token: str, until, publish=None) -> tuple:
+    """
+    Llamar al endpoint SSE directamente por ASGI (TestClient espera al final
+    de la respuesta) y desconectar cuando ``until`` se cumple
+    """
+    disconnected = asyncio.Event()
+    messages = []
+    body = []
+
+    async def receive():
+        await disconnected.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        messages.append(message)
+        if message["type"] == "http.response.body":
+            body.append(message.get("body", b"").decode())
+            text = "".join(body)
+            if publish is not None and len(body) == 1:
+                publish()
+            if until(text):
+                disconnected.set()
+
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+        "method": "GET", "scheme": "http", "path": "/api/jobs/events", "raw_path": b"/api/jobs/events",
+        "root_path": "", "query_string": b"", "server": ("test", 80), "client": ("test", 1234),
+        "headers": [(b"host", b"test"), (b"authorization", f"Bearer {token}".encode())],
+    }
+    await asyncio.wait_for(app(scope, receive, send), timeout=10)
+    return messages[0], "".join(body)
+
+def test_stream_requires_authentication():
+    """Test el stream requiere token"""
+    response = client.get("/api/jobs/events")
+    assert response.status_code in (401, 403)
+
+def test_stream_delivers_job_events(broker, auth_token):
+    """Test el stream entrega los eventos publicados y se limpia al desconectar"""
+    event = {"job_id": 1, "status": "processing", "progress": 25, "error": None, "output_key": None}
+    start, body = asyncio.run(read_stream(
+        auth_token,
+        until=lambda text: "data:" in text,
+        publish=lambda: broker.publish(1, event),
+    ))
+
+    assert start["status"] == 200
+    headers = dict(start["headers"])
+    assert headers[b"content-type"].startswith(b"text/event-stream")
+    assert headers[b"cache-control"] == b"no-cache"
+    data_line = next(line for line in body.splitlines() if line.startswith("data:"))
+    assert json.loads(data_line[len("data:"):]) == event
+    assert broker.subscriber_count() == 0
+
+def test_stream_sends_heartbeat(broker, auth_token, monkeypatch):
+    """Test keep-alive cuando no hay eventos"""
+    monkeypatch.setattr(job_events, "JOB_EVENTS_HEARTBEAT", 0.05)
+    _, body = asyncio.run(read_stream(auth_token, until=lambda text: ": ping" in text))
+    assert ": ping" in body
+
+def test_events_are_per_user():
+    """Test cada usuario solo recibe sus eventos"""
+    broker = MemoryJobEvents()
+
+    async def scenario():
+        async with broker.subscribe(1) as mine, broker.subscribe(2) as other:
+            broker.publish(1, {"job_id": 10})
+            await asyncio.sleep(0)
+            return mine.qsize(), other.qsize()
+
+    assert asyncio.run(scenario()) == (1, 0)
+    assert broker.subscriber_count() == 0
+
+def test_slow_subscriber_drops_oldest_events():
+    """Test una cola llena descarta los eventos más antiguos"""
+    broker = MemoryJobEvents(queue_size=3)
+
+    async def scenario():
+        async with broker.subscribe(1) as queue:
+            for progress in range(5):
+                broker.publish(1, {"job_id": 1, "progress": progress})
+            await asyncio.sleep(0)
+            return [queue.get_nowait()["progress"] for _ in range(queue.qsize())]
+
+    assert asyncio.run(scenario()) == [2, 3, 4]
+
+def test_worker_status_update_publishes_event(broker, setup_database):
+    """Test update_job_status del worker publica el progreso"""
+    from celery_worker import update_job_status
+    from models import Job, User
+
+    db = TestingSessionLocal()
+    user = User(email="worker@example.com", hashed_password="x")
+    db.add(user)
+    db.commit()
+    job = Job(user_id=user.id, input_key="input.ply", status=JobStatus.queued)
+    db.add(job)
+    db.commit()
+    user_id, job_id = user.id, job.id
+
+    async def scenario():
+        async with broker.subscribe(user_id) as queue:
+            await asyncio.get_running_loop().run_in_executor(
+                None, update_job_status, db, job_id, JobStatus.processing, 45
+            )
+            return await asyncio.wait_for(queue.get(), timeout=5)
+
+    try:
+        event = asyncio.run(scenario())
+    finally:
+        db.close()
+    assert event == {"job_id": job_id, "status": "processing", "progress": 45, "error": None, "output_key": None}
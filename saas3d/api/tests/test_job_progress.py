@@ -0,0 +1,146 @@
+import asyncio
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from database import Base
+from enums import JobStatus
+from models import Job
+import celery_worker
+import job_progress
+from job_events import MemoryJobEvents
+from job_progress import MemoryProgressStore
+
+from tests.conftest import client, engine, TestingSessionLocal, TestingAsyncSessionLocal, seed_job
+
+@pytest.fixture
+def setup_database():
+    Base.metadata.create_all(bind=engine)
+    yield
+    Base.metadata.drop_all(bind=engine)
+
+@pytest.fixture
+def store(monkeypatch):
+    """Almacén de progreso y eventos en memoria en lugar de Redis"""
+    memory = MemoryProgressStore()
+    monkeypatch.setattr(job_progress, "progress_store", memory)
+    monkeypatch.setattr(celery_worker, "progress_store", memory)
+    monkeypatch.setattr(celery_worker, "job_events", MemoryJobEvents())
+    return memory
+
+@pytest.fixture
+def statements():
+    """Sentencias SQL sobre la tabla de jobs (de cualquier engine)"""
+    recorded = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if "jobs" in statement:
+            recorded.append(statement.split()[0].upper())
+
+    event.listen(Engine, "before_cursor_execute", record)
+    yield recorded
+    event.remove(Engine, "before_cursor_execute", record)
+
+@pytest.fixture
+def job(setup_database, store):
+    """Usuario autenticado con un job en cola"""
+    client.post("/auth/register", json={"email": "progress@example.com", "password": "testpassword"})
+    response = client.post("/auth/login", json={"email": "progress@example.com", "password": "testpassword"})
+    headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+    job_id = seed_job(headers, "input.ply")
+    return job_id, headers
+
+def read_job(job_id: int) -> Job:
+    db = TestingSessionLocal()
+    try:
+        return db.get(Job, job_id)
+    finally:
+        db.close()
+
+def test_intermediate_progress_skips_database(job, store, statements):
+    """Test el progreso intermedio no escribe en la tabla y se ve en las lecturas"""
+    job_id, headers = job
+    db = TestingSessionLocal()
+    try:
+        owner_id = celery_worker.update_job_status(db, job_id, JobStatus.processing, progress=5)
+        assert statements == ["UPDATE"]
+
+        statements.clear()
+        for progress in (25, 35, 45):
+            celery_worker.report_progress(job_id, owner_id, progress)
+        assert statements == []
+    finally:
+        db.close()
+
+    assert read_job(job_id).progress == 5
+    assert client.get(f"/api/jobs/{job_id}", headers=headers).json()["progress"] == 45
+    listed = client.get("/api/jobs", headers=headers).json()
+    assert [item["progress"] for item in listed if item["id"] == job_id] == [45]
+
+def test_completion_is_durable_and_clears_store(job, store):
+    """Test la transición final escribe en la tabla y descarta el valor intermedio"""
+    job_id, headers = job
+    db = TestingSessionLocal()
+    try:
+        owner_id = celery_worker.update_job_status(db, job_id, JobStatus.processing, progress=5)
+        celery_worker.report_progress(job_id, owner_id, 95)
+        celery_worker.update_job_status(db, job_id, JobStatus.completed, progress=100, output_key="mesh.ply")
+    finally:
+        db.close()
+
+    assert store.get(job_id) is None
+    stored = read_job(job_id)
+    assert stored.status == JobStatus.completed
+    assert stored.progress == 100
+    assert stored.output_key == "mesh.ply"
+    assert stored.finished_at is not None
+
+def test_failure_keeps_last_progress(job, store):
+    """Test un fallo conserva el último progreso intermedio"""
+    job_id, _ = job
+    db = TestingSessionLocal()
+    try:
+        owner_id = celery_worker.update_job_status(db, job_id, JobStatus.processing, progress=5)
+        celery_worker.report_progress(job_id, owner_id, 65)
+        celery_worker.update_job_status(db, job_id, JobStatus.failed, error="boom")
+    finally:
+        db.close()
+
+    stored = read_job(job_id)
+    assert stored.status == JobStatus.failed
+    assert stored.progress == 65
+    assert stored.error == "boom"
+
+def test_stale_progress_ignored_for_finished_jobs(job, store):
+    """Test un valor intermedio no se aplica a jobs fuera de processing"""
+    job_id, headers = job
+    store.set(job_id, 80)
+    response = client.get(f"/api/jobs/{job_id}", headers=headers).json()
+    assert response["status"] == "queued"
+    assert response["progress"] == 0
+
+def test_missing_job_returns_none(setup_database, store):
+    """Test transición sobre un job inexistente"""
+    db = TestingSessionLocal()
+    try:
+        assert celery_worker.update_job_status(db, 999, JobStatus.processing, progress=5) is None
+    finally:
+        db.close()
+
+def test_api_update_is_single_statement(job, store, statements):
+    """Test update_job_status de la API emite un único UPDATE sin SELECT"""
+    from routes.jobs import update_job_status
+
+    job_id, _ = job
+    store.set(job_id, 40)
+
+    async def scenario():
+        async with TestingAsyncSessionLocal() as db:
+            return await update_job_status(db, job_id, JobStatus.failed, error="cancelado")
+
+    statements.clear()
+    updated = asyncio.run(scenario())
+    assert statements == ["UPDATE"]
+    assert updated.status == JobStatus.failed
+    assert updated.error == "cancelado"
+    assert store.get(job_id) is None
@@ -1,26 +1,8 @@
 import pytest
-from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
-from main import app
-from database import get_db, Base
+from database import Base
 from enums import JobStatus
 
-# Base de datos de prueba en memoria
-SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
-engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
-TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-
-def override_get_db():
-    try:
-        db = TestingSessionLocal()
-        yield db
-    finally:
-        db.close()
-
-app.dependency_overrides[get_db] = override_get_db
-
-client = TestClient(app)
+from tests.conftest import client, engine, TestingSessionLocal, seed_job
 
 @pytest.fixture(scope="module")
 def setup_database():
@@ -47,7 +29,8 @@ def auth_headers(setup_database):
     return {"Authorization": f"Bearer {token}"}
 
 def test_create_job(auth_headers):
-    """Test crear job"""
+    """Test crear job sobre un archivo que el usuario ya tiene"""
+    seed_job(auth_headers, "test-input.ply")
     response = client.post("/api/jobs", json={
         "input_key": "test-input.ply"
     }, headers=auth_headers)
@@ -59,12 +42,22 @@ def test_create_job(auth_headers):
     assert data["progress"] == 0
     assert "id" in data
 
+def test_create_job_requires_owned_file(auth_headers):
+    """Test no se puede crear un job sobre el archivo de otro usuario"""
+    seed_job(auth_headers, "private-input.ply")
+    client.post("/auth/register", json={"email": "stranger@example.com", "password": "testpassword"})
+    token = client.post("/auth/login", json={
+        "email": "stranger@example.com", "password": "testpassword"
+    }).json()["access_token"]
+    
+    response = client.post("/api/jobs", json={"input_key": "private-input.ply"},
+                           headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 404
+
 def test_get_jobs(auth_headers):
     """Test obtener jobs del usuario"""
     # Crear un job
-    client.post("/api/jobs", json={
-        "input_key": "test-input2.ply"
-    }, headers=auth_headers)
+    seed_job(auth_headers, "test-input2.ply")
     
     # Obtener jobs
     response = client.get("/api/jobs", headers=auth_headers)
@@ -76,10 +69,7 @@ def test_get_jobs(auth_headers):
 def test_get_job_by_id(auth_headers):
     """Test obtener job específico"""
     # Crear job
-    create_response = client.post("/api/jobs", json={
-        "input_key": "test-input3.ply"
-    }, headers=auth_headers)
-    job_id = create_response.json()["id"]
+    job_id = seed_job(auth_headers, "test-input3.ply")
     
     # Obtener job específico
     response = client.get(f"/api/jobs/{job_id}", headers=auth_headers)
@@ -97,10 +87,7 @@ def test_get_job_not_found(auth_headers):
 def test_delete_job(auth_headers):
     """Test eliminar job"""
     # Crear job
-    create_response = client.post("/api/jobs", json={
-        "input_key": "test-input4.ply"
-    }, headers=auth_headers)
-    job_id = create_response.json()["id"]
+    job_id = seed_job(auth_headers, "test-input4.ply")
     
     # Eliminar job
     response = client.delete(f"/api/jobs/{job_id}", headers=auth_headers)
@@ -120,3 +107,91 @@ def test_jobs_require_authentication():
     
     response = client.get("/api/jobs")
     assert response.status_code == 401
+
+def pagination_headers() -> dict:
+    """Usuario propio para los tests de paginación"""
+    client.post("/auth/register", json={
+        "email": "pages@example.com",
+        "password": "testpassword"
+    })
+    response = client.post("/auth/login", json={
+        "email": "pages@example.com",
+        "password": "testpassword"
+    })
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+def test_get_jobs_cursor_pagination(setup_database):
+    """Test paginación por cursor: páginas sin huecos ni repeticiones"""
+    headers = pagination_headers()
+    created = [
+        seed_job(headers, f"page-{i}.ply")
+        for i in range(7)
+    ]
+    
+    seen = []
+    cursor = None
+    pages = 0
+    while True:
+        params = {"limit": 3}
+        if cursor:
+            params["cursor"] = cursor
+        response = client.get("/api/jobs", params=params, headers=headers)
+        assert response.status_code == 200
+        seen += [job["id"] for job in response.json()]
+        pages += 1
+        cursor = response.headers.get("x-next-cursor")
+        if cursor is None:
+            break
+    
+    assert pages == 3
+    assert seen == sorted(created, reverse=True)
+
+def test_get_jobs_cursor_survives_deleted_anchor(setup_database):
+    """Test el cursor sigue siendo válido si se borra el último job de la página"""
+    headers = pagination_headers()
+    first = client.get("/api/jobs", params={"limit": 2}, headers=headers)
+    anchor = first.json()[-1]["id"]
+    client.delete(f"/api/jobs/{anchor}", headers=headers)
+    
+    response = client.get("/api/jobs", params={"limit": 2, "cursor": first.headers["x-next-cursor"]}, headers=headers)
+    assert response.status_code == 200
+    ids = [job["id"] for job in response.json()]
+    assert ids and all(job_id < anchor for job_id in ids)
+
+def test_get_jobs_status_filter(setup_database):
+    """Test filtro por estado"""
+    from models import Job
+    
+    headers = pagination_headers()
+    job_id = seed_job(headers, "done.ply")
+    db = TestingSessionLocal()
+    db.get(Job, job_id).status = JobStatus.completed
+    db.commit()
+    db.close()
+    
+    response = client.get("/api/jobs", params={"status": "completed"}, headers=headers)
+    assert response.status_code == 200
+    assert [job["id"] for job in response.json()] == [job_id]
+    
+    response = client.get("/api/jobs", params={"status": "unknown"}, headers=headers)
+    assert response.status_code == 422
+
+def test_get_jobs_etag_not_modified(setup_database):
+    """Test una página sin cambios se responde con 304"""
+    headers = pagination_headers()
+    response = client.get("/api/jobs", headers=headers)
+    etag = response.headers["etag"]
+    
+    cached = client.get("/api/jobs", headers={**headers, "If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.content == b""
+    
+    seed_job(headers, "new.ply")
+    changed = client.get("/api/jobs", headers={**headers, "If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["etag"] != etag
+
+def test_get_jobs_invalid_cursor(auth_headers):
+    """Test cursor no válido"""
+    response = client.get("/api/jobs", params={"cursor": "not-a-cursor"}, headers=auth_headers)
+    assert response.status_code == 400
@@ -0,0 +1,101 @@
+"""
+Tests para la lectura por bloques de LAS/LAZ
+"""
+
+import numpy as np
+import pytest
+
+laspy = pytest.importorskip("laspy")
+
+from processing.las_stream import iter_las_chunks, read_las_downsampled
+from processing.voxel_grid import voxel_downsample
+from processing.point_cloud_processor_simple import PointCloudProcessor as SimpleProcessor
+
+
+def write_las(path, points, rgb=None):
+    """Escribir un LAS de prueba"""
+    header = laspy.LasHeader(point_format=3 if rgb is not None else 1, version="1.2")
+    header.scales = np.array([0.001, 0.001, 0.001])
+    header.offsets = points.min(axis=0)
+    las = laspy.LasData(header)
+    las.x, las.y, las.z = points[:, 0], points[:, 1], points[:, 2]
+    if rgb is not None:
+        las.red, las.green, las.blue = rgb[:, 0], rgb[:, 1], rgb[:, 2]
+    las.write(str(path))
+
+
+@pytest.fixture
+def las_file(tmp_path):
+    rng = np.random.default_rng(3)
+    points = np.round(rng.random((5000, 3)) * 10, 3)
+    rgb = rng.integers(0, 65535, size=(5000, 3), dtype=np.uint16)
+    path = tmp_path / "cloud.las"
+    write_las(path, points, rgb)
+    return path, points, rgb
+
+
+def test_iter_chunks(las_file):
+    """Test lectura por bloques"""
+    path, points, rgb = las_file
+    
+    chunks = list(iter_las_chunks(path, chunk_size=1200))
+    assert [len(p) for p, _ in chunks] == [1200, 1200, 1200, 1200, 200]
+    
+    read_points = np.concatenate([p for p, _ in chunks])
+    read_colors = np.concatenate([c for _, c in chunks])
+    np.testing.assert_allclose(read_points, points, atol=1e-6)
+    np.testing.assert_allclose(read_colors, rgb / 65535.0)
+
+
+def test_iter_chunks_without_rgb(tmp_path):
+    """Test LAS sin colores"""
+    path = tmp_path / "nocolor.las"
+    write_las(path, np.random.rand(100, 3))
+    
+    chunks = list(iter_las_chunks(path))
+    assert chunks[0][1] is None
+
+
+def test_streaming_matches_in_memory(las_file):
+    """Test que la lectura en streaming coincide con el downsampling en memoria"""
+    path, _, _ = las_file
+    chunks = list(iter_las_chunks(path))
+    points = np.concatenate([p for p, _ in chunks])
+    colors = np.concatenate([c for _, c in chunks])
+    
+    expected_points, expected_colors = voxel_downsample(points, colors, 1.0)
+    stream_points, stream_colors, count = read_las_downsampled(path, 1.0, chunk_size=777)
+    
+    assert count == 5000
+    order_a = np.lexsort(expected_points.T)
+    order_b = np.lexsort(stream_points.T)
+    np.testing.assert_allclose(expected_points[order_a], stream_points[order_b])
+    np.testing.assert_allclose(expected_colors[order_a], stream_colors[order_b])
+
+
+def test_simple_processor_load_with_voxel(las_file):
+    """Test carga con downsampling en el procesador sin Open3D"""
+    path, _, _ = las_file
+    processor = SimpleProcessor()
+    
+    assert processor.load_point_cloud(str(path), voxel_size=2.0) is True
+    assert len(processor.points) <= 6 ** 3
+    assert len(processor.colors) == len(processor.points)
+
+
+def test_laz_round_trip(tmp_path):
+    """Test escritura y lectura por bloques de LAZ comprimido"""
+    rng = np.random.default_rng(5)
+    points = np.round(rng.random((3000, 3)) * 10, 3)
+    rgb = rng.integers(0, 65535, size=(3000, 3), dtype=np.uint16)
+    path = tmp_path / "cloud.laz"
+    write_las(path, points, rgb)
+    
+    chunks = list(iter_las_chunks(path, chunk_size=1000))
+    assert [len(p) for p, _ in chunks] == [1000, 1000, 1000]
+    np.testing.assert_allclose(np.concatenate([p for p, _ in chunks]), points, atol=1e-6)
+    np.testing.assert_allclose(np.concatenate([c for _, c in chunks]), rgb / 65535.0)
+    
+    stream_points, _, count = read_las_downsampled(path, 1.0)
+    assert count == 3000
+    assert len(stream_points) <= 10 ** 3
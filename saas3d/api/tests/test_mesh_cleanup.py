@@ -0,0 +1,76 @@
+"""
+Tests para la limpieza vectorizada de mallas
+"""
+
+import numpy as np
+
+from processing.mesh_cleanup import (
+    degenerate_mask, duplicate_mask, triangle_components, small_component_mask,
+    compact_vertices, clean_mesh
+)
+
+
+def strip(n_triangles, offset=0):
+    """Tira de triángulos conectados por arista"""
+    idx = np.arange(n_triangles)
+    return np.column_stack([idx, idx + 1, idx + 2]) + offset
+
+
+def test_degenerate_and_duplicate_masks():
+    """Test triángulos degenerados y duplicados en cualquier orden"""
+    triangles = np.array([[0, 1, 2], [2, 1, 0], [1, 2, 0], [3, 3, 4], [0, 2, 3]])
+
+    np.testing.assert_array_equal(degenerate_mask(triangles), [False, False, False, True, False])
+    np.testing.assert_array_equal(duplicate_mask(triangles), [False, True, True, False, False])
+
+
+def test_components_by_shared_edge():
+    """Test componentes por arista compartida (un vértice compartido no une)"""
+    triangles = np.concatenate([
+        strip(5),
+        strip(2, offset=20),
+        np.array([[20, 30, 31]]),  # solo comparte el vértice 20
+    ])
+    labels, counts = triangle_components(triangles)
+
+    assert len(counts) == 3
+    assert sorted(counts.tolist()) == [1, 2, 5]
+    assert len(set(labels[:5])) == 1
+
+
+def test_small_component_mask_matches_threshold():
+    """Test que se eliminan las componentes con min_triangles triángulos o menos"""
+    triangles = np.concatenate([strip(10), strip(3, offset=100), strip(4, offset=200)])
+    mask = small_component_mask(triangles, min_triangles=3)
+
+    assert mask.sum() == 3
+    assert mask[10:13].all()
+
+
+def test_compact_vertices_keeps_arrays_aligned():
+    """Test compactación de vértices no referenciados con colores alineados"""
+    vertices = np.arange(18, dtype=float).reshape(6, 3)
+    colors = vertices / 20.0
+    triangles = np.array([[1, 3, 5]])
+
+    new_vertices, new_triangles, arrays = compact_vertices(vertices, triangles, {'colors': colors, 'normals': None})
+
+    np.testing.assert_array_equal(new_vertices, vertices[[1, 3, 5]])
+    np.testing.assert_array_equal(new_triangles, [[0, 1, 2]])
+    np.testing.assert_array_equal(arrays['colors'], colors[[1, 3, 5]])
+    assert arrays['normals'] is None
+
+
+def test_clean_mesh_stats():
+    """Test limpieza completa y estadísticas"""
+    triangles = np.concatenate([strip(20), strip(2, offset=50), [[0, 0, 1], [2, 1, 0]]])
+    vertices = np.random.rand(60, 3)
+
+    vertices, triangles, _, stats = clean_mesh(vertices, triangles, min_component_triangles=5)
+
+    assert stats['degenerate'] == 1
+    assert stats['duplicate'] == 1
+    assert stats['small_components'] == 2
+    assert len(triangles) == 20
+    assert len(vertices) == 22
+    assert triangles.max() == len(vertices) - 1
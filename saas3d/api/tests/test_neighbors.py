@@ -0,0 +1,85 @@
+"""
+Tests para outliers y normales sobre cKDTree
+"""
+
+import numpy as np
+
+from processing.neighbors import build_kdtree, statistical_outlier_mask, estimate_normals_pca
+from processing.point_cloud_processor_simple import PointCloudProcessor as SimpleProcessor
+
+
+def plane_points(n=2000, seed=0):
+    """Puntos aleatorios sobre el plano z = 0"""
+    rng = np.random.default_rng(seed)
+    points = np.zeros((n, 3))
+    points[:, :2] = rng.random((n, 2))
+    return points
+
+
+def test_outlier_mask_removes_isolated_points():
+    """Test que los puntos aislados se marcan como outliers"""
+    points = np.vstack([plane_points(), [[5, 5, 5], [-4, 3, 8]]])
+    tree = build_kdtree(points)
+    
+    mask = statistical_outlier_mask(tree, points, nb_neighbors=20, std_ratio=2.0)
+    assert not mask[-1] and not mask[-2]
+    assert mask[:-2].mean() > 0.9
+
+
+def test_outlier_mask_chunked_consistent():
+    """Test que el resultado no depende del tamaño de bloque"""
+    points = np.vstack([plane_points(), [[3, 3, 3]]])
+    tree = build_kdtree(points)
+    
+    full = statistical_outlier_mask(tree, points, 10, 1.5)
+    chunked = statistical_outlier_mask(tree, points, 10, 1.5, chunk_size=111)
+    np.testing.assert_array_equal(full, chunked)
+
+
+def test_outlier_mask_tiny_cloud():
+    """Test nube con un solo punto"""
+    points = np.zeros((1, 3))
+    mask = statistical_outlier_mask(build_kdtree(points), points)
+    assert mask.tolist() == [True]
+
+
+def test_normals_of_plane():
+    """Test normales de un plano z = 0"""
+    points = plane_points()
+    
+    normals = estimate_normals_pca(build_kdtree(points), points, radius=0.2, max_nn=30)
+    np.testing.assert_allclose(normals, np.tile([0, 0, 1.0], (len(points), 1)), atol=1e-6)
+
+
+def test_normals_of_tilted_plane():
+    """Test normales de un plano inclinado"""
+    points = plane_points()
+    points[:, 2] = points[:, 0]  # plano z = x
+    expected = np.array([-1.0, 0, 1.0]) / np.sqrt(2)
+    
+    normals = estimate_normals_pca(build_kdtree(points), points, radius=0.2, max_nn=20, chunk_size=300)
+    np.testing.assert_allclose(np.abs(normals @ expected), 1.0, atol=1e-6)
+    assert (normals[:, 2] >= 0).all()
+
+
+def test_normals_isolated_point_default():
+    """Test normal por defecto sin vecinos en el radio"""
+    points = np.vstack([plane_points(200), [[10, 10, 10]]])
+    
+    normals = estimate_normals_pca(build_kdtree(points), points, radius=0.1, max_nn=10)
+    np.testing.assert_allclose(normals[-1], [0, 0, 1])
+
+
+def test_simple_processor_pipeline():
+    """Test outliers y normales en el procesador sin Open3D"""
+    processor = SimpleProcessor()
+    processor.points = np.vstack([plane_points(), [[5, 5, 5]]])
+    processor.colors = np.random.rand(len(processor.points), 3)
+    
+    assert processor.remove_outliers(20, 2.0) is True
+    assert len(processor.points) < 2001
+    assert len(processor.colors) == len(processor.points)
+    
+    assert processor.estimate_normals(0.2, 30) is True
+    assert processor.normals.shape == processor.points.shape
+    np.testing.assert_allclose(np.linalg.norm(processor.normals, axis=1), 1.0)
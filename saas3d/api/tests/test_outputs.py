@@ -0,0 +1,115 @@
+import pytest
+from database import Base
+from models import Job, User
+from enums import JobStatus
+import routes.outputs as outputs
+from storage.filesystem import FilesystemStorage
+
+from tests.conftest import client, engine, TestingSessionLocal
+
+MESH_CONTENT = bytes(range(256)) * 40
+
+@pytest.fixture(scope="module")
+def setup_database():
+    Base.metadata.create_all(bind=engine)
+    yield
+    Base.metadata.drop_all(bind=engine)
+
+@pytest.fixture(scope="module")
+def auth_headers(setup_database):
+    """Crear usuario y obtener token de autenticación"""
+    client.post("/auth/register", json={
+        "email": "outputs@example.com",
+        "password": "testpassword"
+    })
+    response = client.post("/auth/login", json={
+        "email": "outputs@example.com",
+        "password": "testpassword"
+    })
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+@pytest.fixture
+def completed_job(auth_headers, tmp_path, monkeypatch):
+    """Job completado con una malla en un almacenamiento temporal"""
+    monkeypatch.setattr(outputs, "output_storage", FilesystemStorage(tmp_path))
+    (tmp_path / "mesh_test.ply").write_bytes(MESH_CONTENT)
+    
+    db = TestingSessionLocal()
+    user = db.query(User).filter(User.email == "outputs@example.com").first()
+    job = Job(user_id=user.id, input_key="input.ply", output_key="mesh_test.ply",
+              status=JobStatus.completed, progress=100)
+    db.add(job)
+    db.commit()
+    job_id = job.id
+    db.close()
+    return job_id
+
+def test_download_output(auth_headers, completed_job):
+    """Test descarga completa con ETag"""
+    response = client.get(f"/api/outputs/{completed_job}", headers=auth_headers)
+    assert response.status_code == 200
+    assert response.content == MESH_CONTENT
+    assert response.headers["accept-ranges"] == "bytes"
+    assert response.headers["content-length"] == str(len(MESH_CONTENT))
+    assert response.headers["etag"].startswith('"')
+
+def test_download_output_not_modified(auth_headers, completed_job):
+    """Test If-None-Match devuelve 304 sin cuerpo"""
+    etag = client.get(f"/api/outputs/{completed_job}", headers=auth_headers).headers["etag"]
+    
+    response = client.get(f"/api/outputs/{completed_job}",
+                          headers={**auth_headers, "If-None-Match": f'W/{etag}, "otro"'})
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["etag"] == etag
+
+def test_download_output_range(auth_headers, completed_job):
+    """Test descargas parciales"""
+    url = f"/api/outputs/{completed_job}"
+    size = len(MESH_CONTENT)
+    
+    response = client.get(url, headers={**auth_headers, "Range": "bytes=10-19"})
+    assert response.status_code == 206
+    assert response.content == MESH_CONTENT[10:20]
+    assert response.headers["content-range"] == f"bytes 10-19/{size}"
+    
+    response = client.get(url, headers={**auth_headers, "Range": "bytes=10000-"})
+    assert response.status_code == 206
+    assert response.content == MESH_CONTENT[10000:]
+    
+    response = client.get(url, headers={**auth_headers, "Range": "bytes=-100"})
+    assert response.status_code == 206
+    assert response.content == MESH_CONTENT[-100:]
+    
+    response = client.get(url, headers={**auth_headers, "Range": f"bytes={size}-"})
+    assert response.status_code == 416
+    assert response.headers["content-range"] == f"bytes */{size}"
+
+def test_download_output_if_range(auth_headers, completed_job):
+    """Test If-Range con ETag obsoleto devuelve el archivo completo"""
+    url = f"/api/outputs/{completed_job}"
+    etag = client.get(url, headers=auth_headers).headers["etag"]
+    
+    response = client.get(url, headers={**auth_headers, "Range": "bytes=0-9", "If-Range": etag})
+    assert response.status_code == 206
+    
+    response = client.get(url, headers={**auth_headers, "Range": "bytes=0-9", "If-Range": '"obsoleto"'})
+    assert response.status_code == 200
+    assert response.content == MESH_CONTENT
+
+def test_download_output_accel_redirect(auth_headers, completed_job, monkeypatch):
+    """Test delegación del cuerpo a nginx"""
+    monkeypatch.setattr(outputs, "OUTPUT_ACCEL_REDIRECT", "/protected-outputs/")
+    response = client.get(f"/api/outputs/{completed_job}", headers=auth_headers)
+    assert response.status_code == 200
+    assert response.headers["x-accel-redirect"] == "/protected-outputs/mesh_test.ply"
+    assert response.content == b""
+
+def test_download_output_other_user(completed_job):
+    """Test que otro usuario no puede descargar el resultado"""
+    client.post("/auth/register", json={"email": "outputs-other@example.com", "password": "testpassword"})
+    token = client.post("/auth/login", json={
+        "email": "outputs-other@example.com", "password": "testpassword"
+    }).json()["access_token"]
+    response = client.get(f"/api/outputs/{completed_job}", headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 404
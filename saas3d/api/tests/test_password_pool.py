@@ -0,0 +1,77 @@
+import asyncio
+import threading
+
+import pytest
+from database import Base
+from auth import get_password_hash, verify_password
+from password_pool import HashingPool, HashingPoolSaturated, hashing_pool
+
+from tests.conftest import client, engine
+
+@pytest.fixture
+def setup_database():
+    Base.metadata.create_all(bind=engine)
+    yield
+    Base.metadata.drop_all(bind=engine)
+
+def test_rejects_when_queue_is_full():
+    """Test con la cola llena las nuevas operaciones fallan al instante"""
+    pool = HashingPool(kind="thread", workers=1, max_pending=1)
+    release = threading.Event()
+
+    async def scenario():
+        blocked = asyncio.ensure_future(pool.run(release.wait, 5))
+        await asyncio.sleep(0.05)
+        with pytest.raises(HashingPoolSaturated):
+            await pool.run(release.wait, 5)
+        release.set()
+        assert await blocked is True
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        pool.shutdown()
+
+    stats = pool.stats()
+    assert stats["pending"] == 0
+    assert stats["completed"] == 1
+    assert stats["rejected"] == 1
+
+def test_process_executor_hashes_passwords():
+    """Test el executor de procesos calcula y verifica hashes"""
+    pool = HashingPool(kind="process", workers=1, max_pending=4)
+
+    async def scenario():
+        hashed = await pool.run(get_password_hash, "secret")
+        return hashed, await pool.run(verify_password, "secret", hashed)
+
+    try:
+        hashed, valid = asyncio.run(scenario())
+    finally:
+        pool.shutdown()
+    assert hashed.startswith("$pbkdf2-sha256$")
+    assert valid is True
+
+def test_invalid_executor_kind():
+    """Test tipo de executor desconocido"""
+    with pytest.raises(ValueError):
+        HashingPool(kind="fiber")
+
+def test_login_returns_503_when_saturated(setup_database, monkeypatch):
+    """Test login con el pool saturado devuelve 503 con Retry-After"""
+    client.post("/auth/register", json={"email": "busy@example.com", "password": "testpassword"})
+
+    monkeypatch.setattr(hashing_pool, "max_pending", 0)
+    response = client.post("/auth/login", json={"email": "busy@example.com", "password": "testpassword"})
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "1"
+
+    monkeypatch.undo()
+    response = client.post("/auth/login", json={"email": "busy@example.com", "password": "testpassword"})
+    assert response.status_code == 200
+
+def test_password_hashing_metrics_endpoint():
+    """Test endpoint de métricas del pool de hash"""
+    response = client.get("/metrics/password-hashing")
+    assert response.status_code == 200
+    assert {"executor", "pending", "rejected"} <= set(response.json())
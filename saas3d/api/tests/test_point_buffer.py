@@ -0,0 +1,44 @@
+"""
+Tests para el formato binario mapeable .bvb
+"""
+
+import numpy as np
+import pytest
+
+from processing.point_buffer import write_buffer, read_buffer, read_header, ALIGNMENT
+
+
+def test_roundtrip_returns_aligned_views(tmp_path):
+    """Test escritura y lectura sin copia de arrays de nube y malla"""
+    points = np.random.rand(100, 3)
+    triangles = np.arange(30, dtype=np.int32).reshape(10, 3)
+    path = write_buffer(tmp_path / "mesh.bvb", {
+        'points': points, 'triangles': triangles, 'colors': None
+    }, meta={'source': 'test'})
+
+    arrays, meta = read_buffer(path)
+
+    assert meta == {'source': 'test'}
+    assert set(arrays) == {'points', 'triangles'}
+    np.testing.assert_array_equal(arrays['points'], points)
+    np.testing.assert_array_equal(arrays['triangles'], triangles)
+    assert arrays['triangles'].dtype == np.int32
+    for array in arrays.values():
+        assert not array.flags.writeable
+        assert array.base is not None
+        assert array.ctypes.data % ALIGNMENT == 0
+
+
+def test_empty_arrays(tmp_path):
+    """Test arrays vacíos (nube sin puntos)"""
+    path = write_buffer(tmp_path / "empty.bvb", {'points': np.empty((0, 3))})
+    arrays, _ = read_buffer(path)
+    assert arrays['points'].shape == (0, 3)
+
+
+def test_rejects_other_files(tmp_path):
+    """Test que un archivo que no es .bvb se rechaza"""
+    path = tmp_path / "cloud.ply"
+    path.write_bytes(b"ply\nformat ascii 1.0\n")
+    with pytest.raises(ValueError):
+        read_header(path)
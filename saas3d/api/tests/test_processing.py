@@ -166,25 +166,24 @@ end_header
         result = processor.reconstruct_alpha_shape(0.1)
         assert result is True
     
-    def test_transfer_colors(self):
+    @patch('processing.point_cloud_processor.o3d')
+    def test_transfer_colors(self, mock_o3d):
         """Test transferencia de colores"""
         processor = PointCloudProcessor()
         
-        # Mock point cloud y mesh
+        # Nube y malla con arrays reales
         processor.point_cloud = Mock()
         processor.point_cloud.has_colors.return_value = True
-        processor.point_cloud.colors = [Mock() for _ in range(3)]
+        processor.point_cloud.points = np.array([[0, 0, 0], [1, 0, 0], [0, 1, 0]], dtype=float)
+        processor.point_cloud.colors = np.array([[1, 0, 0], [0, 1, 0], [0, 0, 1]], dtype=float)
         
         processor.mesh = Mock()
-        processor.mesh.vertices = [Mock() for _ in range(3)]
-        
-        # Mock KDTree
-        mock_tree = Mock()
-        mock_tree.search_knn_vector_3d.return_value = [None, [0], None]
+        processor.mesh.vertices = np.array([[0.1, 0, 0], [0.9, 0, 0], [0, 0.9, 0]])
+        mock_o3d.utility.Vector3dVector.side_effect = lambda colors: colors
         
-        with patch('processing.point_cloud_processor.o3d.geometry.KDTreeFlann', return_value=mock_tree):
-            result = processor.transfer_colors()
-            assert result is True
+        result = processor.transfer_colors()
+        assert result is True
+        np.testing.assert_allclose(processor.mesh.vertex_colors, processor.point_cloud.colors)
     
     def test_save_mesh(self):
         """Test guardado de malla"""
@@ -0,0 +1,102 @@
+"""
+Tests para la caché de resultados
+"""
+
+import os
+import time
+
+from result_cache import ResultCache, file_sha256, canonical_params, link_or_copy
+from storage.filesystem import FilesystemStorage
+
+
+def test_key_is_canonical():
+    """Test que el orden de los parámetros no cambia la clave"""
+    a = ResultCache.make_key("abc", {"voxel_size": 0.01, "algorithm": "poisson"})
+    b = ResultCache.make_key("abc", {"algorithm": "poisson", "voxel_size": 0.01})
+    c = ResultCache.make_key("abc", {"algorithm": "poisson", "voxel_size": 0.02})
+    d = ResultCache.make_key("abd", {"algorithm": "poisson", "voxel_size": 0.01})
+    
+    assert a == b
+    assert len({a, c, d}) == 3
+    assert canonical_params({"b": None, "a": [1.0]}) == '{"a":[1.0],"b":null}'
+
+
+def test_file_sha256(tmp_path):
+    """Test hash del archivo de entrada"""
+    path = tmp_path / "input.ply"
+    path.write_bytes(b"point cloud")
+    assert file_sha256(path) == "67f42c4b87ce70079a884c7e7381d4bcc126096e91bc4860550f22d5da594295"
+
+
+def test_lookup_and_store(tmp_path):
+    """Test fallo, almacenamiento y acierto"""
+    cache = ResultCache(tmp_path / "cache", max_bytes=10_000)
+    output = tmp_path / "mesh_1.ply"
+    output.write_bytes(b"mesh")
+    key = cache.make_key("hash", {"algorithm": "poisson"})
+    
+    assert cache.lookup(key, "ply") is None
+    entry = cache.store(key, output, "ply")
+    assert cache.lookup(key, "ply") == entry
+    assert entry.read_bytes() == b"mesh"
+    
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["entries"] == 1
+    assert stats["hit_ratio"] == 0.5
+
+
+def test_lru_eviction(tmp_path):
+    """Test expulsión de las entradas menos usadas"""
+    cache = ResultCache(tmp_path / "cache", max_bytes=250)
+    outputs = {}
+    for key in "abc":
+        outputs[key] = tmp_path / f"mesh_{key}.ply"
+        outputs[key].write_bytes(b"x" * 100)
+    
+    cache.store("a", outputs["a"], "ply")
+    cache.store("b", outputs["b"], "ply")
+    # Marcar 'a' como más reciente que 'b'
+    past = time.time() - 100
+    os.utime(tmp_path / "cache" / "b.ply", (past, past))
+    os.utime(tmp_path / "cache" / "a.ply", (past + 10, past + 10))
+    assert cache.lookup("a", "ply") is not None
+    
+    cache.store("c", outputs["c"], "ply")
+    
+    assert cache.lookup("b", "ply") is None
+    assert cache.lookup("a", "ply") is not None
+    assert cache.lookup("c", "ply") is not None
+
+
+def test_link_or_copy(tmp_path):
+    """Test enlace del resultado cacheado a la salida del trabajo"""
+    src = tmp_path / "src.ply"
+    src.write_bytes(b"data")
+    dst = tmp_path / "out" / "mesh_2.ply"
+    
+    link_or_copy(src, dst)
+    assert dst.read_bytes() == b"data"
+
+
+def test_entries_do_not_share_outputs(tmp_path):
+    """Test los accesos a la caché no cambian el mtime (ETag) de las salidas publicadas"""
+    cache = ResultCache(tmp_path / "cache", max_bytes=10_000)
+    outputs = FilesystemStorage(tmp_path / "outputs")
+    output = tmp_path / "mesh_1.ply"
+    output.write_bytes(b"mesh")
+    entry = cache.store("key", output, "ply")
+    outputs.put_file("mesh_1.ply", output, move=True)
+    cache.export(entry, outputs, "mesh_2.ply")
+    
+    published = [outputs.local_path(name).stat() for name in ("mesh_1.ply", "mesh_2.ply")]
+    assert len({stat.st_ino for stat in published} | {entry.stat().st_ino}) == 3
+    
+    past = time.time() - 100
+    for name in ("mesh_1.ply", "mesh_2.ply"):
+        os.utime(outputs.local_path(name), (past, past))
+    assert cache.lookup("key", "ply") == entry
+    assert all(outputs.local_path(name).stat().st_mtime == past for name in ("mesh_1.ply", "mesh_2.ply"))
+    assert outputs.local_path("mesh_2.ply").read_bytes() == b"mesh"
+    assert [p.name for p in (tmp_path / "cache").iterdir()] == ["key.ply"]
@@ -0,0 +1,191 @@
+"""
+Tests para las subidas reanudables por bloques
+"""
+
+import hashlib
+import os
+from datetime import datetime, timedelta
+
+import pytest
+
+from database import Base
+import upload_sessions
+from models import Job, UploadSession
+from upload_sessions import OrderedHasher, ReorderBudget
+import routes.resumable_upload as resumable
+
+from tests.conftest import client, engine, TestingSessionLocal
+
+CHUNK = resumable.MIN_CHUNK_SIZE
+
+@pytest.fixture(scope="module")
+def auth_headers():
+    """Crear usuario y obtener cabeceras de autenticación"""
+    Base.metadata.create_all(bind=engine)
+    client.post("/auth/register", json={"email": "resumable@example.com", "password": "testpassword"})
+    response = client.post("/auth/login", json={"email": "resumable@example.com", "password": "testpassword"})
+    yield {"Authorization": f"Bearer {response.json()['access_token']}"}
+    Base.metadata.drop_all(bind=engine)
+
+def create_session(headers, size, filename="survey.laz"):
+    response = client.post("/api/uploads", headers=headers, json={
+        "filename": filename, "total_size": size, "chunk_size": CHUNK
+    })
+    assert response.status_code == 200
+    return response.json()
+
+def test_out_of_order_upload_and_complete(auth_headers):
+    """Test bloques desordenados, consulta de pendientes y finalización"""
+    content = os.urandom(2 * CHUNK + 1000)
+    session = create_session(auth_headers, len(content))
+    upload_id = session["upload_id"]
+    assert session["total_chunks"] == 3
+
+    for index in (2, 0):
+        chunk = content[index * CHUNK:(index + 1) * CHUNK]
+        response = client.put(f"/api/uploads/{upload_id}/chunks/{index}", headers=auth_headers, content=chunk)
+        assert response.status_code == 200
+
+    state = client.get(f"/api/uploads/{upload_id}", headers=auth_headers).json()
+    assert state["received_chunks"] == [0, 2]
+    assert state["missing_chunks"] == [1]
+
+    response = client.post(f"/api/uploads/{upload_id}/complete", headers=auth_headers)
+    assert response.status_code == 409
+
+    client.put(f"/api/uploads/{upload_id}/chunks/1", headers=auth_headers, content=content[CHUNK:2 * CHUNK])
+    response = client.post(f"/api/uploads/{upload_id}/complete", headers=auth_headers)
+    assert response.status_code == 200
+    data = response.json()
+    assert data["sha256"] == hashlib.sha256(content).hexdigest()
+
+    with open(resumable.UPLOAD_DIR / data["unique_filename"], "rb") as f:
+        assert f.read() == content
+    job = client.get(f"/api/jobs/{data['job_id']}", headers=auth_headers).json()
+    assert job["input_sha256"] == data["sha256"]
+    (resumable.UPLOAD_DIR / data["unique_filename"]).unlink()
+
+def test_chunk_size_is_validated(auth_headers):
+    """Test que un bloque con tamaño incorrecto se rechaza"""
+    session = create_session(auth_headers, CHUNK + 10)
+    upload_id = session["upload_id"]
+
+    response = client.put(f"/api/uploads/{upload_id}/chunks/1", headers=auth_headers, content=b"x" * 5)
+    assert response.status_code == 400
+    response = client.put(f"/api/uploads/{upload_id}/chunks/1", headers=auth_headers, content=b"x" * 11)
+    assert response.status_code == 413
+    response = client.put(f"/api/uploads/{upload_id}/chunks/2", headers=auth_headers, content=b"x")
+    assert response.status_code == 400
+
+    response = client.delete(f"/api/uploads/{upload_id}", headers=auth_headers)
+    assert response.status_code == 200
+    assert client.get(f"/api/uploads/{upload_id}", headers=auth_headers).status_code == 404
+
+def test_rejects_bad_extension(auth_headers):
+    """Test extensión no permitida al crear la sesión"""
+    response = client.post("/api/uploads", headers=auth_headers, json={"filename": "a.txt", "total_size": 10})
+    assert response.status_code == 400
+
+def test_ordered_hasher_reads_only_the_tail(tmp_path):
+    """Test hash correcto con buffer de reordenación lleno y bloques reenviados"""
+    blocks = [os.urandom(100) for _ in range(6)]
+    path = tmp_path / "data.bin"
+    path.write_bytes(b"".join(blocks))
+    expected = hashlib.sha256(b"".join(blocks)).hexdigest()
+
+    hasher = OrderedHasher(ReorderBudget(max_bytes=100))
+    for index in (1, 2, 0, 4, 3, 5):  # el 2 no cabe en el buffer
+        hasher.feed(index, blocks[index])
+    assert hasher.next_index == 2
+    assert hasher.finish(path) == expected
+
+    hasher = OrderedHasher(ReorderBudget())
+    for index in (0, 1, 0):  # reenvío de un bloque ya hasheado
+        hasher.feed(index, blocks[index])
+    assert hasher.stale
+    assert hasher.finish(path) == expected
+
+def test_reorder_budget_is_shared_between_sessions(tmp_path):
+    """Test el buffer de reordenación se limita en bytes entre todas las sesiones"""
+    budget = ReorderBudget(max_bytes=250)
+    first, second = OrderedHasher(budget), OrderedHasher(budget)
+    blocks = [os.urandom(100) for _ in range(3)]
+
+    first.feed(1, blocks[1])
+    first.feed(2, blocks[2])
+    second.feed(1, blocks[1])  # no cabe: se hasheará desde disco
+    assert budget.used == 200
+
+    first.feed(0, blocks[0])
+    assert budget.used == 0
+    second.feed(2, blocks[2])
+    assert budget.used == 100
+
+    path = tmp_path / "data.bin"
+    path.write_bytes(b"".join(blocks))
+    assert second.finish(path) == hashlib.sha256(b"".join(blocks)).hexdigest()
+    assert budget.used == 0
+
+def test_idle_hashers_are_released(monkeypatch):
+    """Test los hashers inactivos se descartan y devuelven su buffer"""
+    budget = ReorderBudget()
+    monkeypatch.setattr(upload_sessions, "reorder_budget", budget)
+    monkeypatch.setattr(upload_sessions, "_hashers", {})
+    hasher = upload_sessions.get_hasher("idle")
+    hasher.feed(3, b"x" * 100)
+    upload_sessions.get_hasher("active").feed(3, b"y" * 50)
+    hasher.last_used -= 3600
+
+    assert upload_sessions.expire_idle_hashers(ttl=60) == 1
+    assert set(upload_sessions._hashers) == {"active"}
+    assert budget.used == 50
+
+def test_stale_sessions_are_removed(auth_headers):
+    """Test las sesiones pendientes abandonadas se eliminan con su archivo reservado"""
+    stale = create_session(auth_headers, CHUNK * 2)
+    active = create_session(auth_headers, CHUNK * 2)
+    client.put(f"/api/uploads/{active['upload_id']}/chunks/0", headers=auth_headers, content=b"a" * CHUNK)
+
+    db = TestingSessionLocal()
+    try:
+        old = datetime.utcnow() - timedelta(days=3)
+        db.get(UploadSession, stale["upload_id"]).created_at = old
+        db.get(UploadSession, stale["upload_id"]).updated_at = old
+        db.get(UploadSession, active["upload_id"]).created_at = old
+        db.commit()
+        stale_file = resumable.UPLOAD_DIR / db.get(UploadSession, stale["upload_id"]).stored_filename
+        assert stale_file.exists()
+
+        assert resumable.expire_stale_sessions(db, ttl=24 * 3600) == 1
+    finally:
+        db.close()
+
+    assert not stale_file.exists()
+    assert client.get(f"/api/uploads/{stale['upload_id']}", headers=auth_headers).status_code == 404
+    assert client.get(f"/api/uploads/{active['upload_id']}", headers=auth_headers).status_code == 200
+    client.delete(f"/api/uploads/{active['upload_id']}", headers=auth_headers)
+
+def test_failed_store_keeps_session_pending(auth_headers, monkeypatch):
+    """Test si no se puede guardar el blob se elimina el job y se puede reintentar"""
+    content = os.urandom(CHUNK + 100)
+    upload_id = create_session(auth_headers, len(content))["upload_id"]
+    for index in (0, 1):
+        client.put(f"/api/uploads/{upload_id}/chunks/{index}", headers=auth_headers,
+                   content=content[index * CHUNK:(index + 1) * CHUNK])
+    store_blob = resumable.store_blob
+
+    def failing_store(source, blob_key):
+        raise OSError("disco lleno")
+    monkeypatch.setattr(resumable, "store_blob", failing_store)
+    response = client.post(f"/api/uploads/{upload_id}/complete", headers=auth_headers)
+    assert response.status_code == 500
+    db = TestingSessionLocal()
+    assert db.query(Job).filter(Job.input_sha256 == hashlib.sha256(content).hexdigest()).count() == 0
+    db.close()
+
+    monkeypatch.setattr(resumable, "store_blob", store_blob)
+    response = client.post(f"/api/uploads/{upload_id}/complete", headers=auth_headers)
+    assert response.status_code == 200
+    data = response.json()
+    assert data["sha256"] == hashlib.sha256(content).hexdigest()
+    (resumable.UPLOAD_DIR / data["unique_filename"]).unlink()
@@ -0,0 +1,84 @@
+"""
+Tests para la caché de etapas intermedias
+"""
+
+import numpy as np
+import pytest
+
+import celery_worker
+from stage_cache import StageCache
+from storage.filesystem import FilesystemStorage
+from processing.point_cloud_processor_simple import PointCloudProcessor as SimpleProcessor
+
+
+STAGE_PARAMS = [
+    {'voxel_size': 0.01},
+    {'nb_neighbors': 20, 'std_ratio': 2.0},
+    {'normal_radius': 0.1, 'normal_max_nn': 30},
+]
+
+
+def test_chain_keys_depend_on_upstream_params():
+    """Test que cambiar una etapa invalida esa etapa y las siguientes"""
+    keys = StageCache.chain_keys("abc", STAGE_PARAMS)
+    changed = StageCache.chain_keys("abc", [STAGE_PARAMS[0], {'nb_neighbors': 30, 'std_ratio': 2.0}, STAGE_PARAMS[2]])
+    other_input = StageCache.chain_keys("abd", STAGE_PARAMS)
+
+    assert len(set(keys)) == 3
+    assert keys[0] == changed[0]
+    assert keys[1] != changed[1]
+    assert keys[2] != changed[2]
+    assert not set(keys) & set(other_input)
+
+
+def test_save_load_and_resume(tmp_path):
+    """Test guardado, lectura y reanudación desde la etapa más profunda"""
+    cache = StageCache(tmp_path, max_bytes=10 ** 9)
+    keys = StageCache.chain_keys("abc", STAGE_PARAMS)
+    points = np.random.rand(50, 3)
+
+    assert cache.resume(keys) == (-1, None)
+
+    cache.save(keys[0], {'points': points, 'colors': None, 'normals': None})
+    cache.save(keys[1], {'points': points[:40], 'colors': None, 'normals': None})
+    depth, arrays = cache.resume(keys)
+
+    assert depth == 1
+    assert set(arrays) == {'points'}
+    np.testing.assert_array_equal(arrays['points'], points[:40])
+
+
+def test_worker_resumes_from_cached_normals(tmp_path, monkeypatch):
+    """Test que un segundo trabajo con otro algoritmo no repite el preprocesado"""
+    monkeypatch.setattr(celery_worker, 'stage_cache', StageCache(tmp_path / "stages", max_bytes=10 ** 9))
+    monkeypatch.setattr(celery_worker, 'OUTPUT_DIR', tmp_path)
+    monkeypatch.setattr(celery_worker, 'output_storage', FilesystemStorage(tmp_path / "outputs"))
+
+    calls = []
+    original_load = SimpleProcessor.load_point_cloud
+    original_normals = SimpleProcessor.estimate_normals
+
+    def counting_load(self, *args, **kwargs):
+        calls.append('load')
+        return original_load(self, *args, **kwargs)
+
+    def counting_normals(self, *args, **kwargs):
+        calls.append('normals')
+        return original_normals(self, *args, **kwargs)
+
+    monkeypatch.setattr(SimpleProcessor, 'load_point_cloud', counting_load)
+    monkeypatch.setattr(SimpleProcessor, 'estimate_normals', counting_normals)
+
+    input_file = tmp_path / "input.ply"
+    input_file.write_bytes(b"ply")
+
+    first = celery_worker.process_point_cloud_task.run(
+        job_id=1, input_file_path=str(input_file), algorithm='poisson', voxel_size=0.05
+    )
+    second = celery_worker.process_point_cloud_task.run(
+        job_id=2, input_file_path=str(input_file), algorithm='ball_pivoting', voxel_size=0.05
+    )
+
+    assert first['success'] and second['success']
+    assert calls == ['load', 'normals']
+    assert len(list((tmp_path / "outputs").iterdir())) == 2
@@ -0,0 +1,133 @@
+"""
+Tests para los backends de almacenamiento
+
+El backend S3 se prueba contra un servidor S3 local (moto) en lugar de AWS.
+"""
+
+import os
+
+import pytest
+
+from storage.filesystem import FilesystemStorage
+from tests.conftest import client, engine
+
+PART = 5 * 1024 * 1024
+
+@pytest.fixture(scope="module")
+def s3_endpoint():
+    """Servidor S3 local para toda la sesión de tests"""
+    moto_server = pytest.importorskip("moto.server")
+    os.environ.setdefault("AWS_ACCESS_KEY_ID", "testing")
+    os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "testing")
+    server = moto_server.ThreadedMotoServer(ip_address="127.0.0.1", port=0)
+    server.start()
+    host, port = server.get_host_and_port()
+    yield f"http://{host}:{port}"
+    server.stop()
+
+@pytest.fixture
+def s3_storage(s3_endpoint):
+    from storage.s3 import S3Storage
+    storage = S3Storage("test-bucket", prefix="uploads/", endpoint_url=s3_endpoint, region="us-east-1")
+    storage.client.create_bucket(Bucket="test-bucket")
+    return storage
+
+@pytest.fixture(params=["filesystem", "s3"])
+def storage(request, tmp_path):
+    if request.param == "filesystem":
+        return FilesystemStorage(tmp_path / "store")
+    return request.getfixturevalue("s3_storage")
+
+def test_put_fetch_and_ranges(storage, tmp_path):
+    """Test guardar, descargar y leer intervalos"""
+    source = tmp_path / "scan.ply"
+    source.write_bytes(bytes(range(256)) * 10)
+    
+    storage.put_file("scan.ply", source)
+    assert source.exists()
+    assert storage.exists("scan.ply")
+    assert storage.size("scan.ply") == 2560
+    assert storage.read_range("scan.ply", 10, 19) == bytes(range(10, 20))
+    
+    storage.fetch("scan.ply", tmp_path / "copy.ply")
+    assert (tmp_path / "copy.ply").read_bytes() == source.read_bytes()
+
+def test_rename_and_delete(storage, tmp_path):
+    """Test renombrado, borrado y objetos inexistentes"""
+    source = tmp_path / "a.ply"
+    source.write_bytes(b"contenido")
+    storage.put_file("a.ply", source, move=True)
+    assert not source.exists()
+    
+    storage.rename("a.ply", "b.ply")
+    assert not storage.exists("a.ply")
+    assert storage.exists("b.ply")
+    with pytest.raises(FileNotFoundError):
+        storage.rename("a.ply", "c.ply")
+    
+    storage.delete("b.ply")
+    storage.delete("b.ply")
+    assert not storage.exists("b.ply")
+    with pytest.raises(FileNotFoundError):
+        storage.size("b.ply")
+
+def test_multipart_upload(storage):
+    """Test subida multiparte con partes desordenadas"""
+    parts = [os.urandom(PART), os.urandom(PART), b"final"]
+    upload_id = storage.create_multipart("big.laz")
+    etags = {}
+    for number in (3, 1, 2):
+        etags[number] = storage.upload_part("big.laz", upload_id, number, parts[number - 1])
+    
+    listed = storage.list_parts("big.laz", upload_id)
+    assert {number: size for number, (size, _) in listed.items()} == {1: PART, 2: PART, 3: 5}
+    
+    storage.complete_multipart("big.laz", upload_id, [(n, etags[n]) for n in (1, 2, 3)])
+    assert storage.size("big.laz") == 2 * PART + 5
+    assert storage.read_range("big.laz", PART, PART + 9) == parts[1][:10]
+
+def test_filesystem_rejects_escaping_keys(tmp_path):
+    """Test que una clave no puede salir del directorio raíz"""
+    storage = FilesystemStorage(tmp_path / "store")
+    with pytest.raises(ValueError):
+        storage.exists("../secret")
+
+def test_direct_upload_via_presigned_urls(s3_storage, monkeypatch):
+    """Test subida directa: los bytes van al almacenamiento con URLs firmadas"""
+    import httpx
+    from database import Base
+    import routes.resumable_upload as resumable
+    
+    monkeypatch.setattr(resumable, "upload_storage", s3_storage)
+    Base.metadata.create_all(bind=engine)
+    try:
+        client.post("/auth/register", json={"email": "direct@example.com", "password": "testpassword"})
+        token = client.post("/auth/login", json={
+            "email": "direct@example.com", "password": "testpassword"
+        }).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+        
+        content = os.urandom(PART + 1000)
+        session = client.post("/api/uploads", headers=headers, json={
+            "filename": "survey.las", "total_size": len(content), "chunk_size": PART, "direct": True
+        }).json()
+        upload_id = session["upload_id"]
+        assert session["direct"] is True
+        
+        # La API no acepta los bytes de una subida directa
+        response = client.put(f"/api/uploads/{upload_id}/chunks/0", headers=headers, content=content[:PART])
+        assert response.status_code == 409
+        
+        for index in (1, 0):
+            presigned = client.get(f"/api/uploads/{upload_id}/chunks/{index}/url", headers=headers).json()
+            chunk = content[index * PART:(index + 1) * PART]
+            assert httpx.put(presigned["url"], content=chunk).status_code == 200
+        
+        state = client.get(f"/api/uploads/{upload_id}", headers=headers).json()
+        assert state["missing_chunks"] == []
+        
+        data = client.post(f"/api/uploads/{upload_id}/complete", headers=headers).json()
+        assert data["file_size"] == len(content)
+        assert s3_storage.read_range(data["unique_filename"], 0, len(content) - 1) == content
+    finally:
+        Base.metadata.drop_all(bind=engine)
@@ -0,0 +1,246 @@
+"""
+Tests para la reconstrucción por teselas (reparto y cosido)
+"""
+
+import numpy as np
+import pytest
+
+from processing.tiling import plan_tiles, stitch_tiles, auto_tile_size, build_tile_payloads
+from processing.point_cloud_processor_simple import PointCloudProcessor as SimpleProcessor
+
+
+def grid_points(n=40):
+    """Rejilla regular en el plano z = 0 sobre [0, 1) x [0, 1)"""
+    xs = (np.arange(n) + 0.5) / n
+    xx, yy = np.meshgrid(xs, xs)
+    return np.column_stack([xx.ravel(), yy.ravel(), np.zeros(n * n)])
+
+
+def grid_mesh(points, n):
+    """Triangulación de una rejilla n x n"""
+    idx = np.arange(n * n).reshape(n, n)
+    a, b = idx[:-1, :-1].ravel(), idx[:-1, 1:].ravel()
+    c, d = idx[1:, :-1].ravel(), idx[1:, 1:].ravel()
+    return np.concatenate([np.column_stack([a, b, c]), np.column_stack([b, d, c])])
+
+
+def test_plan_tiles_covers_every_point_once_in_core():
+    """Test que cada punto está en el núcleo de exactamente una tesela"""
+    points = grid_points()
+    tiles = plan_tiles(points, tile_size=0.25, overlap=0.05)
+    
+    in_core = np.zeros(len(points), dtype=int)
+    for tile in tiles:
+        p = points[tile['indices']]
+        core = np.all((p >= tile['core_min']) & (p < tile['core_max']), axis=1)
+        in_core[tile['indices'][core]] += 1
+    assert (in_core == 1).all()
+
+
+def test_plan_tiles_overlap():
+    """Test que las teselas incluyen los puntos del solape"""
+    points = grid_points()
+    tiles = plan_tiles(points, tile_size=0.25, overlap=0.05)
+    
+    assert len(tiles) == 16
+    total = sum(len(t['indices']) for t in tiles)
+    assert total > len(points)
+    for tile in tiles:
+        p = points[tile['indices']]
+        assert (p >= tile['core_min'] - 0.05 - 1e-9).all()
+        assert (p < tile['core_max'] + 0.05 + 1e-9).all()
+
+
+def test_plan_tiles_invalid_overlap():
+    """Test solape demasiado grande"""
+    with pytest.raises(ValueError):
+        plan_tiles(grid_points(), tile_size=0.2, overlap=0.1)
+
+
+def test_stitch_trims_overlap_and_welds_seams():
+    """Test cosido: sin triángulos duplicados y vértices soldados"""
+    n = 40
+    points = grid_points(n)
+    full_triangles = grid_mesh(points, n)
+    tiles = plan_tiles(points, tile_size=0.25, overlap=0.05)
+    
+    # Cada tesela "reconstruye" los triángulos de la malla completa que usan sus puntos
+    tile_meshes = []
+    for tile in tiles:
+        local = -np.ones(len(points), dtype=np.int64)
+        local[tile['indices']] = np.arange(len(tile['indices']))
+        tri = local[full_triangles]
+        tri = tri[(tri >= 0).all(axis=1)]
+        tile_meshes.append((points[tile['indices']], tri, None))
+    
+    vertices, triangles, colors = stitch_tiles(tile_meshes, tiles, weld_tolerance=1e-6)
+    
+    assert colors is None
+    assert len(triangles) == len(full_triangles)
+    assert len(vertices) == len(points)
+    canonical = {tuple(sorted(map(tuple, vertices[t].round(6)))) for t in triangles}
+    assert len(canonical) == len(triangles)
+
+
+def test_stitch_welds_independently_meshed_tiles():
+    """Test cosido de teselas malladas por separado (vértices de costura no idénticos)"""
+    n = 40
+    points = grid_points(n)
+    full_triangles = grid_mesh(points, n)
+    tiles = plan_tiles(points, tile_size=0.25, overlap=0.05)
+    rng = np.random.default_rng(0)
+    
+    # Cada tesela tiene su propia copia de los vértices con un pequeño error
+    tile_meshes = []
+    for tile in tiles:
+        local = -np.ones(len(points), dtype=np.int64)
+        local[tile['indices']] = np.arange(len(tile['indices']))
+        tri = local[full_triangles]
+        tri = tri[(tri >= 0).all(axis=1)]
+        # Solo en x, y: la nube plana está justo en el borde inferior de las teselas en z
+        jitter = np.zeros((len(tile['indices']), 3))
+        jitter[:, :2] = rng.uniform(-2e-5, 2e-5, (len(tile['indices']), 2))
+        tile_meshes.append((points[tile['indices']] + jitter, tri, None))
+    
+    vertices, triangles, _ = stitch_tiles(tile_meshes, tiles, weld_tolerance=1e-4)
+    
+    assert len(triangles) == len(full_triangles)
+    assert len(vertices) == len(points)
+    # Costuras cerradas: cada arista interior la comparten dos triángulos
+    edges = np.sort(np.concatenate([triangles[:, [0, 1]], triangles[:, [1, 2]], triangles[:, [2, 0]]]), axis=1)
+    _, counts = np.unique(edges, axis=0, return_counts=True)
+    assert (counts == 1).sum() == 4 * (n - 1)
+
+
+def test_stitch_empty():
+    """Test cosido sin mallas"""
+    vertices, triangles, _ = stitch_tiles([None], [{'core_min': 0, 'core_max': 1}], 1e-6)
+    assert len(vertices) == 0 and len(triangles) == 0
+
+
+def test_auto_tile_size():
+    """Test tamaño automático de tesela"""
+    points = np.random.rand(8000, 3)
+    size = auto_tile_size(points, points_per_tile=1000)
+    assert 0.4 < size < 0.6
+
+
+def test_build_tile_payloads():
+    """Test datos enviados a cada proceso"""
+    points = grid_points(10)
+    colors = np.random.rand(len(points), 3)
+    tiles = plan_tiles(points, 0.5, 0.1)
+    
+    payloads = build_tile_payloads(points, None, colors, tiles, 'ball_pivoting', {'ball_pivoting_radii': [0.1]})
+    assert len(payloads) == len(tiles)
+    np.testing.assert_allclose(payloads[0]['colors'], colors[tiles[0]['indices']])
+    assert payloads[0]['normals'] is None
+
+
+def test_simple_processor_reconstruct_tiled():
+    """Test modo por teselas del procesador sin Open3D"""
+    processor = SimpleProcessor()
+    processor.points = grid_points()
+    
+    assert processor.reconstruct_tiled('poisson', tile_size=0.5) is True
+    assert processor.get_mesh_info()['tiles'] == 4
+
+
+def test_buffer_payloads_match_inline_payloads(tmp_path):
+    """Test que los payloads por .bvb resuelven los mismos arrays que los serializados"""
+    from processing.point_buffer import write_buffer
+    from processing.tiling import load_tile_arrays
+
+    points = grid_points()
+    normals = np.tile([0.0, 0.0, 1.0], (len(points), 1))
+    tiles = plan_tiles(points, tile_size=0.25, overlap=0.05)
+    buffer_path = write_buffer(tmp_path / "cloud.bvb", {'points': points, 'normals': normals})
+
+    inline = build_tile_payloads(points, normals, None, tiles, 'poisson', {})
+    mapped = build_tile_payloads(points, normals, None, tiles, 'poisson', {}, buffer_path=buffer_path)
+
+    assert 'points' not in mapped[0]
+    for a, b in zip(inline, mapped):
+        a_points, a_normals, a_colors = load_tile_arrays(a)
+        b_points, b_normals, b_colors = load_tile_arrays(b)
+        np.testing.assert_array_equal(a_points, b_points)
+        np.testing.assert_array_equal(a_normals, b_normals)
+        assert a_colors is None and b_colors is None
+
+
+@pytest.fixture
+def tiled_worker(tmp_path, monkeypatch):
+    """Worker con almacenamiento en tmp_path y tareas de Celery en línea"""
+    import celery_worker
+    from stage_cache import StageCache
+    from storage.filesystem import FilesystemStorage
+
+    monkeypatch.setattr(celery_worker, 'stage_cache', StageCache(tmp_path / "stages", max_bytes=10 ** 9))
+    monkeypatch.setattr(celery_worker, 'OUTPUT_DIR', tmp_path)
+    monkeypatch.setattr(celery_worker, 'output_storage', FilesystemStorage(tmp_path / "outputs"))
+    monkeypatch.setattr(celery_worker.celery_app.conf, 'task_always_eager', True)
+    return celery_worker
+
+
+def test_worker_reconstructs_tiles_as_chord(tiled_worker, tmp_path, monkeypatch):
+    """Test que cada tesela es una tarea propia y el callback termina el trabajo"""
+    reconstructed = []
+    original = SimpleProcessor.reconstruct_tile_mesh
+
+    def counting_tile(arrays, algorithm, params):
+        reconstructed.append(len(arrays['points']))
+        return original(arrays, algorithm, params)
+
+    monkeypatch.setattr(SimpleProcessor, 'reconstruct_tile_mesh', staticmethod(counting_tile))
+    input_file = tmp_path / "input.ply"
+    input_file.write_bytes(b"ply")
+
+    result = tiled_worker.process_point_cloud_task.run(
+        job_id=1, input_file_path=str(input_file), algorithm='poisson',
+        voxel_size=0.05, tiled=True, tile_size=0.5
+    )
+
+    assert result['success'] and result['dispatched']
+    assert len(reconstructed) == result['tiles'] > 1
+    assert (tmp_path / "outputs" / "mesh_1.ply").exists()
+    # Los archivos intermedios de las teselas se borran tras el cosido
+    assert not list((tmp_path / "outputs" / ".tiles").iterdir())
+
+
+def test_tile_failure_marks_job_failed(tiled_worker, tmp_path, monkeypatch):
+    """Test que el errback del chord marca el trabajo como fallido y limpia las teselas"""
+    from database import Base
+    from enums import JobStatus
+    from models import Job, User
+    from tests.conftest import engine, TestingSessionLocal
+
+    Base.metadata.create_all(bind=engine)
+    try:
+        monkeypatch.setattr(tiled_worker, 'SessionLocal', TestingSessionLocal)
+        db = TestingSessionLocal()
+        user = User(email="tiles@example.com", hashed_password="x")
+        db.add(user)
+        db.commit()
+        job = Job(user_id=user.id, input_key="input.ply", status=JobStatus.processing)
+        db.add(job)
+        db.commit()
+        job_id = job.id
+        db.close()
+
+        prefix = f"{tiled_worker.TILE_KEY_PREFIX}/{job_id}_test"
+        storage = tiled_worker.output_storage
+        for key in tiled_worker.tile_keys(prefix, 2):
+            path = tmp_path / "upload.bvb"
+            path.write_bytes(b"bvb")
+            storage.put_file(key, path, move=True)
+
+        tiled_worker.tiles_failed_task.run(None, ValueError("tesela"), None, job_id, prefix, 2)
+
+        db = TestingSessionLocal()
+        job = db.get(Job, job_id)
+        assert job.status == JobStatus.failed
+        assert "tesela" in job.error
+        db.close()
+        assert not any(storage.exists(key) for key in tiled_worker.tile_keys(prefix, 2))
+    finally:
+        Base.metadata.drop_all(bind=engine)
@@ -1,26 +1,8 @@
 import pytest
-from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
-from main import app
-from database import get_db, Base
+from database import Base
 from io import BytesIO
 
-# Base de datos de prueba en memoria
-SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
-engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
-TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-
-def override_get_db():
-    try:
-        db = TestingSessionLocal()
-        yield db
-    finally:
-        db.close()
-
-app.dependency_overrides[get_db] = override_get_db
-
-client = TestClient(app)
+from tests.conftest import client, engine
 
 @pytest.fixture(scope="module")
 def setup_database():
@@ -96,3 +78,173 @@ def test_upload_file_too_large(auth_token):
     
     response = client.post("/api/upload", headers=headers, files=files)
     assert response.status_code == 413
+
+def test_upload_file_stores_sha256(auth_token):
+    """Test que la subida calcula el SHA-256 y lo guarda en el job"""
+    import hashlib
+    file_content = b"streamed point cloud" * 100000  # ~2MB, varios bloques
+    
+    headers = {"Authorization": f"Bearer {auth_token}"}
+    files = {"file": ("scan.las", BytesIO(file_content), "application/octet-stream")}
+    
+    response = client.post("/api/upload", headers=headers, files=files)
+    assert response.status_code == 200
+    data = response.json()
+    expected = hashlib.sha256(file_content).hexdigest()
+    assert data["sha256"] == expected
+    assert data["file_size"] == len(file_content)
+    
+    job = client.get(f"/api/jobs/{data['job_id']}", headers=headers).json()
+    assert job["input_sha256"] == expected
+
+def test_upload_file_too_large_during_copy(auth_token, monkeypatch):
+    """Test que se corta la copia al cruzar el límite y no queda archivo parcial"""
+    import routes.upload as upload
+    monkeypatch.setattr(upload, "MAX_FILE_SIZE", 1024)
+    before = set(upload.UPLOAD_DIR.iterdir())
+    
+    headers = {"Authorization": f"Bearer {auth_token}"}
+    files = {"file": ("big.ply", BytesIO(b"x" * 4096), "application/octet-stream")}
+    
+    response = client.post("/api/upload", headers=headers, files=files)
+    assert response.status_code == 413
+    assert set(upload.UPLOAD_DIR.iterdir()) == before
+
+def test_upload_same_content_is_deduplicated(auth_token):
+    """Test que dos subidas idénticas comparten el mismo archivo"""
+    import routes.upload as upload
+    file_content = b"reference scan" * 1000
+    headers = {"Authorization": f"Bearer {auth_token}"}
+    
+    first = client.post("/api/upload", headers=headers,
+                        files={"file": ("ref.ply", BytesIO(file_content), "application/octet-stream")}).json()
+    second = client.post("/api/upload", headers=headers,
+                         files={"file": ("copy.ply", BytesIO(file_content), "application/octet-stream")}).json()
+    
+    assert first["deduplicated"] is False
+    assert second["deduplicated"] is True
+    assert first["unique_filename"] == second["unique_filename"] == f"{first['sha256']}.ply"
+    assert first["job_id"] != second["job_id"]
+    assert not list(upload.UPLOAD_DIR.glob(".*.part"))
+    
+    # El archivo solo se borra al eliminar el último job que lo referencia
+    blob = upload.UPLOAD_DIR / first["unique_filename"]
+    assert client.delete(f"/api/jobs/{first['job_id']}", headers=headers).status_code == 200
+    assert blob.exists()
+    assert client.delete(f"/api/jobs/{second['job_id']}", headers=headers).status_code == 200
+    assert not blob.exists()
+
+def test_upload_by_hash(auth_token):
+    """Test de creación de job por hash sin transferir el archivo"""
+    import hashlib
+    file_content = b"known scan" * 1000
+    sha256 = hashlib.sha256(file_content).hexdigest()
+    headers = {"Authorization": f"Bearer {auth_token}"}
+    
+    response = client.post("/api/upload/by-hash", headers=headers,
+                           json={"sha256": sha256, "filename": "known.las"})
+    assert response.status_code == 404
+    
+    client.post("/api/upload", headers=headers,
+                files={"file": ("known.las", BytesIO(file_content), "application/octet-stream")})
+    response = client.post("/api/upload/by-hash", headers=headers,
+                           json={"sha256": sha256, "filename": "again.las"})
+    assert response.status_code == 200
+    data = response.json()
+    assert data["deduplicated"] is True
+    assert data["file_size"] == len(file_content)
+    assert data["unique_filename"] == f"{sha256}.las"
+
+def test_upload_by_hash_scoped_to_user(auth_token):
+    """Test que por defecto no se pueden reutilizar contenidos de otro usuario"""
+    import hashlib
+    file_content = b"private scan" * 1000
+    sha256 = hashlib.sha256(file_content).hexdigest()
+    client.post("/api/upload", headers={"Authorization": f"Bearer {auth_token}"},
+                files={"file": ("private.ply", BytesIO(file_content), "application/octet-stream")})
+    
+    client.post("/auth/register", json={"email": "other-upload@example.com", "password": "testpassword"})
+    other = client.post("/auth/login", json={"email": "other-upload@example.com", "password": "testpassword"}).json()
+    response = client.post("/api/upload/by-hash", headers={"Authorization": f"Bearer {other['access_token']}"},
+                           json={"sha256": sha256, "filename": "private.ply"})
+    assert response.status_code == 404
+
+def test_upload_by_hash_invalid(auth_token):
+    """Test de validación del hash"""
+    headers = {"Authorization": f"Bearer {auth_token}"}
+    response = client.post("/api/upload/by-hash", headers=headers,
+                           json={"sha256": "abc", "filename": "scan.ply"})
+    assert response.status_code == 400
+
+def other_user_headers(email: str) -> dict:
+    client.post("/auth/register", json={"email": email, "password": "testpassword"})
+    other = client.post("/auth/login", json={"email": email, "password": "testpassword"}).json()
+    return {"Authorization": f"Bearer {other['access_token']}"}
+
+def test_files_require_owned_job(auth_token):
+    """Test descarga y borrado solo para quien tiene un job con el archivo"""
+    file_content = b"owned scan" * 1000
+    headers = {"Authorization": f"Bearer {auth_token}"}
+    data = client.post("/api/upload", headers=headers,
+                       files={"file": ("owned.ply", BytesIO(file_content), "application/octet-stream")}).json()
+    blob = data["unique_filename"]
+    
+    other_headers = other_user_headers("intruder@example.com")
+    assert client.get(f"/api/files/{blob}", headers=other_headers).status_code == 404
+    assert client.delete(f"/api/files/{blob}", headers=other_headers).status_code == 404
+    # Conocer el nombre tampoco permite crear un job que dé acceso al archivo
+    assert client.post("/api/jobs", json={"input_key": blob}, headers=other_headers).status_code == 404
+    assert client.get(f"/api/files/{blob}", headers=other_headers).status_code == 404
+    
+    response = client.get(f"/api/files/{blob}", headers=headers)
+    assert response.status_code == 200
+    assert response.content == file_content
+    assert client.delete(f"/api/jobs/{data['job_id']}", headers=headers).status_code == 200
+
+def test_delete_file_removes_own_jobs(auth_token):
+    """Test borrar un archivo elimina los jobs propios y el blob sin referencias"""
+    import routes.upload as upload
+    headers = {"Authorization": f"Bearer {auth_token}"}
+    data = client.post("/api/upload", headers=headers,
+                       files={"file": ("removed.ply", BytesIO(b"removed scan" * 1000),
+                                       "application/octet-stream")}).json()
+    again = client.post("/api/jobs", json={"input_key": data["unique_filename"]}, headers=headers).json()
+    
+    response = client.delete(f"/api/files/{data['unique_filename']}", headers=headers)
+    assert response.status_code == 200
+    assert response.json()["deleted_jobs"] == 2
+    assert client.get(f"/api/jobs/{again['id']}", headers=headers).status_code == 404
+    assert not (upload.UPLOAD_DIR / data["unique_filename"]).exists()
+
+def test_delete_file_keeps_blob_referenced_by_others(auth_token):
+    """Test el blob sigue disponible para otros usuarios con el mismo contenido"""
+    import routes.upload as upload
+    file_content = b"common scan" * 1000
+    headers = {"Authorization": f"Bearer {auth_token}"}
+    other_headers = other_user_headers("sharer@example.com")
+    mine = client.post("/api/upload", headers=headers,
+                       files={"file": ("common.ply", BytesIO(file_content), "application/octet-stream")}).json()
+    theirs = client.post("/api/upload", headers=other_headers,
+                         files={"file": ("common.ply", BytesIO(file_content), "application/octet-stream")}).json()
+    
+    assert client.delete(f"/api/files/{mine['unique_filename']}", headers=headers).status_code == 200
+    assert client.get(f"/api/files/{mine['unique_filename']}", headers=headers).status_code == 404
+    assert client.get(f"/api/files/{theirs['unique_filename']}", headers=other_headers).status_code == 200
+    assert client.delete(f"/api/jobs/{theirs['job_id']}", headers=other_headers).status_code == 200
+    assert not (upload.UPLOAD_DIR / mine["unique_filename"]).exists()
+
+def test_failed_store_removes_job(auth_token, monkeypatch):
+    """Test si no se puede guardar el blob no queda un job sin archivo"""
+    import routes.upload as upload
+    headers = {"Authorization": f"Bearer {auth_token}"}
+    jobs_before = len(client.get("/api/jobs", headers=headers).json())
+    
+    def failing_store(source, blob_key):
+        raise OSError("disco lleno")
+    monkeypatch.setattr(upload, "store_blob", failing_store)
+    
+    response = client.post("/api/upload", headers=headers,
+                           files={"file": ("lost.ply", BytesIO(b"lost scan" * 1000), "application/octet-stream")})
+    assert response.status_code == 500
+    assert len(client.get("/api/jobs", headers=headers).json()) == jobs_before
+    assert not list(upload.UPLOAD_DIR.glob(".*.part"))
@@ -0,0 +1,211 @@
+import pytest
+from jose import jwt
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from database import Base
+from models import User
+from auth import SECRET_KEY, ALGORITHM, create_access_token
+from user_cache import CachedUser, UserCache, user_cache
+
+from tests.conftest import client, engine, TestingSessionLocal
+
+@pytest.fixture
+def setup_database():
+    Base.metadata.create_all(bind=engine)
+    user_cache.clear()
+    yield
+    user_cache.clear()
+    Base.metadata.drop_all(bind=engine)
+
+@pytest.fixture
+def user_queries():
+    """Consultas a la tabla de usuarios (de cualquier engine)"""
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if "FROM users" in statement:
+            statements.append(statement)
+
+    event.listen(Engine, "before_cursor_execute", record)
+    yield statements
+    event.remove(Engine, "before_cursor_execute", record)
+
+def register_and_login(email: str) -> str:
+    client.post("/auth/register", json={"email": email, "password": "testpassword"})
+    response = client.post("/auth/login", json={"email": email, "password": "testpassword"})
+    return response.json()["access_token"]
+
+def snapshot(user_id: int, email: str = "a@example.com") -> CachedUser:
+    return CachedUser(id=user_id, email=email, is_active=True, is_verified=False, created_at=None)
+
+class FakeRedis:
+    """Redis mínimo en memoria (get/set/delete)"""
+
+    def __init__(self):
+        self.data = {}
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def set(self, key, value, ex=None):
+        self.data[key] = value
+
+    def delete(self, *keys):
+        for key in keys:
+            self.data.pop(key, None)
+
+def test_token_includes_user_id(setup_database):
+    """Test el token lleva el id del usuario"""
+    token = register_and_login("uid@example.com")
+    payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    assert payload["sub"] == "uid@example.com"
+    assert isinstance(payload["uid"], int)
+
+def test_repeated_requests_skip_user_query(setup_database, user_queries):
+    """Test las peticiones autenticadas repetidas no consultan el usuario"""
+    token = register_and_login("cached@example.com")
+    headers = {"Authorization": f"Bearer {token}"}
+    user_queries.clear()
+
+    for _ in range(3):
+        response = client.get("/api/jobs", headers=headers)
+        assert response.status_code == 200
+    assert len(user_queries) == 1
+
+    response = client.get("/auth/me", headers=headers)
+    assert response.status_code == 200
+    assert response.json()["email"] == "cached@example.com"
+    assert len(user_queries) == 1
+
+def test_user_update_invalidates_cache(setup_database, user_queries):
+    """Test modificar un usuario invalida su entrada"""
+    token = register_and_login("update@example.com")
+    headers = {"Authorization": f"Bearer {token}"}
+    assert client.get("/auth/me", headers=headers).json()["is_verified"] is False
+
+    db = TestingSessionLocal()
+    user = db.query(User).filter(User.email == "update@example.com").first()
+    user.is_verified = True
+    db.commit()
+    db.close()
+
+    user_queries.clear()
+    assert client.get("/auth/me", headers=headers).json()["is_verified"] is True
+    assert len(user_queries) == 1
+
+def test_deleted_user_is_rejected(setup_database):
+    """Test un usuario borrado deja de autenticarse"""
+    token = register_and_login("deleted@example.com")
+    headers = {"Authorization": f"Bearer {token}"}
+    assert client.get("/auth/me", headers=headers).status_code == 200
+
+    db = TestingSessionLocal()
+    db.delete(db.query(User).filter(User.email == "deleted@example.com").first())
+    db.commit()
+    db.close()
+
+    assert client.get("/auth/me", headers=headers).status_code == 401
+
+def test_legacy_token_without_user_id(setup_database):
+    """Test los tokens sin uid se siguen resolviendo por email"""
+    register_and_login("legacy@example.com")
+    token = create_access_token(data={"sub": "legacy@example.com"})
+    response = client.get("/auth/me", headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 200
+    assert response.json()["email"] == "legacy@example.com"
+
+def test_token_email_must_match_user(setup_database):
+    """Test un uid que no corresponde al email del token se rechaza"""
+    register_and_login("owner@example.com")
+    token = create_access_token(data={"sub": "other@example.com", "uid": 1})
+    response = client.get("/auth/me", headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 401
+
+def test_cache_ttl_and_lru_bound(monkeypatch):
+    """Test caducidad por TTL y límite de entradas"""
+    now = [1000.0]
+    monkeypatch.setattr("user_cache.time.monotonic", lambda: now[0])
+    cache = UserCache(ttl=30, max_entries=2, redis_url="")
+
+    cache.set(snapshot(1))
+    cache.set(snapshot(2))
+    assert cache.get(1) == snapshot(1)
+    cache.set(snapshot(3))
+    # 2 era la menos usada
+    assert cache.get(2) is None
+    assert cache.get(1) is not None
+    assert cache.get(3) is not None
+
+    now[0] += 31
+    assert cache.get(1) is None
+    assert cache.get(3) is None
+
+def test_redis_tier_shared_between_processes():
+    """Test la capa Redis comparte usuarios e invalidaciones entre cachés"""
+    redis = FakeRedis()
+    first = UserCache(ttl=30, max_entries=10, redis_url="redis://fake")
+    second = UserCache(ttl=30, max_entries=10, redis_url="redis://fake")
+    first._redis = second._redis = redis
+
+    first.set(snapshot(7, "shared@example.com"))
+    assert second.get(7) == snapshot(7, "shared@example.com")
+
+    first.invalidate(7)
+    second.clear()
+    assert second.get(7) is None
+
+def test_async_access_keeps_redis_off_the_event_loop():
+    """Test aget/aset consultan Redis fuera del hilo del event loop"""
+    import asyncio
+    import threading
+    threads = []
+
+    class TracingRedis(FakeRedis):
+        def get(self, key):
+            threads.append(threading.get_ident())
+            return super().get(key)
+
+        def set(self, key, value, ex=None):
+            threads.append(threading.get_ident())
+            return super().set(key, value, ex=ex)
+
+    redis = TracingRedis()
+    first = UserCache(ttl=30, max_entries=10, redis_url="redis://fake")
+    second = UserCache(ttl=30, max_entries=10, redis_url="redis://fake")
+    first._redis = second._redis = redis
+
+    async def scenario():
+        await first.aset(snapshot(8, "async@example.com"))
+        return threading.get_ident(), await second.aget(8)
+
+    loop_thread, user = asyncio.run(scenario())
+    assert user == snapshot(8, "async@example.com")
+    assert len(threads) == 2 and loop_thread not in threads
+
+def test_orm_invalidation_deletes_from_redis_after_commit(setup_database, monkeypatch):
+    """Test el borrado en Redis se hace tras el commit y fuera del hilo que confirma"""
+    import threading
+    deletes = []
+
+    class TracingRedis(FakeRedis):
+        def delete(self, *keys):
+            deletes.append(threading.get_ident())
+            super().delete(*keys)
+
+    redis = TracingRedis()
+    monkeypatch.setattr(user_cache, "redis_url", "redis://fake")
+    monkeypatch.setattr(user_cache, "_redis", redis)
+    register_and_login("orm@example.com")
+
+    db = TestingSessionLocal()
+    user = db.query(User).filter(User.email == "orm@example.com").first()
+    redis.set(f"user-cache:{user.id}", snapshot(user.id, "orm@example.com").to_json())
+    user.is_verified = True
+    db.flush()
+    assert deletes == []
+    db.commit()
+    db.close()
+    user_cache._executor.submit(lambda: None).result()
+
+    assert deletes and threading.get_ident() not in deletes
+    assert redis.data == {}
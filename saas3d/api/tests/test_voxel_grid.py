@@ -0,0 +1,103 @@
+"""
+Tests para el downsampling por rejilla de vóxeles
+"""
+
+import pytest
+import numpy as np
+
+from processing.voxel_grid import voxel_downsample, VoxelGridAccumulator
+from processing.point_cloud_processor_simple import PointCloudProcessor as SimpleProcessor
+
+
+def test_average_per_voxel():
+    """Test promedio de puntos y colores por vóxel"""
+    points = np.array([
+        [0.1, 0.1, 0.1], [0.3, 0.3, 0.3],  # vóxel (0, 0, 0)
+        [1.2, 0.1, 0.1],                     # vóxel (2, 0, 0)
+    ])
+    colors = np.array([[1, 0, 0], [0, 0, 1], [0, 1, 0]], dtype=float)
+    
+    out_points, out_colors = voxel_downsample(points, colors, 0.5)
+    order = np.argsort(out_points[:, 0])
+    
+    np.testing.assert_allclose(out_points[order], [[0.2, 0.2, 0.2], [1.2, 0.1, 0.1]])
+    np.testing.assert_allclose(out_colors[order], [[0.5, 0, 0.5], [0, 1, 0]])
+
+
+def test_negative_coordinates():
+    """Test vóxeles con coordenadas negativas"""
+    points = np.array([[-0.1, 0, 0], [0.1, 0, 0]])
+    
+    out_points, out_colors = voxel_downsample(points, None, 0.5)
+    assert len(out_points) == 2
+    assert out_colors is None
+
+
+def test_chunked_equals_single_pass():
+    """Test que procesar por bloques da el mismo resultado"""
+    rng = np.random.default_rng(1)
+    points = rng.random((20000, 3)) * 10
+    colors = rng.random((20000, 3))
+    
+    single = voxel_downsample(points, colors, 0.7, chunk_size=len(points))
+    chunked = voxel_downsample(points, colors, 0.7, chunk_size=997)
+    
+    order_a = np.lexsort(single[0].T)
+    order_b = np.lexsort(chunked[0].T)
+    np.testing.assert_allclose(single[0][order_a], chunked[0][order_b])
+    np.testing.assert_allclose(single[1][order_a], chunked[1][order_b])
+
+
+def test_merge_threshold_keeps_result():
+    """Test fusión intermedia de agregados"""
+    rng = np.random.default_rng(2)
+    points = rng.random((5000, 3))
+    accumulator = VoxelGridAccumulator(0.25, merge_threshold=10)
+    for start in range(0, len(points), 500):
+        accumulator.add(points[start:start + 500])
+    
+    out_points, _ = accumulator.result()
+    assert accumulator.input_count == 5000
+    assert len(out_points) == 64
+
+
+def test_merge_threshold_relative_to_grid(monkeypatch):
+    """Test con una rejilla fusionada mayor que el umbral no se fusiona en cada bloque"""
+    rng = np.random.default_rng(4)
+    accumulator = VoxelGridAccumulator(0.001, merge_threshold=100)
+    merges = []
+    merge = accumulator._merge
+    monkeypatch.setattr(accumulator, "_merge", lambda: merges.append(1) or merge())
+
+    # 50 bloques de 200 vóxeles distintos: la rejilla crece hasta 10000 filas
+    for _ in range(50):
+        accumulator.add(rng.random((200, 3)) * 1000)
+
+    assert len(merges) < 10
+    out_points, _ = accumulator.result()
+    assert len(out_points) == 10000
+
+
+def test_large_coordinate_range():
+    """Test rango de claves que no cabe en un int64 empaquetado"""
+    points = np.array([[-1e12, 0, 0], [1e12, 1e12, 1e12], [1e12, 1e12, 1e12]])
+    
+    out_points, _ = voxel_downsample(points, None, 1e-3)
+    assert len(out_points) == 2
+
+
+def test_invalid_voxel_size():
+    """Test tamaño de vóxel inválido"""
+    with pytest.raises(ValueError):
+        VoxelGridAccumulator(0)
+
+
+def test_simple_processor_downsample():
+    """Test downsample del procesador sin Open3D"""
+    processor = SimpleProcessor()
+    processor.points = np.random.rand(10000, 3)
+    processor.colors = np.random.rand(10000, 3)
+    
+    assert processor.downsample(0.1) is True
+    assert len(processor.points) <= 1000
+    assert len(processor.colors) == len(processor.points)
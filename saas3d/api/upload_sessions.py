@@ -0,0 +1,162 @@
+"""
+Hash incremental de subidas reanudables
+
+Los bloques de una sesión pueden llegar en cualquier orden y en paralelo.
+Cada bloque se escribe en su offset final y, si es el siguiente en orden, se
+añade al SHA-256 en ese momento; los que llegan adelantados esperan en un
+buffer de reordenación. Al finalizar solo se lee del disco la cola que no
+se pudo hashear en memoria (bloques descartados por buffer lleno, bloques
+recibidos por otro proceso o antes de un reinicio).
+
+El buffer está acotado en bytes para todas las sesiones del proceso (no por
+sesión), y los hashers sin actividad durante ``UPLOAD_SESSION_IDLE_TTL``
+se descartan: una sesión abandonada no retiene memoria indefinidamente.
+"""
+
+import hashlib
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict
+
+HASH_READ_SIZE = 8 * 1024 * 1024
+# Bytes de bloques adelantados retenidos en memoria entre todas las sesiones
+REORDER_BUFFER_MAX_BYTES = int(os.getenv("UPLOAD_REORDER_BUFFER_MB", "256")) * 1024 * 1024
+# Sesiones pendientes sin bloques nuevos durante este tiempo se consideran abandonadas
+UPLOAD_SESSION_IDLE_TTL = int(os.getenv("UPLOAD_SESSION_IDLE_TTL_SECONDS", str(24 * 60 * 60)))
+# Intervalo mínimo entre barridos de hashers inactivos
+HASHER_SWEEP_INTERVAL = 60
+
+
+class ReorderBudget:
+    """Presupuesto de bytes compartido por los buffers de reordenación"""
+
+    def __init__(self, max_bytes: int = REORDER_BUFFER_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.used = 0
+        self._lock = threading.Lock()
+
+    def reserve(self, size: int) -> bool:
+        with self._lock:
+            if self.used + size > self.max_bytes:
+                return False
+            self.used += size
+            return True
+
+    def release(self, size: int):
+        with self._lock:
+            self.used -= size
+
+
+reorder_budget = ReorderBudget()
+
+
+class OrderedHasher:
+    """SHA-256 de los bloques en orden aunque lleguen desordenados"""
+
+    def __init__(self, budget: ReorderBudget = None):
+        self.budget = budget if budget is not None else reorder_budget
+        self.last_used = time.monotonic()
+        self.next_index = 0
+        self.hashed_bytes = 0
+        # Un bloque ya hasheado se ha vuelto a recibir: el prefijo no es fiable
+        self.stale = False
+        self._digest = hashlib.sha256()
+        self._pending: Dict[int, bytes] = {}
+        self._lock = threading.Lock()
+
+    def feed(self, index: int, data: bytes):
+        """Registrar un bloque recibido"""
+        with self._lock:
+            self.last_used = time.monotonic()
+            if index < self.next_index:
+                self.stale = True
+                return
+            if index > self.next_index:
+                # Un reenvío sustituye al bloque retenido; si el buffer está
+                # lleno el bloque se hashea desde disco al finalizar
+                if index in self._pending:
+                    self.budget.release(len(self._pending.pop(index)))
+                if self.budget.reserve(len(data)):
+                    self._pending[index] = bytes(data)
+                return
+
+            self._update(data)
+            while self.next_index in self._pending:
+                block = self._pending.pop(self.next_index)
+                self.budget.release(len(block))
+                self._update(block)
+
+    def _update(self, data: bytes):
+        self._digest.update(data)
+        self.hashed_bytes += len(data)
+        self.next_index += 1
+
+    def finish(self, path: Path) -> str:
+        """Completar el hash leyendo del disco solo la parte no hasheada"""
+        with self._lock:
+            self._release_pending()
+            if self.stale:
+                self._digest = hashlib.sha256()
+                self.hashed_bytes = 0
+            with open(path, "rb") as f:
+                f.seek(self.hashed_bytes)
+                for block in iter(lambda: f.read(HASH_READ_SIZE), b""):
+                    self._digest.update(block)
+            return self._digest.hexdigest()
+
+    def release(self):
+        """Liberar los bloques retenidos (sesión descartada)"""
+        with self._lock:
+            self._release_pending()
+
+    def _release_pending(self):
+        self.budget.release(sum(len(block) for block in self._pending.values()))
+        self._pending.clear()
+
+
+_hashers: Dict[str, OrderedHasher] = {}
+_registry_lock = threading.Lock()
+_last_sweep = time.monotonic()
+
+
+def expire_idle_hashers(ttl: float = None) -> int:
+    """
+    Descartar los hashers sin bloques nuevos durante ``ttl`` segundos
+
+    Si la sesión se reanuda más tarde, el hash se completa desde el disco.
+
+    Returns:
+        Número de hashers descartados
+    """
+    ttl = UPLOAD_SESSION_IDLE_TTL if ttl is None else ttl
+    cutoff = time.monotonic() - ttl
+    with _registry_lock:
+        idle = [session_id for session_id, hasher in _hashers.items() if hasher.last_used < cutoff]
+        expired = [_hashers.pop(session_id) for session_id in idle]
+    for hasher in expired:
+        hasher.release()
+    return len(expired)
+
+
+def get_hasher(session_id: str) -> OrderedHasher:
+    """Hasher de la sesión en este proceso (se crea si no existe)"""
+    global _last_sweep
+    now = time.monotonic()
+    if now - _last_sweep > HASHER_SWEEP_INTERVAL:
+        _last_sweep = now
+        expire_idle_hashers()
+    with _registry_lock:
+        hasher = _hashers.get(session_id)
+        if hasher is None:
+            hasher = _hashers[session_id] = OrderedHasher()
+        return hasher
+
+
+def discard_hasher(session_id: str):
+    """Liberar el hasher de una sesión finalizada o cancelada"""
+    with _registry_lock:
+        hasher = _hashers.pop(session_id, None)
+    if hasher is not None:
+        hasher.release()
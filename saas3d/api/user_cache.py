@@ -0,0 +1,228 @@
+"""
+Caché de usuarios autenticados
+
+``get_current_user`` resuelve el usuario del token en cada petición
+autenticada (incluido el sondeo de jobs del frontend). Los usuarios
+resueltos se guardan como instantáneas inmutables en una caché LRU en
+memoria con TTL y, opcionalmente (``USER_CACHE_REDIS_URL``), en Redis para
+compartirlas entre procesos. Desde el event loop (``aget``/``aset``) las
+llamadas a Redis se hacen en el threadpool. Cualquier modificación o borrado
+de un ``User`` a través del ORM invalida su entrada al confirmar la
+transacción (en Redis, desde un hilo aparte).
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from typing import Iterable, List, Optional
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+
+from models import User
+
+logger = logging.getLogger(__name__)
+
+USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL_SECONDS", "30"))
+USER_CACHE_MAX_ENTRIES = int(os.getenv("USER_CACHE_MAX_ENTRIES", "10000"))
+USER_CACHE_REDIS_URL = os.getenv("USER_CACHE_REDIS_URL", "")
+USER_CACHE_REDIS_TTL = int(os.getenv("USER_CACHE_REDIS_TTL_SECONDS", "300"))
+
+
+@dataclass(frozen=True)
+class CachedUser:
+    """Instantánea de solo lectura de un usuario (mismos atributos que ``User``)"""
+    id: int
+    email: str
+    is_active: bool
+    is_verified: bool
+    created_at: Optional[datetime]
+
+    @classmethod
+    def from_model(cls, user: User) -> "CachedUser":
+        return cls(id=user.id, email=user.email, is_active=bool(user.is_active),
+                   is_verified=bool(user.is_verified), created_at=user.created_at)
+
+    def to_json(self) -> str:
+        data = asdict(self)
+        data["created_at"] = self.created_at.isoformat() if self.created_at else None
+        return json.dumps(data)
+
+    @classmethod
+    def from_json(cls, raw) -> "CachedUser":
+        data = json.loads(raw)
+        if data["created_at"]:
+            data["created_at"] = datetime.fromisoformat(data["created_at"])
+        return cls(**data)
+
+
+class UserCache:
+    """LRU en memoria con TTL y capa opcional en Redis"""
+
+    def __init__(self, ttl: float = USER_CACHE_TTL, max_entries: int = USER_CACHE_MAX_ENTRIES,
+                 redis_url: str = USER_CACHE_REDIS_URL):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.redis_url = redis_url
+        self._entries: "OrderedDict[int, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._redis = None
+        self._executor = None
+
+    @property
+    def redis(self):
+        if self.redis_url and self._redis is None:
+            import redis
+            self._redis = redis.Redis.from_url(self.redis_url, socket_timeout=0.5)
+        return self._redis
+
+    @staticmethod
+    def _redis_key(user_id: int) -> str:
+        return f"user-cache:{user_id}"
+
+    def get(self, user_id: int) -> Optional[CachedUser]:
+        """Usuario cacheado o None (la capa Redis solo se consulta si falla la local)"""
+        user = self._get_local(user_id)
+        if user is not None:
+            return user
+        return self._get_redis(user_id)
+
+    async def aget(self, user_id: int) -> Optional[CachedUser]:
+        """``get`` desde el event loop: la consulta a Redis va al threadpool"""
+        user = self._get_local(user_id)
+        if user is not None or not self.redis_url:
+            return user
+        return await run_in_threadpool(self._get_redis, user_id)
+
+    def _get_local(self, user_id: int) -> Optional[CachedUser]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None:
+                user, expires = entry
+                if expires > now:
+                    self._entries.move_to_end(user_id)
+                    return user
+                del self._entries[user_id]
+        return None
+
+    def _get_redis(self, user_id: int) -> Optional[CachedUser]:
+        if not self.redis_url or self.ttl <= 0:
+            return None
+        try:
+            raw = self.redis.get(self._redis_key(user_id))
+        except Exception as e:
+            logger.warning(f"Caché de usuarios en Redis no disponible: {str(e)}")
+            return None
+        if raw is None:
+            return None
+        user = CachedUser.from_json(raw)
+        self._store_local(user)
+        return user
+
+    def _store_local(self, user: CachedUser):
+        with self._lock:
+            self._entries[user.id] = (user, time.monotonic() + self.ttl)
+            self._entries.move_to_end(user.id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def set(self, user: CachedUser):
+        """Guardar un usuario resuelto"""
+        if self.ttl <= 0:
+            return
+        self._store_local(user)
+        self._set_redis(user)
+
+    async def aset(self, user: CachedUser):
+        """``set`` desde el event loop: la escritura en Redis va al threadpool"""
+        if self.ttl <= 0:
+            return
+        self._store_local(user)
+        if self.redis_url:
+            await run_in_threadpool(self._set_redis, user)
+
+    def _set_redis(self, user: CachedUser):
+        if self.redis_url:
+            try:
+                self.redis.set(self._redis_key(user.id), user.to_json(), ex=USER_CACHE_REDIS_TTL)
+            except Exception as e:
+                logger.warning(f"No se pudo guardar el usuario en Redis: {str(e)}")
+
+    def invalidate(self, user_id: int):
+        """Olvidar un usuario (tras modificarlo o borrarlo)"""
+        self._invalidate_local([user_id])
+        self._delete_redis([user_id])
+
+    def invalidate_in_background(self, user_ids: Iterable[int]) -> Optional[Future]:
+        """
+        ``invalidate`` sin bloquear a quien llama: la entrada local se borra ya
+        y el borrado en Redis se hace en un hilo aparte
+
+        Returns:
+            Future del borrado en Redis (None sin Redis)
+        """
+        user_ids = list(user_ids)
+        self._invalidate_local(user_ids)
+        if not self.redis_url or not user_ids:
+            return None
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="user-cache")
+        return self._executor.submit(self._delete_redis, user_ids)
+
+    def _invalidate_local(self, user_ids: Iterable[int]):
+        with self._lock:
+            for user_id in user_ids:
+                self._entries.pop(user_id, None)
+
+    def _delete_redis(self, user_ids: List[int]):
+        if self.redis_url:
+            try:
+                self.redis.delete(*(self._redis_key(user_id) for user_id in user_ids))
+            except Exception as e:
+                logger.warning(f"No se pudo invalidar el usuario en Redis: {str(e)}")
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+user_cache = UserCache()
+
+# Clave de ``Session.info`` con los ids de usuario modificados en la transacción
+CHANGED_USERS_KEY = "user_cache_changed"
+
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def collect_user_change(mapper, connection, target):
+    """
+    Anotar los usuarios modificados vía ORM; se invalidan al confirmar
+
+    El flush de una ``AsyncSession`` se ejecuta en el event loop: aquí no se
+    llama a Redis.
+    """
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault(CHANGED_USERS_KEY, set()).add(target.id)
+
+
+@event.listens_for(Session, "after_commit")
+def invalidate_changed_users(session):
+    """Invalidar los usuarios modificados en la transacción confirmada"""
+    user_ids = session.info.pop(CHANGED_USERS_KEY, None)
+    if user_ids:
+        user_cache.invalidate_in_background(user_ids)
+
+
+@event.listens_for(Session, "after_rollback")
+def discard_changed_users(session):
+    session.info.pop(CHANGED_USERS_KEY, None)
@@ -28,6 +28,22 @@ export interface Job {
   finished_at?: string
 }
 
+// Paginación por cursor: la cabecera X-Next-Cursor de una página se pasa
+// como cursor para pedir la siguiente
+export interface JobListQuery {
+  status?: Job['status']
+  limit?: number
+  cursor?: string
+}
+
+export interface JobEvent {
+  job_id: number
+  status: Job['status']
+  progress: number
+  error?: string | null
+  output_key?: string | null
+}
+
 export interface LoginRequest {
   email: string
   password: string
@@ -132,8 +148,15 @@ class ApiClient {
   }
 
   // Métodos de jobs
-  async getJobs(): Promise<ApiResponse<Job[]>> {
-    return this.request<Job[]>('/api/jobs')
+  async getJobs(query: JobListQuery = {}): Promise<ApiResponse<Job[]>> {
+    const params = new URLSearchParams()
+    if (query.status) params.set('status', query.status)
+    if (query.limit) params.set('limit', String(query.limit))
+    if (query.cursor) params.set('cursor', query.cursor)
+    const search = params.toString()
+    // Revalidar siempre con If-None-Match: una página sin cambios cuesta un 304
+    // y el navegador reutiliza la copia en caché
+    return this.request<Job[]>(`/api/jobs${search ? `?${search}` : ''}`, { cache: 'no-cache' })
   }
 
   async getJob(jobId: number): Promise<ApiResponse<Job>> {
@@ -216,6 +239,91 @@ class ApiClient {
     }
   }
 
+  async downloadOutput(jobId: number): Promise<Blob | null> {
+    // El navegador revalida con If-None-Match: si la malla no cambió, el servidor responde 304
+    const url = `${this.baseURL}/api/outputs/${jobId}`
+    
+    const headers: HeadersInit = {}
+    if (this.token) {
+      headers.Authorization = `Bearer ${this.token}`
+    }
+
+    try {
+      const response = await fetch(url, {
+        headers,
+        cache: 'no-cache',
+      })
+
+      if (!response.ok) {
+        return null
+      }
+
+      return await response.blob()
+    } catch (error) {
+      return null
+    }
+  }
+
+  // Eventos de jobs (Server-Sent Events). Se lee con fetch en lugar de
+  // EventSource para poder enviar el token en la cabecera Authorization.
+  // Devuelve una función que cierra la suscripción.
+  subscribeJobEvents(
+    onEvent: (event: JobEvent) => void,
+    onOpen?: () => void,
+    onClose?: () => void,
+  ): () => void {
+    const controller = new AbortController()
+    const url = `${this.baseURL}/api/jobs/events`
+    
+    const headers: HeadersInit = { Accept: 'text/event-stream' }
+    if (this.token) {
+      headers.Authorization = `Bearer ${this.token}`
+    }
+
+    const read = async () => {
+      const response = await fetch(url, { headers, signal: controller.signal })
+      if (!response.ok || !response.body) {
+        return
+      }
+      onOpen?.()
+
+      const reader = response.body.pipeThrough(new TextDecoderStream()).getReader()
+      let buffer = ''
+      while (true) {
+        const { value, done } = await reader.read()
+        if (done) {
+          return
+        }
+        buffer += value
+        // Los mensajes SSE terminan con una línea en blanco
+        let boundary = buffer.indexOf('\n\n')
+        while (boundary !== -1) {
+          const message = buffer.slice(0, boundary)
+          buffer = buffer.slice(boundary + 2)
+          const data = message
+            .split('\n')
+            .filter((line) => line.startsWith('data:'))
+            .map((line) => line.slice(5).trim())
+            .join('\n')
+          if (data) {
+            onEvent(JSON.parse(data))
+          }
+          boundary = buffer.indexOf('\n\n')
+        }
+      }
+    }
+
+    read()
+      .catch(() => undefined)
+      .finally(() => {
+        if (!controller.signal.aborted) {
+          onClose?.()
+        }
+      })
+
+    return () => controller.abort()
+  }
+
   // Métodos de utilidad
   setToken(token: string) {
     this.token = token
@@ -249,10 +357,16 @@ export const auth = {
 }
 
 export const jobs = {
-  getAll: () => apiClient.getJobs(),
+  getAll: (query?: JobListQuery) => apiClient.getJobs(query),
   getById: (id: number) => apiClient.getJob(id),
   create: (jobData: JobCreateRequest) => apiClient.createJob(jobData),
   delete: (id: number) => apiClient.deleteJob(id),
+  downloadOutput: (id: number) => apiClient.downloadOutput(id),
+  subscribe: (
+    onEvent: (event: JobEvent) => void,
+    onOpen?: () => void,
+    onClose?: () => void,
+  ) => apiClient.subscribeJobEvents(onEvent, onOpen, onClose),
 }
 
 export const upload = {
@@ -1,12 +1,24 @@
 'use client'
 
-import { useState, useEffect } from 'react'
-import { jobs, Job } from '@/lib/api'
+import { useState, useEffect, useRef } from 'react'
+import { jobs, Job, JobEvent } from '@/lib/api'
+
+// Espera antes de reabrir el stream de eventos si se corta
+const RECONNECT_DELAY_MS = 5000
+// Los eventos de jobs que aún no están en la lista se agrupan en una recarga
+const RELOAD_DEBOUNCE_MS = 500
 
 export function useJobs() {
   const [jobsList, setJobsList] = useState<Job[]>([])
   const [isLoading, setIsLoading] = useState(true)
   const [error, setError] = useState<string | null>(null)
+  // Lista actual para los callbacks del stream (creados una sola vez)
+  const jobsRef = useRef<Job[]>([])
+  const reloadTimer = useRef<ReturnType<typeof setTimeout> | undefined>(undefined)
+
+  useEffect(() => {
+    jobsRef.current = jobsList
+  }, [jobsList])
 
   const fetchJobs = async () => {
     try {
@@ -56,8 +68,62 @@ export function useJobs() {
     }
   }
 
+  const scheduleReload = () => {
+    if (reloadTimer.current !== undefined) {
+      return
+    }
+    reloadTimer.current = setTimeout(() => {
+      reloadTimer.current = undefined
+      fetchJobs()
+    }, RELOAD_DEBOUNCE_MS)
+  }
+
+  const applyEvent = (event: JobEvent) => {
+    if (!jobsRef.current.some((job) => job.id === event.job_id)) {
+      // Job nuevo (p. ej. creado desde otra pestaña): recargar la lista una
+      // vez por ráfaga de eventos
+      scheduleReload()
+      return
+    }
+    setJobsList((current) =>
+      current.map((job) =>
+        job.id === event.job_id
+          ? {
+              ...job,
+              status: event.status,
+              progress: event.progress,
+              error: event.error ?? undefined,
+              output_key: event.output_key ?? undefined,
+            }
+          : job
+      )
+    )
+  }
+
   useEffect(() => {
-    fetchJobs()
+    let unsubscribe = () => {}
+    let reconnectTimer: ReturnType<typeof setTimeout> | undefined
+
+    // El estado y el progreso llegan por eventos del servidor; la lista
+    // completa solo se recarga al (re)abrir la suscripción o si se corta
+    const connect = () => {
+      unsubscribe = jobs.subscribe(
+        applyEvent,
+        () => fetchJobs(),
+        () => {
+          fetchJobs()
+          reconnectTimer = setTimeout(connect, RECONNECT_DELAY_MS)
+        }
+      )
+    }
+
+    connect()
+
+    return () => {
+      clearTimeout(reconnectTimer)
+      clearTimeout(reloadTimer.current)
+      unsubscribe()
+    }
   }, [])
 
   return {